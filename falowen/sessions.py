@@ -1,9 +1,11 @@
 """Firestore session helpers for Falowen."""
 
 import base64
+import hashlib
 import os
+import threading
 import time
-from typing import Optional
+from typing import Dict, Optional
 
 import firebase_admin
 import requests
@@ -39,6 +41,53 @@ SESSIONS_COL = "sessions"
 SESSION_TTL_MIN = 60 * 24 * 14  # 14 days
 SESSION_ROTATE_AFTER_MIN = 60 * 24 * 7  # 7 days
 
+# Validated sessions are trusted from memory for this long before Firestore is
+# consulted again (bounds how long a token revoked elsewhere stays usable).
+SESSION_CACHE_TTL_SEC = int(os.environ.get("FALOWEN_SESSION_CACHE_TTL_SEC", 300))
+# ``expires_at`` is pushed forward at most once per this window.
+SESSION_EXTEND_EVERY_SEC = int(os.environ.get("FALOWEN_SESSION_EXTEND_EVERY_SEC", 3600))
+_SESSION_CACHE_MAX = 10_000
+
+_session_cache: Dict[str, dict] = {}
+_session_cache_lock = threading.Lock()
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()
+
+
+def _cache_put(token: str, data: dict, now: float) -> dict:
+    cached = dict(data)
+    with _session_cache_lock:
+        if len(_session_cache) >= _SESSION_CACHE_MAX:
+            oldest = min(_session_cache, key=lambda k: _session_cache[k]["checked_at"])
+            _session_cache.pop(oldest, None)
+        _session_cache[_token_key(token)] = {"data": cached, "checked_at": now}
+    return cached
+
+
+def _cache_get(token: str, now: float) -> Optional[dict]:
+    with _session_cache_lock:
+        entry = _session_cache.get(_token_key(token))
+        if entry is None:
+            return None
+        if now - entry["checked_at"] >= SESSION_CACHE_TTL_SEC:
+            _session_cache.pop(_token_key(token), None)
+            return None
+        return entry
+
+
+def _cache_drop(token: str) -> None:
+    with _session_cache_lock:
+        _session_cache.pop(_token_key(token), None)
+
+
+def clear_session_cache() -> None:
+    """Forget all cached session validations (mainly for tests)."""
+
+    with _session_cache_lock:
+        _session_cache.clear()
+
 
 def _rand_token(nbytes: int = 48) -> str:
     return base64.urlsafe_b64encode(os.urandom(nbytes)).rstrip(b"=").decode("ascii")
@@ -48,73 +97,101 @@ def create_session_token(student_code: str, name: str, ua_hash: str = "") -> str
     db = get_db()
     now = time.time()
     token = _rand_token()
-    db.collection(SESSIONS_COL).document(token).set(
-        {
-            "student_code": (student_code or "").strip().lower(),
-            "name": name or "",
-            "issued_at": now,
-            "expires_at": now + (SESSION_TTL_MIN * 60),
-            "ua_hash": ua_hash or "",
-        }
-    )
+    data = {
+        "student_code": (student_code or "").strip().lower(),
+        "name": name or "",
+        "issued_at": now,
+        "expires_at": now + (SESSION_TTL_MIN * 60),
+        "ua_hash": ua_hash or "",
+    }
+    db.collection(SESSIONS_COL).document(token).set(data)
+    _cache_put(token, data, now)
     return token
 
 
+def _load_session(token: str, now: float) -> Optional[dict]:
+    """Return the session document for ``token`` from cache or Firestore."""
+
+    entry = _cache_get(token, now)
+    if entry is not None:
+        return entry["data"]
+    db = get_db()
+    snap = db.collection(SESSIONS_COL).document(token).get()
+    if not snap.exists:
+        return None
+    return _cache_put(token, snap.to_dict() or {}, now)
+
+
 def validate_session_token(token: str, ua_hash: str = "") -> Optional[dict]:
+    """Return the session data for ``token`` or ``None`` when invalid.
+
+    Successful lookups are cached in-process (keyed by the token's SHA-256) for
+    :data:`SESSION_CACHE_TTL_SEC`, so reruns do not read Firestore.
+    """
     if not token:
         return None
-    db = get_db()
     try:
-        snap = db.collection(SESSIONS_COL).document(token).get()
-        if not snap.exists:
+        now = time.time()
+        data = _load_session(token, now)
+        if data is None:
             return None
-        data = snap.to_dict() or {}
-        if float(data.get("expires_at", 0)) < time.time():
+        if float(data.get("expires_at", 0)) < now:
+            _cache_drop(token)
             return None
         if data.get("ua_hash") and ua_hash and data["ua_hash"] != ua_hash:
             return None
-        return data
+        return dict(data)
     except Exception:
         return None
 
 
 def refresh_or_rotate_session_token(token: str) -> str:
-    """Extend session TTL and rotate token periodically without crashing the app."""
+    """Extend session TTL and rotate token periodically without crashing the app.
+
+    Decisions are made from the cached session data.  ``expires_at`` is only
+    written when the last extension is older than
+    :data:`SESSION_EXTEND_EVERY_SEC`, so steady-state reruns issue no RPCs.
+    """
     db = get_db()
     try:
-        ref = db.collection(SESSIONS_COL).document(token)
-        snap = ref.get()
-        if not snap.exists:
-            return token
-
-        data = snap.to_dict() or {}
         now = time.time()
-
-        # Extend TTL
-        ref.update({"expires_at": now + (SESSION_TTL_MIN * 60)})
+        data = _load_session(token, now)
+        if data is None:
+            return token
+        ref = db.collection(SESSIONS_COL).document(token)
+        ttl_sec = SESSION_TTL_MIN * 60
 
         # Rotate if older than threshold
         if now - float(data.get("issued_at", now)) > (SESSION_ROTATE_AFTER_MIN * 60):
             new_token = _rand_token()
-            db.collection(SESSIONS_COL).document(new_token).set(
-                {
-                    **data,
-                    "issued_at": now,
-                    "expires_at": now + (SESSION_TTL_MIN * 60),
-                }
-            )
+            new_data = {
+                **data,
+                "issued_at": now,
+                "expires_at": now + ttl_sec,
+            }
+            db.collection(SESSIONS_COL).document(new_token).set(new_data)
+            _cache_put(new_token, new_data, now)
+            _cache_drop(token)
             try:
                 ref.delete()
             except Exception:
                 pass
             return new_token
 
+        # Extend TTL, throttled: the previous extension happened at
+        # ``expires_at - ttl``.
+        last_extended = float(data.get("expires_at", 0)) - ttl_sec
+        if now - last_extended >= SESSION_EXTEND_EVERY_SEC:
+            ref.update({"expires_at": now + ttl_sec})
+            data["expires_at"] = now + ttl_sec
+
     except Exception as e:  # pragma: no cover - streamlit UI feedback
         st.warning(f"Session rotation warning: {e}")
     return token
 
 
 def destroy_session_token(token: str) -> None:
+    _cache_drop(token)
     db = get_db()
     try:
         db.collection(SESSIONS_COL).document(token).delete()
@@ -0,0 +1,28 @@
+"""Store the parent post id on Class Board comments written before it existed."""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import firebase_admin
+from firebase_admin import firestore
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.class_board_loader import backfill_comment_post_ids  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    args = parser.parse_args()
+
+    firebase_admin.initialize_app()
+    db = firestore.client()
+    updated = backfill_comment_post_ids(db, dry_run=args.dry_run)
+    print(json.dumps({"comments": updated, "dry_run": args.dry_run}, indent=2))
+
+
+if __name__ == "__main__":  # pragma: no cover - script entrypoint
+    main()
@@ -0,0 +1,299 @@
+"""Measure import cost and time-to-first-render of the app and enforce a budget.
+
+Every module in ``--module`` (default: the heavy third-party libraries and the
+app packages imported at the top of ``a1sprechen.py``) is imported on its own
+in a fresh interpreter under ``python -X importtime``; its cumulative time is
+the standalone cost of importing it.  The first render runs ``a1sprechen.py``
+once through Streamlit's ``AppTest`` with sockets disabled, an empty sheet
+snapshot directory and dummy credentials, so no network or Firestore call can
+make the numbers noisy.
+
+``--rerun-tab`` measures the CPU time of each Streamlit rerun while a
+logged-in (stub) student sits on that top-level tab: the script is run once
+and then re-run ``--reruns`` times, and the median is reported.
+
+A JSON report is printed (or written with ``--output``).  With ``--budget``
+(default ``scripts/startup_budget.json``) the script exits with status 1 when
+a measurement exceeds its budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BUDGET = Path(__file__).with_name("startup_budget.json")
+
+DEFAULT_MODULES = [
+    "pandas",
+    "streamlit",
+    "firebase_admin",
+    "openai",
+    "bs4",
+    "docx",
+    "fpdf",
+    "flask",
+    "src.firestore_utils",
+    "src.services.vocab",
+    "src.data_loading",
+    "src.assignment_ui",
+    "src.ui_components",
+    "src.schedule",
+    "src.sentence_bank",
+]
+
+# Prepended to every child interpreter: any connection attempt fails at once.
+_NO_NETWORK = """
+import socket
+
+def _blocked(*args, **kwargs):
+    raise OSError("network disabled by bench_startup")
+
+socket.socket.connect = _blocked
+socket.create_connection = _blocked
+socket.getaddrinfo = _blocked
+"""
+
+_FIRST_RENDER = """
+import json
+import time
+
+from streamlit.testing.v1 import AppTest
+
+started = time.perf_counter()
+app = AppTest.from_file("a1sprechen.py", default_timeout={timeout})
+app.run()
+elapsed = (time.perf_counter() - started) * 1000
+print("BENCH_RESULT " + json.dumps({{
+    "ms": elapsed,
+    "exceptions": [str(e.value)[:200] for e in app.exception],
+}}))
+"""
+
+
+_RERUNS = """
+import json
+import time
+
+from streamlit.testing.v1 import AppTest
+
+app = AppTest.from_file("a1sprechen.py", default_timeout={timeout})
+app.session_state["logged_in"] = True
+app.session_state["student_code"] = "bench"
+app.session_state["student_name"] = "Bench Student"
+app.session_state["student_level"] = "A1"
+app.session_state["nav_sel"] = {tab!r}
+app.session_state["main_tab_select"] = {tab!r}
+app.run()
+cpu = []
+for _ in range({reruns}):
+    started = time.process_time()
+    app.run()
+    cpu.append((time.process_time() - started) * 1000)
+print("BENCH_RESULT " + json.dumps({{
+    "cpu_ms": cpu,
+    "exceptions": [str(e.value)[:200] for e in app.exception],
+}}))
+"""
+
+
+def _child_env(snapshot_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    env["FALOWEN_SHEET_SNAPSHOT_DIR"] = snapshot_dir
+    env["FALOWEN_DRAFT_WRITE_BEHIND"] = "0"
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, object]]:
+    """Parse ``-X importtime`` output into ``{module, self_ms, cumulative_ms}`` rows."""
+
+    rows: List[Dict[str, object]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # the header line
+        rows.append(
+            {
+                "module": parts[2].strip(),
+                "self_ms": self_us / 1000,
+                "cumulative_ms": cumulative_us / 1000,
+            }
+        )
+    return rows
+
+
+def measure_import(module: str, env: Mapping[str, str], top: int = 5) -> Dict[str, object]:
+    """Import ``module`` in a fresh interpreter and return its import cost."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{_NO_NETWORK}\nimport {module}"],
+        cwd=ROOT,
+        env=dict(env),
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    rows = parse_importtime(result.stderr)
+    target = next((r for r in reversed(rows) if r["module"] == module), None)
+    heaviest = sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top]
+    return {
+        "ok": result.returncode == 0,
+        "cumulative_ms": target["cumulative_ms"] if target else None,
+        "modules_loaded": len(rows),
+        "heaviest": heaviest,
+        "error": "" if result.returncode == 0 else result.stderr.strip().splitlines()[-1:],
+    }
+
+
+def measure_first_render(env: Mapping[str, str], timeout: float = 120) -> Dict[str, object]:
+    """Run ``a1sprechen.py`` once headless and return the elapsed time."""
+
+    result = subprocess.run(
+        [sys.executable, "-c", _NO_NETWORK + _FIRST_RENDER.format(timeout=timeout)],
+        cwd=ROOT,
+        env=dict(env),
+        capture_output=True,
+        text=True,
+        timeout=timeout + 60,
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT "):])
+    return {"ms": None, "exceptions": [result.stderr.strip()[-500:]]}
+
+
+def measure_reruns(
+    tab: str, env: Mapping[str, str], reruns: int, timeout: float = 120
+) -> Dict[str, object]:
+    """Return the median CPU time of a rerun while ``tab`` is active."""
+
+    script = _RERUNS.format(tab=tab, reruns=reruns, timeout=timeout)
+    result = subprocess.run(
+        [sys.executable, "-c", _NO_NETWORK + script],
+        cwd=ROOT,
+        env=dict(env),
+        capture_output=True,
+        text=True,
+        timeout=(timeout + 10) * (reruns + 1),
+    )
+    for line in result.stdout.splitlines():
+        if line.startswith("BENCH_RESULT "):
+            data = json.loads(line[len("BENCH_RESULT "):])
+            return {"cpu_ms": _median(data["cpu_ms"]), "exceptions": data["exceptions"]}
+    return {"cpu_ms": None, "exceptions": [result.stderr.strip()[-500:]]}
+
+
+def _median(values: Iterable[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return statistics.median(present) if present else None
+
+
+def check_budget(report: Mapping[str, object], budget: Mapping[str, object]) -> List[str]:
+    """Return a message for every measurement over its budget."""
+
+    violations: List[str] = []
+    imports = report.get("imports", {})
+    for module, limit in (budget.get("imports_ms") or {}).items():
+        measured = imports.get(module, {}).get("cumulative_ms")
+        if measured is None:
+            continue
+        if measured > limit:
+            violations.append(f"import {module}: {measured:.0f} ms > budget {limit} ms")
+    render = report.get("first_render") or {}
+    limit = budget.get("first_render_ms")
+    if limit is not None and render.get("ms") is not None and render["ms"] > limit:
+        violations.append(f"first render: {render['ms']:.0f} ms > budget {limit} ms")
+    if budget.get("fail_on_render_exception") and render.get("exceptions"):
+        violations.append(f"first render raised: {render['exceptions'][0]}")
+    reruns = report.get("reruns", {})
+    for tab, limit in (budget.get("rerun_cpu_ms") or {}).items():
+        measured = reruns.get(tab, {}).get("cpu_ms")
+        if measured is not None and measured > limit:
+            violations.append(f"rerun on {tab}: {measured:.0f} ms CPU > budget {limit} ms")
+    return violations
+
+
+def run(
+    modules: List[str],
+    repeat: int,
+    render: bool,
+    rerun_tabs: Iterable[str] = (),
+    reruns: int = 5,
+) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="bench-sheets-") as snapshot_dir:
+        env = _child_env(snapshot_dir)
+        imports: Dict[str, Dict[str, object]] = {}
+        for module in modules:
+            runs = [measure_import(module, env) for _ in range(repeat)]
+            summary = runs[-1]
+            summary["cumulative_ms"] = _median(r["cumulative_ms"] for r in runs)
+            imports[module] = summary
+        report: Dict[str, object] = {
+            "python": sys.version.split()[0],
+            "repeat": repeat,
+            "imports": imports,
+        }
+        if render:
+            renders = [measure_first_render(env) for _ in range(repeat)]
+            report["first_render"] = {
+                "ms": _median(r["ms"] for r in renders),
+                "exceptions": renders[-1]["exceptions"],
+            }
+        report["reruns"] = {tab: measure_reruns(tab, env, reruns) for tab in rerun_tabs}
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", action="append", help="module to time (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (median)")
+    parser.add_argument("--no-render", action="store_true", help="skip the first-render run")
+    parser.add_argument(
+        "--rerun-tab", action="append", default=[], help="measure reruns on this tab (repeatable)"
+    )
+    parser.add_argument("--reruns", type=int, default=5, help="reruns per --rerun-tab")
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET, help="budget JSON file")
+    parser.add_argument("--no-budget", action="store_true", help="report only")
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.module or DEFAULT_MODULES,
+        max(1, args.repeat),
+        not args.no_render,
+        args.rerun_tab,
+        max(1, args.reruns),
+    )
+    violations: List[str] = []
+    if not args.no_budget:
+        violations = check_budget(report, json.loads(args.budget.read_text(encoding="utf-8")))
+    report["budget_violations"] = violations
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    for message in violations:
+        print(f"over budget: {message}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":  # pragma: no cover - script entrypoint
+    sys.exit(main())
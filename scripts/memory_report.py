@@ -0,0 +1,81 @@
+"""Report the memory each Streamlit session holds for the level schedules.
+
+Before the shared store, ``load_level_schedules`` put the unpickled copy
+returned by ``st.cache_data`` into ``st.session_state``, so every session held
+a private copy.  Now sessions reference one read-only structure built with
+``st.cache_resource``.  This script rebuilds both situations for
+``--sessions`` simulated sessions and prints the bytes held privately per
+session and in total as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import pickle
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def _plain_schedules() -> Dict[str, object]:
+    from src import schedule
+
+    return {
+        "A1": schedule.get_a1_schedule(),
+        "A2": schedule.get_a2_schedule(),
+        "B1": schedule.get_b1_schedule(),
+        "B2": schedule.get_b2_schedule(),
+        "C1": schedule.get_c1_schedule(),
+    }
+
+
+def run(sessions: int) -> Dict[str, object]:
+    from src import schedule
+    from src.shared_store import deep_sizeof, session_memory_report
+
+    plain = _plain_schedules()
+    payload = pickle.dumps(plain)
+    # ``st.cache_data`` returned a fresh unpickled copy to every session.
+    before = [
+        session_memory_report({"level_schedules": pickle.loads(payload)})
+        for _ in range(sessions)
+    ]
+
+    shared = schedule.load_level_schedules()
+    after = [
+        session_memory_report({"level_schedules": schedule.load_level_schedules()}, [shared])
+        for _ in range(sessions)
+    ]
+
+    def _summary(reports: List[Dict[str, object]], shared_bytes: int) -> Dict[str, object]:
+        per_session = reports[0]["total_bytes"] if reports else 0
+        return {
+            "bytes_per_session": per_session,
+            "shared_bytes": shared_bytes,
+            "total_bytes": shared_bytes + sum(r["total_bytes"] for r in reports),
+        }
+
+    return {
+        "sessions": sessions,
+        "level_schedules": {
+            "before": _summary(before, 0),
+            "after": _summary(after, deep_sizeof(shared)),
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50, help="simulated sessions")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(max(1, args.sessions)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - script entrypoint
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Migration script to move Falowen chats into one document per conversation."""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import firebase_admin
+from firebase_admin import firestore
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.falowen.chat_migration import migrate_legacy_chats  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--code", action="append", help="only migrate this student (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    parser.add_argument(
+        "--delete-legacy",
+        action="store_true",
+        help="remove copied conversations from the legacy chats map",
+    )
+    args = parser.parse_args()
+
+    firebase_admin.initialize_app()
+    db = firestore.client()
+    stats = migrate_legacy_chats(
+        db, codes=args.code, dry_run=args.dry_run, delete_legacy=args.delete_legacy
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":  # pragma: no cover - script entrypoint
+    main()
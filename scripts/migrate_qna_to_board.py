@@ -45,6 +45,7 @@ def migrate():
                     "commented_by_name": rdata.get("replied_by_name"),
                     "commented_by_code": rdata.get("replied_by_code"),
                     "created_at": rdata.get("timestamp"),
+                    "post_id": qdoc.id,
                 }
                 if rdata.get("updated_at") is not None:
                     comment_data["updated_at"] = rdata.get("updated_at")
@@ -0,0 +1,160 @@
+"""Per-student submission calendars computed once per scores snapshot.
+
+The Dashboard used to filter the whole scores sheet by student code on every
+rerun to compute the streak and the weekly goal.  :class:`ActivityCalendar`
+groups the normalized submission dates by student once, as sorted
+``datetime64[D]`` arrays, so streaks, weekly counts and heatmap counts are
+array operations on a few dozen dates.  :func:`load_activity_calendar`
+derives it from the shared assignment scores snapshot.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .assignment_dates import DATE_NORM_COLUMN, normalize_submission_dates
+from .assignment_ui import ASSIGNMENT_SCORES_SHEET
+from .sheets import sheet_refresher
+
+_EMPTY_DAYS = np.array([], dtype="datetime64[D]")
+
+
+def _norm_code(code: object) -> str:
+    return str(code).lower().strip()
+
+
+def _day(value: date) -> np.datetime64:
+    return np.datetime64(value, "D")
+
+
+def _runs(days: np.ndarray) -> np.ndarray:
+    """Return the lengths of the runs of consecutive days in sorted unique ``days``."""
+
+    if days.size == 0:
+        return np.array([], dtype=int)
+    breaks = np.flatnonzero(np.diff(days) != np.timedelta64(1, "D"))
+    bounds = np.concatenate(([-1], breaks, [days.size - 1]))
+    return np.diff(bounds)
+
+
+class ActivityCalendar:
+    """Sorted submission dates of every student of one scores snapshot.
+
+    Student codes are matched lowercased and stripped.  Every submission is
+    kept, so a day with two submissions counts twice in weekly and heatmap
+    counts but once in streaks.
+    """
+
+    def __init__(self, days: Dict[str, np.ndarray]) -> None:
+        self._days = days
+        self._unique: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_scores(cls, scores: pd.DataFrame) -> "ActivityCalendar":
+        if not isinstance(scores, pd.DataFrame) or "studentcode" not in scores.columns:
+            return cls({})
+        if DATE_NORM_COLUMN in scores.columns:
+            dates = scores[DATE_NORM_COLUMN]
+        else:
+            # Snapshots persisted before ``date_norm`` existed.
+            dates = normalize_submission_dates(scores)
+
+        days = pd.to_datetime(dates, errors="coerce").to_numpy(dtype="datetime64[D]")
+        codes = scores["studentcode"].astype(str).str.lower().str.strip().to_numpy(dtype=object)
+        valid = ~np.isnat(days)
+        days, codes = days[valid], codes[valid]
+        if days.size == 0:
+            return cls({})
+
+        order = np.lexsort((days, codes))
+        days, codes = days[order], codes[order]
+        starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+        ends = np.append(starts[1:], codes.size)
+        # Slices share one buffer instead of allocating an array per student.
+        return cls({codes[s]: days[s:e] for s, e in zip(starts, ends)})
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def days(self, student_code: str) -> np.ndarray:
+        """Return every submission day of ``student_code`` in ascending order."""
+
+        return self._days.get(_norm_code(student_code), _EMPTY_DAYS)
+
+    def active_days(self, student_code: str) -> np.ndarray:
+        """Return the distinct submission days of ``student_code``."""
+
+        key = _norm_code(student_code)
+        unique = self._unique.get(key)
+        if unique is None:
+            unique = self._unique[key] = np.unique(self.days(key))
+        return unique
+
+    def current_streak(self, student_code: str, today: Optional[date] = None) -> int:
+        """Return the number of consecutive days ending at the latest submission.
+
+        With ``today``, a streak whose latest day is before yesterday counts
+        as broken (0).
+        """
+
+        active = self.active_days(student_code)
+        if active.size == 0:
+            return 0
+        if today is not None and active[-1] < _day(today) - np.timedelta64(1, "D"):
+            return 0
+        return int(_runs(active)[-1])
+
+    def longest_streak(self, student_code: str) -> int:
+        runs = _runs(self.active_days(student_code))
+        return int(runs.max()) if runs.size else 0
+
+    def submissions_between(
+        self, student_code: str, start: date, end: Optional[date] = None
+    ) -> int:
+        """Return the submissions on or after ``start`` (and on or before ``end``)."""
+
+        days = self.days(student_code)
+        lo = np.searchsorted(days, _day(start), side="left")
+        hi = days.size if end is None else np.searchsorted(days, _day(end), side="right")
+        return int(max(0, hi - lo))
+
+    def submissions_this_week(self, student_code: str, today: Optional[date] = None) -> int:
+        """Return the submissions dated on or after this week's Monday."""
+
+        today = today or date.today()
+        return self.submissions_between(student_code, today - timedelta(days=today.weekday()))
+
+    def heatmap(self, student_code: str, start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """Return every day from ``start`` to ``end`` and its submission count."""
+
+        calendar = np.arange(_day(start), _day(end) + np.timedelta64(1, "D"))
+        days = self.days(student_code)
+        counts = np.searchsorted(days, calendar, side="right") - np.searchsorted(
+            days, calendar, side="left"
+        )
+        return calendar, counts
+
+    def streak_leaderboard(
+        self, n: int = 10, today: Optional[date] = None
+    ) -> List[Tuple[str, int]]:
+        """Return the ``n`` students with the longest current streaks."""
+
+        streaks = [(code, self.current_streak(code, today)) for code in self._days]
+        streaks = [item for item in streaks if item[1] > 0]
+        streaks.sort(key=lambda item: (-item[1], item[0]))
+        return streaks[: max(n, 0)]
+
+
+def load_activity_calendar() -> ActivityCalendar:
+    """Return the activity calendar of the current assignment scores snapshot."""
+
+    return sheet_refresher.view(
+        ASSIGNMENT_SCORES_SHEET, "activity_calendar", ActivityCalendar.from_scores
+    )
+
+
+__all__ = ["ActivityCalendar", "load_activity_calendar"]
@@ -0,0 +1,197 @@
+"""Vectorised normalisation of assignment submission dates.
+
+The scores sheet stores submission dates in whatever format the form or tutor
+used.  :func:`normalize_submission_dates` resolves a whole column with a few
+bulk :func:`pandas.to_datetime` passes (ISO 8601, then each explicit format)
+and only runs the generic parser and the regex fallbacks on the rows still
+unresolved.  It is applied once when the scores sheet is loaded, producing the
+``date_norm`` column consumers read.
+
+Values with an explicit offset (``Z``, ``+05:00``) are converted to UTC while
+naive values are taken as written.  The two kinds are parsed separately: a
+bulk ``utc=True`` parse applies the first value's offset to later naive ones.
+"""
+
+from __future__ import annotations
+
+import re
+import warnings
+from typing import Iterable, Optional
+
+import pandas as pd
+
+DATE_NORM_COLUMN = "date_norm"
+
+ASSIGNMENT_DATE_COLUMNS = (
+    "date",
+    "submission_date",
+    "submissiondate",
+    "submitted_on",
+    "submittedon",
+    "submitted_at",
+    "submittedat",
+    "submitted",
+    "timestamp",
+    "created_at",
+    "createdat",
+    "created",
+    "completed_at",
+    "completedat",
+)
+
+# Tried in order after ISO 8601 (mirrors the contract date formats).
+DATE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%m/%d/%Y",
+    "%d.%m.%y",
+    "%d.%m.%Y",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+)
+
+ASSIGNMENT_DATE_REGEX_PATTERNS = (
+    re.compile(r"(?P<year>\d{4})[-/](?P<month>\d{1,2})[-/](?P<day>\d{1,2})"),
+    re.compile(r"(?P<day>\d{1,2})[\./-](?P<month>\d{1,2})[\./-](?P<year>\d{4})"),
+)
+
+# A time of day followed by ``Z`` or a numeric UTC offset.
+_UTC_OFFSET_PATTERN = r"\d{1,2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:Z|[+-]\d{2}(?::?\d{2})?)$"
+
+
+def _find_date_column(df: pd.DataFrame, candidates: Iterable[str]) -> Optional[str]:
+    lookup = {str(col).strip().lower(): col for col in df.columns}
+    for candidate in candidates:
+        if candidate in lookup:
+            return lookup[candidate]
+    return None
+
+
+def _to_naive_utc(parsed: pd.Series) -> pd.Series:
+    if getattr(parsed.dt, "tz", None) is not None:
+        parsed = parsed.dt.tz_convert("UTC").dt.tz_localize(None)
+    return parsed
+
+
+def _parse_known_formats(text: pd.Series, *, utc: bool = False) -> pd.Series:
+    """Bulk-parse ``text`` trying ISO 8601 first and then :data:`DATE_FORMATS`."""
+
+    result = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    pending = text
+    parsers = [dict(format="ISO8601", utc=utc)] + [dict(format=fmt) for fmt in DATE_FORMATS]
+    for kwargs in parsers:
+        if pending.empty:
+            break
+        parsed = _to_naive_utc(pd.to_datetime(pending, errors="coerce", **kwargs))
+        hit = parsed.notna()
+        if hit.any():
+            result.loc[parsed.index[hit]] = parsed[hit].astype("datetime64[ns]")
+            pending = pending[~hit]
+    return result
+
+
+def _timestamp_to_naive_utc(value: object) -> object:
+    if isinstance(value, pd.Timestamp) and value.tzinfo is not None:
+        return value.tz_convert("UTC").tz_localize(None)
+    return value
+
+
+def _parse_one(value: object) -> object:
+    return _timestamp_to_naive_utc(pd.to_datetime(value, errors="coerce"))
+
+
+def _parse_generic(text: pd.Series, *, utc: bool = False) -> pd.Series:
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", FutureWarning)
+            parsed = pd.to_datetime(text, format="mixed", errors="coerce", utc=utc)
+    except (ValueError, FutureWarning):
+        # A textual zone ("GMT") among naive values mixes aware and naive
+        # results; parse those few rows one by one.
+        parsed = pd.to_datetime(text.map(_parse_one), errors="coerce")
+    return _to_naive_utc(parsed).astype("datetime64[ns]")
+
+
+def _split_by_offset(text: pd.Series, parse) -> pd.Series:
+    """Run ``parse`` on values with a UTC offset (``utc=True``) and on naive ones."""
+
+    aware = text.str.contains(_UTC_OFFSET_PATTERN, regex=True)
+    parts = [parse(group, utc=flag) for group, flag in ((text[aware], True), (text[~aware], False))]
+    return pd.concat([part for part in parts if not part.empty] or [parts[0]]).loc[text.index]
+
+
+def _parse_regex(text: pd.Series) -> pd.Series:
+    result = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+    pending = text
+    for pattern in ASSIGNMENT_DATE_REGEX_PATTERNS:
+        if pending.empty:
+            break
+        parts = pending.str.extract(pattern)
+        matched = parts.dropna()
+        if matched.empty:
+            continue
+        parsed = pd.to_datetime(
+            {
+                "year": matched["year"].astype(int),
+                "month": matched["month"].astype(int),
+                "day": matched["day"].astype(int),
+            },
+            errors="coerce",
+        )
+        hit = parsed.notna()
+        result.loc[parsed.index[hit]] = parsed[hit]
+        pending = pending.drop(parsed.index[hit])
+    return result
+
+
+def normalize_submission_dates(
+    df: pd.DataFrame,
+    *,
+    candidate_columns: Iterable[str] = ASSIGNMENT_DATE_COLUMNS,
+) -> pd.Series:
+    """Return normalized ``datetime.date`` objects (or ``NaT``) for ``df``'s rows."""
+
+    if not isinstance(df, pd.DataFrame):
+        return pd.Series(dtype="object")
+    if df.empty:
+        return pd.Series([pd.NaT] * len(df), index=df.index, dtype="object")
+
+    column = _find_date_column(df, candidate_columns)
+    if column is None:
+        return pd.Series([pd.NaT] * len(df), index=df.index, dtype="object")
+
+    source = df[column]
+    if pd.api.types.is_datetime64_any_dtype(source):
+        parsed = _to_naive_utc(source)
+    else:
+        text = source.astype("string").str.strip()
+        usable = text.notna() & (text != "") & ~text.str.lower().isin(["nan", "none", "nat"])
+        text = text[usable].astype(object)
+
+        parsed = pd.Series(pd.NaT, index=source.index, dtype="datetime64[ns]")
+        parsed.update(_split_by_offset(text, _parse_known_formats))
+
+        # Values with a trailing time part ("23.09.2025 14:05") parse by date.
+        left = text[parsed.loc[text.index].isna()]
+        with_time = left[left.str.contains(r"[ T]", regex=True)]
+        if not with_time.empty:
+            head = with_time.str.split(r"[ T]", n=1, regex=True).str[0]
+            parsed.update(_parse_known_formats(head))
+
+        left = text[parsed.loc[text.index].isna()]
+        if not left.empty:
+            parsed.update(_split_by_offset(left, _parse_generic))
+        left = text[parsed.loc[text.index].isna()]
+        if not left.empty:
+            parsed.update(_parse_regex(left))
+
+    dates = parsed.dt.date.astype(object)
+    dates[parsed.isna()] = pd.NaT
+    dates.index = source.index
+    return dates
+
+
+__all__ = [
+    "ASSIGNMENT_DATE_COLUMNS",
+    "DATE_NORM_COLUMN",
+    "normalize_submission_dates",
+]
@@ -12,7 +12,9 @@ import io
 import os
 import re
 import tempfile
+import threading
 import time
+from collections import OrderedDict
 from datetime import date
 from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
 
@@ -22,10 +24,13 @@ import streamlit as st
 from fpdf import FPDF
 
 from .assignment import linkify_html
+from .assignment_dates import DATE_NORM_COLUMN, normalize_submission_dates
 from .schedule import get_level_schedules as _get_level_schedules
 # ``load_school_logo`` is expected to be defined elsewhere in this package.
 from .pdf_utils import make_qr_code, clean_for_pdf
 from .data_loading import load_student_data
+from .roster_index import get_roster_index
+from .sheets import CsvSheet, sheet_refresher
 from .attendance_utils import load_attendance_records
 from .utils.currency import format_cedis
 from src.utils.toasts import refresh_with_toast
@@ -323,31 +328,23 @@ def summarize_assignment_attempts(df_user: pd.DataFrame) -> pd.DataFrame:
 # Data loaders
 # ---------------------------------------------------------------------------
 
-@st.cache_data(ttl=600)
-def _load_assignment_scores_cached(force_refresh: bool = False) -> pd.DataFrame:
-    """Fetch assignment scores from the Google Sheet.
+ASSIGNMENT_SCORES_SHEET = "assignment_scores"
+ASSIGNMENT_SCORES_TTL_SEC = 600
+ASSIGNMENT_SCORES_SHEET_ID = "1BRb8p3Rq0VpFCLSwL4eS9tSgXBo9hSWzfW_J_7W36NQ"
+ASSIGNMENT_SCORES_CSV_URL = (
+    f"https://docs.google.com/spreadsheets/d/{ASSIGNMENT_SCORES_SHEET_ID}"
+    "/gviz/tq?tqx=out:csv&sheet=Sheet1"
+)
 
-    Parameters
-    ----------
-    force_refresh: bool, optional
-        When ``True`` the Streamlit data cache is cleared before fetching the
-        scores.
-    """
 
-    if force_refresh:
-        try:
-            st.cache_data.clear()
-        except Exception:  # pragma: no cover - best effort
-            pass
+def _parse_assignment_scores(text: str) -> pd.DataFrame:
+    """Parse the assignment scores CSV.
 
-    SHEET_ID = "1BRb8p3Rq0VpFCLSwL4eS9tSgXBo9hSWzfW_J_7W36NQ"
-    base_url = (
-        f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/gviz/tq?tqx=out:csv&sheet=Sheet1"
-    )
-    cache_buster = int(time.time()) if force_refresh else int(time.time() // 60)
-    sep = "&" if "?" in base_url else "?"
-    url = f"{base_url}{sep}cb={cache_buster}"
-    df = pd.read_csv(url)
+    Runs on the background sheet refresher, so errors are raised rather than
+    shown to whichever student happens to be rendering.
+    """
+
+    df = pd.read_csv(io.StringIO(text))
 
     # Normalize column headers immediately for downstream lookups.
     df.columns = [str(col).strip().lower() for col in df.columns]
@@ -368,13 +365,31 @@ def _load_assignment_scores_cached(force_refresh: bool = False) -> pd.DataFrame:
             f"{missing_str}. Please update the sheet to include them."
         )
 
+    # Parsed once per download; readers use ``date_norm`` instead of re-parsing.
+    df[DATE_NORM_COLUMN] = normalize_submission_dates(df)
     return df
 
 
+sheet_refresher.register(
+    ASSIGNMENT_SCORES_SHEET,
+    CsvSheet(ASSIGNMENT_SCORES_CSV_URL, _parse_assignment_scores, cache_bust=True),
+    ttl=ASSIGNMENT_SCORES_TTL_SEC,
+    persist=True,
+)
+
+
 def load_assignment_scores(force_refresh: bool = False) -> pd.DataFrame:
-    """Public wrapper around :func:`_load_assignment_scores_cached`."""
+    """Return the latest assignment scores snapshot.
 
-    return _load_assignment_scores_cached(force_refresh=force_refresh)
+    The snapshot is kept fresh in the background by :mod:`src.sheets`;
+    ``force_refresh`` downloads the sheet now.  Submission dates are already
+    parsed into the ``date_norm`` column.  The frame is shared, so callers
+    must copy it before mutating.
+    """
+
+    if force_refresh:
+        return sheet_refresher.refresh(ASSIGNMENT_SCORES_SHEET)
+    return sheet_refresher.get(ASSIGNMENT_SCORES_SHEET)
 
 
 def select_best_assignment_attempts(df: pd.DataFrame) -> pd.DataFrame:
@@ -421,156 +436,112 @@ def fetch_scores(*_args, **_kwargs) -> pd.DataFrame:
     return load_assignment_scores(force_refresh=force_refresh)
 
 
-def get_assignment_summary(student_code: str, level: str, df: pd.DataFrame) -> dict:
-    """Summarize assignment progress for a student at a given level."""
+def _extract_all_nums(chapter_str: str) -> List[float]:
+    text = "" if chapter_str is None else str(chapter_str)
+    if not text:
+        return []
+    numbers: List[float] = []
+    base_prefix: Optional[str] = None
+    decimal_len = 0
+    for match in re.finditer(r"\d+(?:\.\d+)?", text):
+        token = match.group()
+        if "." in token:
+            integer_part, decimal_part = token.split(".", 1)
+            base_prefix = integer_part
+            decimal_len = len(decimal_part)
+            numbers.append(float(f"{integer_part}.{decimal_part}"))
+        else:
+            plain = token.lstrip("0") or "0"
+            if (
+                base_prefix is not None
+                and decimal_len
+                and plain.isdigit()
+                and len(plain) <= decimal_len
+            ):
+                combined = f"{base_prefix}.{plain.zfill(decimal_len)}"
+                numbers.append(float(combined))
+            else:
+                numbers.append(float(token))
+                base_prefix = None
+                decimal_len = 0
+    return numbers
 
-    schedules = _get_level_schedules() or {}
-    schedule = (
-        schedules.get(level)
-        or schedules.get((level or "").upper())
-        or schedules.get((level or "").title())
-        or []
-    )
 
-    def _extract_all_nums(chapter_str: str) -> List[float]:
-        text = "" if chapter_str is None else str(chapter_str)
-        if not text:
-            return []
-        numbers: List[float] = []
-        base_prefix: Optional[str] = None
-        decimal_len = 0
-        for match in re.finditer(r"\d+(?:\.\d+)?", text):
-            token = match.group()
-            if "." in token:
-                integer_part, decimal_part = token.split(".", 1)
-                base_prefix = integer_part
-                decimal_len = len(decimal_part)
-                numbers.append(float(f"{integer_part}.{decimal_part}"))
-            else:
-                plain = token.lstrip("0") or "0"
-                if (
-                    base_prefix is not None
-                    and decimal_len
-                    and plain.isdigit()
-                    and len(plain) <= decimal_len
-                ):
-                    combined = f"{base_prefix}.{plain.zfill(decimal_len)}"
-                    numbers.append(float(combined))
-                else:
-                    numbers.append(float(token))
-                    base_prefix = None
-                    decimal_len = 0
-        return numbers
+def _numbers_from_source(value: object) -> List[float]:
+    if value is None:
+        return []
+    text = str(value).strip()
+    if not text:
+        return []
+    return _extract_all_nums(text)
+
+
+def _collect_section_numbers(section: object, fallback: object) -> List[float]:
+    numbers: List[float] = []
+    if isinstance(section, dict):
+        if section.get("assignment"):
+            numbers.extend(_numbers_from_source(section.get("chapter", fallback)))
+    elif isinstance(section, list):
+        for item in section:
+            if isinstance(item, dict) and item.get("assignment"):
+                numbers.extend(_numbers_from_source(item.get("chapter", fallback)))
+    return numbers
 
-    def _numbers_from_source(value: object) -> List[float]:
+
+def _chapter_strings(lesson: dict) -> List[str]:
+    chapters: List[str] = []
+
+    def _maybe_add(value: object) -> None:
         if value is None:
-            return []
+            return
         text = str(value).strip()
-        if not text:
-            return []
-        return _extract_all_nums(text)
+        if text:
+            chapters.append(text)
 
-    def _collect_section_numbers(section: object, fallback: object) -> List[float]:
-        numbers: List[float] = []
+    _maybe_add(lesson.get("chapter"))
+    for section_name in ("lesen_hören", "schreiben_sprechen"):
+        section = lesson.get(section_name)
         if isinstance(section, dict):
-            if section.get("assignment"):
-                numbers.extend(_numbers_from_source(section.get("chapter", fallback)))
+            _maybe_add(section.get("chapter"))
         elif isinstance(section, list):
             for item in section:
-                if isinstance(item, dict) and item.get("assignment"):
-                    numbers.extend(_numbers_from_source(item.get("chapter", fallback)))
-        return numbers
+                if isinstance(item, dict):
+                    _maybe_add(item.get("chapter"))
+    return chapters
 
-    def _chapter_strings(lesson: dict) -> List[str]:
-        chapters: List[str] = []
 
-        def _maybe_add(value: object) -> None:
-            if value is None:
-                return
-            text = str(value).strip()
-            if text:
-                chapters.append(text)
-
-        _maybe_add(lesson.get("chapter"))
-        for section_name in ("lesen_hören", "schreiben_sprechen"):
-            section = lesson.get(section_name)
-            if isinstance(section, dict):
-                _maybe_add(section.get("chapter"))
-            elif isinstance(section, list):
-                for item in section:
-                    if isinstance(item, dict):
-                        _maybe_add(item.get("chapter"))
-        return chapters
-
-    student_norm = (student_code or "").strip().casefold()
-    level_norm = (level or "").strip().casefold()
-
-    completed_nums: Set[float] = set()
-    failed_attempt_nums: Set[float] = set()
-    if isinstance(df, pd.DataFrame) and not df.empty:
-        required_columns = {"studentcode", "assignment", "level"}
-        if required_columns.issubset(df.columns):
-            normalized_columns = {
-                str(column).strip().casefold(): column for column in df.columns
-            }
-            score_column_name: Optional[str] = None
-            for candidate in ("score", "grade", "points", "result", "marks", "percentage"):
-                lookup = normalized_columns.get(candidate)
-                if lookup is not None:
-                    score_column_name = lookup
-                    break
-
-            student_series = (
-                df["studentcode"].astype(str).str.strip().str.casefold()
-            )
-            level_series = df["level"].astype(str).str.strip().str.casefold()
-            mask = (student_series == student_norm) & (level_series == level_norm)
-            if mask.any():
-                highest_scores: Dict[float, float] = {}
-                filtered_df = df.loc[mask]
-                for _, row in filtered_df.iterrows():
-                    assignment_value = row.get("assignment")
-                    if pd.isna(assignment_value):
-                        continue
-                    text = str(assignment_value).strip()
-                    if not text:
-                        continue
-                    numbers = _extract_all_nums(text)
-                    if not numbers:
-                        continue
+def _to_int(value: object) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
 
-                    numeric_score: Optional[float] = None
-                    if score_column_name is not None:
-                        numeric_score = _coerce_score_value(row.get(score_column_name))
-                        if numeric_score is not None:
-                            try:
-                                numeric_score = float(numeric_score)
-                            except (TypeError, ValueError):
-                                numeric_score = None
-                    if numeric_score is None or pd.isna(numeric_score):
-                        continue
 
-                    for num in numbers:
-                        previous_best = highest_scores.get(num)
-                        if previous_best is None or numeric_score > previous_best:
-                            highest_scores[num] = numeric_score
+class ScheduleLesson(NamedTuple):
+    """A graded lesson of a level schedule with its chapter numbers."""
 
-                for identifier, best_score in highest_scores.items():
-                    if best_score >= PASS_MARK:
-                        completed_nums.add(identifier)
-                    else:
-                        failed_attempt_nums.add(identifier)
+    day: object
+    day_int: Optional[int]
+    chapter: str
+    topic: str
+    goal: object
+    relevant_nums: Tuple[float, ...]
 
-    def _to_int(value: object) -> Optional[int]:
-        try:
-            return int(value) if value is not None else None
-        except (TypeError, ValueError):
-            return None
 
-    lessons_info: List[Dict[str, object]] = []
-    assignment_identifiers: Set[float] = set()
+class CompiledSchedule(NamedTuple):
+    """The graded lessons of one level and every chapter number they cover."""
+
+    lessons: Tuple[ScheduleLesson, ...]
+    identifiers: frozenset
+
+
+def compile_schedule(schedule: Sequence[object]) -> CompiledSchedule:
+    """Extract the lessons with assignments and their chapter numbers."""
 
-    for lesson in schedule:
+    lessons: List[ScheduleLesson] = []
+    identifiers: Set[float] = set()
+
+    for lesson in schedule or []:
         if not isinstance(lesson, dict):
             continue
 
@@ -594,41 +565,173 @@ def get_assignment_summary(student_code: str, level: str, df: pd.DataFrame) -> d
         if not has_reading and has_writing:
             continue
 
-        seen: Set[float] = set()
-        relevant_nums: List[float] = []
-        for num in general_nums + reading_nums + writing_nums:
-            if num not in seen:
-                seen.add(num)
-                relevant_nums.append(num)
-
+        # Keep first-seen order while dropping duplicates.
+        relevant_nums = tuple(dict.fromkeys(general_nums + reading_nums + writing_nums))
         if not relevant_nums:
             continue
 
-        assignment_identifiers.update(relevant_nums)
+        identifiers.update(relevant_nums)
+        lessons.append(
+            ScheduleLesson(
+                day=lesson.get("day"),
+                day_int=_to_int(lesson.get("day")),
+                chapter=chapter_display,
+                topic=topic,
+                goal=lesson.get("goal"),
+                relevant_nums=relevant_nums,
+            )
+        )
+
+    return CompiledSchedule(tuple(lessons), frozenset(identifiers))
 
-        lessons_info.append(
-            {
-                "day": lesson.get("day"),
-                "day_int": _to_int(lesson.get("day")),
-                "chapter": chapter_display,
-                "topic": topic,
-                "goal": lesson.get("goal"),
-                "relevant_nums": relevant_nums,
-            }
+
+# Schedules are loaded once per session, so compile each list object once.  The
+# list itself is kept alongside its table so its ``id`` cannot be reused.
+_COMPILED_SCHEDULES_MAX = 64
+_compiled_schedules: "OrderedDict[int, Tuple[object, CompiledSchedule]]" = OrderedDict()
+_compiled_schedules_lock = threading.Lock()
+
+
+def _compiled_schedule(schedule: Sequence[object]) -> CompiledSchedule:
+    key = id(schedule)
+    with _compiled_schedules_lock:
+        cached = _compiled_schedules.get(key)
+        if cached is not None and cached[0] is schedule:
+            _compiled_schedules.move_to_end(key)
+            return cached[1]
+    compiled = compile_schedule(schedule)
+    with _compiled_schedules_lock:
+        _compiled_schedules[key] = (schedule, compiled)
+        while len(_compiled_schedules) > _COMPILED_SCHEDULES_MAX:
+            _compiled_schedules.popitem(last=False)
+    return compiled
+
+
+def get_compiled_schedule(level: str) -> CompiledSchedule:
+    """Return the compiled schedule of ``level`` (empty for unknown levels)."""
+
+    schedules = _get_level_schedules() or {}
+    schedule = (
+        schedules.get(level)
+        or schedules.get((level or "").upper())
+        or schedules.get((level or "").title())
+        or []
+    )
+    return _compiled_schedule(schedule)
+
+
+_SCORE_COLUMN_CANDIDATES = ("score", "grade", "points", "result", "marks", "percentage")
+
+
+class AssignmentProgressIndex:
+    """Best score per chapter number for every ``(student, level)`` pair.
+
+    Keys are casefolded student codes and levels.  Each distinct assignment
+    label and score value of the sheet is parsed only once.
+    """
+
+    def __init__(self, best: Dict[Tuple[str, str], Dict[float, float]]) -> None:
+        self._best = best
+
+    @classmethod
+    def from_scores(
+        cls, df: pd.DataFrame, student_code: Optional[str] = None
+    ) -> "AssignmentProgressIndex":
+        """Build the index, optionally only for rows of ``student_code``."""
+
+        best: Dict[Tuple[str, str], Dict[float, float]] = {}
+        if not isinstance(df, pd.DataFrame) or df.empty:
+            return cls(best)
+        if not {"studentcode", "assignment", "level"}.issubset(df.columns):
+            return cls(best)
+
+        normalized_columns = {str(column).strip().casefold(): column for column in df.columns}
+        score_column = next(
+            (normalized_columns[c] for c in _SCORE_COLUMN_CANDIDATES if c in normalized_columns),
+            None,
         )
+        if score_column is None:
+            return cls(best)
+
+        students = df["studentcode"].astype(str).str.strip().str.casefold()
+        if student_code is not None:
+            mask = students == (student_code or "").strip().casefold()
+            df, students = df.loc[mask], students[mask]
+        levels = df["level"].astype(str).str.strip().str.casefold()
+
+        numbers_by_label: Dict[object, List[float]] = {}
+        score_by_value: Dict[object, Optional[float]] = {}
+        for student, level, assignment, raw_score in zip(
+            students, levels, df["assignment"], df[score_column]
+        ):
+            if pd.isna(assignment):
+                continue
+            numbers = numbers_by_label.get(assignment)
+            if numbers is None:
+                numbers = numbers_by_label[assignment] = _extract_all_nums(str(assignment).strip())
+            if not numbers:
+                continue
+
+            try:
+                score = score_by_value[raw_score]
+            except (KeyError, TypeError):
+                score = _coerce_score_value(raw_score)
+                if score is not None:
+                    try:
+                        score = float(score)
+                    except (TypeError, ValueError):
+                        score = None
+                if score is not None and pd.isna(score):
+                    score = None
+                try:
+                    score_by_value[raw_score] = score
+                except TypeError:
+                    pass
+            if score is None:
+                continue
+
+            chapters = best.setdefault((student, level), {})
+            for num in numbers:
+                previous = chapters.get(num)
+                if previous is None or score > previous:
+                    chapters[num] = score
+        return cls(best)
+
+    def best_scores(self, student_code: str, level: str) -> Dict[float, float]:
+        key = ((student_code or "").strip().casefold(), (level or "").strip().casefold())
+        return self._best.get(key, {})
+
+    def students(self, level: str) -> List[str]:
+        """Return the (casefolded) codes of students with scores at ``level``."""
+
+        level_norm = (level or "").strip().casefold()
+        return sorted(student for student, lvl in self._best if lvl == level_norm)
+
+
+def load_progress_index() -> AssignmentProgressIndex:
+    """Return the progress index of the current assignment scores snapshot."""
 
+    return sheet_refresher.view(
+        ASSIGNMENT_SCORES_SHEET, "progress_index", AssignmentProgressIndex.from_scores
+    )
+
+
+def _summarize_progress(compiled: CompiledSchedule, best: Dict[float, float]) -> dict:
+    completed_nums = {num for num, score in best.items() if score >= PASS_MARK}
+    failed_attempt_nums = {num for num, score in best.items() if score < PASS_MARK}
+
+    lessons_info: List[Dict[str, object]] = []
     failed_identifiers_set: Set[float] = set()
-    for info in lessons_info:
-        relevant_nums = info["relevant_nums"]
-        needs_rework = any(num in failed_attempt_nums for num in relevant_nums)
-        info["needs_rework"] = needs_rework
-        if needs_rework:
+    for lesson in compiled.lessons:
+        failed_here = failed_attempt_nums.intersection(lesson.relevant_nums)
+        info: Dict[str, object] = lesson._asdict()
+        info["needs_rework"] = bool(failed_here)
+        if failed_here:
             info["completed"] = False
-            for num in relevant_nums:
-                if num in failed_attempt_nums:
-                    failed_identifiers_set.add(num)
+            failed_identifiers_set |= failed_here
         else:
-            info["completed"] = all(num in completed_nums for num in relevant_nums)
+            info["completed"] = completed_nums.issuperset(lesson.relevant_nums)
+        lessons_info.append(info)
 
     blocked_for_rework = any(info.get("needs_rework") for info in lessons_info)
 
@@ -639,7 +742,7 @@ def get_assignment_summary(student_code: str, level: str, df: pd.DataFrame) -> d
     ]
     max_completed_day = max(completed_day_ints) if completed_day_ints else None
 
-    target_total = len(assignment_identifiers)
+    target_total = len(compiled.identifiers)
 
     def _format_line(info: Dict[str, object]) -> str:
         day_value = info.get("day")
@@ -691,6 +794,49 @@ def get_assignment_summary(student_code: str, level: str, df: pd.DataFrame) -> d
         "failed_identifiers": failed_identifiers,
     }
 
+
+def get_assignment_summary(
+    student_code: str,
+    level: str,
+    df: pd.DataFrame,
+    *,
+    progress: Optional[AssignmentProgressIndex] = None,
+) -> dict:
+    """Summarize assignment progress for a student at a given level.
+
+    Pass ``progress`` (see :func:`load_progress_index`) to skip scanning
+    ``df``; otherwise only ``student_code``'s rows of ``df`` are indexed.
+    """
+
+    if progress is None:
+        progress = AssignmentProgressIndex.from_scores(df, student_code=student_code)
+    return _summarize_progress(
+        get_compiled_schedule(level), progress.best_scores(student_code, level)
+    )
+
+
+def get_class_assignment_summaries(
+    level: str,
+    student_codes: Optional[Sequence[str]] = None,
+    progress: Optional[AssignmentProgressIndex] = None,
+) -> Dict[str, dict]:
+    """Summarize every student of ``level`` (or ``student_codes``) in one pass.
+
+    Keys are the casefolded student codes.
+    """
+
+    if progress is None:
+        progress = load_progress_index()
+    compiled = get_compiled_schedule(level)
+    codes = progress.students(level) if student_codes is None else student_codes
+    summaries: Dict[str, dict] = {}
+    for code in codes:
+        code_norm = (code or "").strip().casefold()
+        summaries[code_norm] = _summarize_progress(
+            compiled, progress.best_scores(code_norm, level)
+        )
+    return summaries
+
 # ---------------------------------------------------------------------------
 # Helpers used elsewhere in the module (stubs shown here for completeness)
 # ---------------------------------------------------------------------------
@@ -975,18 +1121,9 @@ def render_results_and_resources_tab() -> None:
                     and not roster_df.empty
                     and "StudentCode" in roster_df.columns
                 ):
-                    norm_codes = (
-                        roster_df["StudentCode"].astype(str).str.strip().str.lower()
-                    )
-                    sc_norm = student_code.lower()
-                    matches = roster_df[norm_codes == sc_norm]
-                    if not matches.empty:
-                        row_series = matches.iloc[0]
-                        try:
-                            row_series = row_series.where(pd.notna(row_series), None)
-                        except Exception:
-                            pass
-                        student_row_state = row_series.to_dict()
+                    match = get_roster_index(roster_df).by_student_code(student_code)
+                    if match is not None:
+                        student_row_state = match
                         st.session_state["student_row"] = student_row_state
     student_row = st.session_state.get("student_row")
     if not isinstance(student_row, dict):
@@ -1839,12 +1976,10 @@ def render_results_and_resources_tab() -> None:
                         and not roster_df.empty
                         and "StudentCode" in roster_df.columns
                     ):
-                        roster_norm = (
-                            roster_df["StudentCode"].astype(str).str.strip().str.casefold()
+                        roster_row = get_roster_index(roster_df).by_student_code(
+                            lookup_code_norm
                         )
-                        matches = roster_df[roster_norm == lookup_code_norm]
-                        if not matches.empty:
-                            roster_row = matches.iloc[0]
+                        if roster_row is not None:
                             for key in ["Balance", "OutstandingBalance", "BalanceDue"]:
                                 if key not in roster_row:
                                     continue
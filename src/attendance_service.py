@@ -0,0 +1,295 @@
+"""Per-class attendance matrices shared by every student of the class.
+
+Attendance lives in ``attendance/{class}/sessions``, one document per session
+with the attendees stored as a mapping (under ``attendees``, ``students`` or
+at the top level) or as a list of ``{"code": ...}`` items.  Instead of
+streaming the whole collection for each student who opens the attendance view
+or the Dashboard, :class:`AttendanceService` loads a class once into an
+:class:`AttendanceMatrix` (sessions x students, present flags and hours) and
+keeps it for :data:`ATTENDANCE_TTL_SEC`.  Attendance is recorded outside this
+app, so nothing here sees the writes: a new session or mark shows up once the
+cached matrix is older than the TTL (five minutes by default, set with
+``FALOWEN_ATTENDANCE_TTL_SEC``).  :func:`invalidate_attendance` is only for
+code in this process that edits attendance; nothing calls it yet.
+
+The attendance view and the Dashboard summary historically read the session
+documents with slightly different rules (exact vs. case-insensitive codes,
+defaults for hours); the matrix keeps one grid per rule set so both return
+exactly what they did before.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+ATTENDANCE_TTL_SEC = float(os.environ.get("FALOWEN_ATTENDANCE_TTL_SEC", 300))
+
+
+def _session_attendees(data: Dict[str, Any]) -> Any:
+    """Attendees as read by the attendance view (``format_record``)."""
+
+    return data.get("attendees") or data.get("students") or data
+
+
+def _view_marks(data: Dict[str, Any]) -> Dict[str, Tuple[bool, float]]:
+    """Return ``code -> (present, hours)`` with exact student codes."""
+
+    attendees = _session_attendees(data)
+    marks: Dict[str, Tuple[bool, float]] = {}
+    if isinstance(attendees, dict):
+        for code, entry in attendees.items():
+            present, hours = False, 0.0
+            if isinstance(entry, dict):
+                present = bool(entry.get("present"))
+                if present:
+                    try:
+                        hours = float(entry.get("hours", 1) or 0)
+                    except Exception:
+                        hours = 1.0
+            elif isinstance(entry, (int, float, bool)):
+                present = bool(entry)
+                if present:
+                    try:
+                        hours = float(entry)
+                    except Exception:
+                        hours = 1.0
+            if present:
+                marks[code] = (True, hours)
+    elif isinstance(attendees, list):
+        for item in attendees:
+            if isinstance(item, dict) and isinstance(item.get("code"), str):
+                marks[item["code"]] = (True, 1.0)
+    return marks
+
+
+def _summary_marks(data: Dict[str, Any]) -> Dict[str, Tuple[bool, float]]:
+    """Return ``code -> (present, hours)`` with lowercased, stripped codes."""
+
+    if "attendees" in data:
+        attendees = data.get("attendees") or {}
+    elif "students" in data:
+        attendees = data.get("students") or {}
+    else:
+        attendees = data
+
+    marks: Dict[str, Tuple[bool, float]] = {}
+    if isinstance(attendees, dict):
+        attendees_norm = {str(k).strip().lower(): v for k, v in attendees.items()}
+        for code, entry in attendees_norm.items():
+            if isinstance(entry, dict) and "present" in entry:
+                if not bool(entry.get("present")):
+                    continue
+                raw_hours = entry.get("hours", 1)
+            else:
+                raw_hours = entry
+            try:
+                hours = float(raw_hours or 0)
+            except Exception:
+                hours = 0.0
+            marks[code] = (True, hours)
+    elif isinstance(attendees, list):
+        for item in attendees:
+            if not isinstance(item, dict) or not bool(item.get("present", True)):
+                continue
+            code = str(item.get("code", "")).strip().lower()
+            if code in marks:
+                continue  # the first present entry of a student counts
+            try:
+                hours = float(item.get("hours", 0) or 0)
+            except Exception:
+                hours = 0.0
+            marks[code] = (True, hours)
+    return marks
+
+
+class AttendanceGrid:
+    """Present flags and hours of every student (columns) per session (rows)."""
+
+    def __init__(self, sessions: List[Dict[str, Tuple[bool, float]]]) -> None:
+        codes = sorted({code for marks in sessions for code in marks})
+        self.columns: Dict[str, int] = {code: pos for pos, code in enumerate(codes)}
+        self.present = np.zeros((len(sessions), len(codes)), dtype=bool)
+        self.hours = np.zeros((len(sessions), len(codes)), dtype=float)
+        for row, marks in enumerate(sessions):
+            for code, (present, hours) in marks.items():
+                col = self.columns[code]
+                self.present[row, col] = present
+                self.hours[row, col] = hours
+
+    def student(self, code: str) -> Tuple[np.ndarray, np.ndarray]:
+        col = self.columns.get(code)
+        if col is None:
+            empty = np.zeros(self.present.shape[0])
+            return empty.astype(bool), empty
+        return self.present[:, col], self.hours[:, col]
+
+    def totals(self, code: str) -> Tuple[int, float]:
+        present, hours = self.student(code)
+        return int(present.sum()), float(hours[present].sum())
+
+
+@dataclass
+class AttendanceMatrix:
+    """All sessions of one class, loaded once."""
+
+    session_ids: List[str]
+    labels: List[str]
+    view: AttendanceGrid
+    summary: AttendanceGrid
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: Iterable[Tuple[str, Dict[str, Any]]],
+        normalize_label: Callable[[str], str] = lambda label: label,
+    ) -> "AttendanceMatrix":
+        session_ids: List[str] = []
+        labels: List[str] = []
+        view_rows: List[Dict[str, Tuple[bool, float]]] = []
+        summary_rows: List[Dict[str, Tuple[bool, float]]] = []
+        for doc_id, data in documents:
+            session_ids.append(doc_id)
+            labels.append(normalize_label(data.get("label") or doc_id))
+            view_rows.append(_view_marks(data))
+            summary_rows.append(_summary_marks(data))
+        return cls(session_ids, labels, AttendanceGrid(view_rows), AttendanceGrid(summary_rows))
+
+    def __len__(self) -> int:
+        return len(self.session_ids)
+
+    def student_records(self, student_code: str) -> Tuple[List[Dict[str, object]], int, float]:
+        """Return ``(records, sessions, hours)`` as shown in the attendance view."""
+
+        present, _hours = self.view.student(student_code)
+        records = [
+            {"session": label, "present": bool(flag)} for label, flag in zip(self.labels, present)
+        ]
+        count, hours = self.view.totals(student_code)
+        return records, count, hours
+
+    def student_summary(self, student_code: str) -> Tuple[int, float]:
+        """Return ``(sessions, hours)`` attended, matching codes case-insensitively."""
+
+        return self.summary.totals((student_code or "").strip().lower())
+
+    def class_report(self) -> List[Dict[str, object]]:
+        """Return sessions attended and hours of every student, most active first."""
+
+        grid = self.summary
+        counts = grid.present.sum(axis=0)
+        hours = np.where(grid.present, grid.hours, 0.0).sum(axis=0)
+        report = [
+            {"student_code": code, "sessions": int(counts[col]), "hours": float(hours[col])}
+            for code, col in grid.columns.items()
+        ]
+        report.sort(key=lambda row: (-row["sessions"], -row["hours"], row["student_code"]))
+        return report
+
+    def session_report(self) -> List[Dict[str, object]]:
+        """Return the number of students present at every session."""
+
+        present = self.summary.present.sum(axis=1)
+        return [
+            {"session_id": sid, "session": label, "present": int(count)}
+            for sid, label, count in zip(self.session_ids, self.labels, present)
+        ]
+
+
+@dataclass
+class _CachedMatrix:
+    matrix: AttendanceMatrix
+    loaded_at: float
+    db: Any
+
+
+class AttendanceService:
+    """Load each class's attendance once and serve it from memory for a TTL."""
+
+    def __init__(
+        self,
+        ttl: float = ATTENDANCE_TTL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: Dict[str, _CachedMatrix] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    def _fresh(self, class_name: str, db: Any) -> Optional[AttendanceMatrix]:
+        entry = self._entries.get(class_name)
+        if entry is None or entry.db is not db:
+            return None
+        if self._clock() - entry.loaded_at >= self.ttl:
+            return None
+        return entry.matrix
+
+    def matrix(self, class_name: str, db: Any) -> AttendanceMatrix:
+        """Return the attendance matrix of ``class_name`` read from ``db``.
+
+        Loading errors propagate; nothing is cached for a failed load.
+        """
+
+        with self._lock:
+            cached = self._fresh(class_name, db)
+            if cached is not None:
+                return cached
+            loading = self._loading.setdefault(class_name, threading.Lock())
+        with loading:
+            with self._lock:
+                cached = self._fresh(class_name, db)
+                if cached is not None:
+                    return cached
+            matrix = self._load(class_name, db)
+            with self._lock:
+                self._entries[class_name] = _CachedMatrix(matrix, self._clock(), db)
+        return matrix
+
+    def _load(self, class_name: str, db: Any) -> AttendanceMatrix:
+        from .firestore_utils import normalize_label
+
+        sessions_ref = db.collection("attendance").document(class_name).collection("sessions")
+        documents = (
+            (getattr(snap, "id", ""), snap.to_dict() or {}) for snap in sessions_ref.stream()
+        )
+        return AttendanceMatrix.from_documents(documents, normalize_label)
+
+    def invalidate(self, class_name: Optional[str] = None) -> None:
+        """Drop the cached matrix of ``class_name`` (of every class if ``None``)."""
+
+        with self._lock:
+            if class_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(class_name, None)
+
+
+attendance_service = AttendanceService()
+
+
+def load_class_attendance(class_name: str, db: Any) -> AttendanceMatrix:
+    """Return the (cached) attendance matrix of ``class_name``."""
+
+    return attendance_service.matrix(class_name, db)
+
+
+def invalidate_attendance(class_name: Optional[str] = None) -> None:
+    """Forget cached attendance after writing to ``attendance/{class_name}``."""
+
+    attendance_service.invalidate(class_name)
+
+
+__all__ = [
+    "ATTENDANCE_TTL_SEC",
+    "AttendanceMatrix",
+    "AttendanceService",
+    "attendance_service",
+    "invalidate_attendance",
+    "load_class_attendance",
+]
@@ -11,7 +11,7 @@ from __future__ import annotations
 from typing import List, Dict, Tuple
 import logging
 
-from .firestore_utils import format_record
+from .attendance_service import load_class_attendance
 
 try:  # Firestore client is optional in test environments
     from falowen.sessions import get_db  # pragma: no cover - runtime side effect
@@ -36,8 +36,9 @@ def load_attendance_records(
     is the number of sessions attended and ``hours`` is the invested time based on
     the Firestore record (defaulting to **1 hour** when unspecified).
 
-    If Firestore is unavailable or an error occurs the function returns
-    ``([], 0, 0.0)``.
+    The class's sessions are loaded once and shared by all its students (see
+    :mod:`src.attendance_service`).  If Firestore is unavailable or an error
+    occurs the function returns ``([], 0, 0.0)``.
     """
 
     db = _get_db()
@@ -45,23 +46,7 @@ def load_attendance_records(
         return [], 0, 0.0
 
     try:
-        sessions_ref = (
-            db.collection("attendance")
-            .document(class_name)
-            .collection("sessions")
-        )
-        records: List[Dict[str, object]] = []
-        count = 0
-        hours = 0.0
-        for snap in sessions_ref.stream():
-            data = snap.to_dict() or {}
-            record, session_hours = format_record(getattr(snap, "id", ""), data, student_code)
-            records.append(record)
-            if record["present"]:
-                count += 1
-                hours += session_hours
-
-        return records, count, hours
+        return load_class_attendance(class_name, db).student_records(student_code)
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
         logging.exception(
             "Failed to load attendance for %s/%s: %s", class_name, student_code, exc
@@ -0,0 +1,338 @@
+"""Listener-backed, process-wide cache for the Class Board.
+
+The "Class Notes & Q&A" page auto-refreshes every few seconds.  Streaming the
+whole ``posts`` collection and every ``comments`` subcollection on each rerun
+makes Firestore reads grow with viewers × refresh rate.  Instead, one
+:class:`ClassBoardCache` per ``(level, class)`` keeps the board in memory and
+applies the incremental changes delivered by Firestore ``on_snapshot``
+listeners, so reads only scale with the number of writes.
+
+The cache hands out the original ``DocumentSnapshot`` objects, which keeps the
+rendering code (``.id``, ``.to_dict()``, ``.reference``) unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+try:  # Firestore may be unavailable in tests
+    from falowen.sessions import get_db  # pragma: no cover - runtime side effect
+except Exception:  # pragma: no cover - handle missing Firestore gracefully
+    def get_db():  # type: ignore
+        return None
+
+try:  # pragma: no cover - optional in lightweight test environments
+    from google.cloud.firestore_v1.field_path import FieldPath
+except Exception:  # pragma: no cover - Firestore client not installed
+    FieldPath = None  # type: ignore
+
+
+# Smallest possible document id; mirrors the sentinel used by the Firestore
+# client for ``CollectionReference.recursive()`` range scans.
+_MIN_DOC_ID = "__id-9223372036854775808__"
+
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+# After a failed build the board falls back to direct reads; retry attaching
+# listeners only after this many seconds so a broken backend is not hammered.
+BOARD_CACHE_RETRY_SECONDS = 300.0
+
+_failed_at: Dict[Tuple[str, str], float] = {}
+
+
+def board_posts_path(level: str, class_name: str) -> str:
+    """Return the Firestore path of the ``posts`` collection for a class."""
+
+    return f"class_board/{level}/classes/{class_name}/posts"
+
+
+def board_posts_ref(db: Any, level: str, class_name: str):
+    """Return the ``posts`` collection reference for ``level``/``class_name``."""
+
+    return (
+        db.collection("class_board")
+        .document(level)
+        .collection("classes")
+        .document(class_name)
+        .collection("posts")
+    )
+
+
+def board_comments_query(db: Any, level: str, class_name: str):
+    """Return a collection-group query over every comment of one class board.
+
+    Comments live in ``posts/{id}/comments``.  A ``comments`` collection-group
+    query restricted to the document-name range below the class's ``posts``
+    collection returns all of them in a single query, without also matching
+    the chatty ``typing`` subcollections that live next to them.
+    """
+
+    posts_path = board_posts_path(level, class_name)
+    doc_id = FieldPath.document_id() if FieldPath is not None else "__name__"
+    start = db.document(f"{posts_path}/{_MIN_DOC_ID}")
+    # A trailing NUL on the collection segment sorts after every child path.
+    end = db.document(f"{posts_path}\0/{_MIN_DOC_ID}")
+    return (
+        db.collection_group("comments")
+        .order_by(doc_id)
+        .start_at({doc_id: start})
+        .end_at({doc_id: end})
+    )
+
+
+def snapshot_timestamp(snap: Any) -> datetime:
+    """Return the ``timestamp`` of ``snap`` as an aware datetime for sorting."""
+
+    try:
+        value = (snap.to_dict() or {}).get("timestamp")
+    except Exception:
+        return _EPOCH
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return _EPOCH
+
+
+def _change_kind(change: Any) -> str:
+    kind = getattr(change, "type", "")
+    return str(getattr(kind, "name", kind)).upper()
+
+
+def _post_id_for_comment(snap: Any) -> str:
+    try:
+        return snap.reference.parent.parent.id
+    except Exception:
+        return ""
+
+
+class ClassBoardCache:
+    """In-memory mirror of one class board kept current by snapshot listeners.
+
+    Listener callbacks run on Firestore's background threads; all reads and
+    writes of the internal maps happen under a lock.  ``version`` increases on
+    every applied change so callers can tell whether anything moved.
+    """
+
+    def __init__(self, db: Any, level: str, class_name: str) -> None:
+        self.db = db
+        self.level = level
+        self.class_name = class_name
+        self._lock = threading.Condition()
+        self._posts: Dict[str, Any] = {}
+        self._comments: Dict[str, Dict[str, Any]] = {}
+        self._watches: List[Any] = []
+        self._posts_ready = False
+        self._comments_ready = False
+        self.version = 0
+
+    # ------------------------------------------------------------------
+    # Listener lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> bool:
+        """Attach the posts and comments listeners.
+
+        Returns ``False`` when the database is unavailable or the listeners
+        could not be attached; callers should then fall back to direct reads.
+        """
+
+        if self.db is None:
+            return False
+        try:
+            posts_ref = board_posts_ref(self.db, self.level, self.class_name)
+            self._watches.append(posts_ref.on_snapshot(self._on_posts))
+            comments_query = board_comments_query(self.db, self.level, self.class_name)
+            self._watches.append(comments_query.on_snapshot(self._on_comments))
+        except Exception as exc:  # pragma: no cover - depends on Firestore runtime
+            logging.warning(
+                "Failed to attach class board listeners for %s/%s: %s",
+                self.level,
+                self.class_name,
+                exc,
+            )
+            self.close()
+            return False
+        return True
+
+    def close(self) -> None:
+        """Detach all listeners."""
+
+        for watch in self._watches:
+            try:
+                watch.unsubscribe()
+            except Exception:  # pragma: no cover - best effort
+                pass
+        self._watches = []
+        with self._lock:
+            self._posts_ready = False
+            self._comments_ready = False
+
+    @property
+    def ready(self) -> bool:
+        """``True`` once both listeners delivered their initial snapshot."""
+
+        with self._lock:
+            return self._posts_ready and self._comments_ready
+
+    @property
+    def healthy(self) -> bool:
+        """``True`` while the cache is ready and every listener is running."""
+
+        if not self._watches or not self.ready:
+            return False
+        return all(getattr(w, "is_active", True) for w in self._watches)
+
+    def wait_until_ready(self, timeout: float = 5.0) -> bool:
+        """Block until the initial snapshots arrived or ``timeout`` elapses."""
+
+        with self._lock:
+            self._lock.wait_for(
+                lambda: self._posts_ready and self._comments_ready, timeout=timeout
+            )
+            return self._posts_ready and self._comments_ready
+
+    def wait_for_change(self, since_version: int, timeout: float = 2.0) -> bool:
+        """Block until ``version`` moves past ``since_version``.
+
+        Used right after a local write so the following render already shows
+        it instead of waiting for the next auto-refresh.
+        """
+
+        with self._lock:
+            self._lock.wait_for(lambda: self.version > since_version, timeout=timeout)
+            return self.version > since_version
+
+    # ------------------------------------------------------------------
+    # Snapshot callbacks
+    # ------------------------------------------------------------------
+    def _on_posts(self, docs: List[Any], changes: List[Any], read_time: Any) -> None:
+        with self._lock:
+            for change in changes:
+                snap = change.document
+                if _change_kind(change) == "REMOVED":
+                    self._posts.pop(snap.id, None)
+                    self._comments.pop(snap.id, None)
+                else:
+                    self._posts[snap.id] = snap
+            self._posts_ready = True
+            self.version += 1
+            self._lock.notify_all()
+
+    def _on_comments(self, docs: List[Any], changes: List[Any], read_time: Any) -> None:
+        with self._lock:
+            for change in changes:
+                snap = change.document
+                post_id = _post_id_for_comment(snap)
+                if not post_id:
+                    continue
+                if _change_kind(change) == "REMOVED":
+                    bucket = self._comments.get(post_id)
+                    if bucket is not None:
+                        bucket.pop(snap.id, None)
+                        if not bucket:
+                            self._comments.pop(post_id, None)
+                else:
+                    self._comments.setdefault(post_id, {})[snap.id] = snap
+            self._comments_ready = True
+            self.version += 1
+            self._lock.notify_all()
+
+    # ------------------------------------------------------------------
+    # Readers
+    # ------------------------------------------------------------------
+    def post_snapshots(self, *, newest_first: bool = True) -> List[Any]:
+        """Return post snapshots ordered by ``timestamp``."""
+
+        with self._lock:
+            posts = list(self._posts.values())
+        posts.sort(key=snapshot_timestamp, reverse=newest_first)
+        return posts
+
+    def comment_snapshots(self, post_id: str) -> List[Any]:
+        """Return the comments of ``post_id`` ordered oldest first."""
+
+        with self._lock:
+            comments = list(self._comments.get(post_id, {}).values())
+        comments.sort(key=snapshot_timestamp)
+        return comments
+
+    def comments_by_post(self) -> Dict[str, List[Any]]:
+        """Return all comments grouped by post id, each list oldest first."""
+
+        with self._lock:
+            grouped = {pid: list(bucket.values()) for pid, bucket in self._comments.items()}
+        for comments in grouped.values():
+            comments.sort(key=snapshot_timestamp)
+        return grouped
+
+
+def _build_board_cache(
+    level: str,
+    class_name: str,
+    db_getter: Callable[[], Any] = get_db,
+    ready_timeout: float = 5.0,
+) -> Optional[ClassBoardCache]:
+    try:
+        db = db_getter()
+    except Exception:
+        db = None
+    if db is None:
+        return None
+    cache = ClassBoardCache(db, level, class_name)
+    if not cache.start():
+        return None
+    if not cache.wait_until_ready(ready_timeout):
+        logging.warning(
+            "Class board listeners for %s/%s not ready after %.1fs",
+            level,
+            class_name,
+            ready_timeout,
+        )
+        cache.close()
+        return None
+    return cache
+
+
+@st.cache_resource(show_spinner=False)
+def _cached_board_cache(level: str, class_name: str) -> Optional[ClassBoardCache]:
+    return _build_board_cache(level, class_name)
+
+
+def get_class_board_cache(level: str, class_name: str) -> Optional[ClassBoardCache]:
+    """Return the shared :class:`ClassBoardCache` for ``level``/``class_name``.
+
+    ``None`` is returned when listeners are unavailable so callers can fall
+    back to streaming the board directly.  A cache whose listeners died is
+    discarded and rebuilt on the next call; failed builds are retried after
+    :data:`BOARD_CACHE_RETRY_SECONDS`.
+    """
+
+    if not (level and class_name):
+        return None
+    try:
+        cache = _cached_board_cache(level, class_name)
+    except Exception as exc:  # pragma: no cover - runtime depends on Streamlit
+        logging.debug("Class board cache unavailable: %s", exc)
+        return None
+    if cache is not None and cache.healthy:
+        _failed_at.pop((level, class_name), None)
+        return cache
+
+    key = (level, class_name)
+    now = time.monotonic()
+    if cache is None:
+        failed_at = _failed_at.setdefault(key, now)
+        if now - failed_at < BOARD_CACHE_RETRY_SECONDS:
+            return None
+    else:
+        cache.close()
+    _failed_at[key] = now
+    try:
+        _cached_board_cache.clear(level, class_name)
+    except Exception:  # pragma: no cover - clearing is best effort
+        pass
+    return None
@@ -0,0 +1,389 @@
+"""Bulk and paginated loaders for Class Board posts and their comments.
+
+Rendering the board used to issue one ``comments`` query per post, one after
+the other (an N+1 pattern).  :func:`load_board` of a whole board fetches the
+posts with one query and every comment of the class with a single
+``comments`` collection-group query, grouping the results by post id in
+memory.  The returned :class:`BoardData` records how many queries were issued
+so the bound can be asserted in tests.
+
+:func:`load_board_page` walks the posts with ``start_after`` cursors in pages
+of :data:`BOARD_PAGE_SIZE` and fetches pinned posts with a separate small
+query.  Only the comments of the loaded posts are read: every comment stores
+its parent's id in :data:`COMMENT_POST_ID_FIELD`, and
+:func:`load_post_comments` fetches them with one collection-group query per
+page (``post_id in [...]``, at most :data:`COMMENT_IN_LIMIT` ids each).  The
+cost of a render depends on how many pages the student opened, not on the
+page size or the class's history.  :func:`window_posts` applies the same
+window to posts that are already in memory (e.g. the listener cache).
+
+The filtered query needs a collection-group index on ``comments``
+(``post_id`` ascending, ``__name__`` ascending).  Comments written before the
+field existed are filled in by ``scripts/backfill_board_comment_post_ids.py``
+(:func:`backfill_comment_post_ids`).
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:  # pragma: no cover - optional in lightweight test environments
+    from google.cloud.firestore_v1 import FieldFilter
+except Exception:  # pragma: no cover - Firestore client not installed
+    FieldFilter = None  # type: ignore
+
+from src.class_board_cache import (
+    ClassBoardCache,
+    board_comments_query,
+    board_posts_ref,
+    snapshot_timestamp,
+)
+
+BOARD_PAGE_SIZE = 20
+PINNED_POST_LIMIT = 10
+# Denormalised parent post id on every comment document.
+COMMENT_POST_ID_FIELD = "post_id"
+# Firestore accepts at most 30 values in an ``in`` filter.
+COMMENT_IN_LIMIT = 30
+
+
+@dataclass
+class BoardData:
+    """Posts and comments of one class board.
+
+    ``has_more`` is ``True`` when older posts exist beyond the loaded pages.
+    """
+
+    posts: List[Any]
+    comments: Dict[str, List[Any]] = field(default_factory=dict)
+    queries: int = 0
+    has_more: bool = False
+
+    def comments_for(self, post_id: str) -> List[Any]:
+        """Return the comments of ``post_id`` ordered oldest first."""
+
+        return self.comments.get(post_id, [])
+
+    @classmethod
+    def from_cache(cls, cache: ClassBoardCache, *, newest_first: bool = True) -> "BoardData":
+        """Build a :class:`BoardData` view from a listener cache (no queries)."""
+
+        return cls(
+            posts=cache.post_snapshots(newest_first=newest_first),
+            comments=cache.comments_by_post(),
+            queries=0,
+        )
+
+
+def _is_pinned(post: Any) -> bool:
+    if isinstance(post, dict):
+        return bool(post.get("pinned"))
+    try:
+        return bool((post.to_dict() or {}).get("pinned"))
+    except Exception:
+        return False
+
+
+def window_posts(
+    posts: Sequence[Any],
+    *,
+    pages: int = 1,
+    page_size: int = BOARD_PAGE_SIZE,
+) -> Tuple[List[Any], List[Any], bool]:
+    """Split ``posts`` into ``(pinned, visible, has_more)``.
+
+    Pinned posts are always shown; the remaining posts are cut to the first
+    ``pages * page_size`` entries in their current order.  Works with post
+    dictionaries as well as snapshots.
+    """
+
+    limit = max(1, pages) * max(1, page_size)
+    pinned = [p for p in posts if _is_pinned(p)]
+    others = [p for p in posts if not _is_pinned(p)]
+    return pinned, others[:limit], len(others) > limit
+
+
+def group_comments(snapshots: List[Any]) -> Dict[str, List[Any]]:
+    """Group comment snapshots by their parent post id, oldest first."""
+
+    grouped: Dict[str, List[Any]] = {}
+    for snap in snapshots:
+        try:
+            post_id = snap.reference.parent.parent.id
+        except Exception:
+            continue
+        grouped.setdefault(post_id, []).append(snap)
+    for comments in grouped.values():
+        comments.sort(key=snapshot_timestamp)
+    return grouped
+
+
+def _post_comments(posts_ref: Any, post_id: str) -> List[Any]:
+    try:
+        docs = list(posts_ref.document(post_id).collection("comments").stream())
+    except Exception as exc:
+        logging.warning("Comments query failed for post %s: %s", post_id, exc)
+        return []
+    docs.sort(key=snapshot_timestamp)
+    return docs
+
+
+def _read_per_post(
+    db: Any, level: str, class_name: str, post_ids: List[str]
+) -> Tuple[Dict[str, List[Any]], int]:
+    posts_ref = board_posts_ref(db, level, class_name)
+    comments: Dict[str, List[Any]] = {}
+    for post_id in post_ids:
+        docs = _post_comments(posts_ref, post_id)
+        if docs:
+            comments[post_id] = docs
+    return comments, len(post_ids)
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def post_comments_query(db: Any, level: str, class_name: str, post_ids: List[str]):
+    """Return the comments of up to :data:`COMMENT_IN_LIMIT` posts of one board.
+
+    Narrows :func:`board_comments_query` (scoped to the class's ``posts``
+    path) to comments whose :data:`COMMENT_POST_ID_FIELD` is in ``post_ids``.
+    """
+
+    query = board_comments_query(db, level, class_name)
+    if FieldFilter is not None:
+        return query.where(filter=FieldFilter(COMMENT_POST_ID_FIELD, "in", post_ids))
+    return query.where(COMMENT_POST_ID_FIELD, "in", post_ids)  # pragma: no cover
+
+
+def load_post_comments(
+    db: Any,
+    level: str,
+    class_name: str,
+    post_ids: Iterable[str],
+) -> Tuple[Dict[str, List[Any]], int]:
+    """Read the comments of ``post_ids`` only; return ``(comments, queries)``.
+
+    Issues one collection-group query per :data:`COMMENT_IN_LIMIT` ids.  When
+    the filtered query is rejected (e.g. its index is missing) the affected
+    posts are read one by one and ``queries`` reflects the cost.
+    """
+
+    post_ids = list(dict.fromkeys(post_ids))
+    comments: Dict[str, List[Any]] = {}
+    queries = 0
+    for chunk in _chunks(post_ids, COMMENT_IN_LIMIT):
+        queries += 1
+        try:
+            snaps = list(post_comments_query(db, level, class_name, chunk).stream())
+        except Exception as exc:
+            logging.warning(
+                "Filtered comments query failed for %s/%s, reading per post: %s",
+                level,
+                class_name,
+                exc,
+            )
+            found, cost = _read_per_post(db, level, class_name, chunk)
+            comments.update(found)
+            queries += cost
+            continue
+        comments.update(group_comments(snaps))
+    return comments, queries
+
+
+def backfill_comment_post_ids(db: Any, *, dry_run: bool = False, batch_size: int = 450) -> int:
+    """Store :data:`COMMENT_POST_ID_FIELD` on Class Board comments lacking it.
+
+    Streams every ``comments`` document once; returns how many need (or,
+    unless ``dry_run``, received) the field.  Safe to re-run.
+    """
+
+    limit = max(1, min(batch_size, 500))
+    batch, pending, updated = db.batch(), 0, 0
+    for snap in db.collection_group("comments").stream():
+        ref = snap.reference
+        if not str(getattr(ref, "path", "")).startswith("class_board/"):
+            continue
+        if (snap.to_dict() or {}).get(COMMENT_POST_ID_FIELD):
+            continue
+        updated += 1
+        if dry_run:
+            continue
+        batch.set(ref, {COMMENT_POST_ID_FIELD: ref.parent.parent.id}, merge=True)
+        pending += 1
+        if pending >= limit:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+    return updated
+
+
+def load_board(
+    db: Any,
+    level: str,
+    class_name: str,
+    *,
+    post_limit: Optional[int] = None,
+    newest_first: bool = True,
+) -> BoardData:
+    """Load a class board with a bounded number of Firestore queries.
+
+    Posts are ordered by ``timestamp``.  For the whole board, comments are
+    fetched through one collection-group query scoped to the class's
+    ``posts`` path; when that query is rejected (e.g. the backend lacks the
+    collection-group index) the loader falls back to per-post reads and
+    ``queries`` reflects the cost.  With ``post_limit`` only the comments of
+    the loaded posts are read (see :func:`load_post_comments`).
+    """
+
+    posts_ref = board_posts_ref(db, level, class_name)
+    direction = "DESCENDING" if newest_first else "ASCENDING"
+    queries = 1
+    try:
+        query = posts_ref.order_by("timestamp", direction=direction)
+        if post_limit:
+            query = query.limit(post_limit)
+        posts = list(query.stream())
+    except Exception:
+        queries += 1
+        posts = list(posts_ref.stream())
+        posts.sort(key=snapshot_timestamp, reverse=newest_first)
+        if post_limit:
+            posts = posts[:post_limit]
+
+    if not posts:
+        return BoardData(posts=[], comments={}, queries=queries)
+
+    post_ids = [snap.id for snap in posts]
+    if post_limit:
+        comments, cost = load_post_comments(db, level, class_name, post_ids)
+        return BoardData(posts=posts, comments=comments, queries=queries + cost)
+
+    try:
+        queries += 1
+        comments = group_comments(list(board_comments_query(db, level, class_name).stream()))
+    except Exception as exc:
+        logging.warning(
+            "Comments collection-group query failed for %s/%s, reading per post: %s",
+            level,
+            class_name,
+            exc,
+        )
+        comments, cost = _read_per_post(db, level, class_name, post_ids)
+        queries += cost
+
+    return BoardData(posts=posts, comments=comments, queries=queries)
+
+
+def fetch_post_page(
+    db: Any,
+    level: str,
+    class_name: str,
+    *,
+    page_size: int = BOARD_PAGE_SIZE,
+    start_after: Any = None,
+    newest_first: bool = True,
+) -> Tuple[List[Any], Any]:
+    """Return one page of posts and the cursor for the following page.
+
+    ``start_after`` is the last snapshot of the previous page.  The returned
+    cursor is ``None`` once the end of the board was reached.
+    """
+
+    direction = "DESCENDING" if newest_first else "ASCENDING"
+    query = board_posts_ref(db, level, class_name).order_by("timestamp", direction=direction)
+    if start_after is not None:
+        query = query.start_after(start_after)
+    posts = list(query.limit(page_size).stream())
+    cursor = posts[-1] if len(posts) == page_size else None
+    return posts, cursor
+
+
+def fetch_pinned_posts(
+    db: Any,
+    level: str,
+    class_name: str,
+    *,
+    limit: int = PINNED_POST_LIMIT,
+) -> List[Any]:
+    """Return the pinned posts of a board, newest first."""
+
+    posts_ref = board_posts_ref(db, level, class_name)
+    if FieldFilter is not None:
+        query = posts_ref.where(filter=FieldFilter("pinned", "==", True))
+    else:  # pragma: no cover - Firestore client not installed
+        query = posts_ref.where("pinned", "==", True)
+    posts = list(query.limit(limit).stream())
+    posts.sort(key=snapshot_timestamp, reverse=True)
+    return posts
+
+
+def load_board_page(
+    db: Any,
+    level: str,
+    class_name: str,
+    *,
+    pages: int = 1,
+    page_size: int = BOARD_PAGE_SIZE,
+    newest_first: bool = True,
+) -> BoardData:
+    """Load pinned posts plus the first ``pages`` pages of a board.
+
+    Issues one pinned-post query, ``pages`` cursor queries and one
+    ``comments`` query for the pinned posts and for each page (more only
+    when ``page_size`` exceeds :data:`COMMENT_IN_LIMIT`); falls back to :func:`load_board` with
+    a ``limit`` when the cursor queries are rejected.  Older posts and their
+    comments are not read, so searching the result only covers the loaded
+    pages.
+    """
+
+    limit = max(1, pages) * page_size
+    try:
+        pinned = fetch_pinned_posts(db, level, class_name)
+        queries = 1
+        posts: List[Any] = []
+        page_ids: List[List[str]] = []
+        cursor = None
+        has_more = False
+        for _ in range(max(1, pages)):
+            chunk, cursor = fetch_post_page(
+                db,
+                level,
+                class_name,
+                page_size=page_size,
+                start_after=cursor,
+                newest_first=newest_first,
+            )
+            queries += 1
+            posts.extend(chunk)
+            page_ids.append([snap.id for snap in chunk])
+            if cursor is None:
+                break
+        else:
+            has_more = cursor is not None
+    except Exception as exc:
+        logging.warning("Paginated board load failed for %s/%s: %s", level, class_name, exc)
+        data = load_board(
+            db, level, class_name, post_limit=limit, newest_first=newest_first
+        )
+        data.has_more = len(data.posts) >= limit
+        return data
+
+    pinned_ids = [snap.id for snap in pinned]
+    seen = set(pinned_ids)
+    posts = pinned + [snap for snap in posts if snap.id not in seen]
+    comments: Dict[str, List[Any]] = {}
+    # One comments query per page keeps the cost tied to ``pages``.
+    for position, ids in enumerate([pinned_ids] + page_ids):
+        if position:
+            ids = [post_id for post_id in ids if post_id not in seen]
+        if not ids:
+            continue
+        found, cost = load_post_comments(db, level, class_name, ids)
+        comments.update(found)
+        queries += cost
+    return BoardData(posts=posts, comments=comments, queries=queries, has_more=has_more)
@@ -0,0 +1,412 @@
+"""Counters for Class Board badges and discussion prompts.
+
+Two complementary mechanisms keep the board header and the Course Book
+discussion prompt from streaming full post documents just to count them:
+
+* :func:`count_board_posts` runs a Firestore ``count()`` aggregation query and
+  memoises the result for :data:`COUNT_CACHE_TTL_SECONDS`.
+* A ``class_board_stats`` document per class holds maintained counters
+  (``total``, ``unanswered``, per-chapter counts and per-day buckets of new
+  posts).  The ``record_*`` helpers update it with atomic increments whenever
+  posts or comments are created or deleted, so rendering the badges costs a
+  single document read via :func:`load_board_stats`.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from firebase_admin import firestore
+
+try:  # pragma: no cover - optional in lightweight test environments
+    from google.cloud.firestore_v1 import FieldFilter
+    from google.cloud.firestore_v1.field_path import FieldPath
+except Exception:  # pragma: no cover - Firestore client not installed
+    FieldFilter = None  # type: ignore
+    FieldPath = None  # type: ignore
+
+from src.class_board_cache import board_posts_ref
+from src.forum_timer import to_datetime_any
+
+STATS_DOC_ID = "class_board_stats"
+COUNT_CACHE_TTL_SECONDS = 60.0
+NEW_POST_WINDOW_DAYS = 7
+# Day buckets older than this are pruned from the stats document.
+DAY_BUCKET_RETENTION_DAYS = 30
+# A class whose stats could not be rebuilt or stored is retried after this.
+STATS_REBUILD_RETRY_SECONDS = 300.0
+
+_CHAPTER_RE = re.compile(r"\(Chapter\s+([^)]+)\)\s*$", re.IGNORECASE)
+
+_count_cache: Dict[Tuple[str, str, str], Tuple[float, int]] = {}
+# (level, class) -> (monotonic time of the failed rebuild, stats it computed)
+_rebuild_failed: Dict[Tuple[str, str], Tuple[float, Optional["BoardStats"]]] = {}
+
+
+def board_stats_ref(db: Any, level: str, class_name: str):
+    """Return the ``class_board_stats`` document reference for a class."""
+
+    return (
+        db.collection("class_board")
+        .document(level)
+        .collection("classes")
+        .document(class_name)
+        .collection("meta")
+        .document(STATS_DOC_ID)
+    )
+
+
+def post_chapter(post: Mapping[str, Any]) -> str:
+    """Return the chapter a post belongs to.
+
+    Uses the explicit ``chapter`` field when present and otherwise parses the
+    ``"Day X: Topic (Chapter Y)"`` lesson title chosen in the post form.
+    """
+
+    chapter = str(post.get("chapter") or "").strip()
+    if chapter:
+        return chapter
+    match = _CHAPTER_RE.search(str(post.get("lesson") or ""))
+    return match.group(1).strip() if match else ""
+
+
+def _post_created_at(post: Mapping[str, Any]) -> Optional[datetime]:
+    return to_datetime_any(post.get("created_at") or post.get("timestamp"))
+
+
+def _day_key(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _field(*parts: str) -> str:
+    if FieldPath is not None:
+        return FieldPath(*parts).to_api_repr()
+    return ".".join(parts)  # pragma: no cover - Firestore client not installed
+
+
+# ---------------------------------------------------------------------------
+# count() aggregation with a short TTL cache
+# ---------------------------------------------------------------------------
+
+def _aggregate_count(query: Any) -> int:
+    result = query.count(alias="total").get()
+    for row in result:
+        for agg in row if isinstance(row, (list, tuple)) else [row]:
+            return int(getattr(agg, "value", 0) or 0)
+    return 0
+
+
+def count_board_posts(
+    db: Any,
+    level: str,
+    class_name: str,
+    *,
+    chapter: str = "",
+    ttl: float = COUNT_CACHE_TTL_SECONDS,
+) -> int:
+    """Return the number of posts on a board, optionally for one ``chapter``.
+
+    The count is computed server-side with an aggregation query (billed as a
+    single read per 1,000 matches) and cached in-process for ``ttl`` seconds.
+    """
+
+    key = (level, class_name, chapter)
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    query = board_posts_ref(db, level, class_name)
+    if chapter:
+        if FieldFilter is not None:
+            query = query.where(filter=FieldFilter("chapter", "==", chapter))
+        else:  # pragma: no cover - Firestore client not installed
+            query = query.where("chapter", "==", chapter)
+    try:
+        value = _aggregate_count(query)
+    except Exception as exc:
+        logging.warning("count() failed for %s/%s (%s): %s", level, class_name, chapter, exc)
+        return cached[1] if cached else 0
+    _count_cache[key] = (now + ttl, value)
+    return value
+
+
+def invalidate_counts(level: str, class_name: str) -> None:
+    """Drop cached ``count()`` results for one class."""
+
+    for key in [k for k in _count_cache if k[:2] == (level, class_name)]:
+        _count_cache.pop(key, None)
+
+
+# ---------------------------------------------------------------------------
+# Maintained counters
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BoardStats:
+    """Snapshot of the ``class_board_stats`` counters for one class."""
+
+    total: int = 0
+    unanswered: int = 0
+    chapters: Dict[str, int] = field(default_factory=dict)
+    new_by_day: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "BoardStats":
+        def _ints(value: Any) -> Dict[str, int]:
+            if not isinstance(value, Mapping):
+                return {}
+            return {str(k): int(v or 0) for k, v in value.items()}
+
+        return cls(
+            total=max(0, int(data.get("total") or 0)),
+            unanswered=max(0, int(data.get("unanswered") or 0)),
+            chapters=_ints(data.get("chapters")),
+            new_by_day=_ints(data.get("new_by_day")),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "unanswered": self.unanswered,
+            "chapters": dict(self.chapters),
+            "new_by_day": dict(self.new_by_day),
+        }
+
+    def new_in_days(self, days: int = NEW_POST_WINDOW_DAYS, *, now: Optional[datetime] = None) -> int:
+        """Return the number of posts created during the last ``days`` days."""
+
+        today = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+        keys = {_day_key(today - timedelta(days=offset)) for offset in range(days + 1)}
+        return max(0, sum(count for day, count in self.new_by_day.items() if day in keys))
+
+    def chapter_count(self, chapter: str) -> int:
+        return max(0, self.chapters.get(str(chapter), 0))
+
+
+def _write_counters(
+    db: Any,
+    level: str,
+    class_name: str,
+    *,
+    total: int = 0,
+    unanswered: int = 0,
+    chapter: str = "",
+    day: str = "",
+) -> None:
+    if db is None or not (level and class_name):
+        return
+    updates: Dict[str, Any] = {"updated_at": firestore.SERVER_TIMESTAMP}
+    if total:
+        updates["total"] = firestore.Increment(total)
+    if unanswered:
+        updates["unanswered"] = firestore.Increment(unanswered)
+    if chapter and total:
+        updates[_field("chapters", chapter)] = firestore.Increment(total)
+    if day and total:
+        updates[_field("new_by_day", day)] = firestore.Increment(total)
+    try:
+        # ``update`` (not ``set``) so a class without a stats document is
+        # left alone and rebuilt in full on its next read.
+        board_stats_ref(db, level, class_name).update(updates)
+    except Exception as exc:  # pragma: no cover - runtime depends on Firestore
+        logging.debug("Board stats not updated for %s/%s: %s", level, class_name, exc)
+    invalidate_counts(level, class_name)
+
+
+def _recent_day(post: Mapping[str, Any], now: Optional[datetime]) -> str:
+    created = _post_created_at(post)
+    if created is None:
+        return ""
+    current = now or datetime.now(timezone.utc)
+    if (current - created).days > DAY_BUCKET_RETENTION_DAYS:
+        return ""
+    return _day_key(created)
+
+
+def record_post_created(
+    db: Any,
+    level: str,
+    class_name: str,
+    post: Mapping[str, Any],
+    *,
+    now: Optional[datetime] = None,
+) -> None:
+    """Count a newly created (and therefore unanswered) post."""
+
+    _write_counters(
+        db,
+        level,
+        class_name,
+        total=1,
+        unanswered=1,
+        chapter=post_chapter(post),
+        day=_recent_day(post, now),
+    )
+
+
+def record_post_deleted(
+    db: Any,
+    level: str,
+    class_name: str,
+    post: Mapping[str, Any],
+    *,
+    had_comments: bool,
+    now: Optional[datetime] = None,
+) -> None:
+    """Remove a deleted post from the counters."""
+
+    _write_counters(
+        db,
+        level,
+        class_name,
+        total=-1,
+        unanswered=0 if had_comments else -1,
+        chapter=post_chapter(post),
+        day=_recent_day(post, now),
+    )
+
+
+def record_comment_added(db: Any, level: str, class_name: str, *, first_reply: bool) -> None:
+    """Mark a post as answered when it received its first comment."""
+
+    if first_reply:
+        _write_counters(db, level, class_name, unanswered=-1)
+
+
+def record_comment_deleted(db: Any, level: str, class_name: str, *, last_reply: bool) -> None:
+    """Mark a post as unanswered again when its last comment was removed."""
+
+    if last_reply:
+        _write_counters(db, level, class_name, unanswered=1)
+
+
+def legacy_reply_count(post: Mapping[str, Any]) -> int:
+    """Return the replies recorded on the post itself by older board versions."""
+
+    if isinstance(post.get("answers"), list):
+        return len(post["answers"])
+    if isinstance(post.get("replies"), list):
+        return len(post["replies"])
+    if isinstance(post.get("reply_count"), int):
+        return int(post["reply_count"])
+    return 0
+
+
+def compute_board_stats(
+    posts: Iterable[Mapping[str, Any]],
+    comment_counts: Mapping[str, int],
+    *,
+    now: Optional[datetime] = None,
+) -> BoardStats:
+    """Compute counters from post dictionaries (each carrying an ``id``).
+
+    A post is unanswered when it has no comments and no replies recorded in
+    the legacy ``answers``/``replies``/``reply_count`` fields.
+    """
+
+    stats = BoardStats()
+    for post in posts:
+        stats.total += 1
+        if not comment_counts.get(str(post.get("id", "")), 0) and not legacy_reply_count(post):
+            stats.unanswered += 1
+        chapter = post_chapter(post)
+        if chapter:
+            stats.chapters[chapter] = stats.chapters.get(chapter, 0) + 1
+        day = _recent_day(post, now)
+        if day:
+            stats.new_by_day[day] = stats.new_by_day.get(day, 0) + 1
+    return stats
+
+
+def rebuild_board_stats(db: Any, level: str, class_name: str) -> BoardStats:
+    """Recompute the counters from scratch and overwrite the stats document.
+
+    Used to backfill classes that predate the counters or to repair drift;
+    costs one full read of the board.  Reading errors propagate; when the
+    document cannot be stored the class is remembered so
+    :func:`load_board_stats` does not repeat the rebuild on every render.
+    """
+
+    from src.class_board_loader import load_board
+
+    data = load_board(db, level, class_name)
+    posts = [dict(snap.to_dict() or {}, id=snap.id) for snap in data.posts]
+    counts = {pid: len(docs) for pid, docs in data.comments.items()}
+    stats = compute_board_stats(posts, counts)
+    try:
+        payload = stats.to_dict()
+        payload["updated_at"] = firestore.SERVER_TIMESTAMP
+        board_stats_ref(db, level, class_name).set(payload)
+    except Exception as exc:
+        logging.warning("Failed to store board stats for %s/%s: %s", level, class_name, exc)
+        _rebuild_failed[(level, class_name)] = (time.monotonic(), stats)
+    else:
+        _rebuild_failed.pop((level, class_name), None)
+    invalidate_counts(level, class_name)
+    return stats
+
+
+def _prune_day_buckets(ref: Any, stats: BoardStats, now: Optional[datetime]) -> None:
+    cutoff = _day_key(
+        (now or datetime.now(timezone.utc)) - timedelta(days=DAY_BUCKET_RETENTION_DAYS)
+    )
+    stale = [day for day in stats.new_by_day if day < cutoff]
+    if not stale:
+        return
+    for day in stale:
+        stats.new_by_day.pop(day, None)
+    try:
+        ref.update({_field("new_by_day", day): firestore.DELETE_FIELD for day in stale})
+    except Exception as exc:  # pragma: no cover - best effort cleanup
+        logging.debug("Failed to prune board stats buckets: %s", exc)
+
+
+def _rebuild_with_backoff(db: Any, level: str, class_name: str) -> Optional[BoardStats]:
+    key = (level, class_name)
+    failed = _rebuild_failed.get(key)
+    fallback = failed[1] if failed else None
+    if failed and time.monotonic() - failed[0] < STATS_REBUILD_RETRY_SECONDS:
+        return fallback
+    try:
+        return rebuild_board_stats(db, level, class_name)
+    except Exception as exc:
+        logging.warning("Failed to rebuild board stats for %s/%s: %s", level, class_name, exc)
+        _rebuild_failed[key] = (time.monotonic(), fallback)
+        return fallback
+
+
+def load_board_stats(
+    db: Any,
+    level: str,
+    class_name: str,
+    *,
+    rebuild_missing: bool = True,
+    now: Optional[datetime] = None,
+) -> Optional[BoardStats]:
+    """Return the counters for a class with a single document read.
+
+    When the document does not exist yet it is rebuilt (if
+    ``rebuild_missing``); ``None`` is returned when Firestore is unavailable.
+    A failed rebuild is not retried for :data:`STATS_REBUILD_RETRY_SECONDS`;
+    meanwhile the counters it computed (if any) are returned.
+    """
+
+    if db is None or not (level and class_name):
+        return None
+    ref = board_stats_ref(db, level, class_name)
+    try:
+        snap = ref.get()
+    except Exception as exc:
+        logging.warning("Failed to read board stats for %s/%s: %s", level, class_name, exc)
+        return None
+    if not getattr(snap, "exists", False):
+        return _rebuild_with_backoff(db, level, class_name) if rebuild_missing else None
+    stats = BoardStats.from_dict(snap.to_dict() or {})
+    _prune_day_buckets(ref, stats, now)
+    return stats
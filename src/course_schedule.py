@@ -1,10 +1,18 @@
-"""Course schedule data and helper utilities."""
+"""Course schedule data and helper utilities.
+
+The bundled schedules are compiled once into a :class:`ScheduleIndex`: class
+name -> :class:`ClassSchedule`, each with its days keyed by date and a sorted
+list of session dates, so date lookups are dict hits and "next session"
+queries a bisect.
+"""
 from __future__ import annotations
 
 import json
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from datetime import date
 from functools import lru_cache
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 _SCHEDULE_JSON = """
 {
@@ -649,9 +657,7 @@ _SCHEDULE_JSON = """
             }
           ]
         }
-      ]
-    }
-  ],
+      ],
       "generated_note": "Schedule generated by Learn Language Education Academy."
     },
     {
@@ -1569,19 +1575,12 @@ def _load_schedule_data() -> Dict[str, Any]:
 
 def all_schedules() -> List[Dict[str, Any]]:
     """Return all course schedules as a list."""
-    data = _load_schedule_data()
-    schedules = data.get("schedules", []) if isinstance(data, dict) else []
-    return [s for s in schedules if isinstance(s, dict)]
+    return list(schedule_index().schedules)
 
 def get_schedule_for_class(class_name: str) -> Optional[Dict[str, Any]]:
     """Return the schedule mapping for ``class_name`` if available."""
-    class_name = (class_name or "").strip().lower()
-    if not class_name:
-        return None
-    for schedule in all_schedules():
-        if str(schedule.get("class_name", "")).strip().lower() == class_name:
-            return schedule
-    return None
+    compiled = schedule_index().get(class_name)
+    return compiled.schedule if compiled else None
 
 def _iter_days(schedule: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
     days = schedule.get("days", []) if isinstance(schedule, dict) else []
@@ -1624,6 +1623,153 @@ def _format_sessions(sessions: Iterable[Dict[str, Any]]) -> Optional[str]:
         return None
     return " • ".join(formatted)
 
+
+@dataclass(frozen=True)
+class ScheduledDay:
+    """One calendar day of a class with its formatted session labels."""
+
+    date: date
+    weekday: Optional[str]
+    day_number: Optional[int]
+    sessions: Tuple[str, ...]
+
+    @property
+    def summary(self) -> Optional[str]:
+        summary = " • ".join(self.sessions)
+        if not summary:
+            return None
+        if isinstance(self.day_number, int):
+            return f"Day {self.day_number} — {summary}"
+        return summary
+
+    def details(self) -> Dict[str, Any]:
+        return {"day_number": self.day_number, "sessions": list(self.sessions)}
+
+    def next_details(self) -> Dict[str, Any]:
+        return {
+            "date": self.date,
+            "date_iso": self.date.isoformat(),
+            "weekday": self.weekday,
+            "day_number": self.day_number,
+            "sessions": list(self.sessions),
+            "summary": self.summary,
+        }
+
+
+def _compile_day(day: Dict[str, Any]) -> Optional[ScheduledDay]:
+    raw = str(day.get("date"))
+    try:
+        session_date = date.fromisoformat(raw)
+    except ValueError:
+        return None
+    if session_date.isoformat() != raw:
+        return None  # only canonical ISO dates are looked up
+
+    sessions = day.get("sessions", [])
+    formatted: List[str] = []
+    if isinstance(sessions, list):
+        for session in sessions:
+            if isinstance(session, dict):
+                label = _format_session(session)
+                if label:
+                    formatted.append(label)
+
+    day_number = day.get("day_number")
+    weekday = day.get("weekday")
+    return ScheduledDay(
+        date=session_date,
+        weekday=weekday if isinstance(weekday, str) else None,
+        day_number=day_number if isinstance(day_number, int) else None,
+        sessions=tuple(formatted),
+    )
+
+
+class ClassSchedule:
+    """A class schedule with its days keyed and sorted by date."""
+
+    def __init__(self, schedule: Dict[str, Any]) -> None:
+        self.schedule = schedule
+        self.class_name = str(schedule.get("class_name", ""))
+        self.days_by_date: Dict[date, ScheduledDay] = {}
+        for day in _iter_days(schedule):
+            compiled = _compile_day(day)
+            if compiled is not None:
+                # The first entry of a date wins, as in the schedule order.
+                self.days_by_date.setdefault(compiled.date, compiled)
+        # Dates that have at least one session, for ``next_day`` and ranges.
+        self.dates: List[date] = sorted(
+            d for d, day in self.days_by_date.items() if day.sessions
+        )
+
+    def day(self, session_date: date) -> Optional[ScheduledDay]:
+        """Return the day on ``session_date`` if it has sessions."""
+        day = self.days_by_date.get(session_date)
+        return day if day is not None and day.sessions else None
+
+    def next_day(self, from_date: date) -> Optional[ScheduledDay]:
+        """Return the first day with sessions on or after ``from_date``."""
+        pos = bisect_left(self.dates, from_date)
+        return self.days_by_date[self.dates[pos]] if pos < len(self.dates) else None
+
+    def between(self, start: date, end: date) -> List[ScheduledDay]:
+        """Return the days with sessions from ``start`` to ``end`` inclusive."""
+        lo = bisect_left(self.dates, start)
+        hi = bisect_right(self.dates, end)
+        return [self.days_by_date[d] for d in self.dates[lo:hi]]
+
+
+def _class_key(class_name: str) -> str:
+    return (class_name or "").strip().lower()
+
+
+class ScheduleIndex:
+    """All class schedules compiled for date lookups."""
+
+    def __init__(self, schedules: Sequence[Dict[str, Any]]) -> None:
+        self.schedules: Tuple[Dict[str, Any], ...] = tuple(schedules)
+        self.classes: Dict[str, ClassSchedule] = {}
+        for schedule in self.schedules:
+            key = _class_key(str(schedule.get("class_name", "")))
+            if key and key not in self.classes:
+                self.classes[key] = ClassSchedule(schedule)
+
+    @classmethod
+    def from_data(cls, data: Any) -> "ScheduleIndex":
+        schedules = data.get("schedules", []) if isinstance(data, dict) else []
+        return cls([s for s in schedules if isinstance(s, dict)])
+
+    def get(self, class_name: str) -> Optional[ClassSchedule]:
+        key = _class_key(class_name)
+        return self.classes.get(key) if key else None
+
+    def sessions_between(
+        self, class_names: Iterable[str], start: date, end: date
+    ) -> Dict[str, List[ScheduledDay]]:
+        """Return each class's days with sessions from ``start`` to ``end``."""
+        result: Dict[str, List[ScheduledDay]] = {}
+        for name in class_names:
+            compiled = self.get(name)
+            result[name] = compiled.between(start, end) if compiled else []
+        return result
+
+    def next_sessions(
+        self, class_names: Iterable[str], from_date: Optional[date] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Return :func:`next_session_details` for several classes at once."""
+        start = from_date or date.today()
+        result: Dict[str, Optional[Dict[str, Any]]] = {}
+        for name in class_names:
+            compiled = self.get(name)
+            day = compiled.next_day(start) if compiled else None
+            result[name] = day.next_details() if day else None
+        return result
+
+
+@lru_cache(maxsize=1)
+def schedule_index() -> ScheduleIndex:
+    """Return the compiled index of the bundled schedules (built once)."""
+    return ScheduleIndex.from_data(_load_schedule_data())
+
 def session_details_for_date(
     class_name: str,
     session_date: date,
@@ -1633,35 +1779,9 @@ def session_details_for_date(
     The result contains the day number (when provided in the schedule) and a
     list of formatted session labels describing each activity on that day.
     """
-    schedule = get_schedule_for_class(class_name)
-    if not schedule:
-        return None
-
-    target = session_date.isoformat()
-    for day in _iter_days(schedule):
-        if str(day.get("date")) != target:
-            continue
-
-        sessions = day.get("sessions", [])
-        formatted_sessions: List[str] = []
-        if isinstance(sessions, list):
-            for session in sessions:
-                if not isinstance(session, dict):
-                    continue
-                label = _format_session(session)
-                if label:
-                    formatted_sessions.append(label)
-
-        if not formatted_sessions:
-            return None
-
-        day_number = day.get("day_number")
-        return {
-            "day_number": day_number if isinstance(day_number, int) else None,
-            "sessions": formatted_sessions,
-        }
-
-    return None
+    compiled = schedule_index().get(class_name)
+    day = compiled.day(session_date) if compiled else None
+    return day.details() if day else None
 
 def session_summary_for_date(class_name: str, session_date: date) -> Optional[str]:
     """Return a concise summary of the lessons for ``session_date``.
@@ -1673,18 +1793,9 @@ def session_summary_for_date(class_name: str, session_date: date) -> Optional[st
     session_date:
         The calendar date of the upcoming class.
     """
-    details = session_details_for_date(class_name, session_date)
-    if not details:
-        return None
-
-    summary = " • ".join(details.get("sessions", []))
-    if not summary:
-        return None
-
-    day_number = details.get("day_number")
-    if isinstance(day_number, int):
-        return f"Day {day_number} — {summary}"
-    return summary
+    compiled = schedule_index().get(class_name)
+    day = compiled.day(session_date) if compiled else None
+    return day.summary if day else None
 
 
 def next_session_details(
@@ -1700,35 +1811,4 @@ def next_session_details(
         Date from which to search for the next session. Defaults to today.
     """
 
-    schedule = get_schedule_for_class(class_name)
-    if not schedule:
-        return None
-
-    start_date = from_date or date.today()
-
-    for day in _iter_days(schedule):
-        session_date_raw = day.get("date")
-        try:
-            session_date = date.fromisoformat(str(session_date_raw))
-        except Exception:
-            continue
-
-        if session_date < start_date:
-            continue
-
-        details = session_details_for_date(class_name, session_date)
-        if not details:
-            continue
-
-        weekday = day.get("weekday") if isinstance(day.get("weekday"), str) else None
-        summary = session_summary_for_date(class_name, session_date)
-        return {
-            "date": session_date,
-            "date_iso": session_date.isoformat(),
-            "weekday": weekday,
-            "day_number": details.get("day_number"),
-            "sessions": details.get("sessions"),
-            "summary": summary,
-        }
-
-    return None
+    return schedule_index().next_sessions([class_name], from_date)[class_name]
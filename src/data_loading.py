@@ -7,13 +7,15 @@ from __future__ import annotations
 
 import io
 import logging
-import time
+import uuid
 from typing import Optional
 
 import pandas as pd
 import requests
 import streamlit as st
 
+from .roster_index import ROSTER_FETCH_ID_ATTR, RosterIndex, get_roster_index
+from .sheets import CsvSheet, sheet_refresher
 from .youtube import (  # noqa: F401
     DEFAULT_PLAYLIST_LEVEL,
     YOUTUBE_API_KEY,
@@ -40,52 +42,38 @@ _REQUEST_HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; a1sprechen/1.0; +streamlit)",
 }
 
+ROSTER_SHEET = "roster"
+ROSTER_TTL_SEC = 300
+
+
 class _NoUsableData(RuntimeError):
     """Signal that the fetch succeeded but produced no usable rows.
-    We raise (instead of returning None) so cache_data does NOT cache this state.
+    We raise (instead of returning None) so the refresher keeps the previous
+    snapshot instead of replacing it with an empty roster.
     """
 
-def _with_cache_buster(url: str) -> str:
-    # Changes once per minute to avoid CDN/Sheets staleness on first render
-    cb = int(time.time() // 60)
-    sep = "&" if ("?" in url) else "?"
-    return f"{url}{sep}cb={cb}"
 
+def _parse_student_data(txt: str) -> pd.DataFrame:
+    """Parse the student roster CSV downloaded by the roster :class:`CsvSheet`.
 
-@st.cache_data(ttl=300, show_spinner=False)
-def _load_student_data_cached(csv_url: str) -> pd.DataFrame:
-    """Fetch and parse the student roster from the given CSV URL.
+    Runs on the background refresher too, so problems are raised (never shown
+    with ``st.*``); :func:`load_student_data` reports them in the foreground.
 
     Raises
     ------
-    requests.RequestException | pd.errors.ParserError | ValueError | _NoUsableData
+    pd.errors.ParserError | ValueError | _NoUsableData
     """
-    try:
-        try:
-            resp = requests.get(csv_url, timeout=12, headers=_REQUEST_HEADERS)
-        except TypeError:
-            resp = requests.get(csv_url, timeout=12)
-        resp.raise_for_status()
-        txt = resp.text
-        # Guard against HTML interstitials (private sheet / auth / rate limit)
-        if "<html" in txt[:512].lower():
-            raise ValueError("Expected CSV, got HTML (check sheet privacy/sharing).")
-        df = pd.read_csv(
-            io.StringIO(txt),
-            dtype=str,
-            keep_default_na=True,
-            na_values=["", " ", "nan", "NaN", "None"],
-        )
-    except (requests.RequestException, pd.errors.ParserError, ValueError) as e:
-        logging.exception("Could not load student data")
-        st.error(f"❌ Could not load student data. {e}")
-        raise
+    df = pd.read_csv(
+        io.StringIO(txt),
+        dtype=str,
+        keep_default_na=True,
+        na_values=["", " ", "nan", "NaN", "None"],
+    )
 
     # Basic normalization
     df.columns = df.columns.str.strip().str.replace(" ", "", regex=False)
     if df.empty:
-        st.info("No rows found in the roster sheet.")
-        raise _NoUsableData("Empty roster")
+        raise _NoUsableData("No rows found in the roster sheet.")
 
     # --- Column aliasing -------------------------------------------------------
     # Make 'ClassName' robust to different labels
@@ -124,8 +112,9 @@ def _load_student_data_cached(csv_url: str) -> pd.DataFrame:
 
     if "ContractEnd" not in df.columns:
         logging.warning("Student roster missing 'ContractEnd' column")
-        st.warning("The student roster is missing a 'ContractEnd' (or equivalent) column.")
-        raise _NoUsableData("Missing ContractEnd")
+        raise _NoUsableData(
+            "The student roster is missing a 'ContractEnd' (or equivalent) column."
+        )
 
     # Strip whitespace in all string columns
     for col in df.columns:
@@ -160,40 +149,67 @@ def _load_student_data_cached(csv_url: str) -> pd.DataFrame:
     df = df.drop(columns=["ContractEnd_dt"], errors="ignore")
 
     if df.empty:
-        st.info("No active students found with a valid 'ContractEnd'.")
-        raise _NoUsableData("No active students")
+        raise _NoUsableData("No active students found with a valid 'ContractEnd'.")
 
+    # Lets :func:`get_roster_index` reuse one index for every copy of this fetch.
+    df.attrs[ROSTER_FETCH_ID_ATTR] = uuid.uuid4().hex
     return df
 
 
+def _roster_csv_url() -> str:
+    # Allow overriding the URL via secrets
+    return st.secrets.get("ROSTER_CSV_URL", GOOGLE_SHEET_CSV)
+
+
+sheet_refresher.register(
+    ROSTER_SHEET,
+    CsvSheet(
+        _roster_csv_url,
+        _parse_student_data,
+        timeout=12,
+        headers=_REQUEST_HEADERS,
+        cache_bust=True,
+    ),
+    ttl=ROSTER_TTL_SEC,
+    persist=True,
+)
+
+
 def load_student_data(force_refresh: bool = False) -> Optional[pd.DataFrame]:
     """Load student roster.
 
+    Returns the last good roster snapshot immediately; the background sheet
+    refresher keeps it up to date.  ``force_refresh`` downloads the sheet now.
+    The returned frame is shared between sessions and must not be mutated.
+
     Returns ``None`` if the roster contains no usable rows. Any errors during
-    loading (network/parse/validation) are propagated to the caller.
+    the first load or a forced refresh (network/parse/validation) are
+    propagated to the caller.
     """
-    # Allow overriding the URL via secrets
-    base = st.secrets.get("ROSTER_CSV_URL", GOOGLE_SHEET_CSV)
-    url = _with_cache_buster(base)
-
-    if force_refresh:
-        try:
-            _load_student_data_cached.clear()
-        except Exception:
-            logging.exception("Unable to clear cached student roster")
-
     try:
         if force_refresh:
-            try:
-                return _load_student_data_cached()
-            except TypeError:
-                return _load_student_data_cached(url)
-        return _load_student_data_cached(url)
-    except TypeError:
-        return _load_student_data_cached()
-    except _NoUsableData:
-        # Present as "no data" to the caller but DO NOT cache this state
+            return sheet_refresher.refresh(ROSTER_SHEET)
+        return sheet_refresher.get(ROSTER_SHEET)
+    except _NoUsableData as exc:
+        # Present as "no data" to the caller; the previous snapshot is kept
+        st.info(str(exc))
+        return None
+    except (requests.RequestException, pd.errors.ParserError, ValueError) as e:
+        logging.exception("Could not load student data")
+        st.error(f"❌ Could not load student data. {e}")
+        raise
+
+
+def load_roster_index(force_refresh: bool = False) -> Optional[RosterIndex]:
+    """Return the :class:`RosterIndex` for the current roster fetch.
+
+    ``None`` is returned when the roster has no usable rows.
+    """
+
+    df = load_student_data(force_refresh=force_refresh)
+    if df is None:
         return None
+    return get_roster_index(df)
 
 
-__all__ = ["load_student_data"]
+__all__ = ["load_roster_index", "load_student_data"]
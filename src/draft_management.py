@@ -27,6 +27,11 @@ from src.firestore_utils import (
     save_draft_to_db,
     load_draft_meta_from_db,
 )
+from src.draft_queue import (
+    discard_pending_draft,
+    enqueue_chat_draft_write,
+    enqueue_draft_write,
+)
 from src.utils.toasts import toast_ok, toast_err
 
 
@@ -144,6 +149,7 @@ def autosave_draft_for_text(
 def clear_draft_after_post(code: str, draft_key: str) -> None:
     """Persist an empty draft and clear local state after publishing."""
 
+    discard_pending_draft(code, draft_key)
     save_draft_to_db(code, draft_key, "")
     st.session_state.pop(draft_key, None)
 
@@ -164,8 +170,10 @@ def save_now(draft_key: str, code: str, show_toast: bool = True) -> None:
     text = st.session_state.get(draft_key, "") or ""
     if st.session_state.get("falowen_chat_draft_key") == draft_key:
         conv = st.session_state.get("falowen_conv_key", "")
+        discard_pending_draft(code, conv_key=conv)
         save_chat_draft_to_db(code, conv, text)
     else:
+        discard_pending_draft(code, draft_key)
         save_draft_to_db(code, draft_key, text)
 
     last_val_key, last_ts_key, saved_flag_key, saved_at_key = _draft_state_keys(
@@ -229,7 +237,11 @@ def autosave_maybe(
     min_delta: int = 30,
     locked: bool = False,
 ) -> None:
-    """Debounced background autosave for lesson drafts."""
+    """Debounced background autosave for lesson drafts.
+
+    Saves go through the write-behind queue in :mod:`src.draft_queue` and are
+    only written synchronously when the queue is disabled or unavailable.
+    """
     if locked:
         return
 
@@ -256,8 +268,9 @@ def autosave_maybe(
     if changed and (time_ok or big_change):
         if st.session_state.get("falowen_chat_draft_key") == lesson_field_key:
             conv = st.session_state.get("falowen_conv_key", "")
-            save_chat_draft_to_db(code, conv, text)
-        else:
+            if not enqueue_chat_draft_write(code, conv, text):
+                save_chat_draft_to_db(code, conv, text)
+        elif not enqueue_draft_write(code, lesson_field_key, text):
             save_draft_to_db(code, lesson_field_key, text)
         st.session_state[last_val_key] = text
         st.session_state[last_ts_key] = now
@@ -326,6 +339,7 @@ def on_cb_subtab_change() -> None:
     if prev == "🧑‍🏫 Classroom" and curr != "🧑‍🏫 Classroom":
         for key in [k for k in st.session_state.keys() if k.startswith("classroom_reply_draft_")]:
             try:
+                discard_pending_draft(code, key)
                 save_draft_to_db(code, key, st.session_state.get(key, ""))
             except Exception:
                 toast_err("Draft save failed")
@@ -0,0 +1,189 @@
+"""Copy legacy drafts into the ``drafts_v2/{code}/lessons/{lesson}`` layout.
+
+Two older layouts are still read as fallbacks by
+:func:`src.firestore_utils.load_draft_meta_from_db`:
+
+* ``drafts_v2/{level}/lessons/{lesson}/users/{code}`` (level-rooted), and
+* ``draft_answers/{code}`` (one flat document with a field per draft).
+
+:func:`migrate_legacy_drafts` copies every legacy draft that has no v2
+document yet, then sets the ``legacy_drafts_migrated`` marker on
+``drafts_v2/{code}`` so the app stops reading the fallbacks for that student.
+Once a full run has completed the fallbacks can be disabled altogether with
+``FALOWEN_LEGACY_DRAFT_FALLBACK=0``.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from firebase_admin import firestore
+
+from src.firestore_utils import (
+    LEGACY_MARKER_FIELD,
+    _extract_level_and_lesson,
+    get_documents,
+    legacy_marker_ref,
+)
+
+# Stay below Firestore's 500 writes per batch.
+MIGRATION_BATCH_OPS = 450
+_UPDATED_SUFFIX = "__updated_at"
+_LEVEL_ID_RE = re.compile(r"^[A-C][12]$")
+
+
+class _BatchWriter:
+    """Accumulate writes and commit them in batches of ``limit`` operations."""
+
+    def __init__(self, db: Any, limit: int, dry_run: bool) -> None:
+        self.db = db
+        self.limit = limit
+        self.dry_run = dry_run
+        self.batch = None if dry_run else db.batch()
+        self.ops = 0
+
+    def set(self, ref: Any, data: Dict[str, Any], *, merge: bool = False) -> None:
+        if not self.dry_run:
+            self.batch.set(ref, data, merge=merge)
+        self._count()
+
+    def delete(self, ref: Any) -> None:
+        if not self.dry_run:
+            self.batch.delete(ref)
+        self._count()
+
+    def _count(self) -> None:
+        self.ops += 1
+        if self.ops >= self.limit:
+            self.commit()
+
+    def commit(self) -> None:
+        if self.ops and not self.dry_run:
+            self.batch.commit()
+            self.batch = self.db.batch()
+        self.ops = 0
+
+
+def _flat_drafts(snap: Any) -> Dict[str, Tuple[str, str, Any]]:
+    """Return ``{lesson_key: (level, text, updated_at)}`` from a ``draft_answers`` doc."""
+
+    data = snap.to_dict() or {}
+    drafts: Dict[str, Tuple[str, str, Any]] = {}
+    for field_key, text in data.items():
+        if field_key.endswith(_UPDATED_SUFFIX) or not isinstance(text, str) or not text:
+            continue
+        level, lesson_key = _extract_level_and_lesson(field_key)
+        drafts[lesson_key] = (level, text, data.get(f"{field_key}{_UPDATED_SUFFIX}"))
+    return drafts
+
+
+def _collect_legacy(
+    db: Any, codes: Optional[Set[str]]
+) -> Tuple[Dict[str, Dict[str, Tuple[str, str, Any]]], Dict[str, List[Any]], Set[str]]:
+    """Gather legacy drafts per student, the refs they came from and level ids."""
+
+    drafts: Dict[str, Dict[str, Tuple[str, str, Any]]] = {}
+    sources: Dict[str, List[Any]] = {}
+    level_ids: Set[str] = set()
+
+    if codes is None:
+        flat_snaps = list(db.collection("draft_answers").stream())
+    else:
+        refs = [db.collection("draft_answers").document(code) for code in sorted(codes)]
+        flat_snaps = [s for s in get_documents(db, refs) if s is not None and s.exists]
+    for snap in flat_snaps:
+        drafts.setdefault(snap.id, {}).update(_flat_drafts(snap))
+        sources.setdefault(snap.id, []).append(snap.reference)
+
+    # The level-rooted layout wins over the flat document, as in the reader.
+    for snap in db.collection_group("users").stream():
+        parts = snap.reference.path.split("/")
+        if len(parts) != 6 or parts[0] != "drafts_v2" or parts[2] != "lessons":
+            continue
+        code = snap.id
+        level_ids.add(parts[1])
+        if codes is not None and code not in codes:
+            continue
+        data = snap.to_dict() or {}
+        text = data.get("text") or ""
+        if text:
+            drafts.setdefault(code, {})[parts[3]] = (
+                parts[1].upper(),
+                text,
+                data.get("updated_at"),
+            )
+        sources.setdefault(code, []).append(snap.reference)
+    return drafts, sources, level_ids
+
+
+def migrate_legacy_drafts(
+    db: Any,
+    *,
+    codes: Optional[Iterable[str]] = None,
+    dry_run: bool = False,
+    delete_legacy: bool = False,
+    mark_all: bool = True,
+    batch_size: int = MIGRATION_BATCH_OPS,
+) -> Dict[str, int]:
+    """Copy legacy drafts into the v2 layout and mark the students as migrated.
+
+    Existing v2 documents are never overwritten.  ``codes`` restricts the run
+    to some students; otherwise every legacy document is migrated and, with
+    ``mark_all``, students that only ever used the v2 layout are marked too.
+    ``delete_legacy`` removes the copied legacy documents.  Returns counters
+    describing the run.
+    """
+
+    wanted = {str(c) for c in codes} if codes is not None else None
+    drafts, sources, level_ids = _collect_legacy(db, wanted)
+    writer = _BatchWriter(db, max(1, min(batch_size, 500)), dry_run)
+    stats = {"students": 0, "copied": 0, "kept_v2": 0, "marked": 0, "deleted": 0}
+    marker = {LEGACY_MARKER_FIELD: True, "legacy_migrated_at": firestore.SERVER_TIMESTAMP}
+
+    for code in sorted(set(drafts) | set(sources)):
+        stats["students"] += 1
+        lessons = drafts.get(code, {})
+        lesson_keys = sorted(lessons)
+        lessons_ref = db.collection("drafts_v2").document(code).collection("lessons")
+        refs = [lessons_ref.document(key) for key in lesson_keys]
+        for key, ref, snap in zip(lesson_keys, refs, get_documents(db, refs)):
+            if snap is not None and snap.exists:
+                stats["kept_v2"] += 1
+                continue
+            level, text, updated_at = lessons[key]
+            writer.set(
+                ref,
+                {
+                    "text": text,
+                    "updated_at": updated_at or firestore.SERVER_TIMESTAMP,
+                    "level": level,
+                    "lesson_key": key,
+                    "student_code": code,
+                    "migrated_from_legacy": True,
+                },
+            )
+            stats["copied"] += 1
+        writer.set(legacy_marker_ref(db, code), marker, merge=True)
+        stats["marked"] += 1
+        if delete_legacy:
+            for ref in sources.get(code, []):
+                writer.delete(ref)
+                stats["deleted"] += 1
+
+    if wanted is None and mark_all:
+        for ref in db.collection("drafts_v2").list_documents():
+            if ref.id in drafts or ref.id in sources:
+                continue
+            if ref.id in level_ids or _LEVEL_ID_RE.match(ref.id):
+                continue
+            writer.set(ref, marker, merge=True)
+            stats["marked"] += 1
+
+    writer.commit()
+    logging.info("Legacy draft migration%s: %s", " (dry run)" if dry_run else "", stats)
+    return stats
+
+
+__all__ = ["MIGRATION_BATCH_OPS", "migrate_legacy_drafts"]
@@ -0,0 +1,314 @@
+"""Write-behind queue for draft autosaves.
+
+Autosaves used to block the Streamlit rerun on a Firestore ``set(merge=True)``
+for every pause in typing.  :class:`DraftWriteQueue` keeps only the latest
+pending write per ``(student, draft key)`` in memory and a daemon thread
+commits them in ``WriteBatch`` chunks of up to :data:`MAX_BATCH_OPS` writes,
+either every :data:`FLUSH_INTERVAL_SEC` seconds or as soon as
+:data:`FLUSH_THRESHOLD` writes are pending.
+
+Paths that need ordering guarantees (explicit saves, submit and download)
+call :func:`discard_pending_draft` before writing synchronously: it waits for
+an in-flight batch to finish and drops the queued write so a stale autosave
+can never land after the explicit one.  :meth:`DraftWriteQueue.metrics`
+exposes queue depth and flush latency.
+
+Set ``FALOWEN_DRAFT_WRITE_BEHIND=0`` to write every autosave synchronously.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.firestore_utils import _get_db, chat_draft_write_op, draft_write_op
+
+# Firestore rejects batches with more than 500 writes.
+MAX_BATCH_OPS = 500
+FLUSH_INTERVAL_SEC = float(os.environ.get("FALOWEN_DRAFT_FLUSH_INTERVAL_SEC", 2.0))
+FLUSH_THRESHOLD = int(os.environ.get("FALOWEN_DRAFT_FLUSH_THRESHOLD", 200))
+# Writes whose batch failed this many times are dropped (and logged).
+MAX_ATTEMPTS = 3
+WRITE_BEHIND_ENABLED = os.environ.get("FALOWEN_DRAFT_WRITE_BEHIND", "1") != "0"
+
+
+@dataclass
+class PendingWrite:
+    """Latest queued ``set(merge=True)`` for one draft."""
+
+    ref: Any
+    payload: Dict[str, Any]
+    queued_at: float
+    attempts: int = 0
+
+
+class DraftWriteQueue:
+    """Coalescing write-behind queue flushed in Firestore ``WriteBatch``es."""
+
+    def __init__(
+        self,
+        db_getter: Callable[[], Any] = _get_db,
+        *,
+        flush_interval: float = FLUSH_INTERVAL_SEC,
+        flush_threshold: int = FLUSH_THRESHOLD,
+        max_batch: int = MAX_BATCH_OPS,
+    ) -> None:
+        self._db_getter = db_getter
+        self.flush_interval = flush_interval
+        self.flush_threshold = max(1, flush_threshold)
+        self.max_batch = max(1, min(max_batch, MAX_BATCH_OPS))
+        self._pending: "OrderedDict[Hashable, PendingWrite]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Held while a batch is being committed so ``discard`` can wait for it.
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "written": 0,
+            "dropped": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Queue operations
+    # ------------------------------------------------------------------
+    @property
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def enqueue(self, key: Hashable, ref: Any, payload: Dict[str, Any]) -> None:
+        """Queue ``ref.set(payload, merge=True)``, replacing any pending write for ``key``."""
+
+        with self._lock:
+            self._stats["enqueued"] += 1
+            if self._pending.pop(key, None) is not None:
+                self._stats["coalesced"] += 1
+            self._pending[key] = PendingWrite(ref, payload, time.monotonic())
+            depth = len(self._pending)
+        self._ensure_worker()
+        if depth >= self.flush_threshold:
+            self._wakeup.set()
+
+    def discard(self, key: Hashable) -> bool:
+        """Drop the pending write for ``key`` once no batch is in flight.
+
+        Callers about to write ``key`` synchronously use this so a queued
+        (older) value cannot overwrite theirs.
+        """
+
+        with self._flush_lock:
+            with self._lock:
+                return self._pending.pop(key, None) is not None
+
+    def flush(self) -> int:
+        """Commit every pending write now; return the number written."""
+
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    chunk: List[Tuple[Hashable, PendingWrite]] = []
+                    while self._pending and len(chunk) < self.max_batch:
+                        chunk.append(self._pending.popitem(last=False))
+                committed = self._commit(chunk)
+                written += committed
+                if not committed:
+                    break
+        return written
+
+    def _commit(self, chunk: List[Tuple[Hashable, PendingWrite]]) -> int:
+        start = time.perf_counter()
+        try:
+            db = self._db_getter()
+            if db is None:
+                raise RuntimeError("Firestore unavailable")
+            batch = db.batch()
+            for _, item in chunk:
+                batch.set(item.ref, item.payload, merge=True)
+            batch.commit()
+        except Exception as exc:
+            logging.warning("Draft batch of %d writes failed: %s", len(chunk), exc)
+            self._requeue(chunk)
+            with self._lock:
+                self._stats["failed_batches"] += 1
+            return 0
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["written"] += len(chunk)
+            self._stats["last_flush_ms"] = elapsed_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+            self._stats["total_flush_ms"] += elapsed_ms
+        return len(chunk)
+
+    def _requeue(self, chunk: List[Tuple[Hashable, PendingWrite]]) -> None:
+        with self._lock:
+            for key, item in reversed(chunk):
+                if key in self._pending:
+                    continue  # a newer value was queued meanwhile
+                item.attempts += 1
+                if item.attempts >= MAX_ATTEMPTS:
+                    self._stats["dropped"] += 1
+                    logging.error("Dropping draft write for %s after %d attempts", key, item.attempts)
+                    continue
+                self._pending[key] = item
+                self._pending.move_to_end(key, last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return queue depth, counters and flush latency (milliseconds)."""
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats["depth"] = len(self._pending)
+            oldest = next(iter(self._pending.values()), None)
+        stats["oldest_pending_sec"] = (
+            time.monotonic() - oldest.queued_at if oldest is not None else 0.0
+        )
+        batches = stats["batches"]
+        stats["avg_flush_ms"] = stats.pop("total_flush_ms") / batches if batches else 0.0
+        return stats
+
+    # ------------------------------------------------------------------
+    # Background worker
+    # ------------------------------------------------------------------
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="draft-write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:  # pragma: no cover - keep the worker alive
+                logging.exception("Draft write-behind flush failed")
+
+    def close(self, *, flush: bool = True) -> None:
+        """Stop the worker thread, optionally flushing what is still queued."""
+
+        self._stop.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=max(1.0, self.flush_interval))
+        self._thread = None
+        if flush:
+            self.flush()
+
+
+_queue: Optional[DraftWriteQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_draft_queue() -> Optional[DraftWriteQueue]:
+    """Return the process-wide queue, or ``None`` when write-behind is disabled."""
+
+    global _queue
+    if not WRITE_BEHIND_ENABLED:
+        return None
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = DraftWriteQueue()
+                atexit.register(_queue.close)
+    return _queue
+
+
+def _draft_key(code: str, field_key: str) -> Tuple[str, str]:
+    return (code, field_key)
+
+
+def _chat_key(code: str, conv_key: str) -> Tuple[str, str]:
+    return (code, f"chat:{conv_key}")
+
+
+def _enqueue(key: Tuple[str, str], build: Callable[[], Any]) -> bool:
+    queue = get_draft_queue()
+    if queue is None:
+        return False
+    try:
+        op = build()
+    except Exception as exc:
+        logging.debug("Draft write for %s not queued: %s", key, exc)
+        return False
+    if op is None:
+        return False
+    ref, payload = op
+    queue.enqueue(key, ref, payload)
+    return True
+
+
+def enqueue_draft_write(code: str, field_key: str, text: str) -> bool:
+    """Queue a lesson draft save; ``False`` means the caller must write it."""
+
+    return _enqueue(
+        _draft_key(code, field_key), lambda: draft_write_op(code, field_key, text)
+    )
+
+
+def enqueue_chat_draft_write(code: str, conv_key: str, text: str) -> bool:
+    """Queue a chat draft save; ``False`` means the caller must write it."""
+
+    return _enqueue(
+        _chat_key(code, conv_key), lambda: chat_draft_write_op(code, conv_key, text)
+    )
+
+
+def discard_pending_draft(code: str, field_key: str = "", *, conv_key: str = "") -> bool:
+    """Drop a queued autosave before an explicit synchronous write."""
+
+    queue = _queue
+    if queue is None:
+        return False
+    key = _chat_key(code, conv_key) if conv_key else _draft_key(code, field_key)
+    return queue.discard(key)
+
+
+def flush_drafts() -> int:
+    """Write every queued draft now (e.g. on shutdown or in admin tooling)."""
+
+    queue = _queue
+    return queue.flush() if queue is not None else 0
+
+
+def draft_queue_metrics() -> Dict[str, Any]:
+    """Return :meth:`DraftWriteQueue.metrics` for the process-wide queue."""
+
+    queue = _queue
+    return queue.metrics() if queue is not None else {"depth": 0}
+
+
+__all__ = [
+    "DraftWriteQueue",
+    "discard_pending_draft",
+    "draft_queue_metrics",
+    "enqueue_chat_draft_write",
+    "enqueue_draft_write",
+    "flush_drafts",
+    "get_draft_queue",
+]
@@ -9,7 +9,7 @@ heavy lifting lives in :mod:`src.falowen.custom_chat`.
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Dict, Iterable, List, Optional
 from uuid import uuid4
 
@@ -18,10 +18,10 @@ import logging
 import streamlit as st
 
 from src.draft_management import _draft_state_keys
-from src.firestore_utils import load_chat_draft_from_db
 from src.utils.toasts import rerun_without_toast
 
 from . import custom_chat as _custom_chat
+from .chat_storage import ConversationStore
 
 # Re-export chat specific helpers so existing imports continue to function.
 CustomChatResult = _custom_chat.CustomChatResult
@@ -36,16 +36,26 @@ render_custom_chat_input = _custom_chat.render_custom_chat_input
 set_summary_client = _custom_chat.set_summary_client
 
 
+# Session state key of the student's conversation store; it is loaded once
+# and dropped by :func:`back_step`, so reruns of the chat stage cost no reads.
+CHAT_STORE_STATE_KEY = "falowen_chat_store"
+
+
 @dataclass
 class ChatSessionData:
-    """Container describing the currently selected conversation."""
+    """Container describing the currently selected conversation.
+
+    ``doc_ref`` is the student's :class:`ConversationStore` and
+    ``conversations`` maps every conversation key to its message count.
+    """
 
     conv_key: str
     draft_key: str
-    doc_ref: Any
+    doc_ref: Optional[ConversationStore]
     doc_data: Dict[str, Any]
     fresh_chat: bool
     messages: Optional[List[dict]] = None
+    conversations: Dict[str, int] = field(default_factory=dict)
 
 
 # ---------------------------------------------------------------------------
@@ -67,7 +77,7 @@ def _conversation_namespace(mode: Optional[str], level: Optional[str], teil: Opt
     return f"{(mode or '').strip()}_{(level or '').strip()}_{suffix}".strip("_")
 
 
-def _prefixed_keys(chats: Dict[str, List[dict]], namespace: str) -> List[str]:
+def _prefixed_keys(chats: Iterable[str], namespace: str) -> List[str]:
     return [key for key in chats if key.startswith(namespace)]
 
 
@@ -80,37 +90,50 @@ def seed_initial_instruction(messages: List[dict]) -> None:
     st.session_state["falowen_messages"] = messages
 
 
-def persist_messages(doc_ref: Any, conv_key: str, messages: Iterable[dict]) -> None:
-    """Persist the latest conversation transcript to the backing store."""
+def persist_messages(target: Any, conv_key: str, messages: Iterable[dict]) -> None:
+    """Persist the latest conversation transcript to the backing store.
 
-    if doc_ref is None:
+    ``target`` is normally the session's :class:`ConversationStore`, which only
+    appends the messages not stored yet.  A plain document reference gets the
+    whole transcript in its legacy ``chats`` map.
+    """
+
+    if target is None:
         return
     try:
-        doc_ref.set({"chats": {conv_key: list(messages)}}, merge=True)
+        if isinstance(target, ConversationStore):
+            target.append(conv_key, messages)
+        else:
+            target.set({"chats": {conv_key: list(messages)}}, merge=True)
     except Exception as exc:  # pragma: no cover - Firestore failure paths
         logging.warning("Failed to persist chat for %s: %s", conv_key, exc)
 
 
-def _load_chat_document(db: Any, student_code: str) -> tuple[Any, Dict[str, Any]]:
+def _session_store(db: Any, student_code: str) -> Optional[ConversationStore]:
+    """Return the session's loaded :class:`ConversationStore` for ``student_code``."""
+
     if db is None or not student_code:
-        return None, {}
-    doc_ref = db.collection("falowen_chats").document(student_code)
-    try:
-        snapshot = doc_ref.get()
-        if getattr(snapshot, "exists", False):
-            return doc_ref, snapshot.to_dict() or {}
-    except Exception as exc:  # pragma: no cover - Firestore failure paths
-        logging.warning("Failed to load chats for %s: %s", student_code, exc)
-    return doc_ref, {}
+        return None
+    store = st.session_state.get(CHAT_STORE_STATE_KEY)
+    if (
+        not isinstance(store, ConversationStore)
+        or store.db is not db
+        or store.student_code != student_code
+    ):
+        store = ConversationStore(db, student_code).load()
+        st.session_state[CHAT_STORE_STATE_KEY] = store
+    return store
 
 
 def _pick_existing_conv(
     *,
     namespace: str,
-    chats: Dict[str, List[dict]],
+    chats: Dict[str, int],
     doc_data: Dict[str, Any],
     session_state_key: Optional[str],
 ) -> Optional[str]:
+    """Pick the conversation to open; ``chats`` maps keys to message counts."""
+
     if session_state_key and session_state_key in chats:
         return session_state_key
 
@@ -125,7 +148,7 @@ def _pick_existing_conv(
 
     prefixed = _prefixed_keys(chats, namespace)
     if prefixed:
-        return max(prefixed, key=lambda key: len(chats.get(key, [])))
+        return max(prefixed, key=lambda key: chats.get(key, 0))
     return None
 
 
@@ -140,8 +163,11 @@ def prepare_chat_session(
     """Populate Streamlit state for the active conversation and return metadata."""
 
     namespace = _conversation_namespace(mode, level, teil)
-    doc_ref, doc_data = _load_chat_document(db, student_code)
-    chats = (doc_data.get("chats") or {})
+    store = _session_store(db, student_code)
+    chats = store.message_counts() if store else {}
+    doc_data: Dict[str, Any] = (
+        {"current_conv": store.current_conv(), "drafts": store.drafts()} if store else {}
+    )
 
     current = _pick_existing_conv(
         namespace=namespace,
@@ -153,25 +179,27 @@ def prepare_chat_session(
     fresh_chat = False
     if not current:
         current = f"{namespace}_{uuid4().hex[:8]}"
-        chats = doc_data.setdefault("chats", {})
-        chats[current] = []
+        chats[current] = 0
         fresh_chat = True
 
-    messages = list(chats.get(current, []))
+    loaded = st.session_state.get("falowen_messages")
+    if st.session_state.get("falowen_loaded_key") == current and isinstance(loaded, list):
+        # Rerun of the open conversation: the session already holds it.
+        messages = loaded
+    else:
+        messages = store.load_messages(current) if store and not fresh_chat else []
     st.session_state["falowen_messages"] = messages
     st.session_state["falowen_conv_key"] = current
     st.session_state["falowen_loaded_key"] = current
 
     draft_key = f"falowen_chat_draft_{current}"
     st.session_state["falowen_chat_draft_key"] = draft_key
-    draft_text = (
-        load_chat_draft_from_db(student_code, current) if student_code else ""
-    )
-    st.session_state[draft_key] = draft_text
+    if draft_key not in st.session_state:
+        st.session_state[draft_key] = doc_data.get("drafts", {}).get(current, "") or ""
 
-    if doc_ref is not None:
+    if store is not None:
         try:
-            doc_ref.set({"current_conv": {namespace: current}}, merge=True)
+            store.set_current(namespace, current)
         except Exception as exc:  # pragma: no cover - Firestore failure paths
             logging.warning(
                 "Failed to update current conversation for %s/%s: %s",
@@ -183,10 +211,11 @@ def prepare_chat_session(
     return ChatSessionData(
         conv_key=current,
         draft_key=draft_key,
-        doc_ref=doc_ref,
+        doc_ref=store,
         doc_data=doc_data,
         fresh_chat=fresh_chat,
         messages=messages,
+        conversations=chats,
     )
 
 
@@ -219,6 +248,7 @@ def back_step() -> None:
         "falowen_turn_count",
         "falowen_chat_closed",
         "falowen_summary_emitted",
+        CHAT_STORE_STATE_KEY,
     ]:
         st.session_state.pop(key, None)
 
@@ -258,8 +288,7 @@ def render_chat_stage(
         st.session_state.get("falowen_teil"),
     )
 
-    chats = (session.doc_data.get("chats") or {})
-    options = sorted(_prefixed_keys(chats, namespace))
+    options = sorted(_prefixed_keys(session.conversations, namespace))
     if session.conv_key not in options:
         options.append(session.conv_key)
 
@@ -292,6 +321,7 @@ def render_chat_stage(
 
 
 __all__ = [
+    "CHAT_STORE_STATE_KEY",
     "ChatSessionData",
     "CustomChatResult",
     "CUSTOM_CHAT_GREETING",
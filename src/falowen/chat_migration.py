@@ -0,0 +1,101 @@
+"""Copy legacy ``chats`` maps into the per-conversation layout.
+
+:func:`migrate_legacy_chats` reads every ``falowen_chats/{code}`` document (or
+the ones of ``codes``), copies each Falowen conversation of its ``chats`` map
+into ``falowen_chats/{code}/conversations/{conv_key}/messages`` and the
+``falowen_chat_index/{code}`` document, then sets the
+``legacy_chats_migrated`` marker so the app stops reading the legacy map for
+that student.  Messages already present in the new layout are never
+rewritten, so the migration can be re-run safely.  The Topic Coach transcript,
+drafts and ``current_conv`` stay in the legacy document.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from firebase_admin import firestore
+
+from src.firestore_utils import get_documents
+
+from .chat_storage import (
+    CHAT_BATCH_OPS,
+    CHATS_COLLECTION,
+    LEGACY_CHATS_MIGRATED_FIELD,
+    append_messages_ops,
+    chat_index_ref,
+    commit_ops,
+    legacy_conversations,
+)
+
+
+def _stored_counts(index: Dict[str, Any]) -> Dict[str, int]:
+    entries = index.get("conversations")
+    counts: Dict[str, int] = {}
+    for key, entry in (entries if isinstance(entries, dict) else {}).items():
+        try:
+            counts[key] = int((entry or {}).get("message_count") or 0)
+        except (TypeError, ValueError):
+            counts[key] = 0
+    return counts
+
+
+def migrate_legacy_chats(
+    db: Any,
+    *,
+    codes: Optional[Iterable[str]] = None,
+    dry_run: bool = False,
+    delete_legacy: bool = False,
+    batch_size: int = CHAT_BATCH_OPS,
+) -> Dict[str, int]:
+    """Copy legacy conversations into the new layout and mark the students.
+
+    ``delete_legacy`` removes the copied conversations from the legacy
+    ``chats`` map.  Returns counters describing the run.
+    """
+
+    chats = db.collection(CHATS_COLLECTION)
+    if codes is None:
+        snaps = list(chats.stream())
+    else:
+        refs = [chats.document(str(code)) for code in sorted({str(c) for c in codes})]
+        snaps = [s for s in get_documents(db, refs) if s is not None and s.exists]
+
+    limit = max(1, min(batch_size, 500))
+    stats = {"students": 0, "conversations": 0, "messages": 0, "kept": 0, "deleted": 0}
+    for snap in snaps:
+        code = snap.id
+        legacy = legacy_conversations(snap.to_dict() or {})
+        index_snap = chat_index_ref(db, code).get()
+        index = (index_snap.to_dict() or {}) if getattr(index_snap, "exists", False) else {}
+        stored = _stored_counts(index)
+        stats["students"] += 1
+
+        ops: List[tuple] = []
+        for conv_key in sorted(legacy):
+            messages = legacy[conv_key]
+            start = stored.get(conv_key, 0)
+            if len(messages) <= start:
+                stats["kept"] += 1
+                continue
+            ops.extend(append_messages_ops(db, code, conv_key, messages, start))
+            stats["conversations"] += 1
+            stats["messages"] += len(messages) - start
+        marker = {
+            LEGACY_CHATS_MIGRATED_FIELD: True,
+            "legacy_migrated_at": firestore.SERVER_TIMESTAMP,
+        }
+        ops.append((chat_index_ref(db, code), marker, True))
+        if delete_legacy and legacy:
+            cleared = {key: firestore.DELETE_FIELD for key in legacy}
+            ops.append((snap.reference, {"chats": cleared}, True))
+            stats["deleted"] += len(cleared)
+        if not dry_run:
+            commit_ops(db, ops, limit)
+
+    logging.info("Legacy chat migration%s: %s", " (dry run)" if dry_run else "", stats)
+    return stats
+
+
+__all__ = ["migrate_legacy_chats"]
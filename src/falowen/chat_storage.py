@@ -0,0 +1,307 @@
+"""Per-conversation storage for Falowen chats.
+
+Every conversation used to live in the ``chats`` map of the single
+``falowen_chats/{code}`` document, rewritten in full on every turn and read in
+full to open one conversation.  Conversations are now stored as::
+
+    falowen_chat_index/{code}
+        conversations: {conv_key: {namespace, message_count, updated_at}}
+        current_conv: {namespace: conv_key}
+    falowen_chats/{code}/conversations/{conv_key}
+        namespace, message_count, created_at, updated_at
+    falowen_chats/{code}/conversations/{conv_key}/messages/{seq:06d}
+        seq, role, content, ...
+
+The index document is all the "Previous chats" selector needs, opening a
+conversation reads only its messages, and :meth:`ConversationStore.append`
+writes only the messages added since the last save.  Message documents are
+keyed by their position, so retrying a failed write never duplicates them.
+
+Until a student's legacy ``chats`` map has been copied over (see
+:mod:`src.falowen.chat_migration` and
+``scripts/migrate_falowen_chats.py``), conversations missing from the index are
+still read from it; the first append to such a conversation copies its whole
+transcript.  Set ``FALOWEN_LEGACY_CHAT_FALLBACK=0`` once every student has
+been migrated to stop using the legacy map.  Drafts and the Topic Coach
+transcript stay in ``falowen_chats/{code}``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Iterable, List
+
+from firebase_admin import firestore
+
+from src.topic_coach_persistence import TOPIC_COACH_CHAT_KEY
+
+CHATS_COLLECTION = "falowen_chats"
+CHAT_INDEX_COLLECTION = "falowen_chat_index"
+CONVERSATIONS_SUBCOLLECTION = "conversations"
+MESSAGES_SUBCOLLECTION = "messages"
+
+LEGACY_CHAT_FALLBACK = os.environ.get("FALOWEN_LEGACY_CHAT_FALLBACK", "1") != "0"
+# Field on the index document once the legacy ``chats`` map holds nothing
+# that is missing from the new layout.
+LEGACY_CHATS_MIGRATED_FIELD = "legacy_chats_migrated"
+
+# Stay below Firestore's 500 writes per batch.
+CHAT_BATCH_OPS = 450
+
+# Keys of the legacy ``chats`` map that belong to other features.
+_RESERVED_CHAT_KEYS = frozenset({TOPIC_COACH_CHAT_KEY})
+
+
+def chat_index_ref(db: Any, student_code: str):
+    """Return the ``falowen_chat_index/{code}`` document."""
+
+    return db.collection(CHAT_INDEX_COLLECTION).document(student_code)
+
+
+def conversation_ref(db: Any, student_code: str, conv_key: str):
+    """Return the ``falowen_chats/{code}/conversations/{conv_key}`` document."""
+
+    return (
+        db.collection(CHATS_COLLECTION)
+        .document(student_code)
+        .collection(CONVERSATIONS_SUBCOLLECTION)
+        .document(conv_key)
+    )
+
+
+def message_id(seq: int) -> str:
+    """Return the document id of the message at position ``seq``."""
+
+    return f"{seq:06d}"
+
+
+def conversation_namespace(conv_key: str) -> str:
+    """Return the ``mode_level_teil`` prefix of ``conv_key``."""
+
+    return conv_key.rsplit("_", 1)[0]
+
+
+def legacy_conversations(data: Dict[str, Any]) -> Dict[str, List[dict]]:
+    """Return the Falowen conversations of a legacy ``falowen_chats/{code}`` document."""
+
+    chats = data.get("chats") if isinstance(data, dict) else None
+    if not isinstance(chats, dict):
+        return {}
+    return {
+        key: list(value)
+        for key, value in chats.items()
+        if key not in _RESERVED_CHAT_KEYS and isinstance(value, list)
+    }
+
+
+def _index_entry(conv_key: str, count: int) -> Dict[str, Any]:
+    return {
+        "namespace": conversation_namespace(conv_key),
+        "message_count": count,
+        "updated_at": firestore.SERVER_TIMESTAMP,
+    }
+
+
+def _message_document(seq: int, message: Any) -> Dict[str, Any]:
+    payload = dict(message) if isinstance(message, dict) else {"content": message}
+    payload["seq"] = seq
+    return payload
+
+
+def append_messages_ops(
+    db: Any,
+    student_code: str,
+    conv_key: str,
+    messages: List[Any],
+    start: int,
+) -> List[tuple]:
+    """Return ``(ref, payload, merge)`` writes storing ``messages[start:]``.
+
+    The conversation and index metadata come last so a partially committed
+    run never advertises messages that were not written.
+    """
+
+    conv_ref = conversation_ref(db, student_code, conv_key)
+    messages_ref = conv_ref.collection(MESSAGES_SUBCOLLECTION)
+    ops: List[tuple] = [
+        (messages_ref.document(message_id(seq)), _message_document(seq, messages[seq]), False)
+        for seq in range(start, len(messages))
+    ]
+    count = len(messages)
+    conversation = _index_entry(conv_key, count)
+    if start == 0:
+        conversation["created_at"] = firestore.SERVER_TIMESTAMP
+    ops.append((conv_ref, conversation, True))
+    ops.append(
+        (
+            chat_index_ref(db, student_code),
+            {"conversations": {conv_key: _index_entry(conv_key, count)}},
+            True,
+        )
+    )
+    return ops
+
+
+def commit_ops(db: Any, ops: Iterable[tuple], limit: int = CHAT_BATCH_OPS) -> int:
+    """Commit ``(ref, payload, merge)`` writes in batches of ``limit``; return the batches."""
+
+    batch, pending, commits = db.batch(), 0, 0
+    for ref, payload, merge in ops:
+        batch.set(ref, payload, merge=merge)
+        pending += 1
+        if pending >= limit:
+            batch.commit()
+            batch, pending, commits = db.batch(), 0, commits + 1
+    if pending:
+        batch.commit()
+        commits += 1
+    return commits
+
+
+class ConversationStore:
+    """The Falowen conversations of one student.
+
+    :meth:`load` reads the index document and ``falowen_chats/{code}``
+    (drafts, and the legacy ``chats`` map until the student has been
+    migrated) once; the other methods work from it.  A store is meant to be
+    kept for the session so reruns cost no reads.
+    """
+
+    def __init__(self, db: Any, student_code: str) -> None:
+        self.db = db
+        self.student_code = student_code
+        self.index: Dict[str, Any] = {}
+        self.legacy: Dict[str, List[dict]] = {}
+        self.chat_document: Dict[str, Any] = {}
+        self._loaded = False
+
+    def load(self) -> "ConversationStore":
+        self._loaded = True
+        try:
+            snap = chat_index_ref(self.db, self.student_code).get()
+            if getattr(snap, "exists", False):
+                self.index = snap.to_dict() or {}
+        except Exception as exc:  # pragma: no cover - Firestore failure paths
+            logging.warning("Failed to load chat index for %s: %s", self.student_code, exc)
+
+        try:
+            snap = self.db.collection(CHATS_COLLECTION).document(self.student_code).get()
+            if getattr(snap, "exists", False):
+                self.chat_document = snap.to_dict() or {}
+        except Exception as exc:  # pragma: no cover - Firestore failure paths
+            logging.warning("Failed to load chats for %s: %s", self.student_code, exc)
+        if LEGACY_CHAT_FALLBACK and not self.index.get(LEGACY_CHATS_MIGRATED_FIELD):
+            self.legacy = legacy_conversations(self.chat_document)
+        return self
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def _entries(self) -> Dict[str, Dict[str, Any]]:
+        entries = self.index.get("conversations")
+        return entries if isinstance(entries, dict) else {}
+
+    def stored_count(self, conv_key: str) -> int:
+        """Return the number of messages of ``conv_key`` in the new layout."""
+
+        self._ensure_loaded()
+        try:
+            return int((self._entries().get(conv_key) or {}).get("message_count") or 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def message_counts(self) -> Dict[str, int]:
+        """Return ``conv_key -> message count`` of every conversation."""
+
+        self._ensure_loaded()
+        counts = {key: len(messages) for key, messages in self.legacy.items()}
+        counts.update({key: self.stored_count(key) for key in self._entries()})
+        return counts
+
+    def current_conv(self) -> Dict[str, str]:
+        """Return the last opened conversation per namespace."""
+
+        self._ensure_loaded()
+        current = dict(self.chat_document.get("current_conv") or {})
+        current.update(self.index.get("current_conv") or {})
+        return current
+
+    def drafts(self) -> Dict[str, str]:
+        """Return the unsent drafts stored in ``falowen_chats/{code}``."""
+
+        self._ensure_loaded()
+        return dict(self.chat_document.get("drafts") or {})
+
+    def load_messages(self, conv_key: str) -> List[dict]:
+        """Return the transcript of ``conv_key`` in order."""
+
+        self._ensure_loaded()
+        if conv_key not in self._entries():
+            return list(self.legacy.get(conv_key, []))
+        messages_ref = conversation_ref(self.db, self.student_code, conv_key).collection(
+            MESSAGES_SUBCOLLECTION
+        )
+        try:
+            docs = [snap.to_dict() or {} for snap in messages_ref.stream()]
+        except Exception as exc:  # pragma: no cover - Firestore failure paths
+            logging.warning("Failed to load chat %s for %s: %s", conv_key, self.student_code, exc)
+            return []
+        docs.sort(key=lambda doc: doc.get("seq", 0))
+        for doc in docs:
+            doc.pop("seq", None)
+        return docs
+
+    def append(self, conv_key: str, messages: Iterable[Any]) -> int:
+        """Write the messages of ``conv_key`` not stored yet; return how many."""
+
+        messages = list(messages)
+        # Messages are only ever appended; a shorter list (e.g. a stale
+        # session) writes nothing.
+        start = self.stored_count(conv_key)
+        if len(messages) <= start:
+            return 0
+        ops = append_messages_ops(self.db, self.student_code, conv_key, messages, start)
+        entries = dict(self._entries())
+        entries[conv_key] = {"message_count": len(messages)}
+        if not self.index.get(LEGACY_CHATS_MIGRATED_FIELD) and set(self.legacy) <= set(entries):
+            # Nothing left to read from the legacy document.
+            ops.append(
+                (
+                    chat_index_ref(self.db, self.student_code),
+                    {LEGACY_CHATS_MIGRATED_FIELD: True},
+                    True,
+                )
+            )
+        commit_ops(self.db, ops)
+        self.index["conversations"] = entries
+        return len(messages) - start
+
+    def set_current(self, namespace: str, conv_key: str) -> None:
+        """Remember ``conv_key`` as the open conversation of ``namespace``."""
+
+        self._ensure_loaded()
+        if (self.index.get("current_conv") or {}).get(namespace) == conv_key:
+            return
+        chat_index_ref(self.db, self.student_code).set(
+            {"current_conv": {namespace: conv_key}}, merge=True
+        )
+        self.index.setdefault("current_conv", {})[namespace] = conv_key
+
+
+__all__ = [
+    "CHAT_BATCH_OPS",
+    "CHAT_INDEX_COLLECTION",
+    "CHATS_COLLECTION",
+    "ConversationStore",
+    "LEGACY_CHAT_FALLBACK",
+    "LEGACY_CHATS_MIGRATED_FIELD",
+    "append_messages_ops",
+    "chat_index_ref",
+    "commit_ops",
+    "conversation_namespace",
+    "conversation_ref",
+    "legacy_conversations",
+    "message_id",
+]
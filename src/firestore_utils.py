@@ -13,28 +13,107 @@ re-used outside the monolithic :mod:`a1sprechen` module.
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import functools
 import logging
+import os
 import re
+import threading
+import time
 from firebase_admin import firestore
 from rapidfuzz import fuzz, process
 from google.cloud.firestore_v1 import FieldFilter
 
-# Build a canonical list of exercise labels used across the platform.  This
-# allows us to fuzzy-match noisy user-facing titles to their official version.
-try:  # pragma: no cover - schedule/streamlit may be unavailable in some tests
-    from .schedule import get_a1_schedule
+# Canonical exercise labels used across the platform, so noisy user-facing
+# titles can be fuzzy-matched to their official version.  The list is built
+# from every level's schedule on first use (``CANONICAL_LABELS`` is resolved
+# lazily through the module ``__getattr__``); assigning ``CANONICAL_LABELS``
+# replaces it.
+LABEL_SCORE_CUTOFF = 80
+LABEL_MEMO_SIZE = int(os.environ.get("FALOWEN_LABEL_MEMO_SIZE", 4096))
 
-    CANONICAL_LABELS = sorted(
-        {
-            item.get("topic", "")
-            for item in get_a1_schedule()  # type: ignore[func-returns-value]
-            if item.get("topic")
-        }
+
+@functools.lru_cache(maxsize=1)
+def canonical_labels() -> Tuple[str, ...]:
+    """Return the sorted lesson topics of all levels' schedules."""
+
+    try:
+        from .schedule import load_level_schedules
+
+        schedules = load_level_schedules()
+    except Exception:  # pragma: no cover - best effort for offline tests
+        logging.debug("Schedules unavailable for canonical labels", exc_info=True)
+        return ()
+    return tuple(
+        sorted(
+            {
+                str(item.get("topic"))
+                for lessons in schedules.values()
+                for item in lessons
+                if isinstance(item, dict) and item.get("topic")
+            }
+        )
     )
-except Exception:  # pragma: no cover - best effort for offline tests
-    CANONICAL_LABELS: List[str] = []
+
+
+def __getattr__(name: str) -> Any:
+    if name == "CANONICAL_LABELS":
+        return canonical_labels()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LabelMatcher:
+    """Match labels to a fixed canonical list.
+
+    Exact matches are a dict lookup; fuzzy results are memoised per label, so
+    the same session titles are scored only once.
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[str],
+        score_cutoff: int = LABEL_SCORE_CUTOFF,
+        memo_size: int = LABEL_MEMO_SIZE,
+    ) -> None:
+        self.source = labels
+        self.labels = list(labels)
+        self.score_cutoff = score_cutoff
+        self._exact = frozenset(self.labels)
+        self._fuzzy = functools.lru_cache(maxsize=memo_size)(self._best_match)
+
+    def _best_match(self, cleaned: str) -> str:
+        match = process.extractOne(
+            cleaned,
+            self.labels,
+            scorer=fuzz.ratio,
+            score_cutoff=self.score_cutoff,
+        )
+        return match[0] if match else cleaned
+
+    def match(self, cleaned: str) -> str:
+        if not self.labels or cleaned in self._exact:
+            return cleaned
+        return self._fuzzy(cleaned)
+
+    def cache_info(self):
+        return self._fuzzy.cache_info()
+
+
+_label_matcher: Optional[LabelMatcher] = None
+
+
+def get_label_matcher() -> LabelMatcher:
+    """Return the matcher for the current ``CANONICAL_LABELS``."""
+
+    global _label_matcher
+    labels = globals().get("CANONICAL_LABELS")
+    if labels is None:
+        labels = canonical_labels()
+    matcher = _label_matcher
+    if matcher is None or matcher.source is not labels:
+        matcher = _label_matcher = LabelMatcher(labels)
+    return matcher
 
 
 def normalize_label(label: str) -> str:
@@ -49,16 +128,7 @@ def normalize_label(label: str) -> str:
         return ""
 
     cleaned = re.sub(r"^Woche\s*\d+\s*:\s*", "", label, flags=re.I).strip()
-    if not CANONICAL_LABELS:
-        return cleaned
-
-    match = process.extractOne(
-        cleaned,
-        CANONICAL_LABELS,
-        scorer=fuzz.ratio,
-        score_cutoff=80,
-    )
-    return match[0] if match else cleaned
+    return get_label_matcher().match(cleaned)
 
 
 def format_record(doc_id: str, data: Dict[str, Any], student_code: str) -> Tuple[Dict[str, object], float]:
@@ -379,18 +449,22 @@ def recover_student_code_from_drafts(
 
 # ---- DRAFTS (server-side) — now stored separately from submissions ----
 
-def save_draft_to_db(code: str, field_key: str, text: str) -> None:
-    """Persist the given ``text`` as a draft for ``code``/``field_key``."""
+def draft_write_op(code: str, field_key: str, text: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    """Return ``(ref, payload)`` for persisting a lesson draft with ``set(merge=True)``.
 
-    db = _get_db()
-    if db is None:
-        return
+    ``None`` is returned when Firestore is unavailable.  Shared by
+    :func:`save_draft_to_db` and the write-behind queue in
+    :mod:`src.draft_queue` so both write the same document shape.
+    """
+
+    if _get_db() is None:
+        return None
     if text is None:
         text = ""
     level, lesson_key = _extract_level_and_lesson(field_key)
     ref = _draft_doc_ref(level, lesson_key, code)
     if ref is None:
-        return
+        return None
     payload = {
         "text": text,
         "updated_at": firestore.SERVER_TIMESTAMP,
@@ -398,13 +472,23 @@ def save_draft_to_db(code: str, field_key: str, text: str) -> None:
         "lesson_key": lesson_key,
         "student_code": code,
     }
+    return ref, payload
+
 
+def save_draft_to_db(code: str, field_key: str, text: str) -> None:
+    """Persist the given ``text`` as a draft for ``code``/``field_key``."""
+
+    op = draft_write_op(code, field_key, text)
+    if op is None:
+        return
+    ref, payload = op
     try:
         ref.set(payload, merge=True)
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
         logging.warning("Failed to save draft for %s/%s: %s", code, field_key, exc)
         return
-        
+
+
 def load_draft_from_db(code: str, field_key: str) -> str:
     """Return the draft text stored for ``code`` and ``field_key``."""
 
@@ -412,20 +496,34 @@ def load_draft_from_db(code: str, field_key: str) -> str:
     return text or ""
 
 
-def save_chat_draft_to_db(code: str, conv_key: str, text: str) -> None:
-    """Persist an unsent chat draft for the given conversation."""
+def chat_draft_write_op(code: str, conv_key: str, text: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+    """Return ``(ref, payload)`` for persisting an unsent chat draft.
+
+    An empty ``text`` deletes the stored draft.  ``None`` is returned when
+    Firestore is unavailable.
+    """
 
     db = _get_db()
     if db is None:
-        return
+        return None
     ref = db.collection("falowen_chats").document(code)
     mode_level_teil = conv_key.rsplit("_", 1)[0]
+    updates: Dict[str, Any] = {"current_conv": {mode_level_teil: conv_key}}
+    if text:
+        updates["drafts"] = {conv_key: text}
+    else:
+        updates["drafts"] = {conv_key: firestore.DELETE_FIELD}
+    return ref, updates
+
+
+def save_chat_draft_to_db(code: str, conv_key: str, text: str) -> None:
+    """Persist an unsent chat draft for the given conversation."""
+
+    op = chat_draft_write_op(code, conv_key, text)
+    if op is None:
+        return
+    ref, updates = op
     try:
-        updates = {"current_conv": {mode_level_teil: conv_key}}
-        if text:
-            updates["drafts"] = {conv_key: text}
-        else:
-            updates["drafts"] = {conv_key: firestore.DELETE_FIELD}
         ref.set(updates, merge=True)
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
         logging.warning("Failed to save chat draft for %s/%s: %s", code, conv_key, exc)
@@ -468,6 +566,7 @@ def save_student_profile(code: str, about: str) -> None:
         ref.set(payload, merge=True)
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
         logging.warning("Failed to save student profile for %s: %s", code, exc)
+    _forget_profile(code)
 
 
 def delete_student_profile(code: str) -> None:
@@ -483,6 +582,7 @@ def delete_student_profile(code: str) -> None:
         ref.set({"about": firestore.DELETE_FIELD}, merge=True)
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
         logging.warning("Failed to delete student profile for %s: %s", code, exc)
+    _forget_profile(code)
 
 
 def load_student_profile(code: str) -> str:
@@ -501,58 +601,199 @@ def load_student_profile(code: str) -> str:
     return ""
 
 
+# Class Members bios, cached per class and dropped when a member edits theirs.
+PROFILE_CACHE_TTL_SEC = float(os.environ.get("FALOWEN_PROFILE_CACHE_TTL_SEC", 120))
+_class_profiles: Dict[str, Tuple[float, Dict[str, str]]] = {}
+_class_profiles_lock = threading.Lock()
+
+
+def _forget_profile(code: str) -> None:
+    with _class_profiles_lock:
+        for class_name in [k for k, (_, bios) in _class_profiles.items() if code in bios]:
+            _class_profiles.pop(class_name, None)
+
+
+def load_student_profiles(
+    codes: Sequence[str], class_name: Optional[str] = None
+) -> Dict[str, str]:
+    """Return the 'about' text of every code in ``codes`` with one ``get_all``.
+
+    With ``class_name`` the result is cached for ``PROFILE_CACHE_TTL_SEC``;
+    saving or deleting a member's profile drops the cached class.
+    """
+
+    wanted = list(dict.fromkeys(code for code in codes if code))
+    if class_name:
+        with _class_profiles_lock:
+            cached = _class_profiles.get(class_name)
+        if cached is not None:
+            fetched_at, bios = cached
+            if time.monotonic() - fetched_at < PROFILE_CACHE_TTL_SEC and all(
+                code in bios for code in wanted
+            ):
+                return {code: bios[code] for code in wanted}
+
+    bios = {code: "" for code in wanted}
+    db = _get_db()
+    if db is None or not wanted:
+        return bios
+    try:
+        students = db.collection("students")
+        snaps = get_documents(db, [students.document(code) for code in wanted])
+    except Exception as exc:  # pragma: no cover - runtime depends on Firestore
+        logging.exception("Failed to load student profiles for %s: %s", class_name, exc)
+        return bios
+    for code, snap in zip(wanted, snaps):
+        if snap is not None and snap.exists:
+            data = snap.to_dict() or {}
+            bios[code] = data.get("about", "") or ""
+
+    if class_name:
+        with _class_profiles_lock:
+            _class_profiles[class_name] = (time.monotonic(), dict(bios))
+    return bios
+
+
+# Set ``FALOWEN_LEGACY_DRAFT_FALLBACK=0`` once every student has been migrated
+# (see ``scripts/migrate_legacy_drafts.py``) to stop reading the old layouts.
+LEGACY_DRAFT_FALLBACK = os.environ.get("FALOWEN_LEGACY_DRAFT_FALLBACK", "1") != "0"
+# Field on ``drafts_v2/{code}`` written by the migration once the student's
+# legacy drafts were copied into the v2 layout.
+LEGACY_MARKER_FIELD = "legacy_drafts_migrated"
+
+# Per-student knowledge about the legacy layouts, kept for the process lifetime.
+_LEGACY_MIGRATED = "migrated"  # marker present: only the v2 path is read
+_LEGACY_NO_FLAT = "no_flat"  # not migrated, but no ``draft_answers`` doc
+_LEGACY_FLAT = "flat"  # not migrated and a ``draft_answers`` doc exists
+_LEGACY_STATE_MAX = 10_000
+_legacy_state: Dict[str, str] = {}
+
+
+def legacy_marker_ref(db: Any, code: str):
+    """Return the ``drafts_v2/{code}`` document holding the migration marker."""
+
+    return db.collection("drafts_v2").document(code)
+
+
+def compat_draft_ref(db: Any, level: str, lesson_key: str, code: str):
+    """Return the old level-rooted ``drafts_v2/{level}/lessons/{lesson}/users/{code}`` ref."""
+
+    return (
+        db.collection("drafts_v2")
+        .document(level)
+        .collection("lessons")
+        .document(lesson_key)
+        .collection("users")
+        .document(code)
+    )
+
+
+def get_documents(db: Any, refs: List[Any]) -> List[Any]:
+    """Read ``refs`` with a single ``get_all`` round trip, preserving order.
+
+    Falls back to sequential ``get`` calls for clients without ``get_all``.
+    """
+
+    if not refs:
+        return []
+    get_all = getattr(db, "get_all", None)
+    if get_all is None:
+        return [ref.get() for ref in refs]
+    by_path = {}
+    for snap in get_all(refs):
+        by_path[getattr(snap.reference, "path", None)] = snap
+    return [by_path.get(getattr(ref, "path", None)) for ref in refs]
+
+
+def _remember_legacy_state(code: str, state: str) -> None:
+    if code not in _legacy_state and len(_legacy_state) >= _LEGACY_STATE_MAX:
+        _legacy_state.pop(next(iter(_legacy_state)))
+    _legacy_state[code] = state
+
+
+def forget_legacy_draft_state(code: Optional[str] = None) -> None:
+    """Drop the cached legacy-layout state for ``code`` (or every student)."""
+
+    if code is None:
+        _legacy_state.clear()
+    else:
+        _legacy_state.pop(code, None)
+
+
+def _snap_data(snap: Any) -> Optional[Dict[str, Any]]:
+    if snap is None or not getattr(snap, "exists", False):
+        return None
+    return snap.to_dict() or {}
+
+
 def load_draft_meta_from_db(code: str, field_key: str) -> Tuple[str, Optional[datetime]]:
-    """Return ``(text, updated_at)`` for the requested draft."""
+    """Return ``(text, updated_at)`` for the requested draft.
+
+    The user-rooted ``drafts_v2/{code}/lessons/{lesson}`` document wins over
+    the old level-rooted path, which wins over the legacy flat
+    ``draft_answers/{code}`` document.  All candidates are read in one
+    ``get_all`` round trip; students whose legacy drafts were migrated (or who
+    have no flat document) skip those reads on later lookups.
+    """
     db = _get_db()
     if db is None:
         return "", None
     level, lesson_key = _extract_level_and_lesson(field_key)
+    state = _legacy_state.get(code) if LEGACY_DRAFT_FALLBACK else _LEGACY_MIGRATED
 
-    # 1) New user-rooted path
+    candidates: List[Tuple[str, Any]] = []
     try:
         ref = _draft_doc_ref(level, lesson_key, code)
         if ref is not None:
-            snap = ref.get()
-            if snap.exists:
-                data = snap.to_dict() or {}
-                return data.get("text", ""), data.get("updated_at")
-              
+            candidates.append(("v2", ref))
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
-
         logging.exception(
             "Failed to load draft meta for %s/%s: %s", code, field_key, exc
         )
 
-    # 2) Compatibility: old level-rooted nested path
-    try:
-        comp = (
-            db.collection("drafts_v2")
-            .document(level)
-            .collection("lessons")
-            .document(lesson_key)
-            .collection("users")
-            .document(code)
-            .get()
-        )
-        if comp.exists:
-            data = comp.to_dict() or {}
-            return data.get("text", ""), data.get("updated_at")
-    except Exception as exc:  # pragma: no cover - runtime depends on Firestore
-        logging.exception(
-            "Failed to load draft meta (compat) for %s/%s: %s", code, field_key, exc
-        )
+    if state != _LEGACY_MIGRATED:
+        try:
+            candidates.append(("compat", compat_draft_ref(db, level, lesson_key, code)))
+            if state is None:
+                candidates.append(("marker", legacy_marker_ref(db, code)))
+        except Exception as exc:  # pragma: no cover - runtime depends on Firestore
+            logging.exception(
+                "Failed to load draft meta (compat) for %s/%s: %s", code, field_key, exc
+            )
+        if state != _LEGACY_NO_FLAT:
+            try:
+                candidates.append(("legacy", db.collection("draft_answers").document(code)))
+            except Exception as exc:  # pragma: no cover - runtime depends on Firestore
+                logging.exception(
+                    "Failed to load draft meta (legacy) for %s/%s: %s", code, field_key, exc
+                )
 
-    # 3) Legacy flat doc
+    if not candidates:
+        return "", None
     try:
-        legacy = db.collection("draft_answers").document(code).get()
-        if legacy.exists:
-            data = legacy.to_dict() or {}
-            return data.get(field_key, ""), data.get(f"{field_key}__updated_at")
+        snaps = get_documents(db, [ref for _, ref in candidates])
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
         logging.exception(
-            "Failed to load draft meta (legacy) for %s/%s: %s", code, field_key, exc
+            "Failed to load draft meta for %s/%s: %s", code, field_key, exc
         )
+        return "", None
+    found = {label: _snap_data(snap) for (label, _), snap in zip(candidates, snaps)}
+
+    if LEGACY_DRAFT_FALLBACK and "marker" in found:
+        if (found["marker"] or {}).get(LEGACY_MARKER_FIELD):
+            _remember_legacy_state(code, _LEGACY_MIGRATED)
+        elif "legacy" in found:
+            _remember_legacy_state(
+                code, _LEGACY_FLAT if found["legacy"] is not None else _LEGACY_NO_FLAT
+            )
 
+    for label in ("v2", "compat"):
+        data = found.get(label)
+        if data is not None:
+            return data.get("text", ""), data.get("updated_at")
+    legacy = found.get("legacy")
+    if legacy is not None:
+        return legacy.get(field_key, ""), legacy.get(f"{field_key}__updated_at")
     return "", None
 
 
@@ -625,8 +866,9 @@ def fetch_attendance_summary(student_code: str, class_name: str) -> Tuple[int, f
 
     The data is expected under ``attendance/{class_name}/sessions`` where each
     session document contains an ``attendees`` or ``students`` mapping of
-    student codes to hours attended.  If Firestore is unavailable or an error
-    occurs, ``(0, 0.0)`` is returned.
+    student codes to hours attended.  The sessions come from the per-class
+    cache in :mod:`src.attendance_service`.  If Firestore is unavailable or an
+    error occurs, ``(0, 0.0)`` is returned.
     """
 
     db = _get_db()
@@ -634,55 +876,9 @@ def fetch_attendance_summary(student_code: str, class_name: str) -> Tuple[int, f
         return 0, 0.0
 
     try:
-        sessions_ref = (
-            db.collection("attendance")
-            .document(class_name)
-            .collection("sessions")
-        )
-        student_code_norm = student_code.strip().lower()
-        count = 0
-        hours = 0.0
-        for snap in sessions_ref.stream():
-            data = snap.to_dict() or {}
-            if "attendees" in data:
-                attendees = data.get("attendees") or {}
-            elif "students" in data:
-                attendees = data.get("students") or {}
-            else:
-                attendees = data
-            if isinstance(attendees, dict):
-                attendees_norm = {
-                    str(k).strip().lower(): v for k, v in attendees.items()
-                }
-                entry = attendees_norm.get(student_code_norm)
-                if isinstance(entry, dict) and "present" in entry:
-                    if bool(entry.get("present")):
-                        count += 1
-                        try:
-                            hours += float(entry.get("hours", 1) or 0)
-                        except Exception:
-                            pass
-                elif student_code_norm in attendees_norm:
-                    count += 1
-                    try:
-                        hours += float(attendees_norm.get(student_code_norm, 0) or 0)
-                    except Exception:
-                        pass
-            elif isinstance(attendees, list):
-                for item in attendees:
-                    if (
-                        isinstance(item, dict)
-                        and str(item.get("code", "")).strip().lower()
-                        == student_code_norm
-                        and bool(item.get("present", True))
-                    ):
-                        count += 1
-                        try:
-                            hours += float(item.get("hours", 0) or 0)
-                        except Exception:
-                            pass
-                        break
-        return count, hours
+        from .attendance_service import load_class_attendance
+
+        return load_class_attendance(class_name, db).student_summary(student_code)
     except Exception as exc:  # pragma: no cover - runtime depends on Firestore
         logging.exception(
             "Failed to fetch attendance summary for %s/%s: %s",
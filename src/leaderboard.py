@@ -0,0 +1,151 @@
+"""Per-level assignment leaderboards computed once per scores snapshot.
+
+The Dashboard used to dedupe, group, sort and rank the whole scores sheet on
+every rerun just to show one student's rank.  :class:`Leaderboard` does that
+work for every level at once; :func:`load_leaderboard` derives it from the
+shared assignment scores snapshot, so it is rebuilt only when the sheet is
+refreshed.  Each level is stored as rank-ordered arrays plus a
+``studentcode -> position`` map, making a student's rank an O(1) lookup and
+top-N queries a slice.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .assignment_ui import (
+    ASSIGNMENT_SCORES_SHEET,
+    select_best_assignment_attempts,
+)
+from .sheets import sheet_refresher
+
+# Students need this many distinct assignments to appear on a board.
+MIN_ASSIGNMENTS = 3
+
+
+def _norm_code(code: object) -> str:
+    return str(code).strip().lower()
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    rank: int
+    studentcode: str
+    name: str
+    total_score: float
+    completed: int
+
+
+@dataclass
+class LevelBoard:
+    """Rank-ordered leaderboard of one level."""
+
+    level: str
+    codes: np.ndarray
+    names: np.ndarray
+    total_scores: np.ndarray
+    completed: np.ndarray
+    _positions: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        if not self._positions:
+            for pos, code in enumerate(self.codes):
+                # A student listed under two names keeps their best rank.
+                self._positions.setdefault(_norm_code(code), pos)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _entry(self, pos: int) -> LeaderboardEntry:
+        return LeaderboardEntry(
+            rank=pos + 1,
+            studentcode=str(self.codes[pos]),
+            name=str(self.names[pos]),
+            total_score=float(self.total_scores[pos]),
+            completed=int(self.completed[pos]),
+        )
+
+    def lookup(self, student_code: str) -> Optional[LeaderboardEntry]:
+        pos = self._positions.get(_norm_code(student_code))
+        return None if pos is None else self._entry(pos)
+
+    def top(self, n: int) -> List[LeaderboardEntry]:
+        return [self._entry(pos) for pos in range(min(max(n, 0), len(self)))]
+
+
+_EMPTY_ARRAY = np.array([], dtype=object)
+
+
+class Leaderboard:
+    """Leaderboards of all levels for one assignment scores snapshot."""
+
+    def __init__(self, boards: Dict[str, LevelBoard]) -> None:
+        self.boards = boards
+
+    @classmethod
+    def from_scores(
+        cls, scores: pd.DataFrame, min_assignments: int = MIN_ASSIGNMENTS
+    ) -> "Leaderboard":
+        required = {"studentcode", "name", "assignment", "score", "level"}
+        if not isinstance(scores, pd.DataFrame) or not required.issubset(scores.columns):
+            return cls({})
+
+        df = scores[list(required)].copy()
+        df["level"] = df["level"].astype(str).str.upper().str.strip()
+        df["score"] = pd.to_numeric(df["score"], errors="coerce")
+        best = select_best_assignment_attempts(df)
+        totals = best.groupby(["level", "studentcode", "name"], as_index=False).agg(
+            total_score=("score", "sum"), completed=("assignment", "nunique")
+        )
+        totals = totals[totals["completed"] >= min_assignments]
+
+        boards: Dict[str, LevelBoard] = {}
+        for level, group in totals.groupby("level", sort=False):
+            ranked = group.sort_values(
+                ["total_score", "completed"], ascending=[False, False]
+            )
+            boards[level] = LevelBoard(
+                level=level,
+                codes=ranked["studentcode"].to_numpy(dtype=object),
+                names=ranked["name"].to_numpy(dtype=object),
+                total_scores=ranked["total_score"].to_numpy(dtype=float),
+                completed=ranked["completed"].to_numpy(dtype=int),
+            )
+        return cls(boards)
+
+    def board(self, level: str) -> LevelBoard:
+        level = (level or "").upper().strip()
+        board = self.boards.get(level)
+        if board is None:
+            return LevelBoard(level, _EMPTY_ARRAY, _EMPTY_ARRAY, _EMPTY_ARRAY, _EMPTY_ARRAY)
+        return board
+
+    def rank(self, level: str, student_code: str) -> Optional[LeaderboardEntry]:
+        """Return ``student_code``'s entry on ``level``'s board, if ranked."""
+
+        return self.board(level).lookup(student_code)
+
+    def size(self, level: str) -> int:
+        return len(self.board(level))
+
+    def top(self, level: str, n: int = 10) -> List[LeaderboardEntry]:
+        return self.board(level).top(n)
+
+
+def load_leaderboard() -> Leaderboard:
+    """Return the leaderboard of the current assignment scores snapshot."""
+
+    return sheet_refresher.view(ASSIGNMENT_SCORES_SHEET, "leaderboard", Leaderboard.from_scores)
+
+
+__all__ = [
+    "MIN_ASSIGNMENTS",
+    "Leaderboard",
+    "LeaderboardEntry",
+    "LevelBoard",
+    "load_leaderboard",
+]
@@ -8,6 +8,7 @@ import streamlit as st
 
 from falowen.sessions import destroy_session_token
 
+from .draft_queue import discard_pending_draft
 from .firestore_utils import save_draft_to_db
 
 
@@ -58,6 +59,7 @@ def do_logout(
                 continue
 
             try:
+                discard_pending_draft(student_code, key)
                 save_draft_to_db(student_code, key, value)
             except Exception:
                 logger.exception(
@@ -101,6 +103,7 @@ def do_logout(
     st_module.session_state.pop("falowen_conv_key", None)
     st_module.session_state.pop("falowen_loaded_key", None)
     st_module.session_state.pop("falowen_messages", None)
+    st_module.session_state.pop("falowen_chat_store", None)
     for k in list(st_module.session_state.keys()):
         if k.startswith("__google_btn_rendered::"):
             st_module.session_state.pop(k, None)
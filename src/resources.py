@@ -0,0 +1,270 @@
+"""Process-wide singletons: the Flask app, the OpenAI client and Firestore.
+
+``a1sprechen.py`` runs top to bottom on every Streamlit rerun, so anything it
+constructs at module level is rebuilt per interaction.  The objects here are
+created once per process in a :class:`ResourceRegistry` held by
+``st.cache_resource`` and handed out on every later call.  The OpenAI client
+uses an ``httpx`` pool with a long keep-alive so consecutive AI calls reuse
+the TLS connection instead of paying a new handshake.
+
+:func:`resource_diagnostics` reports how often each resource was created and
+reused, plus request, connection and TLS handshake counts of the OpenAI pool;
+it is served at ``/health/resources`` when ``FALOWEN_HEALTH_TOKEN`` is set (see
+:mod:`src.routes.health`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import streamlit as st
+
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("FALOWEN_OPENAI_MAX_CONNECTIONS", 20))
+OPENAI_MAX_KEEPALIVE = int(os.environ.get("FALOWEN_OPENAI_MAX_KEEPALIVE", 10))
+OPENAI_KEEPALIVE_EXPIRY_SEC = float(os.environ.get("FALOWEN_OPENAI_KEEPALIVE_EXPIRY_SEC", 120))
+
+FLASK_APP = "flask_app"
+OPENAI_CLIENT = "openai_client"
+FIRESTORE_CLIENT = "firestore_client"
+
+# Survives ``st.cache_resource.clear()`` so rebuilt registries stay visible.
+_creation_counts: Counter = Counter()
+_creation_lock = threading.Lock()
+
+
+@dataclass
+class _Entry:
+    value: Any
+    created_at: float
+    hits: int = 0
+
+
+class ResourceRegistry:
+    """Named singletons created on first use and reused afterwards."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        # One lock per name, so a slow factory does not block other resources.
+        self._building: Dict[str, threading.Lock] = {}
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Return the resource ``name``, building it with ``factory`` once.
+
+        A failing ``factory`` is not cached; the next call tries again.
+        """
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.hits += 1
+                return entry.value
+            building = self._building.setdefault(name, threading.Lock())
+        with building:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    entry.hits += 1
+                    return entry.value
+            value = factory()
+            with self._lock:
+                self._entries[name] = _Entry(value=value, created_at=time.time())
+        with _creation_lock:
+            _creation_counts[name] += 1
+        return value
+
+    def peek(self, name: str) -> Optional[Any]:
+        entry = self._entries.get(name)
+        return entry.value if entry is not None else None
+
+    def discard(self, name: str) -> None:
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def diagnostics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            entries = dict(self._entries)
+        with _creation_lock:
+            counts = dict(_creation_counts)
+        report: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(set(entries) | set(counts)):
+            entry = entries.get(name)
+            report[name] = {
+                "alive": entry is not None,
+                "created": counts.get(name, 0),
+                "reused": entry.hits if entry is not None else 0,
+                "age_sec": round(time.time() - entry.created_at, 1) if entry else None,
+            }
+        return report
+
+
+@st.cache_resource(show_spinner=False)
+def get_registry() -> ResourceRegistry:
+    return ResourceRegistry()
+
+
+# ---------------------------------------------------------------------------
+# OpenAI
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class ConnectionStats:
+    """Counts requests, new connections and TLS handshakes of an httpx pool.
+
+    Uses the ``trace`` request extension of httpcore, which reports every TCP
+    connect and TLS handshake the pool performs.
+    """
+
+    requests: int = 0
+    connections: int = 0
+    handshakes: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def on_request(self, request: Any) -> None:
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections += 1
+        elif event_name == "connection.start_tls.complete":
+            with self._lock:
+                self.handshakes += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.handshakes,
+                "reused_connections": max(0, self.requests - self.connections),
+            }
+
+
+openai_connection_stats = ConnectionStats()
+
+
+def build_http_client(stats: ConnectionStats = openai_connection_stats):
+    """Return the keep-alive ``httpx`` client used by the OpenAI client."""
+
+    import httpx
+    from openai import DefaultHttpxClient
+
+    return DefaultHttpxClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY_SEC,
+        ),
+        event_hooks={"request": [stats.on_request]},
+    )
+
+
+def get_openai_client(api_key: str):
+    """Return the process-wide OpenAI client for ``api_key``."""
+
+    def _create():
+        from openai import OpenAI
+
+        return OpenAI(api_key=api_key, http_client=build_http_client())
+
+    # Keyed by a digest so a rotated key gets its own client.
+    key_id = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return get_registry().get(f"{OPENAI_CLIENT}:{key_id}", _create)
+
+
+# ---------------------------------------------------------------------------
+# Flask
+# ---------------------------------------------------------------------------
+
+
+def _create_flask_app():
+    from flask import Flask
+
+    from auth import auth_bp
+    from src.routes.health import register_health_route
+
+    flask_app = Flask("a1sprechen", root_path=str(Path(__file__).resolve().parent.parent))
+    flask_app.register_blueprint(auth_bp)
+    register_health_route(flask_app)
+    return flask_app
+
+
+def get_flask_app():
+    """Return the process-wide Flask app (reruns would re-register the blueprint)."""
+
+    return get_registry().get(FLASK_APP, _create_flask_app)
+
+
+# ---------------------------------------------------------------------------
+# Firestore
+# ---------------------------------------------------------------------------
+
+
+def _create_firestore_client():
+    import falowen.sessions as sessions
+
+    client = getattr(sessions, "db", None) or getattr(sessions, "_db_client", None)
+    if client is None:
+        # Try Firebase Admin SDK first (firestore.client())
+        try:
+            import firebase_admin
+            from firebase_admin import firestore as fbfs
+
+            if not firebase_admin._apps:
+                firebase_admin.initialize_app()
+            client = fbfs.client()
+        except Exception:
+            logging.debug("Firebase Admin client unavailable", exc_info=True)
+            client = None
+    if client is None:
+        from google.cloud import firestore as gcf
+
+        client = gcf.Client()
+    sessions.db = client
+    if hasattr(sessions, "_db_client"):
+        sessions._db_client = client
+    return client
+
+
+def get_firestore_client():
+    """Return the process-wide Firestore client (shared with ``falowen.sessions``)."""
+
+    return get_registry().get(FIRESTORE_CLIENT, _create_firestore_client)
+
+
+def resource_diagnostics() -> Dict[str, Any]:
+    """Return creation/reuse counts and OpenAI pool statistics."""
+
+    return {
+        "resources": get_registry().diagnostics(),
+        "openai_pool": {
+            **openai_connection_stats.snapshot(),
+            "max_connections": OPENAI_MAX_CONNECTIONS,
+            "max_keepalive": OPENAI_MAX_KEEPALIVE,
+            "keepalive_expiry_sec": OPENAI_KEEPALIVE_EXPIRY_SEC,
+        },
+    }
+
+
+__all__ = [
+    "ConnectionStats",
+    "ResourceRegistry",
+    "build_http_client",
+    "get_firestore_client",
+    "get_flask_app",
+    "get_openai_client",
+    "get_registry",
+    "resource_diagnostics",
+]
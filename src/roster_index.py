@@ -0,0 +1,144 @@
+"""Hash-map index over the student roster.
+
+Looking a student up in the roster ``DataFrame`` used to normalise the whole
+``StudentCode``/``Email`` column on every request.  :class:`RosterIndex` is
+built once per roster fetch and answers code, email and class lookups with
+dictionary reads.  :func:`get_roster_index` returns the index cached for the
+fetch a ``DataFrame`` came from (identified by the ``roster_fetch_id`` attr
+set by :mod:`src.data_loading`) and builds a throwaway index for any other
+frame.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+ROSTER_FETCH_ID_ATTR = "roster_fetch_id"
+# Keep indexes for the current and a few previous roster fetches.
+_MAX_CACHED_INDEXES = 4
+
+_index_cache: Dict[Tuple[str, int], "RosterIndex"] = {}
+_index_lock = threading.Lock()
+
+
+def normalize_key(value: Any) -> str:
+    """Return the lookup form of a student code or email."""
+
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(value).strip().casefold()
+
+
+def _is_missing(value: Any) -> bool:
+    try:
+        return bool(pd.isna(value))
+    except (TypeError, ValueError):
+        return False
+
+
+def _clean_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: (None if _is_missing(value) else value) for key, value in row.items()}
+
+
+@dataclass
+class RosterIndex:
+    """Roster rows with normalised code, email and class lookup tables."""
+
+    rows: List[Dict[str, Any]] = field(default_factory=list)
+    by_code: Dict[str, List[int]] = field(default_factory=dict)
+    by_email: Dict[str, List[int]] = field(default_factory=dict)
+    by_class: Dict[str, List[int]] = field(default_factory=dict)
+
+    @classmethod
+    def from_frame(cls, df: Optional[pd.DataFrame]) -> "RosterIndex":
+        index = cls()
+        if df is None or df.empty:
+            return index
+        index.rows = [_clean_row(row) for row in df.to_dict("records")]
+        for pos, row in enumerate(index.rows):
+            code = normalize_key(row.get("StudentCode"))
+            if code:
+                index.by_code.setdefault(code, []).append(pos)
+            email = normalize_key(row.get("Email"))
+            if email:
+                index.by_email.setdefault(email, []).append(pos)
+            class_name = str(row.get("ClassName") or "").strip()
+            if class_name:
+                index.by_class.setdefault(class_name, []).append(pos)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _rows(self, positions: List[int]) -> List[Dict[str, Any]]:
+        return [dict(self.rows[pos]) for pos in positions]
+
+    def by_student_code(self, code: Any) -> Optional[Dict[str, Any]]:
+        """Return the first row for ``code`` (case/whitespace-insensitive)."""
+
+        positions = self.by_code.get(normalize_key(code))
+        return dict(self.rows[positions[0]]) if positions else None
+
+    def by_student_email(self, email: Any) -> List[Dict[str, Any]]:
+        """Return every row whose ``Email`` matches ``email``."""
+
+        return self._rows(self.by_email.get(normalize_key(email), []))
+
+    def lookup(self, identifier: Any) -> List[Dict[str, Any]]:
+        """Return rows whose code *or* email equals ``identifier``."""
+
+        key = normalize_key(identifier)
+        positions = sorted(set(self.by_code.get(key, [])) | set(self.by_email.get(key, [])))
+        return self._rows(positions)
+
+    def match(self, code: Any, email: Any) -> Optional[Dict[str, Any]]:
+        """Return the row whose code and email both match, if any."""
+
+        email_key = normalize_key(email)
+        for pos in self.by_code.get(normalize_key(code), []):
+            if normalize_key(self.rows[pos].get("Email")) == email_key:
+                return dict(self.rows[pos])
+        return None
+
+    def class_members(self, class_name: str) -> List[Dict[str, Any]]:
+        """Return the rows of every student in ``class_name`` in roster order."""
+
+        return self._rows(self.by_class.get(str(class_name or "").strip(), []))
+
+
+def get_roster_index(df: Optional[pd.DataFrame]) -> RosterIndex:
+    """Return the :class:`RosterIndex` for ``df``.
+
+    Frames produced by one roster fetch share a single index; frames without a
+    fetch id (or filtered copies of one) get a freshly built index.
+    """
+
+    if df is None:
+        return RosterIndex()
+    fetch_id = getattr(df, "attrs", {}).get(ROSTER_FETCH_ID_ATTR)
+    if not fetch_id:
+        return RosterIndex.from_frame(df)
+    key = (str(fetch_id), len(df))
+    index = _index_cache.get(key)
+    if index is not None:
+        return index
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is None:
+            index = RosterIndex.from_frame(df)
+            while len(_index_cache) >= _MAX_CACHED_INDEXES:
+                _index_cache.pop(next(iter(_index_cache)))
+            _index_cache[key] = index
+    return index
+
+
+__all__ = ["RosterIndex", "get_roster_index", "normalize_key"]
@@ -0,0 +1,165 @@
+"""Coordinate forced roster refreshes.
+
+A login or signup miss used to call ``load_student_data(force_refresh=True)``
+directly, clearing the shared roster cache and re-downloading the Google
+Sheet on every attempt.  :class:`RosterRefreshCoordinator` bounds that cost:
+
+* concurrent forced refreshes share one in-flight download (single flight);
+* a forced refresh within :data:`ROSTER_MIN_REFRESH_INTERVAL_SEC` of the
+  previous one is served from the cached roster instead;
+* identifiers that were still missing after a refresh are remembered for
+  :data:`ROSTER_MISS_TTL_SEC` so retries do not trigger another refresh.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from .data_loading import load_student_data
+from .roster_index import normalize_key
+
+ROSTER_MIN_REFRESH_INTERVAL_SEC = float(
+    os.environ.get("FALOWEN_ROSTER_MIN_REFRESH_INTERVAL_SEC", 60)
+)
+ROSTER_MISS_TTL_SEC = float(os.environ.get("FALOWEN_ROSTER_MISS_TTL_SEC", 120))
+# Followers give up waiting for the leader's download after this long.
+_FLIGHT_WAIT_SEC = 30.0
+_MAX_REMEMBERED_MISSES = 5_000
+
+
+def _load_roster(force_refresh: bool) -> Optional[pd.DataFrame]:
+    return load_student_data(force_refresh=force_refresh)
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[pd.DataFrame] = None
+        self.error: Optional[BaseException] = None
+
+
+class RosterRefreshCoordinator:
+    """Single-flight, rate-limited roster refreshes plus a negative lookup cache."""
+
+    def __init__(
+        self,
+        loader: Callable[[bool], Optional[pd.DataFrame]] = _load_roster,
+        *,
+        min_interval: float = ROSTER_MIN_REFRESH_INTERVAL_SEC,
+        miss_ttl: float = ROSTER_MISS_TTL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._loader = loader
+        self.min_interval = min_interval
+        self.miss_ttl = miss_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flight: Optional[_Flight] = None
+        self._last_refresh: Optional[float] = None
+        self._misses: Dict[str, float] = {}
+        self.stats: Dict[str, int] = {
+            "refreshes": 0,
+            "joined": 0,
+            "throttled": 0,
+            "miss_hits": 0,
+        }
+
+    def refresh(self) -> Optional[pd.DataFrame]:
+        """Return a freshly downloaded roster, sharing or skipping the download.
+
+        Callers arriving while a refresh is running wait for it and receive
+        its result; callers arriving within ``min_interval`` of the last
+        refresh get the cached roster.
+        """
+
+        leader = False
+        with self._lock:
+            flight = self._flight
+            if flight is None:
+                now = self._clock()
+                if self._last_refresh is not None and now - self._last_refresh < self.min_interval:
+                    self.stats["throttled"] += 1
+                else:
+                    flight = self._flight = _Flight()
+                    leader = True
+                    self.stats["refreshes"] += 1
+            else:
+                self.stats["joined"] += 1
+
+        if flight is None:
+            return self._loader(False)
+        if not leader:
+            if not flight.done.wait(_FLIGHT_WAIT_SEC):
+                logging.warning("Timed out waiting for the roster refresh in flight")
+                return self._loader(False)
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self._loader(True)
+            return flight.result
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flight = None
+                self._last_refresh = self._clock()
+            flight.done.set()
+
+    # ------------------------------------------------------------------
+    # Negative lookup cache
+    # ------------------------------------------------------------------
+    def is_known_missing(self, identifier: Any) -> bool:
+        """Return ``True`` if ``identifier`` recently missed after a refresh."""
+
+        key = normalize_key(identifier)
+        if not key:
+            return False
+        with self._lock:
+            expires = self._misses.get(key)
+            if expires is None:
+                return False
+            if expires <= self._clock():
+                self._misses.pop(key, None)
+                return False
+            self.stats["miss_hits"] += 1
+            return True
+
+    def remember_missing(self, identifier: Any) -> None:
+        """Cache a miss for ``identifier`` for ``miss_ttl`` seconds."""
+
+        key = normalize_key(identifier)
+        if not key:
+            return
+        with self._lock:
+            if key not in self._misses and len(self._misses) >= _MAX_REMEMBERED_MISSES:
+                self._misses.pop(next(iter(self._misses)))
+            self._misses[key] = self._clock() + self.miss_ttl
+
+    def forget_missing(self, identifier: Any = None) -> None:
+        """Drop one remembered miss, or all of them."""
+
+        with self._lock:
+            if identifier is None:
+                self._misses.clear()
+            else:
+                self._misses.pop(normalize_key(identifier), None)
+
+
+roster_refresh = RosterRefreshCoordinator()
+
+
+__all__ = [
+    "ROSTER_MIN_REFRESH_INTERVAL_SEC",
+    "ROSTER_MISS_TTL_SEC",
+    "RosterRefreshCoordinator",
+    "roster_refresh",
+]
@@ -1,6 +1,21 @@
-"""Flask health check route registration."""
+"""Flask health check route registration.
 
-from flask import Flask
+``/health`` is public.  ``/health/resources`` exposes process internals and is
+only registered when ``FALOWEN_HEALTH_TOKEN`` is set; requests must then send
+``Authorization: Bearer <token>``.
+"""
+
+import hmac
+import os
+
+from flask import Flask, jsonify, request
+
+HEALTH_TOKEN_ENV = "FALOWEN_HEALTH_TOKEN"
+
+
+def _authorized(token: str) -> bool:
+    supplied = request.headers.get("Authorization", "")
+    return hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {token}".encode("utf-8"))
 
 
 def register_health_route(app: Flask) -> None:
@@ -8,4 +23,16 @@ def register_health_route(app: Flask) -> None:
     def health():  # pragma: no cover - trivial
         return {"ok": True}, 200
 
-__all__ = ["register_health_route"]
+    token = os.getenv(HEALTH_TOKEN_ENV, "").strip()
+    if not token:
+        return
+
+    @app.get("/health/resources")
+    def health_resources():
+        if not _authorized(token):
+            return jsonify(error="unauthorized"), 401
+        from src.resources import resource_diagnostics
+
+        return resource_diagnostics(), 200
+
+__all__ = ["HEALTH_TOKEN_ENV", "register_health_route"]
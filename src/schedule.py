@@ -5,6 +5,8 @@ from typing import Dict, List
 import re
 import streamlit as st
 
+from .shared_store import freeze
+
 
 DAY0_TUTORIAL_VIDEO_URL_A1 = "https://youtu.be/QT7YeWg9ReI"
 DAY0_TUTORIAL_VIDEO_URL_ADVANCED = "https://youtu.be/JuScjOEqOEw"
@@ -1732,21 +1734,20 @@ def get_c1_schedule():
     ]
     return _strip_topic_chapter(schedule)
 
-# --- Cache level schedules with TTL for periodic refresh ---
-@st.cache_data(ttl=86400)
+# --- Level schedules, built once per process and shared by every session ---
+@st.cache_resource(ttl=86400, show_spinner=False)
 def _load_level_schedules_cached():
-    return {
+    return freeze({
         "A1": get_a1_schedule(),
         "A2": get_a2_schedule(),
         "B1": get_b1_schedule(),
         "B2": get_b2_schedule(),
         "C1": get_c1_schedule(),
-    }
+    })
 
 def load_level_schedules():
-    if "level_schedules" not in st.session_state:
-        st.session_state["level_schedules"] = _load_level_schedules_cached()
-    return st.session_state["level_schedules"]
+    """Return the shared, read-only level schedules (copy before modifying)."""
+    return _load_level_schedules_cached()
 
 # -------------------------
 
@@ -1,14 +1,17 @@
 """Contract-related helper functions."""
 
 from datetime import UTC
-from typing import Optional
+from typing import Optional, Union
 
 import pandas as pd
 
 from src.contracts import is_contract_expired
+from src.roster_index import RosterIndex, get_roster_index
 
 
-def contract_active(student_code: str, roster: Optional[pd.DataFrame]) -> bool:
+def contract_active(
+    student_code: str, roster: Optional[Union[pd.DataFrame, RosterIndex]]
+) -> bool:
     """Return True if the contract for ``student_code`` is still active.
 
     Parameters
@@ -16,19 +19,19 @@ def contract_active(student_code: str, roster: Optional[pd.DataFrame]) -> bool:
     student_code:
         Code identifying the student.
     roster:
-        DataFrame containing at least ``StudentCode`` and contract fields.
+        :class:`RosterIndex` or DataFrame containing at least ``StudentCode``
+        and contract fields.
     """
-    if roster is None or "StudentCode" not in roster.columns:
+    if roster is None:
         return True
+    if not isinstance(roster, RosterIndex):
+        if "StudentCode" not in roster.columns:
+            return True
+        roster = get_roster_index(roster)
 
-    normalized_code = str(student_code or "").strip().lower()
-    roster_codes = (
-        roster["StudentCode"].astype(str).str.strip().str.lower()
-    )
-    match = roster[roster_codes == normalized_code]
-    if match.empty:
+    row = roster.by_student_code(student_code)
+    if row is None:
         return True
-    row = match.iloc[0]
     if is_contract_expired(row):
         return False
 
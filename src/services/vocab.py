@@ -1,13 +1,23 @@
-"""Utilities for loading vocabulary lists and audio URLs."""
+"""Utilities for loading vocabulary lists and audio URLs.
+
+Importing this module never touches the network: :data:`VOCAB_LISTS` and
+:data:`AUDIO_URLS` are read-only mappings that load the vocab sheet (from the
+on-disk snapshot when one exists) on first use.
+"""
 
 from __future__ import annotations
 
 import os
-from typing import Dict, Tuple, Union
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Tuple, Union
 
 import pandas as pd
 import streamlit as st
 
+from src.sheets import CsvSheet, sheet_refresher
+
 DEFAULT_SHEET_ID = "1I1yAnqzSh3DPjwWRh9cdRSfzNSPsi7o4r5Taj9Y36NU"
 DEFAULT_SHEET_GID = 0  # <-- change this if your Vocab tab uses another gid
 
@@ -75,16 +85,28 @@ def _build_vocab_csv_url() -> str:
     )
 
 
-@st.cache_data
-def load_vocab_lists() -> Tuple[Dict[str, list], Dict[Tuple[str, str], Dict[str, str]]]:
-    """Load vocabulary and audio URLs from the configured Google Sheet."""
-    csv_url = _build_vocab_csv_url()
-    try:
-        df = pd.read_csv(csv_url)
-    except Exception as e:  # pragma: no cover - network errors
-        st.error(f"Could not fetch vocab CSV: {e}")
-        return {}, {}
+VOCAB_SHEET = "vocab"
+VOCAB_TTL_SEC = 12 * 3600
+
+# Every vocab consumer derives its view from this one download.
+sheet_refresher.register(
+    VOCAB_SHEET, CsvSheet(_build_vocab_csv_url, timeout=8), ttl=VOCAB_TTL_SEC, persist=True
+)
 
+
+def load_vocab_sheet() -> pd.DataFrame:
+    """Return the raw vocab sheet snapshot (string columns; shared, do not mutate).
+
+    Errors of the first download propagate to the caller.
+    """
+
+    return sheet_refresher.get(VOCAB_SHEET)
+
+
+def _build_vocab_lists(
+    sheet: pd.DataFrame,
+) -> Tuple[Dict[str, list], Dict[Tuple[str, str], Dict[str, str]]]:
+    df = sheet.copy()
     df.columns = df.columns.str.strip()
 
     required = ["German", "English"]
@@ -136,13 +158,69 @@ def load_vocab_lists() -> Tuple[Dict[str, list], Dict[Tuple[str, str], Dict[str,
     return vocab_lists, audio_urls
 
 
-VOCAB_LISTS, AUDIO_URLS = load_vocab_lists()
+# After a failed first download, wait this long before trying again.
+_RETRY_AFTER_SEC = 60.0
+_failure_lock = threading.Lock()
+_failed_at: float | None = None
+
+
+def load_vocab_lists() -> Tuple[Dict[str, list], Dict[Tuple[str, str], Dict[str, str]]]:
+    """Load vocabulary and audio URLs from the configured Google Sheet."""
+    global _failed_at
+    with _failure_lock:
+        if _failed_at is not None and time.monotonic() - _failed_at < _RETRY_AFTER_SEC:
+            return {}, {}
+    try:
+        result = sheet_refresher.view(VOCAB_SHEET, "vocab_lists", _build_vocab_lists)
+    except Exception as e:  # pragma: no cover - network errors
+        with _failure_lock:
+            _failed_at = time.monotonic()
+        st.error(f"Could not fetch vocab CSV: {e}")
+        return {}, {}
+    with _failure_lock:
+        _failed_at = None
+    return result
+
+
+class _LazyVocabMapping(Mapping):
+    """Read-only view of one half of :func:`load_vocab_lists`, loaded on use.
+
+    Each access reads the current snapshot, so background refreshes of the
+    vocab sheet show up without re-importing anything.
+    """
+
+    def __init__(self, part: int, name: str) -> None:
+        self._part = part
+        self._name = name
+
+    def _data(self) -> Dict[Any, Any]:
+        return load_vocab_lists()[self._part]
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._data()[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._data())
+
+    def __len__(self) -> int:
+        return len(self._data())
+
+    def __repr__(self) -> str:
+        return f"<lazy {self._name}>"
+
+
+VOCAB_LISTS: Mapping[str, list] = _LazyVocabMapping(0, "VOCAB_LISTS")
+AUDIO_URLS: Mapping[Tuple[str, str], Dict[str, str]] = _LazyVocabMapping(1, "AUDIO_URLS")
 
 
 def refresh_vocab_from_sheet() -> None:
-    load_vocab_lists.clear()
-    global VOCAB_LISTS, AUDIO_URLS
-    VOCAB_LISTS, AUDIO_URLS = load_vocab_lists()
+    global _failed_at
+    with _failure_lock:
+        _failed_at = None
+    try:
+        sheet_refresher.refresh(VOCAB_SHEET)
+    except Exception as e:  # pragma: no cover - network errors
+        st.error(f"Could not fetch vocab CSV: {e}")
 
 
 def get_audio_url(level: str, german_word: str) -> str:
@@ -157,8 +235,10 @@ __all__ = [
     "SHEET_GID",
     "VOCAB_LISTS",
     "AUDIO_URLS",
+    "VOCAB_SHEET",
     "get_vocab_sheet_config",
     "load_vocab_lists",
+    "load_vocab_sheet",
     "refresh_vocab_from_sheet",
     "get_audio_url",
 ]
@@ -0,0 +1,154 @@
+"""Read-only data shared by every session of the process.
+
+``st.cache_data`` hands each caller a fresh unpickled copy, and the app used to
+park that copy in ``st.session_state``, so every logged-in student held a
+private copy of structures such as the level schedules.  Values built with
+:func:`freeze` are instead created once (``st.cache_resource``) and shared by
+reference.  :class:`FrozenDict` and :class:`FrozenList` subclass ``dict`` and
+``list`` so existing ``isinstance`` checks and JSON encoding keep working, but
+every mutating method raises ``TypeError``.
+
+:func:`session_memory_report` measures how many bytes a session holds
+privately, i.e. not reachable from the shared values.
+"""
+
+from __future__ import annotations
+
+import copy
+import sys
+from typing import Any, Dict, Iterable, Mapping, Optional, Set
+
+__all__ = [
+    "FrozenDict",
+    "FrozenList",
+    "deep_sizeof",
+    "freeze",
+    "session_memory_report",
+    "shared_object_ids",
+]
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is shared read-only data; copy it to modify")
+
+
+class FrozenDict(dict):
+    """A ``dict`` whose mutating methods raise ``TypeError``."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # Unpickle from a plain dict instead of item assignment.
+        return (type(self), (dict(self),))
+
+    # Copies are meant to be modified, so they are plain dicts.
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {copy.deepcopy(k, memo): copy.deepcopy(v, memo) for k, v in self.items()}
+
+
+class FrozenList(list):
+    """A ``list`` whose mutating methods raise ``TypeError``."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = clear = extend = insert = pop = remove = reverse = sort = _readonly
+
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(item, memo) for item in self]
+
+
+def freeze(value: Any) -> Any:
+    """Return a deep read-only copy of nested dicts, lists and tuples."""
+
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, tuple):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _children(obj: Any) -> Iterable[Any]:
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield key
+            yield value
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        yield from obj
+
+
+def _memory_usage(obj: Any) -> Optional[int]:
+    # pandas objects know their buffer sizes; sys.getsizeof does not.
+    usage = getattr(obj, "memory_usage", None)
+    if usage is None or not callable(usage):
+        return None
+    try:
+        result = usage(deep=True)
+    except TypeError:
+        return None
+    total = getattr(result, "sum", None)
+    return int(total()) if callable(total) else int(result)
+
+
+def shared_object_ids(*values: Any) -> Set[int]:
+    """Return the ids of every container reachable from ``values``."""
+
+    seen: Set[int] = set()
+    stack = list(values)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        stack.extend(_children(obj))
+    return seen
+
+
+def deep_sizeof(obj: Any, exclude: Optional[Set[int]] = None) -> int:
+    """Return the bytes of ``obj`` and everything it contains.
+
+    Objects whose id is in ``exclude`` (and what only they reference) are not
+    counted; each object is counted once.
+    """
+
+    seen: Set[int] = set(exclude or ())
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        usage = _memory_usage(item)
+        if usage is not None:
+            total += usage
+            continue
+        total += sys.getsizeof(item)
+        stack.extend(_children(item))
+    return total
+
+
+def session_memory_report(
+    state: Mapping[str, Any], shared: Iterable[Any] = ()
+) -> Dict[str, Any]:
+    """Return the private bytes held by each key of a session ``state``.
+
+    Anything reachable from ``shared`` is held by reference and costs the
+    session nothing.
+    """
+
+    exclude = shared_object_ids(*shared)
+    per_key = {str(key): deep_sizeof(value, exclude) for key, value in state.items()}
+    return {"total_bytes": sum(per_key.values()), "keys": per_key}
@@ -0,0 +1,514 @@
+"""Stale-while-revalidate cache for Google Sheets data.
+
+Sheet loaders used to sit behind ``st.cache_data`` TTLs, so whichever rerun
+landed after the TTL expired blocked on the download.  Loaders registered
+with :data:`sheet_refresher` are fetched synchronously only once; after that
+:meth:`SheetRefresher.get` always returns the last good snapshot immediately
+while a daemon thread re-fetches each source shortly before its TTL runs out
+and swaps the new value in.  Background failures are logged and the previous
+snapshot is kept, with an exponential back-off between retries.
+
+Sources registered with ``persist=True`` (which must be :class:`CsvSheet`
+loaders) also write the downloaded CSV of each snapshot to
+:data:`SNAPSHOT_DIR` next to a JSON file with the fetch metadata, so a
+restarted process re-parses the last snapshot from disk and only revalidates
+in the background.  Snapshots hold roster data, so they are only written to
+and read from a directory owned by the current user with mode ``0700``
+(by default under ``~/.cache``), and they are plain text that is parsed,
+never unpickled.
+
+:class:`CsvSheet` downloads a published sheet as CSV conditionally: a ``304``
+or an unchanged body keeps the current snapshot object instead of re-parsing
+it.  Consumers needing a
+different shape of the same sheet use :meth:`SheetRefresher.view`, which
+derives it once per fetched snapshot rather than downloading the sheet again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+import pandas as pd
+import requests
+
+# Refresh once a snapshot is this fraction of its TTL old.
+REFRESH_AHEAD_RATIO = 0.8
+POLL_INTERVAL_SEC = 15.0
+_MAX_BACKOFF_SEC = 15 * 60.0
+
+# Where persisted snapshots live; an empty value disables persistence.
+SNAPSHOT_DIR = os.environ.get(
+    "FALOWEN_SHEET_SNAPSHOT_DIR",
+    os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "falowen",
+        "sheets",
+    ),
+)
+# Snapshots older than this are ignored on start-up.
+SNAPSHOT_MAX_AGE_SEC = float(os.environ.get("FALOWEN_SHEET_SNAPSHOT_MAX_AGE_SEC", 24 * 3600))
+_SNAPSHOT_FORMAT = 2
+
+
+class _NotModified:
+    def __repr__(self) -> str:
+        return "NOT_MODIFIED"
+
+
+#: Returned by a loader when the sheet has not changed since its last fetch.
+NOT_MODIFIED = _NotModified()
+
+
+def with_cache_buster(url: str) -> str:
+    """Append a parameter that changes once per minute to dodge stale CDN copies."""
+
+    cb = int(time.time() // 60)
+    sep = "&" if ("?" in url) else "?"
+    return f"{url}{sep}cb={cb}"
+
+
+def _read_csv_text(text: str) -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(text), dtype=str)
+
+
+class CsvSheet:
+    """Loader downloading a published Google Sheet as CSV.
+
+    ``url`` is a string or a callable returning one (so secrets are resolved
+    at fetch time).  ``parse`` turns the CSV text into the snapshot value and
+    defaults to a string-typed :func:`pandas.read_csv`.  Validators and a
+    digest of the last body are kept so an unchanged sheet is answered with
+    :data:`NOT_MODIFIED` instead of being parsed again; the body itself is
+    kept for :meth:`SheetRefresher` to persist.
+    """
+
+    def __init__(
+        self,
+        url: Union[str, Callable[[], str]],
+        parse: Callable[[str], Any] = _read_csv_text,
+        *,
+        timeout: float = 12.0,
+        headers: Optional[Mapping[str, str]] = None,
+        cache_bust: bool = False,
+    ) -> None:
+        self._url = url
+        self.parse = parse
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.cache_bust = cache_bust
+        self._etag = ""
+        self._last_modified = ""
+        self._digest = ""
+        self._text: Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        return str(self._url() if callable(self._url) else self._url)
+
+    @property
+    def snapshot_key(self) -> str:
+        """Identify the sheet so a persisted snapshot of another URL is not reused."""
+
+        return self.url
+
+    def snapshot_state(self) -> Dict[str, str]:
+        return {
+            "etag": self._etag,
+            "last_modified": self._last_modified,
+            "sha256": self._digest,
+        }
+
+    def restore_state(self, state: Mapping[str, Any]) -> None:
+        self._etag = str(state.get("etag") or "")
+        self._last_modified = str(state.get("last_modified") or "")
+        self._digest = str(state.get("sha256") or "")
+
+    def snapshot_body(self) -> Optional[str]:
+        """Return the CSV text of the current snapshot (``None`` before a fetch)."""
+
+        return self._text
+
+    def restore_body(self, text: str, state: Mapping[str, Any]) -> Any:
+        """Parse a persisted body and adopt its validators; return the value."""
+
+        value = self.parse(text)
+        self._text = text
+        self.restore_state(state)
+        return value
+
+    def __call__(self) -> Any:
+        url = with_cache_buster(self.url) if self.cache_bust else self.url
+        headers = dict(self.headers)
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        try:
+            resp = requests.get(url, timeout=self.timeout, headers=headers)
+        except TypeError:
+            resp = requests.get(url, timeout=self.timeout)
+        if getattr(resp, "status_code", 200) == 304 and self._digest:
+            return NOT_MODIFIED
+        resp.raise_for_status()
+
+        text = resp.text
+        body = getattr(resp, "content", None)
+        if not isinstance(body, (bytes, bytearray)):
+            body = text.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        resp_headers = getattr(resp, "headers", None) or {}
+        if digest == self._digest:
+            self._etag = resp_headers.get("ETag", self._etag) or ""
+            self._last_modified = resp_headers.get("Last-Modified", self._last_modified) or ""
+            return NOT_MODIFIED
+        # Guard against HTML interstitials (private sheet / auth / rate limit)
+        if "<html" in text[:512].lower():
+            raise ValueError("Expected CSV, got HTML (check sheet privacy/sharing).")
+
+        value = self.parse(text)
+        self._etag = resp_headers.get("ETag", "") or ""
+        self._last_modified = resp_headers.get("Last-Modified", "") or ""
+        self._digest = digest
+        self._text = text
+        return value
+
+
+@dataclass
+class _Source:
+    name: str
+    loader: Callable[[], Any]
+    ttl: float
+    persist: bool = False
+    value: Any = None
+    loaded: bool = False
+    # Bumped whenever ``value`` is replaced; keys the derived views.
+    generation: int = 0
+    views: Dict[str, Tuple[int, Any]] = field(default_factory=dict, repr=False)
+    fetched_at: float = 0.0
+    failures: int = 0
+    retry_at: float = 0.0
+    last_error: str = ""
+    fetch_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class SheetRefresher:
+    """Registry of sheet loaders kept fresh by a background thread."""
+
+    def __init__(
+        self,
+        *,
+        refresh_ahead: float = REFRESH_AHEAD_RATIO,
+        poll_interval: float = POLL_INTERVAL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+        background: bool = True,
+        snapshot_dir: Optional[str] = None,
+        snapshot_max_age: float = SNAPSHOT_MAX_AGE_SEC,
+    ) -> None:
+        self.refresh_ahead = refresh_ahead
+        self.poll_interval = poll_interval
+        self.background = background
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_max_age = snapshot_max_age
+        self._clock = clock
+        self._sources: Dict[str, _Source] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def register(
+        self, name: str, loader: Callable[[], Any], *, ttl: float, persist: bool = False
+    ) -> None:
+        """Register (or replace) the ``loader`` for ``name``.
+
+        ``loader`` must return the parsed value (or :data:`NOT_MODIFIED`) or
+        raise; it runs on the background thread, so it must not call
+        Streamlit UI functions.  ``persist`` keeps a copy of each snapshot on
+        disk for the next process to start from and needs a loader with
+        ``snapshot_body``/``restore_body`` (a :class:`CsvSheet`).
+        """
+
+        if persist and not callable(getattr(loader, "restore_body", None)):
+            raise TypeError(f"Sheet {name!r}: persist=True needs a CsvSheet loader")
+        with self._lock:
+            self._sources[name] = _Source(
+                name=name, loader=loader, ttl=float(ttl), persist=persist
+            )
+
+    def _source(self, name: str) -> _Source:
+        try:
+            return self._sources[name]
+        except KeyError:
+            raise KeyError(f"Unknown sheet source: {name}") from None
+
+    def get(self, name: str) -> Any:
+        """Return the current snapshot for ``name``.
+
+        Only the very first call (per process) fetches synchronously, and its
+        errors propagate to the caller.
+        """
+
+        source = self._source(name)
+        if not source.loaded:
+            with source.fetch_lock:
+                if not source.loaded and not self._load_snapshot(source):
+                    self._fetch(source)
+        self._ensure_worker()
+        return source.value
+
+    def view(self, name: str, key: str, build: Callable[[Any], Any]) -> Any:
+        """Return ``build(snapshot)`` for ``name``, computed once per snapshot.
+
+        Lets several consumers share one download while each keeps its own
+        parsed shape.  ``build`` must not mutate the snapshot, and its result
+        is shared as well.
+        """
+
+        self.get(name)
+        source = self._source(name)
+        with self._lock:
+            value, generation = source.value, source.generation
+            cached = source.views.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        derived = build(value)
+        with self._lock:
+            if source.generation == generation:
+                source.views[key] = (generation, derived)
+        return derived
+
+    def refresh(self, name: str) -> Any:
+        """Fetch ``name`` now, swap the snapshot in and return it.
+
+        Concurrent calls for the same source share the lock, so a caller that
+        waited for another refresh re-uses its result when it is fresh.
+        """
+
+        source = self._source(name)
+        started = self._clock()
+        with source.fetch_lock:
+            if source.loaded and source.fetched_at >= started:
+                return source.value
+            self._fetch(source)
+        self._ensure_worker()
+        return source.value
+
+    def _fetch(self, source: _Source) -> None:
+        value = source.loader()
+        changed = value is not NOT_MODIFIED
+        if not changed and not source.loaded:
+            raise RuntimeError(f"Sheet {source.name!r} reported no change before its first load")
+        with self._lock:
+            if changed:
+                source.value = value
+                source.generation += 1
+                source.views.clear()
+            source.loaded = True
+            source.fetched_at = self._clock()
+            source.failures = 0
+            source.retry_at = 0.0
+            source.last_error = ""
+        if source.persist:
+            self._save_snapshot(source, write_value=changed)
+
+    # ------------------------------------------------------------------
+    # On-disk snapshots
+    # ------------------------------------------------------------------
+    def _snapshot_paths(self, source: _Source) -> Optional[Tuple[str, str]]:
+        if not self.snapshot_dir:
+            return None
+        base = os.path.join(self.snapshot_dir, source.name)
+        return base + ".csv", base + ".json"
+
+    def _save_snapshot(self, source: _Source, *, write_value: bool) -> None:
+        paths = self._snapshot_paths(source)
+        if paths is None:
+            return
+        value_path, meta_path = paths
+        body = source.loader.snapshot_body()
+        if body is None:
+            return
+        state = getattr(source.loader, "snapshot_state", None)
+        meta = {
+            "format": _SNAPSHOT_FORMAT,
+            "name": source.name,
+            "key": getattr(source.loader, "snapshot_key", None),
+            "fetched_at": time.time(),
+            "state": state() if callable(state) else None,
+        }
+        try:
+            os.makedirs(self.snapshot_dir, mode=0o700, exist_ok=True)
+            if not _is_private_dir(self.snapshot_dir):
+                logging.warning(
+                    "Not persisting sheet %r: %s is not a 0700 directory owned by this user",
+                    source.name,
+                    self.snapshot_dir,
+                )
+                return
+            if write_value or not os.path.exists(value_path):
+                _atomic_write(value_path, body.encode("utf-8"))
+            _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+        except Exception:
+            logging.warning("Could not persist snapshot of sheet %r", source.name, exc_info=True)
+
+    def _load_snapshot(self, source: _Source) -> bool:
+        """Adopt the persisted snapshot of ``source`` if it is usable."""
+
+        paths = None if not source.persist else self._snapshot_paths(source)
+        if paths is None:
+            return False
+        value_path, meta_path = paths
+        if not _is_private_dir(self.snapshot_dir):
+            if os.path.lexists(self.snapshot_dir):
+                logging.warning(
+                    "Ignoring sheet snapshots in %s: not a 0700 directory owned by this user",
+                    self.snapshot_dir,
+                )
+            return False
+        try:
+            with open(meta_path, "rb") as fh:
+                meta = json.loads(fh.read().decode("utf-8"))
+            age = max(0.0, time.time() - float(meta["fetched_at"]))
+            if meta.get("format") != _SNAPSHOT_FORMAT or age > self.snapshot_max_age:
+                return False
+            if meta.get("key") != getattr(source.loader, "snapshot_key", None):
+                return False
+            with open(value_path, "rb") as fh:
+                text = fh.read().decode("utf-8")
+            value = source.loader.restore_body(text, meta.get("state") or {})
+        except FileNotFoundError:
+            return False
+        except Exception:
+            logging.warning("Ignoring unreadable snapshot of sheet %r", source.name, exc_info=True)
+            return False
+
+        with self._lock:
+            source.value = value
+            source.generation += 1
+            source.views.clear()
+            source.loaded = True
+            source.fetched_at = self._clock() - age
+        return True
+
+    def refresh_due(self) -> int:
+        """Re-fetch every loaded source close to expiry; return how many succeeded."""
+
+        now = self._clock()
+        refreshed = 0
+        for source in list(self._sources.values()):
+            if not source.loaded or now < source.retry_at:
+                continue
+            if now - source.fetched_at < source.ttl * self.refresh_ahead:
+                continue
+            if not source.fetch_lock.acquire(blocking=False):
+                continue  # a foreground refresh is already running
+            try:
+                self._fetch(source)
+                refreshed += 1
+            except Exception as exc:
+                with self._lock:
+                    source.failures += 1
+                    source.last_error = str(exc)
+                    backoff = min(
+                        _MAX_BACKOFF_SEC, self.poll_interval * (2 ** (source.failures - 1))
+                    )
+                    source.retry_at = self._clock() + backoff
+                logging.warning(
+                    "Background refresh of sheet %r failed (attempt %d), keeping last snapshot: %s",
+                    source.name,
+                    source.failures,
+                    exc,
+                )
+            finally:
+                source.fetch_lock.release()
+        return refreshed
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Return age, TTL and failure information for every source."""
+
+        now = self._clock()
+        with self._lock:
+            return {
+                name: {
+                    "loaded": source.loaded,
+                    "generation": source.generation,
+                    "age_sec": now - source.fetched_at if source.loaded else None,
+                    "ttl_sec": source.ttl,
+                    "failures": source.failures,
+                    "last_error": source.last_error,
+                }
+                for name, source in self._sources.items()
+            }
+
+    def _ensure_worker(self) -> None:
+        if not self.background:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="sheet-refresher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh_due()
+            except Exception:  # pragma: no cover - keep the worker alive
+                logging.exception("Sheet refresher iteration failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def _is_private_dir(path: str) -> bool:
+    """Return whether ``path`` is a real directory only the current user can use."""
+
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        return False
+    if not hasattr(os, "getuid"):  # pragma: no cover - Windows has no POSIX owner/mode
+        return True
+    return info.st_uid == os.getuid() and stat.S_IMODE(info.st_mode) & 0o077 == 0
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+sheet_refresher = SheetRefresher(snapshot_dir=SNAPSHOT_DIR or None)
+
+
+__all__ = [
+    "NOT_MODIFIED",
+    "CsvSheet",
+    "SheetRefresher",
+    "sheet_refresher",
+    "with_cache_buster",
+]
@@ -10,10 +10,13 @@ from datetime import datetime, timezone
 from typing import Iterable, Optional
 from collections import Counter
 
+import io
 import os
 import pandas as pd
 import streamlit as st
 
+from src.sheets import CsvSheet, sheet_refresher
+
 try:  # Firestore access is optional in tests
     from falowen.sessions import get_db  # pragma: no cover - runtime side effect
 except Exception:  # pragma: no cover - Firestore may be unavailable
@@ -45,27 +48,8 @@ def _get_db():
 # ---------------------------------------------------------------------------
 
 
-DEFAULT_ROSTER_SHEET_ID = "12NXf5FeVHr7JJT47mRHh7Jp-TC1yhPS7ZG6nzZVTt1U"
-
-
-
-@st.cache_data
-def load_student_levels():
-    """Load the roster with a ``Level`` column from a Google Sheet."""
-    
-    sheet_id = (
-        st.secrets.get("ROSTER_SHEET_ID")
-        or os.getenv("ROSTER_SHEET_ID")
-        or DEFAULT_ROSTER_SHEET_ID
-    )
-    csv_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
-    try:
-        df = pd.read_csv(csv_url)
-    except Exception as e:  # pragma: no cover - network/streamlit issues
-        st.warning(
-            f"Could not load roster from {csv_url} ({e}). Using empty roster."
-        )
-        return pd.DataFrame({"student_code": [], "level": []})
+def _student_levels_frame(roster: pd.DataFrame) -> pd.DataFrame:
+    df = roster.copy()
     df.columns = [c.strip().lower() for c in df.columns]
 
     code_col_candidates = ["student_code", "studentcode", "code", "student id", "id"]
@@ -77,11 +61,54 @@ def load_student_levels():
             f"Roster is missing required columns. Found: {list(df.columns)}; "
             f"need one of {code_col_candidates} and one of {level_col_candidates}."
         )
-        st.error(msg)
         raise ValueError(msg)
 
-    df = df.rename(columns={code_col: "student_code", level_col: "level"})
-    return df
+    return df.rename(columns={code_col: "student_code", level_col: "level"})
+
+
+DEFAULT_ROSTER_SHEET_ID = "12NXf5FeVHr7JJT47mRHh7Jp-TC1yhPS7ZG6nzZVTt1U"
+STUDENT_LEVELS_SHEET = "student_levels"
+STUDENT_LEVELS_TTL_SEC = 300
+
+
+def _student_levels_csv_url() -> str:
+    sheet_id = (
+        st.secrets.get("ROSTER_SHEET_ID")
+        or os.getenv("ROSTER_SHEET_ID")
+        or DEFAULT_ROSTER_SHEET_ID
+    )
+    return f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
+
+
+def _parse_student_levels(text: str) -> pd.DataFrame:
+    return _student_levels_frame(pd.read_csv(io.StringIO(text)))
+
+
+# Every roster row, unlike the active-contract roster of ``src.data_loading``.
+sheet_refresher.register(
+    STUDENT_LEVELS_SHEET,
+    CsvSheet(_student_levels_csv_url, _parse_student_levels),
+    ttl=STUDENT_LEVELS_TTL_SEC,
+    persist=True,
+)
+
+
+def load_student_levels():
+    """Return the roster with ``student_code`` and ``level`` columns.
+
+    Covers every row of the ``ROSTER_SHEET_ID`` sheet (secret or environment
+    variable), including students without a valid contract end.  The snapshot
+    is kept fresh in the background by :mod:`src.sheets`.
+    """
+
+    try:
+        return sheet_refresher.get(STUDENT_LEVELS_SHEET)
+    except ValueError as e:
+        st.error(str(e))
+        raise
+    except Exception as e:  # pragma: no cover - network/streamlit issues
+        st.warning(f"Could not load roster ({e}). Using empty roster.")
+        return pd.DataFrame({"student_code": [], "level": []})
 
 
 def get_student_level(student_code: str, default: Optional[str] = None) -> Optional[str]:
@@ -0,0 +1,62 @@
+"""Run the active top-level tab of ``a1sprechen.py`` from its own file.
+
+Streamlit re-executes the entry script on every interaction.  The bodies of
+the large top-level tabs live in ``tabs/<name>.py``; only the active tab's
+file is read and compiled (once per process and file version) and executed.
+It runs in the entry script's namespace, so tab code can use the helpers
+defined there; each tab imports everything else it uses and names those
+helpers explicitly, so flake8 still checks the tab files for undefined names.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+from types import CodeType
+from typing import Dict, MutableMapping, Optional
+
+TABS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tabs")
+
+TAB_SCRIPTS: Dict[str, str] = {
+    "Dashboard": "dashboard.py",
+    "My Course": "my_course.py",
+    "Chat • Grammar • Exams": "chat_grammar_exams.py",
+    "Schreiben Trainer": "schreiben_trainer.py",
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_tab(path: str, mtime_ns: int) -> CodeType:
+    # ``mtime_ns`` is only part of the cache key, so edited files recompile.
+    with open(path, "r", encoding="utf-8") as fh:
+        source = fh.read()
+    return compile(source, path, "exec", dont_inherit=True)
+
+
+def tab_script_path(tab: str) -> Optional[str]:
+    """Return the file holding ``tab``'s code, or ``None`` for unknown tabs."""
+
+    script = TAB_SCRIPTS.get(tab)
+    return os.path.join(TABS_DIR, script) if script else None
+
+
+def load_tab(tab: str) -> Optional[CodeType]:
+    """Return the compiled code of ``tab`` (cached per file version)."""
+
+    path = tab_script_path(tab)
+    if path is None:
+        return None
+    return _compile_tab(path, os.stat(path).st_mtime_ns)
+
+
+def run_tab(tab: str, namespace: MutableMapping[str, object]) -> bool:
+    """Execute ``tab`` in ``namespace``; return ``False`` if it has no script."""
+
+    code = load_tab(tab)
+    if code is None:
+        return False
+    exec(code, namespace)
+    return True
+
+
+__all__ = ["TAB_SCRIPTS", "load_tab", "run_tab", "tab_script_path"]
@@ -20,6 +20,8 @@ from falowen.sessions import create_session_token, destroy_session_token
 from src.auth import persist_session_client
 from src.contracts import is_contract_expired
 from src.data_loading import load_student_data
+from src.roster_index import get_roster_index
+from src.roster_refresh import roster_refresh
 from src.session_management import determine_level
 from src.ui_helpers import qp_get, qp_clear
 from src.services.contracts import contract_active
@@ -67,14 +69,6 @@ def renew_session_if_needed() -> None:
     st.query_params["t"] = token
 
 
-def _normalize_roster(df):
-    if "StudentCode" in df.columns:
-        df["StudentCode"] = df["StudentCode"].str.lower().str.strip()
-    if "Email" in df.columns:
-        df["Email"] = df["Email"].str.lower().str.strip()
-    return df
-
-
 def _refresh_logged_in_student_row(
     student_row: Optional[Dict[str, object]] = None,
 ) -> None:
@@ -91,24 +85,20 @@ def _refresh_logged_in_student_row(
         st.session_state["roster_refresh_needed"] = False
         return
 
-    df = load_student_data(force_refresh=True)
+    df = roster_refresh.refresh()
     if df is None:
         st.session_state["roster_refreshed"] = True
         st.session_state["roster_refresh_needed"] = False
         return
 
-    df = _normalize_roster(df)
-    code = (student_row.get("StudentCode") or "").strip().lower()
-    email = (student_row.get("Email") or "").strip().lower()
-
-    refreshed_lookup = df.iloc[0:0]
-    if code and "StudentCode" in df.columns:
-        refreshed_lookup = df[df["StudentCode"] == code]
-    if refreshed_lookup.empty and email and "Email" in df.columns:
-        refreshed_lookup = df[df["Email"] == email]
+    roster = get_roster_index(df)
+    refreshed_row = roster.by_student_code(student_row.get("StudentCode"))
+    if refreshed_row is None:
+        email_rows = roster.by_student_email(student_row.get("Email"))
+        refreshed_row = email_rows[0] if email_rows else None
 
-    if not refreshed_lookup.empty:
-        st.session_state["student_row"] = refreshed_lookup.iloc[0].to_dict()
+    if refreshed_row is not None:
+        st.session_state["student_row"] = refreshed_row
 
     st.session_state["roster_refreshed"] = True
     st.session_state["roster_refresh_needed"] = False
@@ -148,7 +138,7 @@ def render_signup_form() -> None:
     )
     if df is None:
         logger.debug("Signup roster missing; forcing refresh for '%s'", new_code)
-        df = load_student_data(force_refresh=True)
+        df = roster_refresh.refresh()
         roster_rows = len(df.index) if df is not None else 0
         logger.debug(
             "Signup roster refresh returned %d rows for student code '%s'",
@@ -158,28 +148,30 @@ def render_signup_form() -> None:
     if df is None:
         st.error("Student roster unavailable. Please try again later.")
         return
-    df = _normalize_roster(df)
-    valid = df[(df["StudentCode"] == new_code) & (df["Email"] == new_email)]
+    valid = get_roster_index(df).match(new_code, new_email)
     logger.debug(
-        "Signup lookup for student code '%s' found=%s (matches=%d)",
+        "Signup lookup for student code '%s' found=%s",
         new_code,
-        not valid.empty,
-        int(valid.shape[0]),
+        valid is not None,
     )
-    if valid.empty:
+    signup_key = f"{new_code}|{new_email}"
+    if valid is None and roster_refresh.is_known_missing(signup_key):
+        logger.debug("Signup miss for '%s' is cached; skipping refresh", new_code)
+    elif valid is None:
         logger.debug("Signup miss for '%s'; refreshing roster", new_code)
-        df = load_student_data(force_refresh=True)
+        df = roster_refresh.refresh()
         if df is None:
             st.error("Student roster unavailable. Please try again later.")
             return
-        df = _normalize_roster(df)
-        valid = df[(df["StudentCode"] == new_code) & (df["Email"] == new_email)]
+        valid = get_roster_index(df).match(new_code, new_email)
         logger.debug(
-            "Signup roster refresh lookup for '%s' matches=%d",
+            "Signup roster refresh lookup for '%s' found=%s",
             new_code,
-            int(valid.shape[0]),
+            valid is not None,
         )
-    if valid.empty:
+        if valid is None:
+            roster_refresh.remember_missing(signup_key)
+    if valid is None:
         st.error("Your code/email aren’t registered. Use 'Request Access' first.")
         return
 
@@ -222,7 +214,7 @@ def render_login_form(login_id: str, login_pass: str) -> bool:
     )
     if df is None:
         logger.debug("Login roster missing; forcing refresh for '%s'", login_id)
-        df = load_student_data(force_refresh=True)
+        df = roster_refresh.refresh()
         roster_rows = len(df.index) if df is not None else 0
         logger.debug(
             "Login roster refresh returned %d rows for '%s'",
@@ -233,37 +225,41 @@ def render_login_form(login_id: str, login_pass: str) -> bool:
         st.error("Student roster unavailable. Please try again later.")
         return False
 
-    df = _normalize_roster(df)
-    lookup = df[(df["StudentCode"] == login_id) | (df["Email"] == login_id)]
+    roster = get_roster_index(df)
+    lookup = roster.lookup(login_id)
     logger.debug(
         "Login lookup for identifier '%s' found=%s (matches=%d)",
         login_id,
-        not lookup.empty,
-        int(lookup.shape[0]),
+        bool(lookup),
+        len(lookup),
     )
-    if lookup.empty:
+    if not lookup and roster_refresh.is_known_missing(login_id):
+        logger.debug("Login miss for '%s' is cached; skipping refresh", login_id)
+    elif not lookup:
         logger.debug("Login miss for '%s'; refreshing roster", login_id)
-        df = load_student_data(force_refresh=True)
+        df = roster_refresh.refresh()
         if df is None:
             st.error("Student roster unavailable. Please try again later.")
             return False
-        df = _normalize_roster(df)
-        lookup = df[(df["StudentCode"] == login_id) | (df["Email"] == login_id)]
+        roster = get_roster_index(df)
+        lookup = roster.lookup(login_id)
         logger.debug(
             "Login roster refresh lookup for '%s' matches=%d",
             login_id,
-            int(lookup.shape[0]),
+            len(lookup),
         )
-    if lookup.empty:
+        if not lookup:
+            roster_refresh.remember_missing(login_id)
+    if not lookup:
         st.error("No matching student code or email found.")
         return False
-    if lookup.shape[0] > 1:
+    if len(lookup) > 1:
         st.error("Multiple matching accounts found. Please contact the office.")
         return False
 
-    # Convert the pandas Series to a plain dict so the entire row can be
-    # persisted in ``st.session_state`` without losing any fields.
-    student_row = lookup.iloc[0].to_dict()
+    # Index rows are plain dicts so the entire row can be persisted in
+    # ``st.session_state`` without losing any fields.
+    student_row = lookup[0]
     logger.debug(
         "Login identifier '%s' resolved to student code '%s'",
         login_id,
@@ -273,7 +269,7 @@ def render_login_form(login_id: str, login_pass: str) -> bool:
         st.error("Your contract has expired. Contact the office.")
         return False
 
-    if not contract_active(student_row["StudentCode"], df):
+    if not contract_active(student_row["StudentCode"], roster):
         st.error("Outstanding balance past due. Contact the office.")
         return False
 
@@ -495,11 +491,10 @@ def _handle_google_oauth(code: str, state: str) -> None:
     df = load_student_data()
     if df is None:
         logger.debug("OAuth roster missing; forcing refresh")
-        df = load_student_data(force_refresh=True)
+        df = roster_refresh.refresh()
     if df is None:
         st.error("Student roster unavailable. Please try again later.")
         return
-    df = _normalize_roster(df)
     try:
         if st.session_state.get("_oauth_state") and state != st.session_state["_oauth_state"]:
             st.error("OAuth state mismatch. Please try again.")
@@ -539,22 +534,23 @@ def _handle_google_oauth(code: str, state: str) -> None:
         ).json()
 
         email = (userinfo.get("email") or "").lower().strip()
-        match = df[df["Email"] == email]
-        if match.empty:
+        match = get_roster_index(df).by_student_email(email)
+        if not match and not roster_refresh.is_known_missing(email):
             logger.debug("OAuth miss for '%s'; refreshing roster", email)
-            df = load_student_data(force_refresh=True)
+            df = roster_refresh.refresh()
             if df is None:
                 st.error("Student roster unavailable. Please try again later.")
                 return
-            df = _normalize_roster(df)
-            match = df[df["Email"] == email]
-        if match.empty:
+            match = get_roster_index(df).by_student_email(email)
+            if not match:
+                roster_refresh.remember_missing(email)
+        if not match:
             st.error("No student account found for that Google email.")
             return
 
-        # Use a plain dict for the student data so we can persist it in
+        # Index rows are plain dicts, so the student data can be persisted in
         # ``st.session_state`` for downstream coursebook/calendar loaders.
-        student_row = match.iloc[0].to_dict()
+        student_row = match[0]
         if is_contract_expired(student_row):
             st.error("Your contract has expired. Contact the office.")
             return
@@ -15,25 +15,22 @@ import requests
 import streamlit as st
 import streamlit.components.v1 as components
 
+from src.services.vocab import load_vocab_sheet
+
 try:  # pragma: no cover - dependency might be missing in some environments
     from rapidfuzz import process
 except ImportError:  # pragma: no cover
     process = None
 
-# Google Sheet ID for vocabulary lookup
-VOCAB_SHEET_ID = "1I1yAnqzSh3DPjwWRh9cdRSfzNSPsi7o4r5Taj9Y36NU"
-
 
-@st.cache_data(show_spinner=False)
-def _load_vocab_sheet(sheet_id: str = VOCAB_SHEET_ID) -> Optional[pd.DataFrame]:
-    """Download the vocabulary sheet as a DataFrame.
+def _load_vocab_sheet() -> Optional[pd.DataFrame]:
+    """Return the shared vocabulary sheet snapshot.
 
     Returns ``None`` if the sheet cannot be loaded.
     """
 
-    url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?format=csv"
     try:
-        return pd.read_csv(url)
+        return load_vocab_sheet()
     except Exception:  # pragma: no cover - network or parsing issues
         logging.exception("Failed to load vocabulary sheet")
         return None
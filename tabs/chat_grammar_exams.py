@@ -0,0 +1,1408 @@
+# Chat • Grammar • Exams tab of the Falowen app.
+#
+# Executed by src.tab_router in the namespace of a1sprechen.py when this tab is
+# active.  It imports what it uses; the helpers below the imports are defined
+# in a1sprechen.py itself and are named here so flake8 checks every other name.
+# It is not meant to be imported on its own.
+
+import html
+import logging
+import random
+import re
+import time
+from datetime import UTC, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+import streamlit as st
+import streamlit.components.v1 as components
+from firebase_admin import firestore
+
+import falowen.sessions as _falowen_sessions
+from src.level_sync import sync_assignment_level_state, sync_level_state
+from src.session_management import ensure_student_level
+from src.topic_coach_persistence import (
+    get_topic_coach_doc,
+    load_topic_coach_state,
+    persist_topic_coach_state,
+)
+from src.utils.toasts import toast_ok
+
+# Defined in a1sprechen.py.
+FOOTER_LINKS = FOOTER_LINKS  # noqa: F821
+HERR_FELIX_TYPING_HTML = HERR_FELIX_TYPING_HTML  # noqa: F821
+_assignment_helper_persistence_enabled = _assignment_helper_persistence_enabled  # noqa: F821
+_extract_focus_tips_from_history = _extract_focus_tips_from_history  # noqa: F821
+_initialise_topic_coach_session_state = _initialise_topic_coach_session_state  # noqa: F821
+_safe_str = _safe_str  # noqa: F821
+_safe_upper = _safe_upper  # noqa: F821
+clear_assignment_helper_state = clear_assignment_helper_state  # noqa: F821
+client = client  # noqa: F821
+get_assignment_helper_doc = get_assignment_helper_doc  # noqa: F821
+load_assignment_helper_state = load_assignment_helper_state  # noqa: F821
+persist_assignment_helper_state = persist_assignment_helper_state  # noqa: F821
+record_assignment_helper_thread = record_assignment_helper_thread  # noqa: F821
+render_app_footer = render_app_footer  # noqa: F821
+render_umlaut_pad = render_umlaut_pad  # noqa: F821
+
+st.markdown("## 🗣️ Chat • Grammar • Exams")
+st.caption("Simple & clear: last 3 messages shown; input stays below. 3 keywords • 6 questions.")
+
+# ---- Links
+RECORDER_URL = "https://script.google.com/macros/s/AKfycbzMIhHuWKqM2ODaOCgtS7uZCikiZJRBhpqv2p6OyBmK1yAVba8HlmVC1zgTcGWSTfrsHA/exec"
+PRACTICE_URL = "https://script.google.com/macros/s/AKfycbyJ5lTeXUgaGw-rejDuh_2ex7El_28JgKLurOOsO1c8LWfVE-Em2-vuWuMn1hC5-_IN/exec"
+
+# ---------- Styles (bubbles, chips, sticky input, contrast buttons, cards) ----------
+st.markdown("""
+    <style>
+      .bubble-wrap{ display:flex; gap:8px; margin:8px 0; align-items:flex-start; }
+      .bubble-a{ background:#fffbe6; border:1px solid #fde68a; padding:12px 14px; border-radius:14px; line-height:1.55; max-width:92%; }
+      .bubble-u{ background:#eef2ff; border:1px solid #c7d2fe; padding:12px 14px; border-radius:14px; line-height:1.55; margin-left:auto; max-width:92%; }
+      .lbl-a{ font-size:.8rem; color:#7c2d12; font-weight:800; margin-bottom:4px; }
+      .lbl-u{ font-size:.8rem; color:#1e40af; font-weight:800; text-align:right; margin:0 4px 4px 0; }
+      .kw-title{ font-weight:900; font-size:1.05rem; margin:2px 0 6px 0; }
+      .kw-chip{ display:inline-block; margin:0 6px 6px 0; padding:6px 12px; border-radius:999px; border:1px solid #065f46; background:#d1fae5; font-weight:800; }
+      .sticky-input{ position:sticky; bottom:0; background:#f8fafc; padding:10px 8px;
+                     border-top:1px solid #e5e7eb; box-shadow:0 -6px 20px rgba(2,6,23,.06); border-radius:12px; }
+      .btn-row{ display:flex; flex-wrap:wrap; gap:10px; }
+      .btn {
+        display:inline-block; padding:12px 16px; border-radius:12px; text-decoration:none; font-weight:900;
+        background:#111827; color:#ffffff; border:1px solid #0b1220; box-shadow:0 4px 10px rgba(0,0,0,.25);
+      }
+      .btn.secondary{ background:#065f46; border-color:#064e3b; }
+      .rec-banner{
+        border:1px solid #a7f3d0; background:#ecfdf5; color:#064e3b;
+        padding:10px 12px; border-radius:10px; margin:6px 0 10px 0; font-weight:700;
+      }
+      .panel { border:1px solid rgba(148,163,184,.35); border-radius:12px; padding:12px 14px; background:#ffffff; }
+      .pres-card{
+        border:2px solid #c7d2fe; background:#eef2ff; border-radius:12px; padding:12px 14px; margin-top:10px;
+      }
+      .pres-head{ display:flex; justify-content:space-between; align-items:center; gap:10px; }
+      .pres-copy{ padding:6px 10px; border-radius:8px; border:1px solid #1f2937; background:#111827; color:#fff; font-weight:800; }
+      .meta{ color:#64748b; font-size:.9rem; }
+      .typing-notice{
+        display:flex; align-items:center; gap:8px; margin-bottom:8px;
+        background:#e0f2fe; border:1px solid #bae6fd; color:#0f172a;
+        font-weight:700; font-size:.9rem; padding:8px 12px; border-radius:12px;
+      }
+      .typing-notice .typing span{ background:#0284c7; }
+      @media (max-width: 640px){
+        .block-container{ padding-bottom: 4.5rem; }
+        .btn{ width:100%; text-align:center; }
+        button,[role="button"]{ min-height:48px; }
+      }
+      .typing span{ display:inline-block; width:6px; height:6px; margin:0 2px; border-radius:50%;
+                    background:#94a3b8; opacity:.2; animation: t 1s infinite; }
+      .typing span:nth-child(2){ animation-delay:.15s; } .typing span:nth-child(3){ animation-delay:.3s; }
+      @keyframes t{ 0%{opacity:.2; transform:translateY(0)} 50%{opacity:1; transform:translateY(-2px)} 100%{opacity:.2; transform:translateY(0)} }
+    </style>
+    """, unsafe_allow_html=True)
+
+student_code_tc = (st.session_state.get("student_code") or "").strip()
+student_row_chat = st.session_state.get("student_row") or {}
+student_display_name = (
+    _safe_str(student_row_chat.get("Name"))
+    or _safe_str(st.session_state.get("student_name"))
+    or "Student"
+)
+student_label_html = html.escape(student_display_name)
+
+def _resolve_topic_coach_db():
+    """Return a Firestore client for Topic Coach persistence if available."""
+
+    global db  # type: ignore  # Streamlit runtime assigns this at module scope
+    existing = globals().get("db")
+    if existing is None:
+        existing = getattr(_falowen_sessions, "db", None) or getattr(
+            _falowen_sessions, "_db_client", None
+        )
+    if existing is not None:
+        return existing
+
+    getter = getattr(_falowen_sessions, "get_db", None)
+    if callable(getter):
+        try:
+            existing = getter()
+        except Exception as exc:
+            logging.debug("Topic Coach Firestore unavailable: %s", exc)
+            return None
+        if existing is not None:
+            try:
+                _falowen_sessions.db = existing
+            except Exception:
+                pass
+            if hasattr(_falowen_sessions, "_db_client"):
+                try:
+                    _falowen_sessions._db_client = existing
+                except Exception:
+                    pass
+            db = existing
+            return existing
+    return None
+
+topic_db = _resolve_topic_coach_db()
+topic_doc_ref = None
+topic_messages: List[Dict[str, Any]] = []
+topic_meta: Dict[str, Any] = {}
+if student_code_tc:
+    topic_doc_ref, topic_messages, topic_meta = load_topic_coach_state(
+        topic_db, student_code_tc
+    )
+
+def _infer_topic_qcount(messages: List[Dict[str, Any]]) -> int:
+    count = 0
+    assistant_seen = False
+    for msg in messages:
+        if not isinstance(msg, dict):
+            continue
+        role = msg.get("role")
+        if role == "assistant":
+            assistant_seen = True
+        elif role == "user" and assistant_seen:
+            count = min(6, count + 1)
+    return count
+
+loaded_qcount_raw = topic_meta.get("qcount") if isinstance(topic_meta, dict) else None
+try:
+    loaded_qcount = int(loaded_qcount_raw) if loaded_qcount_raw is not None else None
+except Exception:
+    loaded_qcount = None
+if loaded_qcount is None:
+    loaded_qcount = _infer_topic_qcount(topic_messages)
+loaded_qcount = max(0, loaded_qcount)
+
+loaded_finalized = (
+    bool(topic_meta.get("finalized")) if isinstance(topic_meta, dict) else False
+)
+
+# ---------- Widget keys (make them UNIQUE across app) ----------
+POST_TOAST_FLAG    = "_cchat_show_post_toast"
+KEY_LEVEL_SLIDER   = "cchat_w_level"
+KEY_FORCE_DE_TOG   = "cchat_w_force_de"
+KEY_MAX_WORDS_NUM  = "cchat_w_max_words"
+KEY_NEWCHAT_BTN    = "cchat_w_btn_new_bottom"
+KEY_CHAT_INPUT     = "cchat_w_chat_input"
+# Grammar keys: one set shared across the grammar widgets
+KEY_GRAM_TEXT      = "cchat_w_gram_text"
+KEY_GRAM_LEVEL     = "cchat_w_gram_level"
+KEY_GRAM_LEVEL_SYNC = "_cchat_sync_gram_level"
+KEY_GRAM_ASK_BTN   = "cchat_w_gram_go"
+KEY_CONN_MODE      = "cchat_w_conn_mode"
+KEY_CONN_TEXT      = "cchat_w_conn_text"
+KEY_CONN_SCENARIO  = "cchat_w_conn_scenario"
+KEY_CONN_SUGGEST   = "cchat_w_conn_suggest"
+KEY_CONN_SESSION   = "cchat_w_conn_session"
+KEY_CONN_COACH     = "cchat_w_conn_coach"
+KEY_CONN_RESPONSE  = "cchat_w_conn_response"
+KEY_CONN_CLEAR     = "cchat_w_conn_clear"
+KEY_ASSIGN_HISTORY = "cchat_w_assign_history_v2"
+KEY_ASSIGN_OWNER = "cchat_w_assign_history_owner"
+KEY_ASSIGN_INPUT   = "cchat_w_assign_input_v2"
+KEY_ASSIGN_LEVEL   = "cchat_w_assign_level"
+KEY_ASSIGN_LAST_STUDENT = "_cchat_assign_last_student_code"
+KEY_ASSIGN_LAST_AUTO = "_cchat_assign_last_auto_level"
+KEY_ASSIGN_PLAN    = "cchat_w_assign_plan"
+KEY_ASSIGN_THREAD  = "cchat_w_assign_thread_id"
+# Also make Regen button unique
+KEY_REGEN_BTN      = "cchat_w_btn_regen_v2"
+
+GRAMMAR_LEVELS = ("A1", "A2", "B1", "B2")
+level_options = list(GRAMMAR_LEVELS)
+ensure_student_level()
+roster_level = _safe_upper(st.session_state.get("student_level"), "")
+match = re.search("|".join(level_options), roster_level) if roster_level else None
+default_level = match.group(0) if match else "A2"
+
+active_level = sync_level_state(
+    st,
+    student_code=student_code_tc,
+    default_level=default_level,
+    level_options=level_options,
+    slider_key=KEY_LEVEL_SLIDER,
+    grammar_key=KEY_GRAM_LEVEL,
+)
+
+focus_meta = topic_meta.get("focus_tips") if isinstance(topic_meta, dict) else None
+if isinstance(focus_meta, list):
+    initial_focus = [
+        str(item).strip()
+        for item in focus_meta
+        if str(item).strip() and str(item).strip().lower() not in {"none", "nan"}
+    ]
+else:
+    initial_focus = None
+
+(
+    chat_data_key,
+    qcount_data_key,
+    finalized_data_key,
+    focus_data_key,
+) = _initialise_topic_coach_session_state(
+    st.session_state,
+    student_code=student_code_tc,
+    level=active_level,
+    messages=topic_messages,
+    qcount=loaded_qcount,
+    finalized=loaded_finalized,
+    focus_tips=initial_focus,
+)
+
+def _save_topic_coach_transcript(
+    focus_override: Optional[Iterable[str]] = None,
+) -> None:
+    if not student_code_tc:
+        return
+    doc_ref = topic_doc_ref or get_topic_coach_doc(topic_db, student_code_tc)
+    if doc_ref is None:
+        return
+    focus_payload = list(focus_override or st.session_state.get(focus_data_key, []) or [])
+    persist_topic_coach_state(
+        doc_ref,
+        messages=list(st.session_state.get(chat_data_key, [])),
+        qcount=st.session_state.get(qcount_data_key, 0),
+        finalized=st.session_state.get(finalized_data_key, False),
+        focus_tips=focus_payload,
+    )
+
+# ---------- Subtabs ----------
+tab_labels = ["🧑‍🏫 Sprechen Coach", "🛠️ Grammar", "📘 Essay Explainer", "📝 Exams"]
+base_tab_labels = tab_labels[:]
+focus_tab = st.session_state.get("_chat_focus_tab")
+if focus_tab not in base_tab_labels:
+    focus_tab = base_tab_labels[0]
+    st.session_state["_chat_focus_tab"] = focus_tab
+
+st.markdown(
+    """
+        <style>
+          .chat-grammar-tabs [data-baseweb="tab-list"]{
+            flex-wrap:wrap;
+            row-gap:0.35rem;
+            column-gap:0.35rem;
+            justify-content:center;
+          }
+          .chat-grammar-tabs [data-baseweb="tab"]{
+            flex:0 0 auto;
+            border-radius:999px !important;
+            padding:4px 14px !important;
+            white-space:nowrap;
+            border:1px solid #e5e7eb;
+            background:#f9fafb;
+            color:#111827;
+            font-weight:600;
+            font-size:0.9rem;
+          }
+          .chat-grammar-tabs [data-baseweb="tab"][aria-selected="true"]{
+            background:#111827;
+            color:#f9fafb;
+            border-color:#111827;
+          }
+          @media (max-width: 640px){
+            .chat-tab-selector{ display:block; margin-bottom:0.5rem; }
+            .chat-tab-selector label{ font-weight:700; color:#0f172a; }
+          }
+          @media (min-width: 641px){
+            .chat-tab-selector{ display:none; }
+          }
+        </style>
+        """,
+    unsafe_allow_html=True,
+)
+
+selector_key = "chat_tab_selector"
+
+def _sync_chat_tab_focus() -> None:
+    chosen = st.session_state.get(selector_key)
+    if chosen and chosen in base_tab_labels:
+        if st.session_state.get("_chat_focus_tab") != chosen:
+            st.session_state["_chat_focus_tab"] = chosen
+            st.session_state["need_rerun"] = True
+
+with st.container():
+    st.markdown('<div class="chat-tab-selector">', unsafe_allow_html=True)
+    st.selectbox(
+        "Select a tool",
+        base_tab_labels,
+        index=base_tab_labels.index(focus_tab),
+        key=selector_key,
+        on_change=_sync_chat_tab_focus,
+        help="Use this menu on phones to switch between Chat • Grammar • Essay Explainer • Exams tools.",
+    )
+    st.markdown("</div>", unsafe_allow_html=True)
+
+if st.session_state.get(selector_key) not in base_tab_labels:
+    st.session_state[selector_key] = focus_tab
+
+# Keep fixed order – no rotation, so tabs don't jump on rerun
+st.markdown('<div class="chat-grammar-tabs">', unsafe_allow_html=True)
+tab_contexts = st.tabs(base_tab_labels)
+st.markdown('</div>', unsafe_allow_html=True)
+tab_lookup = dict(zip(base_tab_labels, tab_contexts))
+tab_tc = tab_lookup["🧑‍🏫 Sprechen Coach"]
+tab_gram = tab_lookup["🛠️ Grammar"]
+tab_assign = tab_lookup["📘 Essay Explainer"]
+tab_exam = tab_lookup["📝 Exams"]
+
+# ===================== Topic Coach (intro, feedback, finalize) =====================
+with tab_tc:
+    if st.session_state.pop(POST_TOAST_FLAG, False):
+        toast_ok("Answer sent!")
+
+    st.info(
+        "Run a 6-question speaking session with Herr Felix. You'll get corrections,"
+        " ideas, and a final summary plus ~60-word presentation when you finish."
+    )
+
+    focus_tips_display = []
+    for tip in st.session_state.get(focus_data_key, []) or []:
+        text_tip = str(tip).strip()
+        if text_tip and text_tip.lower() not in {"none", "nan"}:
+            focus_tips_display.append(text_tip)
+    if focus_tips_display:
+        st.markdown("#### 🎯 Focus Tips from your last session")
+        st.markdown("\n".join(f"- {tip}" for tip in focus_tips_display))
+        st.caption("Start with these corrections in mind before you answer the first question.")
+
+    # Recorder reminder banner + button
+    st.markdown(
+        f"""
+            <div class="rec-banner">
+              🎙️ You can also <a class="btn secondary" href="{RECORDER_URL}" target="_blank" rel="noopener">Open Recorder</a>
+              to record your answers while you practice.
+            </div>
+            """,
+        unsafe_allow_html=True
+    )
+
+    # Controls
+    colA, colB, colC = st.columns([1,1,1.2])
+    with colA:
+        cur_level = st.session_state.get(KEY_LEVEL_SLIDER, default_level)
+        if cur_level not in level_options:
+            cur_level = default_level
+        level = st.select_slider("Level (CEFR)", level_options, value=cur_level, key=KEY_LEVEL_SLIDER)
+    with colB:
+        force_de = st.toggle("Force German replies 🇩🇪", key=KEY_FORCE_DE_TOG, value=st.session_state.get(KEY_FORCE_DE_TOG, False))
+    with colC:
+        max_words = st.number_input(
+            "Max words per reply",
+            min_value=60, max_value=400,
+            value=int(st.session_state.get(KEY_MAX_WORDS_NUM, 140)),
+            step=10, key=KEY_MAX_WORDS_NUM
+        )
+
+    # Progress
+    q_done = int(st.session_state[qcount_data_key] or 0)
+    st.markdown(f"**Progress:** ✅ {q_done}/6 answered")
+    st.progress(q_done / 6.0)
+
+    if st.session_state[finalized_data_key]:
+        st.success("🎉 Session complete — summary & ~60-word presentation generated. You can regenerate if you like.")
+        if st.button("🔁 Regenerate presentation", key=KEY_REGEN_BTN):
+            convo = [{"role": "system", "content": "You are Herr Felix. FINALIZE NOW: The student has answered 6 questions. Do not ask more questions. Output two parts: 1) An English summary (strengths, mistakes, improvements). 2) A ~60-word presentation using their own words (add a few if needed). Keep it clear and usable for class. No extra chit-chat."}]
+            for m in st.session_state[chat_data_key]:
+                convo.append({"role": m["role"], "content": m["content"]})
+            placeholder = st.empty()
+            placeholder.markdown("<div class='bubble-a'><div class='typing'><span></span><span></span><span></span></div></div>", unsafe_allow_html=True)
+            time.sleep(random.uniform(0.8, 1.2))
+            try:
+                resp = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=convo,
+                    temperature=0.2,
+                    max_tokens=800,
+                )
+                reply_raw = (resp.choices[0].message.content or "").strip()
+            except Exception as e:
+                reply_raw = f"(Error) {e}"
+            placeholder.empty()
+            st.session_state[chat_data_key].append({
+                "role": "assistant",
+                "content": reply_raw,
+                "ts": datetime.now(UTC).isoformat()
+            })
+            _save_topic_coach_transcript()
+            st.rerun()
+
+    st.divider()
+
+    # History: older collapsed; last 3 messages shown old→new
+    history = st.session_state[chat_data_key] or []
+    older = history[:-3] if len(history) > 3 else []
+    latest = history[-3:] if len(history) > 3 else history
+
+    typing_notice_placeholder: Optional[Any] = None
+
+    if older:
+        with st.expander(f"Show earlier ({len(older)})"):
+            for m in older:
+                if m["role"] == "user":
+                    st.markdown(
+                        f"<div class='bubble-wrap'><div class='lbl-u'>{student_label_html}</div></div>",
+                        unsafe_allow_html=True,
+                    )
+                    st.markdown(f"<div class='bubble-u'>{m['content']}</div>", unsafe_allow_html=True)
+                else:
+                    st.markdown(f"<div class='bubble-wrap'><div class='lbl-a'>Herr Felix</div></div>", unsafe_allow_html=True)
+                    st.markdown(f"<div class='bubble-a'>{m['content']}</div>", unsafe_allow_html=True)
+
+    for m in latest:
+        if m["role"] == "user":
+            st.markdown(
+                f"<div class='bubble-wrap'><div class='lbl-u'>{student_label_html}</div></div>",
+                unsafe_allow_html=True,
+            )
+            st.markdown(f"<div class='bubble-u'>{m['content']}</div>", unsafe_allow_html=True)
+        else:
+            st.markdown(f"<div class='bubble-wrap'><div class='lbl-a'>Herr Felix</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='bubble-a'>{m['content']}</div>", unsafe_allow_html=True)
+
+    typing_notice_placeholder = st.empty()
+
+
+    # ---- coaching system prompt (intro + feedback + expand + keywords) ----
+    correction_lang = "English"
+    system_text = (
+        f"You are Herr Felix, a supportive and innovative German teacher.\n"
+        f"GOALS:\n"
+        f"- Run a 6-question speaking practice session guided by exactly 3 keywords.\n"
+        f"- After each student answer: (1) correct errors, (2) explain briefly in {correction_lang}, "
+        f"(3) add richer ideas/templates/examples to help them speak more, then (4) ask ONE next German question.\n"
+        f"- Keep questions level-appropriate, short, and creative; never ask >2 questions per keyword.\n\n"
+        f"FIRST REPLY (MANDATORY):\n"
+        f"- Your FIRST paragraph must be in English: congratulate the topic, explain how the session works (6 Qs, feedback each time), "
+        f"invite questions/translation requests, and set expectations.\n"
+        f"- Then show a **KEYWORDS** line with exactly 3 bold chips (e.g., **Supermarkt**, **Preise**, **Einkaufszettel**).\n"
+        f"- After the English intro, ask exactly ONE short German question to begin.\n"
+        f"- Never start your first reply with German.\n\n"
+        f"- For A1 and A2 level, dont overuse relative clauses in both questions and answers.\n\n"
+        f"- The overall 6 questions should train student ability to talk in the past,present and future and also good use of connectors\n\n"
+        f"- When student input looks like a letter question, stop the chat and refer them to go to ideas geenrator at the schreiben trainer as you are only trained to coach on sprechen presentation"
+        f"FIRST TOPIC BEHAVIOR:\n"
+        f"- If the student's FIRST message looks like a topic (1–3 words, e.g., 'Einkaufen', 'Reisen', 'Umwelt'), "
+        f"start with a short English topic intro: what it covers, typical situations, 3–5 helpful ideas, "
+        f"and a micro-vocabulary set (3–6 important words with brief glosses). Then begin Question 1 in German.\n\n"
+        f"FEEDBACK AFTER EACH ANSWER:\n"
+        f"- 1) 'Corrections': fix errors; give 1–2 short notes in {correction_lang}; show a corrected German sentence.\n"
+        f"- 2) 'Idea boost': give 1–2 extra angles students can add; include a tiny template + one filled example in German.\n"
+        f"- 3) 'Next question' (German only): exactly one question.\n\n"
+        f"FINISHING:\n"
+        f"- Stop after 6 questions (≤2 per keyword). Then output:\n"
+        f"  (A) English summary: strengths, mistakes, what to improve.\n"
+        f"  (B) A ~60-word class presentation using the student's own words (add a few if needed).\n\n"
+        f"KEYWORDS & STYLE:\n"
+        f"- Choose exactly 3 useful keywords for the topic. At the top of each reply, show a **KEYWORDS** header "
+        f"with three bold chips (e.g., **Supermarkt**, **Preise**, **Einkaufszettel**).\n"
+        f"- Short paragraphs, simple bullets. Keep each reply under {max_words} words.\n"
+    )
+    system_text += f" CEFR level: {level}."
+    if force_de:
+        system_text += " After your first English intro, ask questions in German; explanations/feedback stay in English."
+
+    # ---- build conversation & enforce first-reply English intro ----
+    convo = [{"role": "system", "content": system_text}]
+    for m in st.session_state[chat_data_key]:
+        convo.append({"role": m["role"], "content": m["content"]})
+
+    no_assistant_yet = not any(m["role"] == "assistant" for m in st.session_state[chat_data_key])
+    if no_assistant_yet:
+        convo.append({
+            "role": "system",
+            "content": (
+                "FIRST_REPLY_MODE: Start with a short English intro (overview, session plan, encouragement). "
+                "Then present a **KEYWORDS** line with exactly 3 bold chips. "
+                "Finally ask ONE short German question to begin. "
+                "Do not skip the English intro even if the user's first message is long or detailed."
+            )
+        })
+    else:
+        convo.append({
+            "role": "system",
+            "content": (
+                "FEEDBACK_MODE: For the user's last message, first give 'Corrections' with a brief explanation in English "
+                "and a corrected German sentence; then 'Idea boost' with a tiny template and one filled German example; "
+                "THEN ask exactly ONE next German question (unless already finished)."
+            )
+        })
+
+
+    # ---- sticky input (recorder reminder + new chat + input) ----
+    with st.container():
+        st.markdown("<div class='sticky-input'>", unsafe_allow_html=True)
+        st.markdown(
+            f"<div class='meta'>Tip: You can also <a href='{RECORDER_URL}' target='_blank' rel='noopener'>record your answer</a> while you practice.</div>",
+            unsafe_allow_html=True
+        )
+        col_left, col_right = st.columns([1, 10])
+        with col_left:
+            if st.button("🧹 Reset chat", key=KEY_NEWCHAT_BTN, width="stretch"):
+                st.session_state[chat_data_key] = []
+                st.session_state[qcount_data_key] = 0
+                st.session_state[finalized_data_key] = False
+                _save_topic_coach_transcript()
+                st.toast("Cleared")
+                st.rerun()
+        with col_right:
+            user_msg = st.chat_input(
+                "Hallo! 👋 What would you like to talk about? Type here so we can chat",
+                key=KEY_CHAT_INPUT
+            )
+            render_umlaut_pad(KEY_CHAT_INPUT, context="chat_tab", disabled=True)
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    # ---- SEND ----
+    if user_msg:
+        # Store user message
+        st.session_state[chat_data_key].append({
+            "role": "user", "content": user_msg, "ts": datetime.now(UTC).isoformat()
+        })
+
+        # Count rule: don't count first topic; only increment if an assistant turn exists before this user turn
+        has_assistant_turn = any(m["role"] == "assistant" for m in st.session_state[chat_data_key][:-1])
+        if has_assistant_turn and not st.session_state[finalized_data_key]:
+            st.session_state[qcount_data_key] = min(6, int(st.session_state[qcount_data_key] or 0) + 1)
+
+        _save_topic_coach_transcript()
+        st.session_state[POST_TOAST_FLAG] = True
+
+        if typing_notice_placeholder is not None:
+            typing_notice_placeholder.markdown(
+                HERR_FELIX_TYPING_HTML,
+                unsafe_allow_html=True,
+            )
+
+        # Build conversation
+        convo = [{"role": "system", "content": system_text}]
+        for m in st.session_state[chat_data_key]:
+            convo.append({"role": m["role"], "content": m["content"]})
+
+        # Detect first 'topic-like' input (1–3 words, no punctuation) → INTRO_MODE
+        def _looks_like_topic(s: str) -> bool:
+            s = (s or "").strip()
+            if not s: return False
+            if any(ch in s for ch in ".,;:!?/\\()[]{}\"'`~@#$%^&*_+=|<>"):
+                return False
+            words = s.split()
+            return 1 <= len(words) <= 3
+
+        no_assistant_yet = not any(m["role"] == "assistant" for m in st.session_state[chat_data_key])
+        if no_assistant_yet and _looks_like_topic(user_msg):
+            convo.append({
+                "role": "system",
+                "content": (
+                    "INTRO_MODE: The first user input is a topic. Start with a short English topic overview, "
+                    "3–5 concrete ideas, and a 3–6 word mini-vocabulary list (German + tiny gloss). "
+                    "Then ask the first question in German (ONE question only)."
+                )
+            })
+
+        # Finalization at 6 questions
+        finalize_now = (int(st.session_state[qcount_data_key]) >= 6) and (not st.session_state[finalized_data_key])
+        if finalize_now:
+            convo.append({
+                "role": "system",
+                "content": (
+                    "FINALIZE NOW: The student has answered 6 questions. "
+                    "Do not ask more questions. Output two parts only:\n"
+                    "1) English summary (strengths, mistakes, what to improve).\n"
+                    "2) A ~60-word presentation using their own words (add a few if needed) for class speaking.\n"
+                    "Keep it clear and usable. No extra chit-chat."
+                )
+            })
+        else:
+            # Always ensure corrections + idea boost + next Q on normal turns
+            convo.append({
+                "role": "system",
+                "content": (
+                    "FEEDBACK_MODE: For the user's last message, first give 'Corrections' with a brief explanation in English "
+                    "and a corrected German sentence; then 'Idea boost' with a tiny template and one filled German example; "
+                    "THEN ask exactly ONE next German question (unless already finished)."
+                )
+            })
+
+        # Typing pulse
+        placeholder = st.empty()
+        placeholder.markdown(
+            "<div class='bubble-a'><div class='typing'><span></span><span></span><span></span></div></div>",
+            unsafe_allow_html=True,
+        )
+        time.sleep(random.uniform(0.8, 1.2))
+
+        # Call model
+        try:
+            resp = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=convo,
+                temperature=0.2,
+                max_tokens=800 if finalize_now else 600,
+            )
+            reply_raw = (resp.choices[0].message.content or "").strip()
+        except Exception as e:
+            reply_raw = f"(Error) {e}"
+
+        placeholder.empty()
+
+        if typing_notice_placeholder is not None:
+            typing_notice_placeholder.empty()
+
+        # Convert "Keywords:" line → bold chips (skip for final message usually)
+        chips_html = ""
+        if not finalize_now:
+            kw_match = re.search(r"(?:^|\n)\s*(?:\*\*?)?(KEYWORDS?|Keywords?)\b(?:\*\*?)?\s*:\s*(.+)", reply_raw)
+            if kw_match:
+                raw = re.split(r"[•,|/]", kw_match.group(2))
+                kws = [k.strip(" .*-_") for k in raw if k.strip()]
+                if kws:
+                    chips_html = "<div class='kw-title'>**KEYWORDS**</div>" + "".join(
+                        f"<span class='kw-chip'><b>{k}</b></span>" for k in kws[:3]
+                    )
+                    reply_raw = re.sub(r"(?:^|\n)\s*(?:\*\*?)?(KEYWORDS?|Keywords?)\b(?:\*\*?)?\s*:.*", "", reply_raw, count=1)
+
+        # Store assistant message
+        bubble = (chips_html + ("<div style='height:6px'></div>" if chips_html else "")) + reply_raw
+        st.session_state[chat_data_key].append({
+            "role": "assistant", "content": bubble, "ts": datetime.now(UTC).isoformat()
+        })
+
+        # If final, mark and try to render presentation card
+        if finalize_now:
+            st.session_state[finalized_data_key] = True
+
+            # Extract a ~60-word presentation paragraph
+            def _extract_presentation(text: str) -> str:
+                paras = [p.strip() for p in re.split(r"\n{2,}|\r{2,}", text) if p.strip()]
+                best = ""
+                best_len = 0
+                for p in paras:
+                    wc = len(re.findall(r"\b\w+\b", p))
+                    if 45 <= wc <= 90 and wc > best_len:
+                        best, best_len = p, wc
+                if not best:
+                    best = paras[-1] if paras else text
+                return best
+
+            pres = _extract_presentation(reply_raw)
+            wc = len(re.findall(r"\b\w+\b", pres))
+            html_id = f"pres_{uuid4().hex}"
+            components.html(f"""
+                    <div class="pres-card" id="{html_id}">
+                      <div class="pres-head">
+                        <div><b>🎤 60-word class presentation</b> <span class="meta">(~{wc} words)</span></div>
+                        <button class="pres-copy" onclick="
+                          const txt = document.querySelector('#{html_id} .pres-body').innerText;
+                          navigator.clipboard.writeText(txt);
+                          this.innerText='Copied!';
+                          setTimeout(()=>this.innerText='Copy',1200);
+                        ">Copy</button>
+                      </div>
+                      <div class="pres-body" style="margin-top:8px; white-space:pre-wrap;">{html.escape(pres)}</div>
+                    </div>
+                """, height=170)
+
+            new_focus = _extract_focus_tips_from_history(
+                st.session_state.get(chat_data_key, [])
+            )
+            st.session_state[focus_data_key] = new_focus
+
+        _save_topic_coach_transcript(
+            focus_override=st.session_state.get(focus_data_key, [])
+        )
+        st.rerun()
+
+# ===================== Grammar (simple, one-box) =====================
+with tab_gram:
+    level_options = list(GRAMMAR_LEVELS)
+    default_gram = st.session_state.get("_cchat_last_profile_level") or level_options[0]
+    if default_gram not in level_options:
+        default_gram = level_options[0]
+    pending_level = st.session_state.pop(KEY_GRAM_LEVEL_SYNC, None)
+    if pending_level in level_options:
+        st.session_state[KEY_GRAM_LEVEL] = pending_level
+
+    if st.session_state.get(KEY_GRAM_LEVEL) not in level_options:
+        st.session_state[KEY_GRAM_LEVEL] = default_gram
+    cur_level_g = st.session_state.get(KEY_GRAM_LEVEL, default_gram)
+
+    tab_quick, tab_connectors = st.tabs(["Quick Grammar Help", "Connector Trainer"])
+
+    with tab_quick:
+        st.info(
+            "Paste a sentence or grammar question here to get quick corrections,"
+            " short explanations in English, and German example sentences for your level."
+        )
+        gcol1, gcol2 = st.columns([3, 1])
+        gram_typing_notice = None
+        with gcol1:
+            gram_typing_notice = st.empty()
+            gram_q = st.text_area(
+                "Type your grammar question or paste text",
+                height=160,
+                key=KEY_GRAM_TEXT,
+                placeholder="z.B. Ist es 'wegen dem' oder 'wegen des'? Oder: Ich bin gestern in den Park gegangen…",
+            )
+        with gcol2:
+            gram_level = st.select_slider(
+                "Level",
+                level_options,
+                value=st.session_state.get(KEY_GRAM_LEVEL, cur_level_g),
+                key=KEY_GRAM_LEVEL,
+            )
+            ask = st.button("Ask", type="primary", width="stretch", key=KEY_GRAM_ASK_BTN)
+
+        if ask and (gram_q or "").strip():
+            sys = (
+                "You are a German grammar helper. "
+                "All EXPLANATIONS must be in English ONLY. "
+                "The CORRECTED TEXT and EXAMPLE SENTENCES must be in German ONLY. "
+                "Match the CEFR level and be concise. "
+                "If text was pasted, first give a short corrected German version of the user's text, "
+                "then provide exactly 3 concise English bullet points explaining the key grammar points and corrections, "
+                "and finally give 1–2 short German example sentences that illustrate the rule. "
+                "If it's only a question (no text to correct), give the English explanation and German examples only. "
+                "Keep the whole answer compact and classroom-friendly."
+            )
+            if gram_typing_notice is not None:
+                gram_typing_notice.markdown(
+                    HERR_FELIX_TYPING_HTML,
+                    unsafe_allow_html=True,
+                )
+
+            placeholder = st.empty()
+            placeholder.markdown(
+                "<div class='bubble-a'><div class='typing'><span></span><span></span><span></span></div></div>",
+                unsafe_allow_html=True,
+            )
+            time.sleep(random.uniform(0.8, 1.2))
+            if topic_db is None:
+                logging.debug("Grammar Firestore logging skipped: no client available")
+            else:
+                try:
+                    topic_db.collection("falowen_grammar_questions").add(
+                        {
+                            "student_code": st.session_state.get("student_code"),
+                            "level": gram_level,
+                            "question": gram_q,
+                            "created_at": firestore.SERVER_TIMESTAMP,
+                        }
+                    )
+                except Exception:
+                    logging.warning("Failed to log grammar question", exc_info=True)
+            try:
+                resp = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": sys + f" CEFR level: {gram_level}."},
+                        {"role": "user", "content": gram_q},
+                    ],
+                    temperature=0.1,
+                    max_tokens=700,
+                )
+                out = (resp.choices[0].message.content or "").strip()
+            except Exception as e:
+                out = f"(Error) {e}"
+            placeholder.empty()
+            if gram_typing_notice is not None:
+                gram_typing_notice.empty()
+            st.markdown(
+                "<div class='bubble-wrap'><div class='lbl-a'>Herr Felix</div></div>",
+                unsafe_allow_html=True,
+            )
+            st.markdown(f"<div class='bubble-a'>{out}</div>", unsafe_allow_html=True)
+
+    with tab_connectors:
+        gram_level = st.session_state.get(KEY_GRAM_LEVEL, cur_level_g)
+        st.info(
+            "Build smoother sentences with German connectors. Choose your own or have Herr Felix suggest a set,"
+            " then get coaching with examples matched to your level."
+        )
+
+        connector_mode = st.radio(
+            "How should we choose connectors?",
+            ("I'll choose connectors", "Suggest for me"),
+            key=KEY_CONN_MODE,
+            horizontal=True,
+        )
+
+        connectors_text = ""
+        suggestion_placeholder = st.empty()
+        if connector_mode == "I'll choose connectors":
+            connectors_text = st.text_area(
+                "Connectors or topics to focus on",
+                key=KEY_CONN_TEXT,
+                height=120,
+                placeholder="z.B. weil, obwohl, trotzdem – oder Themen wie: Mein Wochenende, Arbeit vs. Freizeit",
+            )
+            suggestion_placeholder.empty()
+        else:
+            st.caption(
+                "Let Herr Felix suggest 3–5 connectors for your current CEFR level "
+                f"({gram_level})."
+            )
+            if st.button("Suggest connectors", key=KEY_CONN_SUGGEST):
+                suggestion_placeholder.markdown(
+                    "<div class='bubble-a'><div class='typing'><span></span><span></span><span></span></div></div>",
+                    unsafe_allow_html=True,
+                )
+                try:
+                    resp = client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {
+                                "role": "system",
+                                "content": (
+                                    "You are a German writing coach. Suggest 3-5 connectors appropriate for the "
+                                    "given CEFR level. Provide them as a simple numbered list with each connector "
+                                    "in German and a short English hint about when to use it."
+                                ),
+                            },
+                            {
+                                "role": "user",
+                                "content": f"CEFR level: {gram_level}. Suggest connectors for practice.",
+                            },
+                        ],
+                        temperature=0.3,
+                        max_tokens=300,
+                    )
+                    suggestions = (resp.choices[0].message.content or "").strip()
+                except Exception as exc:
+                    suggestions = f"(Error) {exc}"
+                suggestion_placeholder.empty()
+                st.session_state[KEY_CONN_SESSION] = suggestions
+            suggestions = st.session_state.get(KEY_CONN_SESSION, "")
+            if suggestions:
+                suggestion_placeholder.markdown(
+                    (
+                        "<div class='bubble-wrap'><div class='lbl-a'>Herr Felix</div></div>"
+                        f"<div class='bubble-a'>{suggestions}</div>"
+                    ),
+                    unsafe_allow_html=True,
+                )
+            else:
+                suggestion_placeholder.empty()
+            connectors_text = suggestions
+
+        scenario_text = st.text_area(
+            "Sentence or scenario to practice",
+            key=KEY_CONN_SCENARIO,
+            height=150,
+            placeholder="Beschreibe kurz, was du sagen möchtest. z.B. Ich erzähle über meinen letzten Urlaub und möchte Kontraste zeigen.",
+        )
+
+        coach_response_placeholder = st.empty()
+        existing_coach_reply = st.session_state.get(KEY_CONN_RESPONSE, "")
+        if existing_coach_reply:
+            coach_response_placeholder.markdown(
+                (
+                    "<div class='bubble-wrap'><div class='lbl-a'>Herr Felix</div></div>"
+                    f"<div class='bubble-a'>{existing_coach_reply}</div>"
+                ),
+                unsafe_allow_html=True,
+            )
+
+        col_coach, col_clear = st.columns([1, 1])
+        coach_btn = col_coach.button("Coach me", type="primary", key=KEY_CONN_COACH)
+        clear_btn = col_clear.button("Clear session", type="secondary", key=KEY_CONN_CLEAR)
+
+        if clear_btn:
+            st.session_state.pop(KEY_CONN_SESSION, None)
+            st.session_state.pop(KEY_CONN_TEXT, None)
+            st.session_state.pop(KEY_CONN_SCENARIO, None)
+            st.session_state.pop(KEY_CONN_RESPONSE, None)
+            st.session_state.pop(KEY_CONN_MODE, None)
+            suggestion_placeholder.empty()
+            coach_response_placeholder.empty()
+            rerun_fn = getattr(st, "experimental_rerun", None) or getattr(st, "rerun", None)
+            if callable(rerun_fn):
+                rerun_fn()
+
+        if coach_btn:
+            gram_level = st.session_state.get(KEY_GRAM_LEVEL, cur_level_g)
+            connector_payload = connectors_text.strip()
+            scenario_payload = scenario_text.strip()
+            if not connector_payload and connector_mode == "I'll choose connectors":
+                st.warning("Bitte gib mindestens einen Connector oder ein Thema an – oder nutze die Vorschlagsfunktion.")
+            else:
+                coach_response_placeholder.markdown(
+                    "<div class='bubble-a'><div class='typing'><span></span><span></span><span></span></div></div>",
+                    unsafe_allow_html=True,
+                )
+                time.sleep(random.uniform(0.8, 1.2))
+                sys_msg = (
+                    "You are Herr Felix, a German connector coach. Review any provided connectors (or suggest a short "
+                    "set if none were given), explain how to use them in English, and give short German example "
+                    "sentences that match the student's CEFR level. Keep the tone encouraging and classroom-friendly."
+                )
+                user_parts = [f"CEFR level: {gram_level}"]
+                if connector_payload:
+                    user_parts.append(f"Connectors to cover: {connector_payload}")
+                else:
+                    user_parts.append("No connectors provided – please suggest a helpful set.")
+                if scenario_payload:
+                    user_parts.append(f"Practice scenario: {scenario_payload}")
+                user_msg = "\n".join(user_parts)
+
+                try:
+                    resp = client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": sys_msg},
+                            {"role": "user", "content": user_msg},
+                        ],
+                        temperature=0.4,
+                        max_tokens=700,
+                    )
+                    coaching_reply = (resp.choices[0].message.content or "").strip()
+                except Exception as exc:
+                    coaching_reply = f"(Error) {exc}"
+                st.session_state[KEY_CONN_RESPONSE] = coaching_reply
+                coach_response_placeholder.markdown(
+                    (
+                        "<div class='bubble-wrap'><div class='lbl-a'>Herr Felix</div></div>"
+                        f"<div class='bubble-a'>{coaching_reply}</div>"
+                    ),
+                    unsafe_allow_html=True,
+                )
+
+                if topic_db is None:
+                    logging.debug("Connector Firestore logging skipped: no client available")
+                else:
+                    try:
+                        topic_db.collection("falowen_connector_sessions").add(
+                            {
+                                "student_code": st.session_state.get("student_code"),
+                                "level": gram_level,
+                                "mode": connector_mode,
+                                "connectors": connector_payload,
+                                "scenario": scenario_payload,
+                                "response": coaching_reply,
+                                "suggestions": st.session_state.get(KEY_CONN_SESSION, ""),
+                                "created_at": firestore.SERVER_TIMESTAMP,
+                            }
+                        )
+                    except Exception:
+                        logging.warning("Failed to log connector session", exc_info=True)
+
+# ===================== Essay Explainer (Guidelines & Idea Support) =====================
+with tab_assign:
+    st.info(
+        "Need help untangling a German passage? Use this explainer to break down essays,"
+        " highlight key terms, and understand what the task is asking without receiving a full answer."
+    )
+
+    st.markdown("### 🤖 Essay explainer chat")
+    st.caption(
+        "Paste the passage or prompt – Herr Felix will surface keywords, short translations,"
+        " and understanding tips without giving the full answer."
+    )
+
+    def _focus_assignment_tab() -> None:
+        """Keep the Essay Explainer tab selected after actions that trigger reruns."""
+
+        st.session_state["_chat_focus_tab"] = "📘 Essay Explainer"
+        if selector_key in st.session_state:
+            # Streamlit raises an error when we try to programmatically override the
+            # value of an existing selectbox widget via ``st.session_state[key] =``.
+            # Removing the stored widget state lets the next rerun initialise the
+            # selectbox with the desired default index instead.
+            st.session_state.pop(selector_key, None)
+
+    assignment_persist_enabled = _assignment_helper_persistence_enabled()
+    assign_owner_value = (student_code_tc or "").strip().lower()
+    prev_assign_owner = st.session_state.get(KEY_ASSIGN_OWNER)
+    if prev_assign_owner != assign_owner_value:
+        st.session_state[KEY_ASSIGN_HISTORY] = []
+    st.session_state[KEY_ASSIGN_OWNER] = assign_owner_value
+
+    assign_history = st.session_state.setdefault(KEY_ASSIGN_HISTORY, [])
+    for legacy_key in ("cchat_w_assign_prompt", "cchat_w_assign_response", "cchat_w_assign_ai"):
+        st.session_state.pop(legacy_key, None)
+
+    assign_doc_ref = None
+    assign_meta: Dict[str, Any] = {}
+    remote_history: List[Dict[str, Any]] = []
+    assign_thread_id = st.session_state.get(KEY_ASSIGN_THREAD, "")
+    remote_thread_id = ""
+    if assignment_persist_enabled and student_code_tc:
+        assign_doc_ref, remote_history, assign_meta = load_assignment_helper_state(
+            topic_db, student_code_tc
+        )
+        if remote_history and assign_history != remote_history:
+            assign_history.clear()
+            assign_history.extend(remote_history)
+            st.session_state[KEY_ASSIGN_HISTORY] = assign_history
+
+        remote_thread_id = str(assign_meta.get("thread_id", "")).strip()
+        if remote_thread_id:
+            assign_thread_id = remote_thread_id
+
+    if prev_assign_owner != assign_owner_value:
+        assign_thread_id = ""
+
+    if not assign_thread_id:
+        assign_thread_id = uuid4().hex
+    st.session_state[KEY_ASSIGN_THREAD] = assign_thread_id
+
+    if (
+        assignment_persist_enabled
+        and assign_doc_ref is not None
+        and assign_history
+        and not remote_thread_id
+    ):
+        backfill_ok = persist_assignment_helper_state(
+            assign_doc_ref,
+            messages=assign_history,
+            level=assign_meta.get("level"),
+            thread_id=assign_thread_id,
+            student_code=student_code_tc,
+        )
+        if not backfill_ok:
+            logging.warning(
+                "Failed to backfill Assignment Helper thread metadata for %s",
+                student_code_tc,
+            )
+        elif topic_db is not None:
+            record_assignment_helper_thread(
+                topic_db,
+                thread_id=assign_thread_id,
+                student_code=student_code_tc,
+                level=assign_meta.get("level"),
+                message_count=len(assign_history),
+            )
+
+    assign_level_options = ["A1", "A2", "B1", "B2", "C1"]
+    remote_level_pref = str(assign_meta.get("level", "") or "").strip().upper()
+    if (
+        assignment_persist_enabled
+        and remote_level_pref
+        and remote_level_pref in assign_level_options
+    ):
+        stored_level = st.session_state.get(KEY_ASSIGN_LEVEL)
+        if not stored_level or stored_level not in assign_level_options:
+            st.session_state[KEY_ASSIGN_LEVEL] = remote_level_pref
+
+    if assignment_persist_enabled:
+        auto_detect_level = _safe_upper(
+            st.session_state.get("student_level"), ""
+        )
+        if auto_detect_level not in assign_level_options:
+            fallback_candidates = [
+                remote_level_pref,
+                st.session_state.get(KEY_GRAM_LEVEL),
+                active_level,
+                assign_level_options[0],
+            ]
+            for candidate in fallback_candidates:
+                candidate_level = _safe_upper(candidate, "")
+                if candidate_level in assign_level_options:
+                    auto_detect_level = candidate_level
+                    break
+
+        sync_assignment_level_state(
+            st.session_state,
+            student_code=assign_owner_value,
+            detected_level=auto_detect_level,
+            level_options=assign_level_options,
+            assign_key=KEY_ASSIGN_LEVEL,
+            last_student_key=KEY_ASSIGN_LAST_STUDENT,
+            last_level_key=KEY_ASSIGN_LAST_AUTO,
+        )
+
+    control_cols = st.columns([4, 1])
+    with control_cols[0]:
+        default_assign_level = (
+            st.session_state.get(KEY_ASSIGN_LEVEL)
+            or st.session_state.get(KEY_GRAM_LEVEL)
+            or active_level
+        )
+        if default_assign_level not in assign_level_options:
+            default_assign_level = assign_level_options[0]
+        assign_level = st.select_slider(
+            "Level",
+            assign_level_options,
+            value=default_assign_level,
+            key=KEY_ASSIGN_LEVEL,
+        )
+        if assign_level != st.session_state.get(KEY_GRAM_LEVEL) and assign_level in GRAMMAR_LEVELS:
+            st.session_state[KEY_GRAM_LEVEL_SYNC] = assign_level
+            _focus_assignment_tab()
+            st.rerun()
+        st.caption("Choose the CEFR level that matches your assignment.")
+    with control_cols[1]:
+        if st.button("🧹 Clear chat", type="secondary", use_container_width=True, key="assign_clear_chat"):
+            assign_history.clear()
+            st.session_state[KEY_ASSIGN_HISTORY] = assign_history
+            st.session_state[KEY_ASSIGN_THREAD] = uuid4().hex
+            if assignment_persist_enabled and assign_doc_ref is None and student_code_tc:
+                assign_doc_ref = get_assignment_helper_doc(topic_db, student_code_tc)
+            if assignment_persist_enabled and assign_doc_ref is not None:
+                if not clear_assignment_helper_state(assign_doc_ref):
+                    logging.warning(
+                        "Failed to clear Assignment Helper transcript for %s",
+                        student_code_tc,
+                    )
+            st.toast("Essay explainer chat cleared.")
+            _focus_assignment_tab()
+            st.rerun()
+
+    if not assign_history:
+        st.caption("No messages yet — paste your task below to get guidance from Herr Felix.")
+
+    def _render_assign_message(msg: Dict[str, str]) -> None:
+        text = msg.get("content", "")
+        safe = html.escape(text)
+        safe = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", safe)
+        safe = safe.replace("\n", "<br>")
+        if msg.get("role") == "user":
+            st.markdown(
+                f"<div class='bubble-wrap'><div class='lbl-u'>{student_label_html}</div></div>",
+                unsafe_allow_html=True,
+            )
+            st.markdown(f"<div class='bubble-u'>{safe}</div>", unsafe_allow_html=True)
+        else:
+            st.markdown("<div class='bubble-wrap'><div class='lbl-a'>Herr Felix</div></div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='bubble-a'>{safe}</div>", unsafe_allow_html=True)
+
+    history_snapshot = list(assign_history)
+    older_messages = history_snapshot[:-4] if len(history_snapshot) > 4 else []
+    recent_messages = history_snapshot[-4:] if len(history_snapshot) > 4 else history_snapshot
+
+    if older_messages:
+        with st.expander(f"Show earlier ({len(older_messages)})", expanded=False):
+            for item in older_messages:
+                _render_assign_message(item)
+
+    for item in recent_messages:
+        _render_assign_message(item)
+
+    typing_placeholder = st.empty()
+
+    user_prompt = st.chat_input(
+        "Paste the assignment question or ask for planning help",
+        key=KEY_ASSIGN_INPUT,
+    )
+
+    if user_prompt:
+        prompt_clean = user_prompt.strip()
+        if not prompt_clean:
+            st.warning("Please paste the assignment or describe it before sending.")
+        else:
+            assign_history.append({"role": "user", "content": prompt_clean})
+            st.session_state[KEY_ASSIGN_HISTORY] = assign_history
+            if assignment_persist_enabled and assign_doc_ref is None and student_code_tc:
+                assign_doc_ref = get_assignment_helper_doc(topic_db, student_code_tc)
+            if assignment_persist_enabled and assign_doc_ref is not None:
+                persist_ok = persist_assignment_helper_state(
+                    assign_doc_ref,
+                    messages=assign_history,
+                    level=assign_level,
+                    thread_id=assign_thread_id,
+                    student_code=student_code_tc,
+                )
+                if not persist_ok:
+                    logging.warning(
+                        "Failed to persist Assignment Helper transcript for %s after user message",
+                        student_code_tc,
+                    )
+                elif topic_db is not None:
+                    record_assignment_helper_thread(
+                        topic_db,
+                        thread_id=assign_thread_id,
+                        student_code=student_code_tc,
+                        level=assign_level,
+                        message_count=len(assign_history),
+                    )
+            typing_placeholder.markdown(
+                HERR_FELIX_TYPING_HTML,
+                unsafe_allow_html=True,
+            )
+            system_msg = (
+                "You are Herr Felix, a supportive German essay explainer for students. "
+                f"Always tailor advice to CEFR level {assign_level}. "
+                "Your main goal is to help students understand passages and prompts by surfacing key ideas, "
+                "not by writing the full answer for them. Students will paste German essays, reading passages, "
+                "or follow-up questions. For any comprehension or multiple-choice question, explain what is "
+                "being tested and offer hints, but never state the final answer outright. "
+                "First, summarise what the passage or task is asking in simple English. If the task is unclear, "
+                "ask 1–2 short clarifying questions. Then highlight essential German keywords with brief "
+                "English cues, provide short translations for tricky phrases, and share tips for how to think "
+                "about the passage. Avoid writing full paragraphs or full solutions. If a student asks for the "
+                "answer, politely refuse and keep the focus on explanations and understanding. "
+                "Always answer using clear sections titled 'Passage snapshot', 'Key keywords', "
+                "'Helpful translations', and 'Understanding tips'. Each section must contain 2–4 concise "
+                "bullet points using the bullet character •. "
+                "Under 'Helpful translations', only give short phrase-level translations (no long paragraphs, "
+                "no completed essays). Keep a kind, motivating tone and finish each reply with one brief "
+                "motivation or comprehension tip in English."
+            )
+
+            convo = [{"role": "system", "content": system_msg}]
+            convo.extend(
+                {"role": msg.get("role", "user"), "content": msg.get("content", "")}
+                for msg in assign_history
+            )
+
+            try:
+                resp = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=convo,
+                    temperature=0.3,
+                    max_tokens=700,
+                )
+                assign_reply = (resp.choices[0].message.content or "").strip()
+            except Exception as exc:
+                assign_reply = f"(Error) {exc}"
+
+            assign_history.append({"role": "assistant", "content": assign_reply})
+            if assignment_persist_enabled and assign_doc_ref is None and student_code_tc:
+                assign_doc_ref = get_assignment_helper_doc(topic_db, student_code_tc)
+            if assignment_persist_enabled and assign_doc_ref is not None:
+                persist_ok = persist_assignment_helper_state(
+                    assign_doc_ref,
+                    messages=assign_history,
+                    level=assign_level,
+                    thread_id=assign_thread_id,
+                    student_code=student_code_tc,
+                )
+                if not persist_ok:
+                    logging.warning(
+                        "Failed to persist Assignment Helper transcript for %s after assistant reply",
+                        student_code_tc,
+                    )
+                elif topic_db is not None:
+                    record_assignment_helper_thread(
+                        topic_db,
+                        thread_id=assign_thread_id,
+                        student_code=student_code_tc,
+                        level=assign_level,
+                        message_count=len(assign_history),
+                    )
+            typing_placeholder.empty()
+            st.session_state[KEY_ASSIGN_HISTORY] = assign_history
+            _focus_assignment_tab()
+            st.rerun()
+
+# ===================== Exams (Speaking • Lesen • Hören) =====================
+with tab_exam:
+    # Level-aware Goethe links (Lesen & Hören)
+    lesen_links = {
+        "A1": [("Goethe A1 Lesen (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzsd1/ueb.html")],
+        "A2": [("Goethe A2 Lesen (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzsd2/ueb.html")],
+        "B1": [("Goethe B1 Lesen (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzb1/ueb.html")],
+        "B2": [("Goethe B2 Lesen (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzb2/ue9.html")],
+        "C1": [("Goethe C1 Lesen (Lesen & Hören page)", "https://www.goethe.de/ins/be/en/spr/prf/gzc1/u24.html")],
+    }
+    hoeren_links = {
+        "A1": [("Goethe A1 Hören (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzsd1/ueb.html")],
+        "A2": [("Goethe A2 Hören (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzsd2/ueb.html")],
+        "B1": [("Goethe B1 Hören (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzb1/ueb.html")],
+        "B2": [("Goethe B2 Hören (Lesen & Hören page)", "https://www.goethe.de/ins/mm/en/spr/prf/gzb2/ue9.html")],
+        "C1": [("Goethe C1 Hören (Lesen & Hören page)", "https://www.goethe.de/ins/be/en/spr/prf/gzc1/u24.html")],
+    }
+
+    st.info(
+        "Use these subtabs to get exam-ready: Speaking shows your practice attempts and scores,"
+        " while Lesen and Hören open official Goethe online exercises for your chosen level."
+    )
+
+    level_for_exams = st.session_state.get("exam_lesen_level", default_level)
+    if level_for_exams not in lesen_links or level_for_exams not in hoeren_links:
+        level_for_exams = st.session_state.get("exam_hoeren_level", level_for_exams)
+    if level_for_exams not in lesen_links or level_for_exams not in hoeren_links:
+        if default_level in lesen_links and default_level in hoeren_links:
+            level_for_exams = default_level
+        else:
+            common_levels = [lvl for lvl in lesen_links if lvl in hoeren_links]
+            if common_levels:
+                level_for_exams = common_levels[0]
+            else:
+                level_for_exams = next(
+                    iter(lesen_links.keys()),
+                    next(iter(hoeren_links.keys()), default_level),
+                )
+
+    sub_speak, sub_lesen, sub_hoeren = st.tabs(["🗣️ Speaking", "📖 Lesen", "🎧 Hören"])
+
+    def _link_buttons(links: Iterable[Tuple[str, str]]) -> None:
+        """Render a set of practice links as buttons in the Exams tab."""
+
+        items = list(links or [])
+        if not items:
+            st.caption("No practice links available for this level yet.")
+            return
+
+        for idx, (label, url) in enumerate(items):
+            if not label or not url:
+                continue
+
+            st.link_button(label, url, width="stretch")
+
+
+with sub_speak:
+    st.markdown(
+        """
+            <div class="panel">
+              <b>Speaking practice</b><br>
+              • Open the practice page and follow the prompts to record and submit.<br>
+              • Keep sentences short and clear — you’ve got this! 💪
+            </div>
+            """,
+        unsafe_allow_html=True,
+    )
+
+    st.markdown(
+        '<a class="btn" href="https://blog.falowen.app/blog/a1-speaking-exam-guide/" target="_blank" rel="noopener">📘 Read the A1 Speaking Exam Guide</a>',
+        unsafe_allow_html=True,
+    )
+
+    # Button to your speaking practice page (PRACTICE_URL)
+    st.markdown(
+        f'<a class="btn secondary" href="{PRACTICE_URL}" target="_blank" rel="noopener">📝 Open Speaking Practice</a>',
+        unsafe_allow_html=True,
+    )
+
+    st.info(
+        "Track your latest speaking scores and audio directly on the speaking practice page. "
+        "Once you've submitted new attempts, reopen the practice tool to review your feedback."
+    )
+
+    # ---------- Lesen ----------
+    with sub_lesen:
+        st.markdown(
+            """
+                <div class="panel">
+                  <b>Reading (Lesen)</b><br>
+                  • Choose your level to open official Goethe online practice.
+                </div>
+                """,
+            unsafe_allow_html=True,
+        )
+        lv = st.select_slider(
+            "Level",
+            options=list(lesen_links.keys()),
+            value=level_for_exams,
+            key="exam_lesen_level",
+        )
+        _link_buttons(lesen_links.get(lv, []))
+
+    # ---------- Hören ----------
+    with sub_hoeren:
+        st.markdown(
+            """
+                <div class="panel">
+                  <b>Listening (Hören)</b><br>
+                  • Choose your level to open official Goethe online practice.
+                </div>
+                """,
+            unsafe_allow_html=True,
+        )
+        lv_h = st.select_slider(
+            "Level",
+            options=list(hoeren_links.keys()),
+            value=level_for_exams,
+            key="exam_hoeren_level",
+        )
+        _link_buttons(hoeren_links.get(lv_h, []))
+
+st.divider()
+render_app_footer(FOOTER_LINKS)
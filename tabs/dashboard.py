@@ -0,0 +1,796 @@
+# Dashboard tab of the Falowen app.
+#
+# Executed by src.tab_router in the namespace of a1sprechen.py when this tab is
+# active.  It imports what it uses; the helpers below the imports are defined
+# in a1sprechen.py itself and are named here so flake8 checks every other name.
+# It is not meant to be imported on its own.
+
+import calendar
+import html
+from datetime import date
+from typing import Optional
+
+import streamlit as st
+
+from src.activity_calendar import load_activity_calendar
+from src.assignment_ui import (
+    get_assignment_summary,
+    load_assignment_scores,
+    load_progress_index,
+)
+from src.course_schedule import session_details_for_date, session_summary_for_date
+from src.firestore_utils import fetch_attendance_summary
+from src.group_schedules import load_group_schedules
+from src.leaderboard import load_leaderboard
+from src.session_management import ensure_student_level
+from src.utils.currency import format_cedis
+from src.utils.toasts import refresh_with_toast
+
+# Defined in a1sprechen.py.
+EXAM_ADVICE = EXAM_ADVICE  # noqa: F821
+FOOTER_LINKS = FOOTER_LINKS  # noqa: F821
+_go_attendance = _go_attendance  # noqa: F821
+_go_next_assignment = _go_next_assignment  # noqa: F821
+_parse_contract_date_value = _parse_contract_date_value  # noqa: F821
+_resolve_class_name = _resolve_class_name  # noqa: F821
+ensure_student_row = ensure_student_row  # noqa: F821
+get_vocab_of_the_day = get_vocab_of_the_day  # noqa: F821
+inject_notice_css = inject_notice_css  # noqa: F821
+load_full_vocab_sheet = load_full_vocab_sheet  # noqa: F821
+render_app_footer = render_app_footer  # noqa: F821
+
+# ---------- Helpers ----------
+def safe_get(row, key, default=""):
+    try: return row.get(key, default)
+    except Exception: pass
+    try: return getattr(row, key, default)
+    except Exception: pass
+    try: return row[key]
+    except Exception: return default
+
+# Fallback parsers if globals not present
+def _fallback_parse_date(s):
+    return _parse_contract_date_value(s)
+
+def _fallback_add_months(dt, n):
+    y = dt.year + (dt.month - 1 + n) // 12
+    m = (dt.month - 1 + n) % 12 + 1
+    d = min(dt.day, calendar.monthrange(y, m)[1])
+    return dt.replace(year=y, month=m, day=d)
+
+parse_contract_start_fn = globals().get("parse_contract_start", _fallback_parse_date)
+parse_contract_end_fn   = globals().get("parse_contract_end",   _fallback_parse_date)
+add_months_fn           = globals().get("add_months",           _fallback_add_months)
+
+# Global styles for chips & mini-cards
+inject_notice_css()
+
+# ---------- Ensure we have a student row ----------
+student_row = ensure_student_row(stop_if_missing=True)
+
+st.markdown("<div style='height:6px'></div>", unsafe_allow_html=True)
+
+st.divider()
+# ---------- 3) Motivation mini-cards (streak / vocab / leaderboard) ----------
+_student_code_raw = (st.session_state.get("student_code", "") or "").strip()
+_student_code = _student_code_raw.lower()
+_df_assign = load_assignment_scores()
+_activity = load_activity_calendar()
+_streak = _activity.current_streak(_student_code)
+_weekly_goal = 3
+_submitted_this_week = _activity.submissions_this_week(_student_code)
+_goal_left = max(0, _weekly_goal - _submitted_this_week)
+
+_level = (safe_get(student_row, "Level", "A1") or "A1").upper().strip()
+_vocab_df = load_full_vocab_sheet()
+_vocab_item = get_vocab_of_the_day(_vocab_df, _level)
+
+_leaderboard = load_leaderboard()
+_board_entry = _leaderboard.rank(_level, _student_code)
+_total_students = _leaderboard.size(_level)
+
+_streak_line = (
+    f"<span class='pill pill-green'>{_streak} day{'s' if _streak != 1 else ''} streak</span>"
+    if _streak > 0 else
+    "<span class='pill pill-amber'>Start your streak today</span>"
+)
+_goal_line = (
+    f"Submitted {_submitted_this_week}/{_weekly_goal} this week"
+    + (f" — {_goal_left} to go" if _goal_left else " — goal met 🎉")
+)
+
+if _vocab_item:
+    _vocab_chip = f"<span class='pill pill-purple'>{_vocab_item.get('german','')}</span>"
+    _vocab_sub = f"{_vocab_item.get('english','')} · Level {_level}"
+else:
+    _vocab_chip = "<span class='pill pill-amber'>No vocab available</span>"
+    _vocab_sub = f"Level {_level}"
+
+if _board_entry is not None:
+    _rank = _board_entry.rank
+    _total_score = int(_board_entry.total_score)
+    _rank_text = f"Rank #{_rank} of {_total_students} — {_total_score} pts"
+    _lead_chip = "<span class='pill pill-purple'>On the board</span>"
+else:
+    _rank_text = "Complete 3+ assignments to be ranked"
+    _lead_chip = "<span class='pill pill-amber'>Not ranked yet</span>"
+
+_summary = get_assignment_summary(
+    _student_code, _level, _df_assign, progress=load_progress_index()
+)
+
+_missed_raw = _summary.get("missed", [])
+if isinstance(_missed_raw, (list, tuple, set)):
+    _missed_list = [str(item).strip() for item in _missed_raw if str(item).strip()]
+elif isinstance(_missed_raw, str):
+    _missed_list = [_missed_raw.strip()] if _missed_raw.strip() else []
+else:
+    _missed_list = []
+
+_failed_raw = _summary.get("failed", [])
+if isinstance(_failed_raw, (list, tuple, set)):
+    _failed_list = [str(item).strip() for item in _failed_raw if str(item).strip()]
+elif isinstance(_failed_raw, str):
+    _failed_list = [_failed_raw.strip()] if _failed_raw.strip() else []
+else:
+    _failed_list = []
+
+_next_lesson = _summary.get("next")
+
+if _missed_list:
+    _missed_chip = f"<span class='pill pill-amber'>{len(_missed_list)} jumped</span>"
+    _missed_preview = ", ".join(_missed_list[:2]) + ("…" if len(_missed_list) > 2 else "")
+else:
+    _missed_chip = "<span class='pill pill-green'>None</span>"
+    _missed_preview = "You're on track"
+
+if _failed_list:
+    _next_chip = "<span class='pill pill-amber'>Rework failed assignment</span>"
+    if len(_failed_list) == 1:
+        _next_sub = _failed_list[0]
+    else:
+        _next_sub = f"{_failed_list[0]} (+{len(_failed_list) - 1} more)"
+elif _next_lesson:
+    _next_title = (
+        f"Day {_next_lesson.get('day','?')}: {_next_lesson.get('chapter','?')} – {_next_lesson.get('topic','')}"
+    )
+    _next_chip = f"<span class='pill pill-purple'>{_next_title}</span>"
+    _next_sub = _next_lesson.get("goal", "")
+elif _missed_list:
+    _next_chip = "<span class='pill pill-amber'>Finish jumped work</span>"
+    _next_sub = "Complete jumped assignments first"
+else:
+    _next_chip = "<span class='pill pill-green'>All caught up</span>"
+    _next_sub = ""
+_class_name_clean, _class_name_lookup = _resolve_class_name(
+    safe_get(student_row, "ClassName", ""),
+    level=_level,
+)
+_att_sessions, _att_hours = (0, 0.0)
+if _class_name_lookup and _student_code_raw:
+    _att_sessions, _att_hours = fetch_attendance_summary(
+        _student_code_raw,
+        _class_name_lookup,
+    )
+_attendance_chip = (
+    f"<span class='pill pill-purple'>{_att_sessions} sessions • {_att_hours:.1f}h</span>"
+)
+
+
+
+st.markdown(
+    f"""
+        <div class="minirow">
+          <div class="minicard">
+            <h4>🏅 Assignment Streak</h4>
+            <div>{_streak_line}</div>
+            <div class="sub">{_goal_line}</div>
+          </div>
+          <div class="minicard">
+            <h4>🗣️ Vocab of the Day</h4>
+            <div>{_vocab_chip}</div>
+            <div class="sub">{_vocab_sub}</div>
+          </div>
+          <div class="minicard">
+            <h4>🏆 Leaderboard</h4>
+            <div>{_lead_chip}</div>
+            <div class="sub">{_rank_text}</div>
+          </div>
+          <div class="minicard">
+            <h4>📚 Jumped Assignments</h4>
+            <div>{_missed_chip}</div>
+            <div class="sub">{_missed_preview}</div>
+          </div>
+          <div class="minicard">
+            <h4>⏭️ Next Assignment</h4>
+            <div>{_next_chip}</div>
+            <div class="sub">{_next_sub}</div>
+          </div>
+          <div class="minicard">
+            <h4>🕛 Attendance</h4>
+            <div>{_attendance_chip}</div>
+            <div class="sub"></div>
+          </div>
+        </div>
+        """,
+    unsafe_allow_html=True
+)
+if _next_lesson:
+    raw_day = _next_lesson.get("day", "?")
+    day_text = str(raw_day).strip()
+    if not day_text or day_text.lower() in {"none", "nan"}:
+        button_label = "Start your next assignment"
+    else:
+        button_label = f"Start Day {day_text} assignment"
+    st.button(
+        button_label,
+        type="primary",
+        width="stretch",
+        key="btn_dash_next_assignment",
+        on_click=_go_next_assignment,
+        args=(_next_lesson.get("day"),),
+    )
+st.button("View attendance", on_click=_go_attendance)
+st.divider()
+
+# ---------- Student header (compact) + details (expander) ----------
+name = safe_get(student_row, "Name")
+level = safe_get(student_row, "Level", "")
+code  = safe_get(student_row, "StudentCode", "")
+_class_raw = safe_get(student_row, "ClassName", "")
+_, class_name = _resolve_class_name(_class_raw, level=level)
+try:
+    bal_val = float(str(safe_get(student_row, "Balance", 0)).replace(",", "").strip() or 0)
+except Exception:
+    bal_val = 0.0
+
+st.markdown(
+    f"<div style='display:flex;flex-wrap:wrap;gap:10px;align-items:center;"
+    f"padding:8px 10px;border:1px solid rgba(148,163,184,.35);border-radius:10px;"
+    f"background:#ffffff;'>"
+    f"<b>👤 {name}</b>"
+    f"<span style='background:#eef4ff;color:#2541b2;padding:2px 8px;border-radius:999px;'>Level: {level}</span>"
+    f"<span style='background:#f3e8ff;color:#6b21a8;padding:2px 8px;border-radius:999px;'>Class: {class_name}</span>"
+    f"<span style='background:#f1f5f9;color:#334155;padding:2px 8px;border-radius:999px;'>Code: <code>{code}</code></span>"
+    + (
+        f"<span style='background:#fff7ed;color:#7c2d12;padding:2px 8px;border-radius:999px;'>Balance: {format_cedis(bal_val)}</span>"
+        if bal_val > 0
+        else f"<span style='background:#ecfdf5;color:#065f46;padding:2px 8px;border-radius:999px;'>Balance: {format_cedis(0)}</span>"
+    )
+    + "</div>",
+    unsafe_allow_html=True
+)
+
+with st.expander("👤 Student details", expanded=False):
+    info_html = f"""
+        <div style='
+            background:#f8fbff;
+            border:1.6px solid #cfe3ff;
+            border-radius:12px;
+            padding:12px 14px;
+            margin-top:8px;
+            box-shadow:0 2px 8px rgba(44,106,221,0.04);
+            font-size:1.04em;
+            color:#17325e;
+            font-family:"Segoe UI","Arial",sans-serif;
+            letter-spacing:.01em;'>
+            <div style="font-weight:700;font-size:1.12em;margin-bottom:6px;">
+                👤 {name}
+            </div>
+            <div style="font-size:1em; margin-bottom:4px;">
+                <b>Level:</b> {safe_get(student_row, 'Level', '')} &nbsp;|&nbsp; 
+                <b>Code:</b> <code>{safe_get(student_row, 'StudentCode', '')}</code> &nbsp;|&nbsp;
+                <b>Status:</b> {safe_get(student_row, 'Status', '')}
+            </div>
+            <div style="font-size:1em; margin-bottom:4px;">
+                <b>Email:</b> {safe_get(student_row, 'Email', '')} &nbsp;|&nbsp;
+                <b>Phone:</b> {safe_get(student_row, 'Phone', '')} &nbsp;|&nbsp;
+                <b>Location:</b> {safe_get(student_row, 'Location', '')}
+            </div>
+            <div style="font-size:1em;">
+                <b>Contract:</b> {safe_get(student_row, 'ContractStart', '')} ➔ {safe_get(student_row, 'ContractEnd', '')} &nbsp;|&nbsp;
+                <b>Enroll Date:</b> {safe_get(student_row, 'EnrollDate', '')}
+            </div>
+        </div>
+        """
+    st.markdown(info_html, unsafe_allow_html=True)
+
+# ---------- Payments & Renewal (policy-aligned, all inside one expander) ----------
+from datetime import datetime as _dt
+import calendar as _cal
+
+_read_money = globals().get("_read_money")
+if _read_money is None:
+    def _read_money(x):
+        try:
+            s = str(x).replace(",", "").strip()
+            return float(s) if s not in ("", "nan", "None") else 0.0
+        except Exception:
+            return 0.0
+
+def _fallback_parse_date(s):
+    for f in ("%Y-%m-%d", "%m/%d/%Y", "%d.%m.%y", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return _dt.strptime(str(s).strip(), f)
+        except Exception:
+            pass
+    return None
+
+def _fallback_add_months(dt, n):
+    y = dt.year + (dt.month - 1 + n) // 12
+    m = (dt.month - 1 + n) % 12 + 1
+    d = min(dt.day, _cal.monthrange(y, m)[1])
+    return dt.replace(year=y, month=m, day=d)
+
+_parse_start = (
+    globals().get("parse_contract_start_fn")
+    or globals().get("parse_contract_start")
+    or _fallback_parse_date
+)
+_parse_end = (
+    globals().get("parse_contract_end_fn")
+    or globals().get("parse_contract_end")
+    or _fallback_parse_date
+)
+_add_months = (
+    globals().get("add_months_fn")
+    or globals().get("add_months")
+    or _fallback_add_months
+)
+
+_today = _dt.today().date()
+
+_cs = None
+for _k in ["ContractStart", "StartDate", "ContractBegin", "Start", "Begin"]:
+    _s = str(safe_get(student_row, _k, "") or "").strip()
+    if _s:
+        _cs = _parse_start(_s)
+        break
+_first_due_dt = _add_months(_cs, 1) if _cs else None
+_first_due = _first_due_dt.date() if _first_due_dt and hasattr(_first_due_dt, "date") else _first_due_dt
+
+_balance = _read_money(safe_get(student_row, "Balance", 0))
+
+_exp_title = "💳 Payments (info)"
+_severity = "info"
+if _balance > 0 and _first_due:
+    if _today > _first_due:
+        _days_over = (_today - _first_due).days
+        _exp_title = f"💳 Payments • overdue {_days_over}d"
+        _severity = "error"
+        _msg = (
+            f"💸 **Overdue by {_days_over} day{'s' if _days_over != 1 else ''}.** "
+            f"Amount due: **{format_cedis(_balance)}**. First due: {_first_due:%d %b %Y}."
+        )
+    elif _today == _first_due:
+        _exp_title = "💳 Payments • due today"
+        _severity = "warning"
+        _msg = f"⏳ **Payment due today** ({_first_due:%d %b %Y}). Amount due: **{format_cedis(_balance)}**."
+    else:
+        _exp_title = "💳 Payments (info)"
+        _severity = "info"
+        _days_left = (_first_due - _today).days
+        _msg = (
+            f"No payment expected yet. Your first payment date is **{_first_due:%d %b %Y}** "
+            f"(in {_days_left} day{'s' if _days_left != 1 else ''}). Current balance: **{format_cedis(_balance)}**."
+        )
+elif _balance > 0 and not _first_due:
+    _exp_title = "💳 Payments • schedule unknown"
+    _severity = "info"
+    _msg = (
+        "ℹ️ You have a positive balance, but I couldn’t read your contract start date "
+        "to compute the first payment date. Please contact the office."
+    )
+else:
+    _exp_title = "💳 Payments (info)"
+    _severity = "info"
+    if _first_due:
+        _msg = (
+            "No outstanding balance. You’re not expected to pay anything now. "
+            f"Your first payment date (if applicable) is **{_first_due:%d %b %Y}**."
+        )
+    else:
+        _msg = (
+            "No outstanding balance. You’re not expected to pay anything now. "
+            "We’ll compute your first payment date after your contract start is on file."
+        )
+
+with st.expander(_exp_title, expanded=False):
+    if _severity == "error":
+        st.error(_msg)
+    elif _severity == "warning":
+        st.warning(_msg)
+    else:
+        st.info(_msg)
+
+    _cs_str = _cs.strftime("%d %b %Y") if _cs else "—"
+    _fd_str = _first_due.strftime("%d %b %Y") if _first_due else "—"
+    st.markdown(
+        f"""
+            **Details**
+            - Contract start: **{_cs_str}**
+            - First payment due (start + 1 month): **{_fd_str}**
+            - Current balance: **{format_cedis(_balance)}**
+            """
+    )
+
+    EXT_FEE = 1000
+    _ce = _parse_end(safe_get(student_row, "ContractEnd", ""))
+    _ce_date = _ce.date() if hasattr(_ce, "date") else _ce
+    if _ce_date:
+        _days_left = (_ce_date - _today).days
+        if _days_left < 0:
+            st.error(
+                f"⚠️ Your contract ended on **{_ce_date:%d %b %Y}**. "
+                f"If you need more time, extension costs **{format_cedis(EXT_FEE)}/month**."
+            )
+        elif _days_left <= 14:
+            st.warning(
+                f"⏰ Your contract ends in **{_days_left} day{'s' if _days_left != 1 else ''}** "
+                f"(**{_ce_date:%d %b %Y}**). Extension costs **{format_cedis(EXT_FEE)}/month**."
+            )
+
+# ---------- Always-visible Contract Alert ----------
+from datetime import datetime as _dt
+
+def _fallback_parse_date(_s):
+    for _f in ("%Y-%m-%d", "%m/%d/%Y", "%d.%m.%y", "%d/%m/%Y", "%d-%m-%Y"):
+        try:
+            return _dt.strptime(str(_s).strip(), _f)
+        except Exception:
+            pass
+    return None
+
+_parse_end = (
+    globals().get("parse_contract_end_fn")
+    or globals().get("parse_contract_end")
+    or _fallback_parse_date
+)
+
+_today = _dt.today().date()
+_ce_raw = _parse_end(safe_get(student_row, "ContractEnd", ""))
+_ce_date = _ce_raw.date() if hasattr(_ce_raw, "date") else _ce_raw
+
+st.markdown("""
+    <style>
+      .contract-alert { border-radius:12px; padding:12px 14px; margin:8px 0 10px 0; font-weight:600; }
+      .ca-warn { background:#fff7ed; color:#7c2d12; border:1px solid #fed7aa; }
+      .ca-err  { background:#fef2f2; color:#991b1b; border:1px solid #fecaca; }
+      .ca-text { font-size:1rem; line-height:1.55; }
+      .ca-cta  { margin-top:6px; font-size:.95rem; }
+      @media (max-width:640px){
+        .contract-alert{ padding:10px 12px; }
+        .ca-text{ font-size:1.02rem; }
+      }
+    </style>
+    """, unsafe_allow_html=True)
+
+if _ce_date:
+    _days_left = (_ce_date - _today).days
+    _student_code = str(safe_get(student_row, "StudentCode", "") or "").strip().lower()
+    _alert_key = f"hide_contract_alert:{_student_code}:{_ce_date.isoformat()}:{_today.isoformat()}"
+    _ext_fee = 1000
+
+    if not st.session_state.get(_alert_key, False):
+        if _days_left < 0:
+            _msg = (
+                f"⚠️ <b>Your contract ended on {_ce_date:%d %b %Y}.</b> "
+                f"To continue, extension costs <b>{format_cedis(_ext_fee)}/month</b>."
+            )
+            _cls = "ca-err"
+        elif _days_left <= 14:
+            _msg = (
+                f"⏰ <b>Your contract ends in {_days_left} day{'s' if _days_left != 1 else ''} "
+                f"({_ce_date:%d %b %Y}).</b> Extension costs <b>{format_cedis(_ext_fee)}/month</b>."
+            )
+            _cls = "ca-warn"
+        else:
+            _msg = ""
+            _cls = ""
+
+        if _msg:
+            st.markdown(
+                f"<div class='contract-alert {_cls}'><div class='ca-text'>{_msg}</div></div>",
+                unsafe_allow_html=True
+            )
+            if st.button("Got it — hide this notice for today", key=f"btn_contract_alert_{_student_code}"):
+                st.session_state[_alert_key] = True
+                refresh_with_toast()
+
+# ---------- Class schedules ----------
+with st.expander("🗓️ Class Schedule & Upcoming Sessions", expanded=False):
+    if not st.session_state.get("student_level"):
+        ensure_student_level()
+    GROUP_SCHEDULES = load_group_schedules()
+
+    from datetime import datetime as _dt_local, timedelta as _td_local
+    student_level_val = st.session_state.get("student_level", "")
+    class_name_clean, class_name_lookup = _resolve_class_name(
+        safe_get(student_row, "ClassName", ""),
+        level=student_level_val,
+    )
+    class_name_display = class_name_clean or class_name_lookup
+    class_schedule = GROUP_SCHEDULES.get(class_name_lookup)
+    week_days = [
+        "Monday",
+        "Tuesday",
+        "Wednesday",
+        "Thursday",
+        "Friday",
+        "Saturday",
+        "Sunday",
+    ]
+
+    if not class_name_lookup or not class_schedule:
+        st.info("🚩 Your class is not set yet. Please contact your teacher or the office.")
+    else:
+        days = class_schedule.get("days", [])
+        time_str = class_schedule.get("time", "")
+        start_dt = class_schedule.get("start_date", "")
+        end_dt = class_schedule.get("end_date", "")
+        doc_url = class_schedule.get("doc_url", "")
+
+        today = _dt_local.today().date()
+        start_date_obj = None
+        end_date_obj = None
+        try:
+            if start_dt:
+                start_date_obj = _dt_local.strptime(start_dt, "%Y-%m-%d").date()
+        except Exception:
+            start_date_obj = None
+        try:
+            if end_dt:
+                end_date_obj = _dt_local.strptime(end_dt, "%Y-%m-%d").date()
+        except Exception:
+            end_date_obj = None
+
+        before_start = bool(start_date_obj and today < start_date_obj)
+        after_end = bool(end_date_obj and today > end_date_obj)
+        day_indices = [week_days.index(d) for d in days if d in week_days] if isinstance(days, list) else []
+
+        def get_next_sessions(
+            from_date,
+            weekday_indices,
+            limit=3,
+            end_date=None,
+            include_start_date=False,
+        ):
+            results = []
+            if include_start_date and (not end_date or from_date <= end_date):
+                results.append(from_date)
+
+            check_date = from_date if not results else from_date + _td_local(days=1)
+
+            while len(results) < limit:
+                if end_date and check_date > end_date:
+                    break
+                if not weekday_indices or check_date.weekday() in weekday_indices:
+                    results.append(check_date)
+                check_date += _td_local(days=1)
+
+            return results
+
+        if before_start and start_date_obj:
+            upcoming_sessions = get_next_sessions(
+                start_date_obj,
+                day_indices,
+                limit=3,
+                end_date=end_date_obj,
+                include_start_date=True,
+            )
+        elif after_end:
+            upcoming_sessions = []
+        else:
+            upcoming_sessions = get_next_sessions(today, day_indices, limit=3, end_date=end_date_obj)
+
+        if after_end:
+            end_str = end_date_obj.strftime('%d %b %Y') if end_date_obj else end_dt
+            st.error(
+                f"❌ Your class ({class_name_display}) ended on {end_str}. Please contact the office for next steps."
+            )
+        else:
+            if upcoming_sessions:
+                items = []
+                for session_date in upcoming_sessions:
+                    weekday_name = week_days[session_date.weekday()]
+                    display_date = session_date.strftime("%d %b")
+                    base_line = (
+                        f"<div><b>{weekday_name}</b> "
+                        f"<span style='color:#1976d2;'>{display_date}</span> "
+                        f"<span style='color:#333;'>{html.escape(time_str or 'Time TBD')}</span></div>"
+                    )
+
+                    agenda_html = ""
+                    summary_text = ""
+                    session_plan = None
+                    try:
+                        session_plan = session_details_for_date(
+                            class_name_lookup,
+                            session_date,
+                        ) if class_name_lookup else None
+                    except Exception:
+                        session_plan = None
+
+                    if session_plan:
+                        session_labels = [
+                            str(item).strip()
+                            for item in session_plan.get("sessions") or []
+                            if isinstance(item, str) and item.strip()
+                        ]
+                        if session_labels:
+                            day_number = session_plan.get("day_number")
+                            summary_text = " • ".join(session_labels)
+                            if isinstance(day_number, int):
+                                summary_text = f"Day {day_number} — {summary_text}"
+
+                            agenda_items = "".join(
+                                f"<li style='margin:0 0 4px 0;'>{html.escape(label)}</li>"
+                                for label in session_labels
+                            )
+                            heading_text = (
+                                f"Day {day_number} focus"
+                                if isinstance(day_number, int)
+                                else "Session focus"
+                            )
+                            agenda_html = (
+                                "<div style='margin-top:6px;'>"
+                                f"<div style='font-weight:600;color:#0f172a;font-size:0.9em;'>{html.escape(heading_text)}</div>"
+                                "<ul style='margin:4px 0 0 18px;padding:0;font-size:0.9em;color:#1f2933;'>"
+                                f"{agenda_items}"
+                                "</ul>"
+                                "</div>"
+                            )
+
+                    if not summary_text and class_name_lookup:
+                        try:
+                            fallback_summary = session_summary_for_date(
+                                class_name_lookup,
+                                session_date,
+                            )
+                        except Exception:
+                            fallback_summary = None
+                        if fallback_summary:
+                            summary_text = fallback_summary
+
+                    summary_html = (
+                        "<div style='margin-top:2px;font-size:0.95em;color:#0f172a;font-weight:600;'>"
+                        f"{html.escape(summary_text)}"
+                        "</div>"
+                    ) if summary_text else ""
+
+                    items.append(
+                        "<li style='margin-bottom:12px;'>"
+                        f"{base_line}"
+                        f"{summary_html}"
+                        f"{agenda_html}"
+                        "</li>"
+                    )
+                session_items_html = (
+                    "<ul style='padding-left:16px; margin:9px 0 0 0; list-style-type:disc;'>"
+                    + "".join(items)
+                    + "</ul>"
+                )
+            else:
+                session_items_html = "<span style='color:#c62828;'>No upcoming sessions in the visible window.</span>"
+
+            if before_start and start_date_obj:
+                days_until = (start_date_obj - today).days
+                label = f"Starts in {days_until} day{'s' if days_until != 1 else ''} (on {start_date_obj.strftime('%d %b %Y')})"
+                bar_html = f"""
+        <div style="margin-top:8px; font-size:0.85em;">
+          <div style="margin-bottom:4px;">{label}</div>
+          <div style="background:#ddd; border-radius:6px; overflow:hidden; height:12px; width:100%;">
+            <div style="width:3%; background:#1976d2; height:100%;"></div>
+          </div>
+        </div>"""
+            elif start_date_obj and end_date_obj:
+                total_days = (end_date_obj - start_date_obj).days + 1
+                elapsed = max(0, (today - start_date_obj).days + 1) if today >= start_date_obj else 0
+                remaining = max(0, (end_date_obj - today).days)
+                percent = int((elapsed / total_days) * 100) if total_days > 0 else 100
+                percent = min(100, max(0, percent))
+                label = f"{remaining} day{'s' if remaining != 1 else ''} remaining in course"
+                bar_html = f"""
+        <div style="margin-top:8px; font-size:0.85em;">
+          <div style="margin-bottom:4px;">{label}</div>
+          <div style="background:#ddd; border-radius:6px; overflow:hidden; height:12px; width:100%;">
+            <div style="width:{percent}%; background: linear-gradient(90deg,#1976d2,#4da6ff); height:100%;"></div>
+          </div>
+          <div style="margin-top:2px; font-size:0.75em;">
+            Progress: {percent}% (started {elapsed} of {total_days} days)
+          </div>
+        </div>"""
+            else:
+                bar_html = f"""
+        <div style="margin-top:8px; font-size:0.85em;">
+          <b>Course period:</b> {start_dt or '[not set]'} to {end_dt or '[not set]'}
+        </div>"""
+
+            period_str = f"{start_dt or '[not set]'} to {end_dt or '[not set]'}"
+            st.markdown(
+                f"""
+        <div style='border:2px solid #17617a; border-radius:14px;
+                    padding:13px 11px; margin-bottom:13px;
+                    background:#eaf6fb; font-size:1.15em;
+                    line-height:1.65; color:#232323;'>
+          <b style="font-size:1.09em;">🗓️ Your Next Classes ({class_name}):</b><br>
+          {session_items_html}
+          {bar_html}
+          <div style="font-size:0.98em; margin-top:6px;">
+            <b>Course period:</b> {period_str}
+          </div>
+          {f'<a href="{doc_url}" target="_blank" '
+        f'style="font-size:1em;color:#17617a;text-decoration:underline;margin-top:6px;display:inline-block;">📄 View/download full class schedule</a>'
+        if doc_url else ''}
+        </div>""",
+                unsafe_allow_html=True,
+            )
+
+# ---------- Goethe exam ----------
+GOETHE_EXAM_DATES = {
+    "A1": (date(2025, 10, 13), 2850, None),
+    "A2": (date(2025, 10, 14), 2400, None),
+    "B1": (date(2025, 10, 15), 2750, 880),
+    "B2": (date(2025, 10, 16), 2500, 840),
+    "C1": (date(2025, 10, 17), 2450, 700),
+}
+level = (safe_get(student_row, "Level", "") or "").upper().replace(" ", "")
+exam_info = GOETHE_EXAM_DATES.get(level)
+days_to_exam: Optional[int] = None
+fee_text = ""
+if exam_info:
+    exam_date, fee, module_fee = exam_info
+    days_to_exam = (exam_date - date.today()).days
+    fee_text = f"**Fee:** {format_cedis(fee)}"
+    if module_fee:
+        fee_text += f" &nbsp; | &nbsp; **Per Module:** {format_cedis(module_fee)}"
+
+expander_title = (
+    f"⏳ Goethe Exam: {days_to_exam} days left" if days_to_exam is not None else "⏳ Goethe Exam"
+)
+st.caption(expander_title)
+with st.expander(expander_title, expanded=False):
+    if exam_info:
+        register_link = "[Register online here](https://www.goethe.de/ins/gh/en/spr/prf.html)"
+        if days_to_exam is not None and days_to_exam > 0:
+            st.info(
+                "\n".join(
+                    [
+                        f"Your {level} exam is in {days_to_exam} days ({exam_date:%d %b %Y}).",
+                        fee_text,
+                        register_link,
+                    ]
+                )
+            )
+        elif days_to_exam == 0:
+            st.success(
+                "\n".join(
+                    [
+                        f"📝 Registration is today ({exam_date:%d %b %Y}).",
+                        fee_text,
+                        register_link,
+                    ]
+                )
+            )
+        else:
+            st.error(
+                "\n".join(
+                    [
+                        f"❌ Your {level} exam was on {exam_date:%d %b %Y}, {abs(days_to_exam)} days ago.",
+                        fee_text,
+                    ]
+                )
+            )
+
+        st.caption(
+            EXAM_ADVICE.get(
+                level,
+                "No exam advice available for your level."
+            )
+        )
+    else:
+        st.warning("No exam date configured for your level.")
+st.divider()
+
+# ---------- Footer ----------
+render_app_footer(FOOTER_LINKS)
@@ -0,0 +1,3787 @@
+# My Course tab of the Falowen app.
+#
+# Executed by src.tab_router in the namespace of a1sprechen.py when this tab is
+# active.  It imports what it uses; the helpers below the imports are defined
+# in a1sprechen.py itself and are named here so flake8 checks every other name.
+# It is not meant to be imported on its own.
+
+import html
+import logging
+import random
+import re
+import tempfile
+import textwrap
+import time
+from datetime import UTC, datetime, timezone as _timezone
+from typing import Collection, List, Optional
+from urllib.parse import parse_qs, urlparse, urlsplit
+
+import streamlit as st
+from docx import Document
+from firebase_admin import firestore
+
+import src.schedule as _schedule
+from src.attendance_utils import load_attendance_records
+from src.class_board_cache import get_class_board_cache
+from src.class_board_loader import (
+    BOARD_PAGE_SIZE,
+    COMMENT_POST_ID_FIELD,
+    BoardData,
+    load_board_page,
+    window_posts,
+)
+from src.class_board_stats import (
+    compute_board_stats,
+    count_board_posts,
+    legacy_reply_count,
+    load_board_stats,
+    post_chapter,
+    record_comment_added,
+    record_comment_deleted,
+    record_post_created,
+    record_post_deleted,
+)
+from src.course_schedule import (
+    next_session_details,
+    session_details_for_date,
+    session_summary_for_date,
+)
+from src.data_loading import load_student_data
+from src.discussion_board import (
+    CLASS_DISCUSSION_LABEL,
+    CLASS_DISCUSSION_LINK_TMPL,
+    CLASS_DISCUSSION_PROMPT,
+    CLASS_DISCUSSION_REMINDER,
+    go_class_thread,
+)
+from src.draft_management import (
+    _draft_state_keys,
+    autosave_learning_note,
+    autosave_maybe,
+    clear_draft_after_post,
+    initialize_draft_state,
+    load_notes_from_db,
+    reset_local_draft_state,
+    save_before_download,
+    save_notes_to_db,
+    save_now,
+)
+from src.draft_queue import discard_pending_draft
+from src.firestore_helpers import (
+    acquire_lock,
+    fetch_latest,
+    has_existing_submission,
+    is_locked,
+    lesson_key_build,
+    lock_id,
+)
+from src.firestore_utils import (
+    _draft_doc_ref,
+    fetch_active_typists,
+    load_draft_meta_from_db,
+    load_student_profile,
+    load_student_profiles,
+    save_ai_response,
+    save_draft_to_db,
+    save_student_profile,
+)
+from src.forum_timer import (
+    _to_datetime_any,
+    build_forum_reply_indicator_text,
+    build_forum_timer_indicator,
+)
+from src.group_schedules import load_group_schedules
+from src.logout import do_logout
+from src.pdf_handling import generate_notes_pdf, generate_single_note_pdf
+from src.resources import get_firestore_client
+from src.roster_index import get_roster_index
+from src.session_management import ensure_student_level
+from src.ui_components import render_assignment_reminder
+from src.ui_helpers import filter_matches, highlight_terms
+from src.utils.toasts import refresh_with_toast
+from src.youtube import fetch_youtube_playlist_videos, get_playlist_ids_for_level
+
+# Defined in a1sprechen.py.
+ADMINS_BY_LEVEL = ADMINS_BY_LEVEL  # noqa: F821
+COURSEBOOK_ASSIGNMENT_LABEL = COURSEBOOK_ASSIGNMENT_LABEL  # noqa: F821
+COURSEBOOK_ASSIGNMENT_LEGACY_LABELS = COURSEBOOK_ASSIGNMENT_LEGACY_LABELS  # noqa: F821
+COURSEBOOK_OVERVIEW_LABEL = COURSEBOOK_OVERVIEW_LABEL  # noqa: F821
+COURSEBOOK_SECTION_OPTIONS = COURSEBOOK_SECTION_OPTIONS  # noqa: F821
+COURSEBOOK_SUBMIT_LABEL = COURSEBOOK_SUBMIT_LABEL  # noqa: F821
+_NEW_POST_TYPING_ID = _NEW_POST_TYPING_ID  # noqa: F821
+_clear_typing_state = _clear_typing_state  # noqa: F821
+_coerce_day = _coerce_day  # noqa: F821
+_compute_finish_date_estimates = _compute_finish_date_estimates  # noqa: F821
+_format_typing_banner = _format_typing_banner  # noqa: F821
+_qp_get_first = _qp_get_first  # noqa: F821
+_recover_student_code = _recover_student_code  # noqa: F821
+_resolve_class_name = _resolve_class_name  # noqa: F821
+_safe_lower = _safe_lower  # noqa: F821
+_safe_str = _safe_str  # noqa: F821
+_safe_upper = _safe_upper  # noqa: F821
+_show_missing_code_warning = _show_missing_code_warning  # noqa: F821
+_submission_block_reason = _submission_block_reason  # noqa: F821
+_task_position_word = _task_position_word  # noqa: F821
+_update_student_code_session_state = _update_student_code_session_state  # noqa: F821
+_update_typing_state = _update_typing_state  # noqa: F821
+apply_note_ai_correction = apply_note_ai_correction  # noqa: F821
+apply_profile_ai_correction = apply_profile_ai_correction  # noqa: F821
+apply_status_ai_correction = apply_status_ai_correction  # noqa: F821
+build_course_day_link = build_course_day_link  # noqa: F821
+client = client  # noqa: F821
+diff_with_markers = diff_with_markers  # noqa: F821
+get_slack_webhook = get_slack_webhook  # noqa: F821
+has_telegram_subscription = has_telegram_subscription  # noqa: F821
+load_level_schedules = load_level_schedules  # noqa: F821
+navigate_to_chat_tab = navigate_to_chat_tab  # noqa: F821
+notify_slack_submission = notify_slack_submission  # noqa: F821
+render_day_zero_onboarding = render_day_zero_onboarding  # noqa: F821
+render_lesson_language_support = render_lesson_language_support  # noqa: F821
+render_resubmit_email_cta = render_resubmit_email_cta  # noqa: F821
+render_umlaut_pad = render_umlaut_pad  # noqa: F821
+
+# === HANDLE ALL SWITCHING *BEFORE* ANY WIDGET ===
+# Jump flags set by buttons elsewhere
+if st.session_state.get("__go_classroom"):
+    st.session_state["coursebook_subtab"] = "🧑‍🏫 Classroom"
+    del st.session_state["__go_classroom"]
+    refresh_with_toast()
+
+if st.session_state.get("__go_notes"):
+    st.session_state["coursebook_subtab"] = "📒 Learning Notes"
+    del st.session_state["__go_notes"]
+    refresh_with_toast()
+
+# Backward-compat: older code may still set this
+if st.session_state.get("switch_to_notes"):
+    st.session_state["coursebook_subtab"] = "📒 Learning Notes"
+    del st.session_state["switch_to_notes"]
+    refresh_with_toast()
+
+# First run default
+if "coursebook_subtab" not in st.session_state:
+    st.session_state["coursebook_subtab"] = "📘 Course Book"
+if "cb_prev_subtab" not in st.session_state:
+    st.session_state["cb_prev_subtab"] = st.session_state["coursebook_subtab"]
+
+# Header (render once)
+st.markdown(
+    '''
+        <div style="
+            padding: 16px;
+            background: #007bff;
+            color: #ffffff;
+            border-radius: 8px;
+            text-align: center;
+            margin-bottom: 16px;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+        ">
+            <span style="font-size:1.8rem; font-weight:600;">📈 My Course</span>
+        </div>
+        ''',
+    unsafe_allow_html=True
+)
+st.divider()
+
+# Subtabs (1: Classroom, 2: Course Book, 3: Learning Notes)
+def on_cb_subtab_change() -> None:
+    prev = st.session_state.get("cb_prev_subtab")
+    curr = st.session_state.get("coursebook_subtab")
+    if prev == "📒 Learning Notes":
+        code = st.session_state.get("student_code", "") or ""
+        if not code:
+            st.error("Student code is required.")
+        else:
+            notes_key = f"notes_{code}"
+            notes = st.session_state.get(notes_key)
+            if notes is not None:
+                save_notes_to_db(code, notes)
+    elif prev == "🧑‍🏫 Classroom":
+        code = (
+            st.session_state.get("student_code")
+            or (st.session_state.get("student_row") or {}).get("StudentCode", "")
+        )
+        if code:
+            if str(st.session_state.get("q_text", "")).strip():
+                save_now("q_text", code)
+            for k in [key for key in st.session_state.keys() if key.startswith("q_reply_box_")]:
+                if str(st.session_state.get(k, "")).strip():
+                    save_now(k, code)
+    elif prev == "📘 Course Book":
+        draft_key = st.session_state.get("coursebook_draft_key")
+        code = (
+            st.session_state.get("student_code")
+            or (st.session_state.get("student_row") or {}).get("StudentCode", "")
+        )
+        if draft_key and code:
+            last_val_key, *_ = _draft_state_keys(draft_key)
+            if st.session_state.get(draft_key, "") != st.session_state.get(last_val_key, ""):
+                save_now(draft_key, code)
+    st.session_state["cb_prev_subtab"] = curr
+
+
+# Subtabs (1: Classroom, 2: Course Book, 3: Learning Notes)
+cb_subtab = st.radio(
+    "Select section:",
+    ["🧑‍🏫 Classroom", "📘 Course Book", "📒 Learning Notes"],
+    horizontal=True,
+    key="coursebook_subtab",
+    on_change=on_cb_subtab_change,
+)
+
+# ---------- DB (Firestore) bootstrap ----------
+def _get_db():
+    global db
+    try:
+        # One client per process, shared with falowen.sessions.
+        db = get_firestore_client()
+    except Exception:
+        st.error(
+            "Firestore client isn't configured. Provide Firebase Admin creds or set GOOGLE_APPLICATION_CREDENTIALS.",
+            icon="🛑",
+        )
+        raise
+    return db
+
+db = _get_db()
+
+
+# === COURSE BOOK SUBTAB (mini-tabs inside) ===
+if cb_subtab == "📘 Course Book":
+    from datetime import date, timedelta  # needed inside this branch
+
+    st.markdown(
+        '''
+            <div style="
+                padding: 16px;
+                background: #007bff;
+                color: #ffffff;
+                border-radius: 8px;
+                text-align: center;
+                margin-bottom: 16px;
+                box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            ">
+                <span style="font-size:1.8rem; font-weight:600;">📘 Course Book</span>
+            </div>
+            ''',
+        unsafe_allow_html=True
+    )
+    st.divider()
+
+    # ---- Load schedule (normalized) ----
+    if not st.session_state.get("student_level"):
+        ensure_student_level()
+    student_level = st.session_state.get("student_level", "A1")
+    level_key = (student_level or "A1").strip().upper()
+    schedules = load_level_schedules()
+    schedule = schedules.get(level_key, schedules.get("A1", []))
+    if not schedule:
+        st.warning(f"No lessons found for level **{level_key}**.")
+        # Removed st.stop() so downstream sections (e.g., class board) can still render
+
+    student_row = st.session_state.get("student_row") or {}
+    _class_name_clean, class_name_lookup = _resolve_class_name(
+        student_row.get("ClassName", ""),
+        level=student_level,
+    )
+
+    next_coursebook_session = None
+    if class_name_lookup:
+        try:
+            next_coursebook_session = next_session_details(class_name_lookup)
+        except Exception:
+            next_coursebook_session = None
+
+    if next_coursebook_session:
+        plan_date = next_coursebook_session.get("date")
+        date_label = ""
+        if isinstance(plan_date, date):
+            date_label = plan_date.strftime("%a %d %b")
+        elif isinstance(next_coursebook_session.get("date_iso"), str):
+            date_label = str(next_coursebook_session.get("date_iso"))
+        elif plan_date:
+            try:
+                date_label = str(plan_date)
+            except Exception:
+                date_label = ""
+
+        weekday = next_coursebook_session.get("weekday")
+        if weekday and date_label and weekday not in date_label:
+            date_line = f"{weekday} • {date_label}"
+        elif date_label:
+            date_line = date_label
+        elif weekday:
+            date_line = weekday
+        else:
+            date_line = ""
+
+        day_number = next_coursebook_session.get("day_number")
+        heading_text = (
+            f"Next live class — Day {day_number} focus"
+            if isinstance(day_number, int)
+            else "Next live class focus"
+        )
+
+        session_labels = [
+            str(item).strip()
+            for item in next_coursebook_session.get("sessions") or []
+            if isinstance(item, str) and item.strip()
+        ]
+        agenda_html = ""
+        if session_labels:
+            agenda_items = "".join(
+                f"<li style='margin:0 0 4px 0;'>{html.escape(label)}</li>"
+                for label in session_labels
+            )
+            agenda_html = (
+                "<ul style='margin:8px 0 0 18px;padding:0;color:#1f2933;font-size:0.95em;'>"
+                f"{agenda_items}"
+                "</ul>"
+            )
+
+        summary_line = next_coursebook_session.get("summary")
+        if session_labels and summary_line:
+            summary_line = None
+
+        info_html = [
+            "<div style='margin:0 0 16px 0;padding:16px;border-radius:12px;", 
+            "background:#f8fafc;border:1px solid #e2e8f0;'>",
+            f"<div style='font-weight:600;color:#0f172a;font-size:1.05rem;'>{html.escape(heading_text)}</div>",
+        ]
+        if date_line:
+            info_html.append(
+                f"<div style='margin-top:4px;color:#334155;font-size:0.95rem;'>{html.escape(date_line)}</div>"
+            )
+        if summary_line:
+            info_html.append(
+                f"<div style='margin-top:6px;color:#0f172a;font-size:0.95rem;'>{html.escape(summary_line)}</div>"
+            )
+        if agenda_html:
+            info_html.append(agenda_html)
+        info_html.append("</div>")
+        st.markdown("".join(info_html), unsafe_allow_html=True)
+
+    # ---------- mini-tabs inside Course Book ----------
+    if "coursebook_page" not in st.session_state:
+        st.session_state["coursebook_page"] = COURSEBOOK_OVERVIEW_LABEL
+    if "coursebook_prev_page" not in st.session_state:
+        st.session_state["coursebook_prev_page"] = st.session_state["coursebook_page"]
+
+    if st.session_state.get("coursebook_page") in COURSEBOOK_ASSIGNMENT_LEGACY_LABELS:
+        st.session_state["coursebook_page"] = COURSEBOOK_ASSIGNMENT_LABEL
+    if st.session_state.get("coursebook_prev_page") in COURSEBOOK_ASSIGNMENT_LEGACY_LABELS:
+        st.session_state["coursebook_prev_page"] = COURSEBOOK_ASSIGNMENT_LABEL
+
+    assignment_labels = COURSEBOOK_ASSIGNMENT_LEGACY_LABELS | {COURSEBOOK_ASSIGNMENT_LABEL}
+
+    def on_coursebook_page_change() -> None:
+        prev = st.session_state.get("coursebook_prev_page")
+        curr = st.session_state.get("coursebook_page")
+        if prev in assignment_labels or prev == COURSEBOOK_SUBMIT_LABEL:
+            draft_key = st.session_state.get("coursebook_draft_key")
+            code = (
+                st.session_state.get("student_code")
+                or (st.session_state.get("student_row") or {}).get("StudentCode", "")
+            )
+            if draft_key and code:
+                last_val_key, *_ = _draft_state_keys(draft_key)
+                if st.session_state.get(draft_key, "") != st.session_state.get(last_val_key, ""):
+                    save_now(draft_key, code)
+        st.session_state["coursebook_prev_page"] = curr
+
+    # ---- Search ----
+    query = st.text_input("🔍 Search for topic, chapter, grammar, day, or anything…")
+    search_terms = [q for q in query.strip().lower().split() if q] if query else []
+
+    if search_terms:
+        matches = [(i, d) for i, d in enumerate(schedule) if filter_matches(d, search_terms)]
+        if not matches:
+            st.warning("No matching lessons. Try simpler terms or check spelling.")
+            # Removed st.stop() so downstream sections (e.g., class board) can still render
+
+        labels = []
+        for _, d in matches:
+            title = highlight_terms(f"Day {d['day']}: {d['topic']}", search_terms)
+            grammar = highlight_terms(d.get("grammar_topic", ""), search_terms)
+            grammar_tag = f'<span style="color:#007bff">[{grammar}]</span>' if grammar else ""
+            labels.append(f"{title}  {grammar_tag}")
+
+        st.markdown("<span style='font-weight:700; font-size:1rem;'>Lessons:</span>", unsafe_allow_html=True)
+        sel = st.selectbox(
+            "Lesson",
+            list(range(len(matches))),
+            format_func=lambda i: labels[i],
+            key="course_search_sel",
+            label_visibility="collapsed",
+        )
+        idx = matches[sel][0]
+    else:
+        st.markdown("<span style='font-weight:700; font-size:1rem;'>Choose your lesson/day:</span>", unsafe_allow_html=True)
+        qp_day = _qp_get_first("day", "")
+        default_idx = 0
+        if schedule:
+            try:
+                day_val = int(qp_day)
+                min_day = schedule[0]["day"]
+                max_day = schedule[-1]["day"]
+                day_val = max(min_day, min(day_val, max_day))
+                default_idx = next((i for i, d in enumerate(schedule) if d["day"] == day_val), 0)
+            except Exception:
+                pass
+        idx = st.selectbox(
+            "Lesson selection",
+            list(range(len(schedule))),
+            index=default_idx,
+            format_func=lambda i: f"Day {schedule[i]['day']} - {schedule[i]['topic']} (Chapter {schedule[i].get('chapter', '?')})",
+            label_visibility="collapsed",
+        )
+
+    st.divider()
+
+    # ---- Progress ----
+    total = len(schedule)
+    done = idx + 1
+    pct = int(done / total * 100) if total else 0
+    st.progress(pct)
+    st.markdown(f"**You’ve loaded {done} / {total} lessons ({pct}%)**")
+    st.divider()
+
+    # ---- Lesson info ----
+    info = schedule[idx]
+    lesson_key = lesson_key_build(
+        student_level,
+        info.get("day", 0),
+        info.get("chapter", ""),
+    )
+    draft_key = f"draft_{lesson_key}"
+    st.session_state["coursebook_draft_key"] = draft_key
+    chapter = info.get("chapter")
+    title_txt = f"Day {info['day']}: {info['topic']}"
+    st.markdown(
+        f"### {highlight_terms(title_txt, search_terms)} (Chapter {chapter or '?'})",
+        unsafe_allow_html=True,
+    )
+    if info.get("grammar_topic"):
+        st.markdown(f"**🔤 Grammar Focus:** {highlight_terms(info['grammar_topic'], search_terms)}", unsafe_allow_html=True)
+
+    day_value = _coerce_day(info.get("day"))
+
+    if day_value == 0:
+        render_day_zero_onboarding(info, schedule, idx)
+    elif info.get("goal") or info.get("instruction"):
+        st.info(
+            f"🎯 **Goal:** {info.get('goal','')}\n\n"
+            f"📝 **Instruction:** {info.get('instruction','')}"
+        )
+
+    coursebook_section = None
+    if day_value != 0:
+        coursebook_section = st.radio(
+            "Section",
+            COURSEBOOK_SECTION_OPTIONS,
+            key="coursebook_page",
+            on_change=on_coursebook_page_change,
+        )
+    else:
+        st.session_state.setdefault("coursebook_prev_page", COURSEBOOK_OVERVIEW_LABEL)
+        st.session_state.setdefault("coursebook_page", COURSEBOOK_OVERVIEW_LABEL)
+
+    # ---- Class discussion count & link ----
+    student_row = st.session_state.get("student_row") or {}
+    _class_name_clean, class_name_lookup = _resolve_class_name(
+        student_row.get("ClassName", ""),
+        level=student_level,
+    )
+    class_name = class_name_lookup
+
+    if class_name and chapter:
+        post_count = count_board_posts(db, student_level, class_name, chapter=str(chapter))
+        link_key = CLASS_DISCUSSION_LINK_TMPL.format(chapter=chapter)
+        count_txt = f" ({post_count})" if post_count else ""
+        st.info(
+            f"📣 {CLASS_DISCUSSION_PROMPT} "
+            f"{CLASS_DISCUSSION_LABEL}{count_txt}. "
+            f"{CLASS_DISCUSSION_REMINDER}"
+        )
+
+        def _launch_class_thread(chap: str) -> None:
+            current_row = st.session_state.get("student_row") or {}
+            if isinstance(current_row, dict):
+                updated_row = dict(current_row)
+            else:
+                try:
+                    updated_row = dict(current_row)
+                except Exception:
+                    updated_row = {}
+            updated_row["ClassName"] = class_name_lookup
+            st.session_state["student_row"] = updated_row
+            go_class_thread(chap)
+
+        st.button(
+            CLASS_DISCUSSION_LABEL,
+            key=link_key,
+            on_click=_launch_class_thread,
+            args=(chapter,),
+        )
+        if post_count == 0:
+            st.caption("No posts yet. Clicking will show the full board.")
+    elif not class_name:
+        st.error(
+            "This class discussion board is unavailable. Select another "
+            "classroom tab and return, or log out and back in to refresh "
+            "your roster."
+        )
+    else:
+        st.warning("Missing chapter for discussion board.")
+
+    st.divider()
+
+    student_row = st.session_state.get("student_row", {})
+
+    # OVERVIEW
+    if coursebook_section == COURSEBOOK_OVERVIEW_LABEL:
+    
+        with st.expander("📚 Course Book & Study Recommendations", expanded=True):
+            LEVEL_TIME = {"A1": 15, "A2": 25, "B1": 30, "B2": 40, "C1": 45}
+            rec_time = LEVEL_TIME.get(level_key, 20)
+            st.info(f"⏱️ **Recommended:** Invest about {rec_time} minutes to complete this lesson fully.")
+
+            student_row = st.session_state.get("student_row", {})
+            start_str   = student_row.get("ContractStart", "")
+            parse_start = (
+                globals().get("parse_contract_start_fn")
+                or globals().get("parse_contract_start")
+            )
+            estimates = _compute_finish_date_estimates(start_str, total, parse_start)
+
+            if estimates:
+                end_three = estimates[3]
+                end_two   = estimates[2]
+                end_one   = estimates[1]
+                _, content = st.columns([3, 7])
+                with content:
+                    st.success(f"If you complete **three sessions per week**, you will finish by **{end_three.strftime('%A, %d %B %Y')}**.")
+                    st.info(f"If you complete **two sessions per week**, you will finish by **{end_two.strftime('%A, %d %B %Y')}**.")
+                    st.warning(f"If you complete **one session per week**, you will finish by **{end_one.strftime('%A, %d %B %Y')}**.")
+            else:
+                _, content = st.columns([3, 7])
+                with content:
+                    st.warning(
+                        "❓ We couldn't load your finish date estimates. Try scrolling up, "
+                        "switching to a different tab and back, or logging out and logging "
+                        "in again. If the problem persists, please contact administration."
+                    )
+
+    # ASSIGNMENT (activities + resources; tolerant across A1–C1)
+    elif coursebook_section in assignment_labels:
+
+        draft_text = st.session_state.get(draft_key, "")
+        recovered_code = _recover_student_code(
+            lesson_key=lesson_key,
+            draft_text=draft_text if draft_text else None,
+        )
+        student_row = (
+            _update_student_code_session_state(recovered_code)
+            if recovered_code
+            else st.session_state.get("student_row")
+            or {}
+        )
+
+        if not recovered_code:
+            manual_key = "assignment_student_code_input"
+            st.warning(
+                "We couldn't detect your student code automatically. "
+                "Enter it below so your work is linked to your account."
+            )
+            manual_value = st.text_input(
+                "Student code",
+                key=manual_key,
+                placeholder="e.g. KWAME123",
+                help="This appears on your student ID card or welcome email.",
+            )
+            manual_code = _safe_lower(manual_value)
+            if manual_code and manual_code.lower() != "demo001":
+                student_row = _update_student_code_session_state(manual_code)
+                st.caption("Student code saved. You're all set to continue.")
+
+        # ---------- helpers ----------
+        def _as_list(x):
+            if not x: return []
+            return x if isinstance(x, list) else [x]
+
+        def _is_url(u: str) -> bool:
+            try:
+                p = urlparse(str(u))
+                return p.scheme in ("http", "https") and bool(p.netloc)
+            except Exception:
+                return False
+
+        def _canon_video(u: str) -> str:
+            """Stable id for a video url (YouTube => yt:ID, else normalized url)."""
+            if not u:
+                return ""
+            try:
+                p = urlsplit(u)
+                host = (p.netloc or "").lower().replace("www.", "")
+                path = (p.path or "/").strip("/")
+                if "youtube.com" in host or "youtu.be" in host:
+                    vid = ""
+                    if "youtube.com" in host:
+                        q = parse_qs(p.query or "")
+                        vid = (q.get("v", [""])[0] or "").strip()
+                        if not vid:
+                            parts = path.split("/")
+                            if parts:
+                                if parts[0] in {"embed", "shorts", "live", "v"} and len(parts) > 1:
+                                    vid = parts[1].strip()
+                                elif len(parts) == 1:
+                                    vid = parts[0].strip()
+                    else:  # youtu.be links
+                        vid = path.split("/")[0].strip()
+
+                    vid = vid.strip()
+                    if vid:
+                        return f"yt:{vid}"
+                    return u.strip().lower()
+
+                return u.strip().lower()
+            except Exception:
+                return str(u).strip().lower()
+
+        def _pick_primary_video(
+            *candidates: Optional[str],
+            seen: Optional[Collection[str]] = None,
+        ) -> tuple[str, List[str]]:
+            """Return the preferred playable url and all canonical ids for the candidates."""
+
+            preferred_url = ""
+            fallback_url = ""
+            canon_ids: List[str] = []
+            seen_ids: Collection[str] = seen or ()
+
+            for candidate in candidates:
+                if not _is_url(candidate):
+                    continue
+
+                candidate_url = str(candidate)
+                cid = _canon_video(candidate_url) or candidate_url.strip().lower()
+                if cid and cid not in canon_ids:
+                    canon_ids.append(cid)
+
+                if not fallback_url:
+                    fallback_url = candidate_url
+
+                if preferred_url:
+                    continue
+
+                if not cid or cid not in seen_ids:
+                    preferred_url = candidate_url
+
+            if not preferred_url:
+                preferred_url = fallback_url
+
+            return preferred_url, canon_ids
+
+        def _render_coursebook_video_resource(
+            video_url: Optional[str],
+            seen: set[str],
+        ) -> None:
+            """Embed the lecture video with a preview and optional new-tab link."""
+
+            if not _is_url(video_url):
+                return
+
+            canonical_id = _canon_video(str(video_url))
+            if canonical_id in seen:
+                return
+
+            seen.add(canonical_id)
+
+            safe_url = html.escape(str(video_url))
+            st.markdown("**🎬 Recorded lecture video**")
+            st.video(video_url)
+            st.markdown(
+                (
+                    "<div style=\"margin-top:-0.35rem;margin-bottom:1.1rem;\">"
+                    f"<a href=\"{safe_url}\" target=\"_blank\" rel=\"noopener noreferrer\">"
+                    "Open video in a new tab ↗️"
+                    "</a></div>"
+                ),
+                unsafe_allow_html=True,
+            )
+
+        def pick_sections(day_info: dict):
+            """Find any section keys present for this lesson across levels."""
+            candidates = [
+                ("lesen_hören",        "Lesen & Hören",        "📚"),
+                ("lesen_hoeren",       "Lesen & Hören",        "📚"),
+                ("lesenhoeren",        "Lesen & Hören",        "📚"),
+                ("lesen",              "Lesen",                "📖"),
+                ("hören",              "Hören",                "🎧"),
+                ("hoeren",             "Hören",                "🎧"),
+                ("schreiben_sprechen", "Schreiben & Sprechen", "📝"),
+                ("sprechen_schreiben", "Schreiben & Sprechen", "📝"),
+                ("sprechen",           "Sprechen",             "🗣️"),
+                ("schreiben",          "Schreiben",            "✍️"),
+            ]
+            found = []
+            for key, title, icon in candidates:
+                if day_info.get(key):
+                    found.append((key, title, icon))
+            return found
+
+        def render_section_any(day_info, key, title, icon, seen_videos: set):
+            content = day_info.get(key)
+            if not content:
+                return
+
+            if isinstance(content, dict):
+                items = [content]
+            elif isinstance(content, list):
+                items = [c for c in content if isinstance(c, dict)]
+                if len(items) != len(content):
+                    logging.warning("Expected dict elements in '%s' list, skipping non-dict entries", key)
+            else:
+                logging.warning("Expected dict or list for '%s', got %s", key, type(content).__name__)
+                return
+
+            st.markdown(f"#### {icon} {title}")
+            for idx_part, part in enumerate(items):
+                chapter = part.get('chapter', '')
+                video = part.get('video')
+                youtube_link = part.get('youtube_link')
+                grammarbook_link = part.get('grammarbook_link')
+                workbook_link = part.get('workbook_link')
+                extras = part.get('extra_resources')
+
+                if len(items) > 1:
+                    position = idx_part + 1
+                    chapter_clean = (chapter or "").strip()
+                    chapter_suffix = f": Chapter {chapter_clean}" if chapter_clean else ""
+                    st.markdown(
+                        "###### "
+                        f"{icon} This is your {_task_position_word(position)} task"
+                        f"{chapter_suffix}"
+                    )
+                else:
+                    st.markdown(f"###### {icon} Chapter {chapter}")
+                # videos (embed once)
+                primary_video, canonical_ids = _pick_primary_video(
+                    video,
+                    youtube_link,
+                    seen=seen_videos,
+                )
+                if primary_video:
+                    _render_coursebook_video_resource(primary_video, seen_videos)
+                for cid in canonical_ids:
+                    if cid:
+                        seen_videos.add(cid)
+                # links/resources inline
+                if grammarbook_link:
+                    st.markdown(f"- [📘 Grammar Book (Notes)]({grammarbook_link})")
+                    st.markdown(
+                        "<em>Reminder:</em> 📘 gives you the grammar from today's lecture; 📒 is the assignment you must complete.",
+                        unsafe_allow_html=True,
+                    )
+                if workbook_link:
+                    st.markdown(f"- [📒 Workbook (Assignment)]({workbook_link})")
+                    render_assignment_reminder()
+                if extras:
+                    for ex in _as_list(extras):
+                        st.markdown(f"- [🔗 Extra]({ex})")
+
+        # ---------- YOUR WORK (tolerant across levels; embeds each video at most once) ----------
+        st.markdown("### 🧪 Your Work")
+        seen_videos = set()
+        sections = pick_sections(info)
+
+        if sections:
+            for key, title, icon in sections:
+                render_section_any(info, key, title, icon, seen_videos)
+        else:
+            # Fallback: show top-level resources even if there are no section keys
+            showed = False
+            video_ids: List[str] = []
+            if info.get("video") or info.get("youtube_link"):
+                primary_video, video_ids = _pick_primary_video(
+                    info.get("video"),
+                    info.get("youtube_link"),
+                    seen=seen_videos,
+                )
+                if primary_video:
+                    _render_coursebook_video_resource(primary_video, seen_videos)
+                    showed = True
+
+            for cid in video_ids:
+                if cid:
+                    seen_videos.add(cid)
+            if info.get("grammarbook_link"):
+                st.markdown(f"- [📘 Grammar Book (Notes)]({info['grammarbook_link']})")
+                showed = True
+            if info.get("workbook_link"):
+                st.markdown(f"- [📒 Workbook (Assignment)]({info['workbook_link']})")
+                render_assignment_reminder()
+                showed = True
+            for ex in _as_list(info.get("extra_resources")):
+                st.markdown(f"- [🔗 Extra]({ex})")
+                showed = True
+
+            if not showed:
+                st.info(
+                    "No activity sections or links found for this lesson. Check the lesson data for A2/B1 key names."
+                )
+
+        # --- quick access to translators and language support ---
+        translator_col, support_col = st.columns([1, 1.6])
+        with translator_col:
+            st.markdown("**Need extra support?**")
+            st.button(
+                "🧠 Grammar Helper",
+                key="coursebook_grammar_helper",
+                on_click=navigate_to_chat_tab,
+                kwargs={"focus_tab": "🛠️ Grammar"},
+                use_container_width=True,
+            )
+            st.button(
+                "📘 Essay Explainer",
+                key="coursebook_assignment_helper",
+                on_click=navigate_to_chat_tab,
+                kwargs={"focus_tab": "📘 Essay Explainer"},
+                use_container_width=True,
+            )
+            st.caption("Opens the Chat • Grammar • Exams tools in a new tab of the app.")
+        with support_col:
+            render_lesson_language_support(info, level_key)
+
+        st.markdown("#### 🎬 Video of the Day for Your Level")
+        playlist_ids = get_playlist_ids_for_level(level_key)
+        fetch_videos = fetch_youtube_playlist_videos
+        playlist_id = random.choice(playlist_ids) if playlist_ids else None
+
+        reflection_prompts = [
+            "📝 After watching, jot down two new words or phrases you heard.",
+            "🗣️ Pause the video and repeat a key sentence aloud to practice pronunciation.",
+            "💬 Summarize the main idea of the video in one or two simple sentences.",
+        ]
+
+        if playlist_id:
+            if st.button("🔄 Refresh videos", key=f"refresh_vod_{level_key}"):
+                st.cache_data.clear()
+                st.session_state["need_rerun"] = True
+            st.caption(
+                "Click 'Refresh videos' to clear cached playlist data and reload from YouTube if results look out of date."
+            )
+            try:
+                video_list = fetch_videos(playlist_id)
+            except Exception:
+                video_list = []
+            if video_list:
+                today_idx = date.today().toordinal() % len(video_list)
+                video = video_list[today_idx]
+                st.markdown(f"**{video['title']}**")
+                st.video(video['url'])
+                description = video.get("description")
+                if description:
+                    st.caption(description)
+                else:
+                    st.caption(random.choice(reflection_prompts))
+            else:
+                st.info("No videos found for your level’s playlist. Check back soon!")
+        else:
+            st.info("No playlist found for your level yet. Stay tuned!")
+        st.markdown("**The End**")
+
+
+    # SUBMIT
+    elif coursebook_section == COURSEBOOK_SUBMIT_LABEL:
+        submission_disabled_reason = _submission_block_reason(info, schedule)
+        submission_disabled = bool(submission_disabled_reason)
+
+        st.markdown("### ✅ Submit Your Assignment")
+        st.markdown(
+            f"""
+                <div style="box-sizing:border-box;padding:14px 16px;border-radius:10px;
+                            background:#f0f9ff;border:1px solid #bae6fd;margin:6px 0 12px 0;">
+                  <div style="font-size:1.05rem;">
+                    📌 <b>You're on:</b> Level <b>{student_level}</b> • Day <b>{info['day']}</b> • Chapter <b>{info['chapter']}</b>
+                  </div>
+                  <div style="color:#0369a1;margin-top:4px;">
+                    Make sure this matches the assignment your tutor set. If not, change the lesson from the dropdown above.
+                  </div>
+                </div>
+                """,
+            unsafe_allow_html=True
+        )
+
+        draft_text = st.session_state.get(draft_key, "")
+        recovered_code = _recover_student_code(
+            lesson_key=lesson_key,
+            draft_text=draft_text if draft_text else None,
+        )
+        student_row = (
+            _update_student_code_session_state(recovered_code)
+            if recovered_code
+            else st.session_state.get("student_row")
+            or {}
+        )
+        code = _safe_str(student_row.get("StudentCode"), "demo001")
+        name_default = _safe_str(student_row.get("Name"))
+        missing_code = (not code) or (code.lower() == "demo001")
+
+        locked_key = f"{lesson_key}_locked"
+        needs_resubmit_key = f"{lesson_key}__needs_resubmit"
+
+        code_input_key = "submit_student_code_input"
+        if missing_code:
+            _show_missing_code_warning(
+                name=name_default,
+                level=student_level,
+                lesson_info=info,
+            )
+            manual_value = st.text_input(
+                "Enter your student code to continue",
+                key=code_input_key,
+                placeholder="e.g. KWAME123",
+                help="This appears on your student ID card or welcome email.",
+            )
+            manual_code = _safe_lower(manual_value)
+            if manual_code and manual_code.lower() != "demo001":
+                student_row = _update_student_code_session_state(manual_code)
+                code = manual_code
+                missing_code = False
+                st.success("Student code saved. You can now submit your work.")
+
+            resubmit_should_show = (
+                st.session_state.get(locked_key, False)
+                or bool(st.session_state.get(f"{lesson_key}__receipt"))
+                or (st.session_state.get(needs_resubmit_key) is not None)
+            )
+            if resubmit_should_show:
+                stored_row = st.session_state.get("student_row") or {}
+                resubmit_name = name_default or _safe_str(stored_row.get("Name"))
+                candidate_code = (
+                    st.session_state.get("student_code")
+                    or stored_row.get("StudentCode")
+                    or manual_code
+                )
+                render_resubmit_email_cta(
+                    lesson_info=info,
+                    student_name=resubmit_name,
+                    student_code=candidate_code,
+                )
+        else:
+            st.session_state[code_input_key] = code
+
+        if not missing_code:
+            if submission_disabled:
+                st.info(submission_disabled_reason)
+
+            st.session_state["student_code"] = code
+            chapter_name = f"{info['chapter']} – {info.get('topic', '')}"
+
+            name = st.text_input("Name", value=student_row.get('Name', ''))
+            email = st.text_input("Email", value=student_row.get('Email', ''))
+
+            db_locked = is_locked(student_level, code, lesson_key)
+            success_notice_key = f"{lesson_key}__submit_success_notice"
+            if db_locked:
+                st.session_state[locked_key] = True
+            locked = db_locked or st.session_state.get(locked_key, False)
+            locked_ui = locked or submission_disabled
+            submit_in_progress_key = f"{lesson_key}_submit_in_progress"
+
+            # ---------- save previous lesson on switch + force hydrate for this one ----------
+            prev_active_key = st.session_state.get("__active_draft_key")
+            if prev_active_key and prev_active_key != draft_key:
+                try:
+                    prev_text = st.session_state.get(prev_active_key, "")
+                    discard_pending_draft(code, prev_active_key)
+                    save_draft_to_db(code, prev_active_key, prev_text)
+                except Exception:
+                    pass  # never block UI
+                # ensure the newly selected lesson re-hydrates from cloud
+                st.session_state.pop(f"{draft_key}__hydrated_v2", None)
+            st.session_state["__active_draft_key"] = draft_key
+
+            # ---------- Decide what to show (guarded hydration) ----------
+            pending_key      = f"{draft_key}__pending_reload"
+            pending_text_key = f"{draft_key}__reload_text"
+            pending_ts_key   = f"{draft_key}__reload_ts"
+            hydrated_key     = f"{draft_key}__hydrated_v2"  # only hydrate once per lesson
+
+            last_val_key, last_ts_key, saved_flag_key, saved_at_key = _draft_state_keys(draft_key)
+
+            # 1) If a forced reload was requested, apply it BEFORE widget creation
+            if st.session_state.get(pending_key):
+                cloud_text = st.session_state.pop(pending_text_key, "")
+                cloud_ts   = st.session_state.pop(pending_ts_key, None)
+                st.session_state[pending_key] = False
+
+                st.session_state[draft_key]      = cloud_text or ""
+                st.session_state[last_val_key]   = st.session_state[draft_key]
+                st.session_state[last_ts_key]    = time.time()
+                st.session_state[saved_flag_key] = True
+                st.session_state[saved_at_key]   = (cloud_ts or datetime.now(_timezone.utc))
+                st.session_state[hydrated_key]   = True
+
+                try:
+                    when = (cloud_ts.strftime('%Y-%m-%d %H:%M') + " UTC") if cloud_ts else "now"
+                except Exception:
+                    when = "now"
+                st.info(f"Reloaded cloud draft (saved {when}).")
+
+            else:
+                # 2) If a SUBMISSION exists, always enforce it (locked) on every run
+                latest = fetch_latest(student_level, code, lesson_key)
+                if latest and (latest.get("answer", "") is not None):
+                    sub_txt = latest.get("answer", "") or ""
+                    sub_ts  = latest.get("updated_at")
+
+                    st.session_state[draft_key]      = sub_txt
+                    st.session_state[last_val_key]   = sub_txt
+                    st.session_state[last_ts_key]    = time.time()
+                    st.session_state[saved_flag_key] = True
+                    st.session_state[saved_at_key]   = (sub_ts or datetime.now(_timezone.utc))
+                    st.session_state[locked_key]     = True
+                    st.session_state[hydrated_key]   = True
+                    locked = True  # enforce read-only
+
+                    when = f"{sub_ts.strftime('%Y-%m-%d %H:%M')} UTC" if sub_ts else ""
+                    st.success(f"Showing your submitted answer. {('Updated ' + when) if when else ''}")
+
+                else:
+                    # 3) No submission → hydrate ONCE from cloud; after that, never clobber local typing
+                    if not st.session_state.get(hydrated_key, False):
+                        cloud_text, cloud_ts = load_draft_meta_from_db(code, draft_key)
+                        if cloud_text is not None:
+                            st.session_state[draft_key]      = cloud_text or ""
+                            st.session_state[last_val_key]   = st.session_state[draft_key]
+                            st.session_state[last_ts_key]    = time.time()
+                            st.session_state[saved_flag_key] = True
+                            st.session_state[saved_at_key]   = (cloud_ts or datetime.now(_timezone.utc))
+                        else:
+                            st.session_state.setdefault(draft_key, "")
+                            st.session_state.setdefault(last_val_key, "")
+                            st.session_state.setdefault(last_ts_key, time.time())
+                            st.session_state.setdefault(saved_flag_key, False)
+                            st.session_state.setdefault(saved_at_key, None)
+
+                        st.session_state[hydrated_key] = True
+
+                        if cloud_text:
+                            when = f"{cloud_ts.strftime('%Y-%m-%d %H:%M')} UTC" if cloud_ts else ""
+                            st.info(f"💾 Restored your saved draft. {('Last saved ' + when) if when else ''}")
+                        elif not submission_disabled:
+                            st.caption("Start typing your answer.")
+                    else:
+                        # If 'hydrated' but local is empty, pull cloud once
+                        if not st.session_state.get(draft_key, "") and not locked_ui:
+                            ctext, cts = load_draft_meta_from_db(code, draft_key)
+                            if ctext:
+                                st.session_state[draft_key]      = ctext
+                                st.session_state[last_val_key]   = ctext
+                                st.session_state[last_ts_key]    = time.time()
+                                st.session_state[saved_flag_key] = True
+                                st.session_state[saved_at_key]   = (cts or datetime.now(_timezone.utc))
+
+            st.subheader("✍️ Your Answer")
+
+            locked_warning_message = None
+            needs_resubmit = False
+            if locked:
+                locked_warning_message = (
+                    "This box is locked because you have already submitted your work."
+                )
+                needs_resubmit = st.session_state.get(needs_resubmit_key)
+                if needs_resubmit is None:
+                    answer_text = st.session_state.get(draft_key, "").strip()
+                    MIN_WORDS = 20
+                    needs_resubmit = len(answer_text.split()) < MIN_WORDS
+                needs_resubmit = bool(needs_resubmit)
+                st.session_state[needs_resubmit_key] = needs_resubmit
+
+                render_resubmit_email_cta(
+                    lesson_info=info,
+                    student_name=(name or name_default),
+                    student_code=code,
+                )
+            show_resubmit_hint = locked and bool(needs_resubmit)
+
+            # ---------- Editor (save on blur + debounce) ----------
+            st.text_area(
+                "Type all your answers here",
+                height=500,
+                key=draft_key,              # value already hydrated in st.session_state[draft_key]
+                on_change=save_now,         # guaranteed save on blur/change
+                args=(draft_key, code),
+                disabled=locked_ui,
+                help="Autosaves on blur and in the background while you type."
+            )
+            render_umlaut_pad(draft_key, context=f"coursebook_{lesson_key}", disabled=locked_ui)
+
+            # Debounced autosave (safe so empty first-render won't wipe a non-empty cloud draft)
+            current_text = st.session_state.get(draft_key, "")
+            last_val = st.session_state.get(last_val_key, "")
+            if not locked_ui and (current_text.strip() or not last_val.strip()):
+                autosave_maybe(code, draft_key, current_text, min_secs=2.0, min_delta=12, locked=locked_ui)
+
+            # ---------- Manual save + last saved time + safe reload ----------
+            csave1, csave2, csave3 = st.columns([1, 1, 1])
+
+            with csave1:
+                if st.button("💾 Save Draft now", disabled=locked_ui):
+                    discard_pending_draft(code, draft_key)
+                    save_draft_to_db(code, draft_key, current_text)
+                    st.session_state[last_val_key]   = current_text
+                    st.session_state[last_ts_key]    = time.time()
+                    st.session_state[saved_flag_key] = True
+                    st.session_state[saved_at_key]   = datetime.now(_timezone.utc)
+                    st.success("Draft saved.")
+
+            with csave2:
+                ts = st.session_state.get(saved_at_key)
+                if ts:
+                    st.caption("Last saved: " + ts.strftime("%Y-%m-%d %H:%M") + " UTC")
+                else:
+                    st.caption("No local save yet")
+
+            with csave3:
+                # Current draft text
+                draft_txt = st.session_state.get(draft_key, "") or ""
+
+                # Last-saved timestamp (for header)
+                _, _, _, saved_at_key = _draft_state_keys(draft_key)
+                ts = st.session_state.get(saved_at_key)
+                when = (
+                    ts.astimezone(_timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+                    if ts else datetime.now(_timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+                )
+
+                # Strip any previous backup header the student may have pasted back
+                def _strip_old_header(txt: str) -> str:
+                    if not txt:
+                        return ""
+                    # Remove ONE leading “Falowen — Draft Backup … ======” block if present
+                    pattern = r"(?s)\AFalowen\s+—\s+Draft\s+Backup.*?\n[-=]{8,}\n\n"
+                    return re.sub(pattern, "", txt, count=1)
+
+                clean_body = (_strip_old_header(draft_txt).rstrip() + "\n")
+
+                # Build a simple, single header
+                header_lines = [
+                    "Falowen — Draft Backup",
+                    f"Level: {student_level}  •  Day: {info['day']}  •  Chapter: {info.get('chapter','')}",
+                    f"Student: {name}  •  Code: {code}",
+                    f"Saved (UTC): {when}",
+                    "=" * 56,
+                    ""  # blank line before body
+                ]
+                header = "\n".join(header_lines)
+
+                # Safe filename
+                safe_chapter = re.sub(r"[^A-Za-z0-9_.-]+", "_", str(info.get("chapter", "")))
+                fname = f"falowen_draft_{student_level}_day{info['day']}_{safe_chapter}.txt"
+
+                st.download_button(
+                    "⬇️ Download draft (TXT)",
+                    data=(header + clean_body).encode("utf-8"),
+                    file_name=fname,
+                    mime="text/plain",
+                    help="Save a clean backup of your current draft",
+                    key=f"{draft_key}__download_txt",
+                    on_click=save_before_download,
+                    kwargs={"draft_key": draft_key, "code": code, "skip_count": 2},
+                )
+
+            if show_resubmit_hint:
+                st.info(
+                    "🔒 This box is locked because you already submitted. Scroll up to use the resubmit email link if you need to send an update."
+                )
+
+            st.markdown(
+                textwrap.dedent(
+                    f"""📌 How to Submit
+
+                        1) Check you’re on the correct page: **Level {student_level} • Day {info['day']} • Chapter {info['chapter']}**.
+                        2) Tick the two confirmations below.
+                        3) Click **Confirm & Submit**.
+                        4) Your box will lock (read-only).
+                        _You’ll get an **email** when it’s marked. See **Results & Resources** for scores & feedback._
+                        """
+                )
+            )
+
+            col1, col2 = st.columns([1, 1.2])
+            success_notice = st.session_state.pop(success_notice_key, None)
+            with col1:
+                st.markdown("#### 🧾 Finalize")
+                if success_notice:
+                    success_msg = success_notice.get("message")
+                    caption_msg = success_notice.get("caption")
+                    if success_msg:
+                        st.success(success_msg)
+                    if caption_msg:
+                        st.caption(caption_msg)
+                if locked_warning_message:
+                    st.warning(locked_warning_message)
+                confirm_final = st.checkbox(
+                    f"I confirm this is my complete work for Level {student_level} • Day {info['day']} • Chapter {info['chapter']}.",
+                    key=f"confirm_final_{lesson_key}",
+                    disabled=locked_ui
+                )
+                confirm_lock = st.checkbox(
+                    "I understand it will be locked after I submit.",
+                    key=f"confirm_lock_{lesson_key}",
+                    disabled=locked_ui
+                )
+                can_submit = (
+                    confirm_final
+                    and confirm_lock
+                    and (not locked_ui)
+                )
+
+            with col2:
+                st.markdown("#### 🔍 Live Preview")
+                preview_text = st.session_state.get(draft_key, "") or ""
+                word_count = len(preview_text.split()) if preview_text else 0
+                if preview_text.strip():
+                    st.caption(f"Word count: {word_count}")
+                    preview_box = (
+                        "<div style=\"max-height:360px;overflow:auto;padding:12px;border:1px solid #e2e8f0;"
+                        "border-radius:8px;background:#f8fafc;white-space:pre-wrap;line-height:1.5;\">"
+                        f"{html.escape(preview_text)}"
+                        "</div>"
+                    )
+                    st.markdown(preview_box, unsafe_allow_html=True)
+                else:
+                    st.info("Draft preview will appear here once you start typing.")
+                    st.caption("Word count: 0")
+
+            submit_in_progress = st.session_state.get(submit_in_progress_key, False)
+
+            with col1:
+                if st.button(
+                    "✅ Confirm & Submit",
+                    type="primary",
+                    disabled=(not can_submit) or submit_in_progress,
+                ):
+                    st.session_state[submit_in_progress_key] = True
+                    
+                    try:
+
+                        # 1) Try to acquire the lock first
+                        got_lock = acquire_lock(student_level, code, lesson_key)
+
+                        # If lock exists already, check whether a submission exists; if yes, reflect lock and rerun.
+                        if not got_lock:
+                            if has_existing_submission(student_level, code, lesson_key):
+                                st.session_state[locked_key] = True
+                                st.warning("You have already submitted this assignment. It is locked.")
+                                refresh_with_toast()
+                            else:
+                                st.info("Found an old lock without a submission — recovering and submitting now…")
+
+                        posts_ref = db.collection("submissions").document(student_level).collection("posts")
+
+                        # 2) Pre-create doc (avoids add() tuple-order mismatch)
+                        doc_ref = posts_ref.document()  # auto-ID now available
+                        short_ref = f"{doc_ref.id[:8].upper()}-{info['day']}"
+
+                        payload = {
+                            "student_code": code,
+                            "student_name": name or "Student",
+                            "student_email": email,
+                            "level": student_level,
+                            "day": info["day"],
+                            "chapter": chapter_name,
+                            "lesson_key": lesson_key,
+                            "answer": (st.session_state.get(draft_key, "") or "").strip(),
+                            "status": "submitted",
+                            "receipt": short_ref,  # persist receipt immediately
+                            "created_at": firestore.SERVER_TIMESTAMP,
+                            "updated_at": firestore.SERVER_TIMESTAMP,
+                            "version": 1,
+                        }
+
+                        saved_ok = False
+
+                        # Archive the draft so it won't rehydrate again (drafts_v2)
+                        try:
+
+                            doc_ref.set(payload)  # write the submission
+                            saved_ok = True
+                            st.caption(f"Saved to: `{doc_ref.path}`")  # optional debug
+                        except Exception as e:
+                            st.error(f"Could not save submission: {e}")
+
+                        if saved_ok:
+                            # 3) Success: lock UI, remember receipt, archive draft, notify, rerun
+                            st.session_state[locked_key] = True
+                            st.session_state[f"{lesson_key}__receipt"] = short_ref
+
+                            success_msg = (
+                                f"Well done, {name or 'Student'}! Remember the pass mark is 60, "
+                                "and if you score below that you must revisit this Submit page to try again."
+                            )
+                            caption_msg = (
+                                f"Receipt: `{short_ref}` • Marks will arrive by email and via "
+                                "Telegram from @falowenbot. See **Results & Resources** for scores & feedback."
+                            )
+                            st.success(success_msg)
+                            st.caption(caption_msg)
+                            st.session_state[success_notice_key] = {
+                                "message": success_msg,
+                                "caption": caption_msg,
+                            }
+                            row = st.session_state.get("student_row") or {}
+                            tg_subscribed = bool(
+                                row.get("TelegramChatID")
+                                or row.get("telegram_chat_id")
+                                or row.get("Telegram")
+                                or row.get("telegram")
+                            )
+                            if not tg_subscribed:
+                                try:
+                                    tg_subscribed = has_telegram_subscription(code)
+                                except Exception:
+                                    tg_subscribed = False
+                            if tg_subscribed:
+                                st.info("You'll also receive a Telegram notification when your score is posted.")
+                            else:
+                                with st.expander("🔔 Subscribe to Telegram notifications", expanded=False):
+                                    st.markdown(
+                                        "\n".join(
+                                            [
+                                                "1. Search for **@falowenbot** on Telegram and open the chat.",
+                                                "2. Tap **Start**, then follow the prompts to connect your account so you can receive your marks.",
+                                                "3. To deactivate: send `/stop`",
+                                            ]
+                                        )
+                                    )
+                            answer_text = st.session_state.get(draft_key, "").strip()
+                            MIN_WORDS = 20
+
+                            st.session_state[f"{lesson_key}__needs_resubmit"] = (
+                                len(answer_text.split()) < MIN_WORDS
+                            )
+
+
+                            # Archive the draft so it won't rehydrate again (drafts_v2)
+                            try:
+                                _draft_doc_ref(student_level, lesson_key, code).set(
+                                    {"status": "submitted", "archived_at": firestore.SERVER_TIMESTAMP}, merge=True
+                                )
+                            except Exception:
+                                pass
+
+                            # Notify Slack (best-effort)
+                            webhook = get_slack_webhook()
+                            if webhook:
+                                notify_slack_submission(
+                                    webhook_url=webhook,
+                                    student_name=name or "Student",
+                                    student_code=code,
+                                    level=student_level,
+                                    day=info["day"],
+                                    chapter=chapter_name,
+                                    receipt=short_ref,
+                                    preview=st.session_state.get(draft_key, "")
+                                )
+
+                            # Rerun so hydration path immediately shows locked view
+                            refresh_with_toast(
+                                "Submission saved! Remember you need at least 60 points to pass."
+                            )
+                        else:
+                            # 4) Failure: remove the lock doc so student can retry cleanly
+                            try:
+                                db.collection("submission_locks").document(lock_id(student_level, code, lesson_key)).delete()
+                            except Exception:
+                                pass
+                            st.warning("Submission not saved. Please fix the issue and try again.")
+                    finally:
+                        st.session_state[submit_in_progress_key] = False
+                        st.markdown("**The End**")
+
+
+
+
+if cb_subtab == "🧑‍🏫 Classroom":
+    # --- Classroom banner (top of subtab) ---
+    st.markdown(
+        '''
+            <div style="
+                padding: 16px;
+                background: #0ea5e9;
+                color: #ffffff;
+                border-radius: 8px;
+                text-align: center;
+                margin-bottom: 16px;
+                box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+            ">
+                <span style="font-size:1.8rem; font-weight:600;">🧑‍🏫 Classroom</span>
+            </div>
+            ''',
+        unsafe_allow_html=True
+    )
+    st.divider()
+
+    # ---------- Shared helpers & imports used across tabs ----------
+    import math
+    import os
+    import io
+    import re
+    import json
+    import hashlib
+    import pandas as pd
+    import requests
+    from uuid import uuid4
+    from datetime import datetime as _dt, timedelta as _td
+    import urllib.parse as _urllib
+    try:
+        import streamlit.components.v1 as components
+    except Exception:
+        components = None
+
+    student_row   = st.session_state.get("student_row") or {}
+    student_code  = _safe_str(student_row.get("StudentCode"), "demo001")
+    student_name  = _safe_str(student_row.get("Name"), "Student")
+    student_level = _safe_upper(student_row.get("Level"), "A1")
+    if student_code == "demo001":
+        _show_missing_code_warning(name=student_name, level=student_level)
+    class_name    = _safe_str(student_row.get("ClassName")) or f"{student_level} General"
+
+    ADMINS = set()
+    try:
+        ADMINS = set(st.secrets["roles"]["admins"])
+    except Exception:
+        pass
+    ADMINS |= ADMINS_BY_LEVEL.get(student_level, set())
+    IS_ADMIN = student_code in ADMINS
+
+    # ---------- slack helper (use global notify_slack if present; else env/secrets) ----------
+    def _notify_slack(*parts: str):
+        text = "".join(parts)
+        try:
+            fn = globals().get("notify_slack")
+            if callable(fn):
+                try:
+                    fn(text)
+                    return
+                except Exception:
+                    pass
+            url = (os.getenv("SLACK_WEBHOOK_URL") or
+                   (st.secrets.get("slack", {}).get("webhook_url", "") if hasattr(st, "secrets") else "")).strip()
+            if url:
+                try:
+                    requests.post(url, json={"text": text}, timeout=6)
+                except Exception:
+                    pass
+        except Exception:
+            pass
+
+    def _ukey(base: str) -> str:
+        # unique widget key per class (prevents duplicate-key crashes)
+        seed = f"{base}|{class_name}"
+        return f"{base}_{hashlib.md5(seed.encode()).hexdigest()[:8]}"
+
+
+    # ---------- MINI-TABS INSIDE 'CLASSROOM' (radio style) ----------
+    if "classroom_page" not in st.session_state:
+        st.session_state["classroom_page"] = "Calendar"
+    if "classroom_prev_page" not in st.session_state:
+        st.session_state["classroom_prev_page"] = st.session_state["classroom_page"]
+
+    def on_classroom_page_change() -> None:
+        prev = st.session_state.get("classroom_prev_page")
+        curr = st.session_state.get("classroom_page")
+        st.session_state["classroom_prev_page"] = curr
+
+    classroom_section = st.radio(
+        "Classroom section",
+        [
+            "Calendar",
+            "Join on Zoom",
+            "Members & Profile",
+            "Class Notes & Q&A",
+            "Attendance",
+        ],
+        horizontal=True,
+        key="classroom_page",
+        on_change=on_classroom_page_change,
+    )
+
+            # ===================== CALENDAR =====================
+    if classroom_section == "Calendar":
+        # Banner
+        st.markdown(
+            '''
+                <div style="
+                    padding: 12px;
+                    background: #0ea5e9;
+                    color: #ffffff;
+                    border-radius: 8px;
+                    text-align: center;
+                    margin-bottom: 12px;
+                    box-shadow: 0 2px 6px rgba(0,0,0,0.08);
+                    font-weight: 600;
+                ">
+                    <span style="font-size:1.2rem;">📅 Calendar</span>
+                    <div style="font-weight:500; font-size:0.98rem; margin-top:2px;">
+                        Download the full course schedule or add reminders to your phone.
+                    </div>
+                </div>
+                ''',
+            unsafe_allow_html=True
+        )
+        st.divider()
+
+        # Try dateutil if available; fall back gracefully.
+        try:
+            from dateutil import parser as _dateparse
+        except Exception:
+            _dateparse = None
+
+        # -------- group schedule config (global/secrets/firestore/fallback) --------
+        def _load_group_schedules():
+            if not st.session_state.get("student_level"):
+                ensure_student_level()
+            # 1) global
+            cfg = globals().get("GROUP_SCHEDULES")
+            if isinstance(cfg, dict) and cfg:
+                return cfg
+            # 2) session_state
+            cfg = st.session_state.get("GROUP_SCHEDULES")
+            if isinstance(cfg, dict) and cfg:
+                globals()["GROUP_SCHEDULES"] = cfg
+                return cfg
+            # 3) secrets
+            try:
+                raw = st.secrets.get("group_schedules", None)
+                if raw:
+                    cfg = json.loads(raw) if isinstance(raw, str) else raw
+                    if isinstance(cfg, dict) and cfg:
+                        st.session_state["GROUP_SCHEDULES"] = cfg
+                        globals()["GROUP_SCHEDULES"] = cfg
+                        return cfg
+            except Exception:
+                pass
+            # 4) Firestore (optional)
+            try:
+                doc = db.collection("config").document("group_schedules").get()
+                if doc and getattr(doc, "exists", False):
+                    data = doc.to_dict() or {}
+                    cfg = data.get("data", data)
+                    if isinstance(cfg, dict) and cfg:
+                        st.session_state["GROUP_SCHEDULES"] = cfg
+                        globals()["GROUP_SCHEDULES"] = cfg
+                        return cfg
+            except Exception:
+                pass
+                
+            # 5) Shared fallback from module
+            cfg = load_group_schedules()
+            st.session_state["GROUP_SCHEDULES"] = cfg
+            globals()["GROUP_SCHEDULES"] = cfg
+            return cfg
+
+        def _gdrive_direct_download(url: str) -> Optional[bytes]:
+            if not url:
+                return None
+            m = re.search(r"/file/d/([A-Za-z0-9_-]{20,})/", url) or re.search(r"[?&]id=([A-Za-z0-9_-]{20,})", url)
+            file_id = m.group(1) if m else None
+            if not file_id:
+                return None
+            dl = f"https://drive.google.com/uc?export=download&id={file_id}"
+            try:
+                r = requests.get(dl, timeout=15)
+                if r.status_code == 200 and r.content:
+                    if b"uc-download-link" in r.content[:4000] and b"confirm" in r.content[:4000]:
+                        return None
+                    return r.content
+            except Exception:
+                pass
+            return None
+
+        def _extract_text_from_pdf(pdf_bytes: bytes) -> str:
+            from src.pdf_handling import extract_text_from_pdf
+            return extract_text_from_pdf(pdf_bytes)
+
+        _DATE_PATTERNS = [
+            r"\b(20\d{2}-\d{2}-\d{2})\b",
+            r"\b(\d{1,2}/\d{1,2}/20\d{2})\b",
+            r"\b(\d{1,2}\s+(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\s+20\d{2})\b",
+            r"\b((Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec)[a-z]*\s+\d{1,2},\s*20\d{2})\b",
+        ]
+
+        def _parse_any_date(raw: str):
+            if _dateparse:
+                for dayfirst in (False, True):
+                    try:
+                        return _dateparse.parse(raw, dayfirst=dayfirst, fuzzy=True).date()
+                    except Exception:
+                        pass
+            for fmt in ("%Y-%m-%d", "%d %b %Y", "%b %d, %Y", "%m/%d/%Y", "%d/%m/%Y"):
+                try:
+                    return _dt.strptime(raw, fmt).date()
+                except Exception:
+                    pass
+            return None
+
+        def _find_dates_in_text(txt: str):
+            found = []
+            if not txt:
+                return found
+            for pat in _DATE_PATTERNS:
+                for m in re.finditer(pat, txt, flags=re.IGNORECASE):
+                    d = _parse_any_date(m.group(1))
+                    if d:
+                        found.append(d)
+            uniq = []
+            seen = set()
+            for d in sorted(found):
+                if d not in seen:
+                    seen.add(d)
+                    uniq.append(d)
+            return uniq
+
+        def infer_start_end_from_doc(doc_url: str):
+            pdf_bytes = _gdrive_direct_download(doc_url)
+            if not pdf_bytes:
+                return None, None
+            text = _extract_text_from_pdf(pdf_bytes)
+            dates = _find_dates_in_text(text)
+            if len(dates) >= 2:
+                return dates[0], dates[-1]
+            if len(dates) == 1:
+                return dates[0], None
+            return None, None
+
+        GROUP_SCHEDULES = _load_group_schedules()
+
+        class_cfg   = GROUP_SCHEDULES.get(class_name, {})
+        days        = class_cfg.get("days", [])
+        time_str    = class_cfg.get("time", "")
+        start_str   = class_cfg.get("start_date", "")
+        end_str     = class_cfg.get("end_date", "")
+        doc_url     = class_cfg.get("doc_url", "")
+
+        start_date_obj = None
+        end_date_obj   = None
+        try:
+            if start_str:
+                start_date_obj = _dt.strptime(start_str, "%Y-%m-%d").date()
+        except Exception:
+            pass
+        try:
+            if end_str:
+                end_date_obj = _dt.strptime(end_str, "%Y-%m-%d").date()
+        except Exception:
+            pass
+
+        _inferred_start = _inferred_end = False
+        if (not start_date_obj or not end_date_obj) and doc_url:
+            s, e = infer_start_end_from_doc(doc_url)
+            if s and not start_date_obj:
+                start_date_obj = s; _inferred_start = True
+            if e and not end_date_obj:
+                end_date_obj = e; _inferred_end = True
+
+        if not (start_date_obj and end_date_obj and isinstance(time_str, str) and time_str.strip() and days):
+            st.warning("This class doesn’t have a full calendar setup yet. Please contact the office.", icon="⚠️")
+        else:
+            _note_bits = []
+            if _inferred_start or _inferred_end:
+                _note_bits.append("dates inferred from the schedule document")
+            _note = f" ({', '.join(_note_bits)})" if _note_bits else ""
+            st.info(
+                f"**Course period:** {start_date_obj.strftime('%d %b %Y')} → {end_date_obj.strftime('%d %b %Y')}{_note}",
+                icon="📅",
+            )
+
+            _WKD_ORDER = ["MO","TU","WE","TH","FR","SA","SU"]
+            _FULL_TO_CODE = {
+                "monday":"MO","tuesday":"TU","wednesday":"WE","thursday":"TH","friday":"FR","saturday":"SA","sunday":"SU",
+                "mon":"MO","tue":"TU","tues":"TU","wed":"WE","thu":"TH","thur":"TH","thurs":"TH","fri":"FR","sat":"SA","sun":"SU"
+            }
+            DEFAULT_AMPM = "pm"
+
+            def _normalize_time_groups(s: str) -> str:
+                s = (s or "").strip()
+                s = s.replace("–", "-").replace("—", "-")
+                s = re.sub(
+                    r"(?i)\b(mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\s*(\d)",
+                    r"\1: \2",
+                    s,
+                )
+                return s
+
+            def _to_24h(h, m, ampm):
+                h = int(h); m = int(m); ap = (ampm or "").lower()
+                if ap == "pm" and h != 12: h += 12
+                if ap == "am" and h == 12: h = 0
+                return h, m
+
+            def _parse_time_component_relaxed(s, default_ampm=DEFAULT_AMPM):
+                s = (s or "").strip().lower()
+                m = re.match(r"^(\d{1,2})(?::(\d{2}))?\s*(am|pm)?$", s)
+                if not m: return None
+                hh = int(m.group(1)); mm = int(m.group(2) or 0); ap = m.group(3)
+                if ap:
+                    return _to_24h(hh, mm, ap)
+                if 0 <= hh <= 23:
+                    if hh <= 12 and default_ampm in ("am","pm"):
+                        return _to_24h(hh, mm, default_ampm)
+                    return (hh, mm)
+                return None
+
+            def _parse_time_range_relaxed(rng, default_ampm=DEFAULT_AMPM):
+                rng = (rng or "").strip().lower().replace("–","-").replace("—","-")
+                parts = [p.strip() for p in rng.split("-", 1)]
+                if len(parts) != 2: return None
+                a = _parse_time_component_relaxed(parts[0], default_ampm=default_ampm)
+                if not a: return None
+                ap_hint = re.search(r"(am|pm)\s*$", parts[0])
+                second_default = ap_hint.group(1) if ap_hint else default_ampm
+                b = _parse_time_component_relaxed(parts[1], default_ampm=second_default)
+                return (a, b) if b else None
+
+            def _expand_day_token(tok):
+                tok = (tok or "").strip().lower().replace("–","-").replace("—","-")
+                if "-" in tok:
+                    a, b = [t.strip() for t in tok.split("-", 1)]
+                    a_code = _FULL_TO_CODE.get(a, ""); b_code = _FULL_TO_CODE.get(b, "")
+                    if a_code and b_code:
+                        ai = _WKD_ORDER.index(a_code); bi = _WKD_ORDER.index(b_code)
+                        return _WKD_ORDER[ai:bi+1] if ai <= bi else _WKD_ORDER[ai:] + _WKD_ORDER[:bi+1]
+                    return []
+                c = _FULL_TO_CODE.get(tok, "")
+                return [c] if c else []
+
+            def _parse_time_blocks(time_str, days_list):
+                s = _normalize_time_groups(time_str)
+                blocks = []
+                if ":" in s:
+                    groups = [g.strip() for g in s.split(",") if g.strip()]
+                    for g in groups:
+                        if ":" not in g:
+                            continue
+                        left, right = [x.strip() for x in g.split(":", 1)]
+                        day_tokens = re.split(r"/", left)
+                        codes = []
+                        for tok in day_tokens:
+                            codes.extend(_expand_day_token(tok))
+                        tr = _parse_time_range_relaxed(right)
+                        if codes and tr:
+                            (sh, sm), (eh, em) = tr
+                            blocks.append({
+                                "byday": sorted(set(codes), key=_WKD_ORDER.index),
+                                "start": (sh, sm), "end": (eh, em)
+                            })
+                    return blocks
+                tr = _parse_time_range_relaxed(s)
+                if not tr:
+                    return []
+                (sh, sm), (eh, em) = tr
+                codes = []
+                for d in (days_list or []):
+                    c = _FULL_TO_CODE.get(str(d).lower().strip(), "")
+                    if c: codes.append(c)
+                codes = sorted(set(codes), key=_WKD_ORDER.index) or _WKD_ORDER[:]
+                return [{"byday": codes, "start": (sh, sm), "end": (eh, em)}]
+
+            def _next_on_or_after(d, weekday_index):
+                delta = (weekday_index - d.weekday()) % 7
+                return d + _td(days=delta)
+
+            _blocks = _parse_time_blocks(time_str, days)
+            if not _blocks and (days and str(time_str or "").strip()):
+                tr_fallback = _parse_time_range_relaxed(str(time_str))
+                if tr_fallback:
+                    (sh, sm), (eh, em) = tr_fallback
+                    codes = []
+                    for d in (days or []):
+                        c = _FULL_TO_CODE.get(str(d).lower().strip(), "")
+                        if c: codes.append(c)
+                    if codes:
+                        codes = sorted(set(codes), key=_WKD_ORDER.index)
+                        _blocks = [{"byday": codes, "start": (sh, sm), "end": (eh, em)}]
+
+            # === Next class countdown ======================
+            def _compute_next_class_instance(now_utc: _dt):
+                if not _blocks:
+                    return None, None, ""
+                _wmap = {"MO":0,"TU":1,"WE":2,"TH":3,"FR":4,"SA":5,"SU":6}
+                best = None
+                cur = max(start_date_obj, now_utc.date())
+                while cur <= end_date_obj:
+                    widx = cur.weekday()
+                    for blk in _blocks:
+                        if any(_wmap[c] == widx for c in blk["byday"]):
+                            sh, sm = blk["start"]; eh, em = blk["end"]
+                            sdt = _dt(cur.year, cur.month, cur.day, sh, sm, tzinfo=_timezone.utc)   # Ghana == UTC
+                            edt = _dt(cur.year, cur.month, cur.day, eh, em, tzinfo=_timezone.utc)
+                            if edt <= now_utc:
+                                continue
+                            def _fmt_ampm(h, m):
+                                ap = "AM" if h < 12 else "PM"
+                                hh = h if 1 <= h <= 12 else (12 if h % 12 == 0 else h % 12)
+                                return f"{hh}:{m:02d}{ap}"
+                            label = f"{cur.strftime('%a %d %b')} • {_fmt_ampm(sh, sm)}–{_fmt_ampm(eh, em)}"
+                            cand = (sdt, edt, label)
+                            if (best is None) or (sdt < best[0]):
+                                best = cand
+                    cur += _td(days=1)
+                return best if best else (None, None, "")
+
+            def _human_delta_ms(ms: int) -> str:
+                s = max(0, ms // 1000)
+                d, r = divmod(s, 86400)
+                h, r = divmod(r, 3600)
+                m, _ = divmod(r, 60)
+                parts = []
+                if d: parts.append(f"{d}d")
+                if h: parts.append(f"{h}h")
+                if (d == 0) and (m or not parts):
+                    parts.append(f"{m}m")
+                return " ".join(parts) if parts else "0m"
+
+            _now = _dt.now(_timezone.utc)
+            nxt_start, nxt_end, nxt_label = _compute_next_class_instance(_now)
+            next_topic_label: Optional[str] = None
+            next_session_items: List[str] = []
+            if nxt_start and class_name:
+                next_session_info = None
+                try:
+                    next_session_info = session_details_for_date(
+                        class_name,
+                        nxt_start.date(),
+                    )
+                except Exception:
+                    next_session_info = None
+
+                if next_session_info:
+                    next_session_items = [
+                        str(item).strip()
+                        for item in next_session_info.get("sessions") or []
+                        if isinstance(item, str) and item.strip()
+                    ]
+                    day_number = next_session_info.get("day_number")
+                    summary = " • ".join(next_session_items)
+                    if summary:
+                        if isinstance(day_number, int):
+                            next_topic_label = f"Day {day_number} — {summary}"
+                        else:
+                            next_topic_label = summary
+
+                if not next_topic_label:
+                    try:
+                        next_topic_label = session_summary_for_date(
+                            class_name,
+                            nxt_start.date(),
+                        )
+                    except Exception:
+                        next_topic_label = None
+            if nxt_start and nxt_end:
+                start_ms = int(nxt_start.timestamp() * 1000)
+                now_ms   = int(_now.timestamp() * 1000)
+                time_left_label = _human_delta_ms(start_ms - now_ms) if now_ms < start_ms else "now"
+                display_label = nxt_label
+                if next_topic_label:
+                    display_label = f"{nxt_label} — {next_topic_label}"
+                info_bits = [
+                    f"**Next class:** {display_label}",
+                    f"**Starts in:** {time_left_label}",
+                ]
+                st.info("  •  ".join(info_bits), icon="⏰")
+                if next_session_items:
+                    agenda_lines = "\n".join(f"- {item}" for item in next_session_items)
+                    st.markdown(
+                        "**This class covers:**\n\n" + agenda_lines
+                    )
+                if components:
+                    components.html(
+                        f"""
+                            <div id="nextCount" style="margin:6px 0 2px;color:#0f172a;font-weight:600;"></div>
+                            <script>
+                              (function(){{
+                                const startMs = {start_ms};
+                                const el = document.getElementById('nextCount');
+                                function tick(){{
+                                  const now = Date.now();
+                                  if (now >= startMs) {{
+                                    el.textContent = "Class is LIVE or started.";
+                                  }} else {{
+                                    const diff = startMs - now;
+                                    const s = Math.floor(diff/1000);
+                                    const d = Math.floor(s/86400);
+                                    const h = Math.floor((s%86400)/3600);
+                                    const m = Math.floor((s%3600)/60);
+                                    const sec = s % 60;
+                                    let txt = "Starts in: ";
+                                    if (d) txt += d + "d ";
+                                    if (h) txt += h + "h ";
+                                    if (d || h) {{
+                                      txt += m + "m";
+                                    }} else {{
+                                      txt += m + "m " + sec + "s";
+                                    }}
+                                    el.textContent = txt;
+                                  }}
+                                  setTimeout(tick, 1000);
+                                }}
+                                tick();
+                              }})();
+                            </script>
+                            """,
+                        height=28,
+                    )
+
+            # ================= ICS BUILD (full course) =================
+            ZOOM = {
+                "link": (st.secrets.get("zoom", {}).get("link", "") if hasattr(st, "secrets") else "") or "https://zoom.us",
+                "meeting_id": (st.secrets.get("zoom", {}).get("meeting_id", "") if hasattr(st, "secrets") else "") or "",
+                "passcode": (st.secrets.get("zoom", {}).get("passcode", "") if hasattr(st, "secrets") else "") or "",
+            }
+            _zl = (ZOOM or {}).get("link", "")
+            _zid = (ZOOM or {}).get("meeting_id", "")
+            _zpw = (ZOOM or {}).get("passcode", "")
+            _details = f"Zoom link: {_zl}\\nMeeting ID: {_zid}\\nPasscode: {_zpw}"
+            _dtstamp = _dt.now(_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            _until = _dt(end_date_obj.year, end_date_obj.month, end_date_obj.day, 23, 59, 59, tzinfo=_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            _summary = f"{class_name} — Live German Class"
+
+            USE_TZID = False
+            TZID = "Africa/Accra"
+
+            _ics_lines = [
+                "BEGIN:VCALENDAR","VERSION:2.0","PRODID:-//Falowen//Course Scheduler//EN",
+                "CALSCALE:GREGORIAN","METHOD:PUBLISH",
+            ]
+
+            if not _blocks:
+                _start_dt = _dt(start_date_obj.year, start_date_obj.month, start_date_obj.day, 18, 0)
+                _end_dt   = _dt(start_date_obj.year, start_date_obj.month, start_date_obj.day, 19, 0)
+                if USE_TZID:
+                    dtfmt = "%Y%m%dT%H%M%S"
+                    dtstart_line = f"DTSTART;TZID={TZID}:{_start_dt.strftime(dtfmt)}"
+                    dtend_line   = f"DTEND;TZID={TZID}:{_end_dt.strftime(dtfmt)}"
+                else:
+                    dtstart_line = f"DTSTART:{_start_dt.strftime('%Y%m%dT%H%M%SZ')}"
+                    dtend_line   = f"DTEND:{_end_dt.strftime('%Y%m%dT%H%M%SZ')}"
+                _ics_lines += [
+                    "BEGIN:VEVENT",
+                    f"UID:{uuid4()}@falowen",
+                    f"DTSTAMP:{_dtstamp}",
+                    dtstart_line,
+                    dtend_line,
+                    f"SUMMARY:{_summary}",
+                    f"DESCRIPTION:{_details}",
+                    f"URL:{_zl}",
+                    "LOCATION:Zoom",
+                    "BEGIN:VALARM","ACTION:DISPLAY","DESCRIPTION:Class starts soon","TRIGGER:-PT15M","END:VALARM",
+                    "END:VEVENT",
+                ]
+            else:
+                for blk in _blocks:
+                    byday_codes = blk["byday"]
+                    sh, sm = blk["start"]; eh, em = blk["end"]
+                    _wmap = {"MO":0,"TU":1,"WE":2,"TH":3,"FR":4,"SA":5,"SU":6}
+                    first_dates = []
+                    for code in byday_codes:
+                        widx = _wmap[code]
+                        first_dates.append(_next_on_or_after(start_date_obj, widx))
+                    first_date = min(first_dates)
+                    dt_start = _dt(first_date.year, first_date.month, first_date.day, sh, sm)
+                    dt_end   = _dt(first_date.year, first_date.month, first_date.day, eh, em)
+
+                    if USE_TZID:
+                        dtfmt = "%Y%m%dT%H%M%S"
+                        dtstart_line = f"DTSTART;TZID={TZID}:{dt_start.strftime(dtfmt)}"
+                        dtend_line   = f"DTEND;TZID={TZID}:{dt_end.strftime(dtfmt)}"
+                    else:
+                        dtstart_line = f"DTSTART:{dt_start.strftime('%Y%m%dT%H%M%SZ')}"
+                        dtend_line   = f"DTEND:{dt_end.strftime('%Y%m%dT%H%M%SZ')}"
+
+                    _ics_lines += [
+                        "BEGIN:VEVENT",
+                        f"UID:{uuid4()}@falowen",
+                        f"DTSTAMP:{_dtstamp}",
+                        dtstart_line,
+                        dtend_line,
+                        f"RRULE:FREQ=WEEKLY;BYDAY={','.join(byday_codes)};UNTIL={_until}",
+                        f"SUMMARY:{_summary}",
+                        f"DESCRIPTION:{_details}",
+                        f"URL:{_zl}",
+                        "LOCATION:Zoom",
+                        "BEGIN:VALARM","ACTION:DISPLAY","DESCRIPTION:Class starts soon","TRIGGER:-PT15M","END:VALARM",
+                        "END:VEVENT",
+                    ]
+
+            _ics_lines.append("END:VCALENDAR")
+            _course_ics = "\n".join(_ics_lines)
+
+            c1, c2 = st.columns([1, 1])
+            with c1:
+                st.download_button(
+                    "⬇️ Download full course (.ics)",
+                    data=_course_ics,
+                    file_name=f"{class_name.replace(' ', '_')}_course.ics",
+                    mime="text/calendar",
+                    key=_ukey("dl_course_ics"),
+                )
+            with c2:
+                st.caption("Calendar created. Use the download button to import the full course.")
+
+            # --- Quick Android repeat links ---
+            _gcal_repeat_links = []
+            try:
+                if _blocks:
+                    _wmap = {"MO":0,"TU":1,"WE":2,"TH":3,"FR":4,"SA":5,"SU":6}
+                    _code_to_pretty = {"MO":"Mon","TU":"Tue","WE":"Wed","TH":"Thu","FR":"Fri","SA":"Sat","SU":"Sun"}
+
+                    def _fmt_time(h, m):
+                        ap = "AM" if h < 12 else "PM"
+                        hh = h if 1 <= h <= 12 else (12 if h % 12 == 0 else h % 12)
+                        return f"{hh}:{m:02d}{ap}"
+
+                    for blk in _blocks:
+                        byday_codes = blk["byday"]
+                        sh, sm = blk["start"]; eh, em = blk["end"]
+
+                        first_dates = []
+                        for code in byday_codes:
+                            widx = _wmap[code]
+                            first_dates.append(_next_on_or_after(start_date_obj, widx))
+                        first_date = min(first_dates)
+
+                        _start_dt = _dt(first_date.year, first_date.month, first_date.day, sh, sm)
+                        _end_dt   = _dt(first_date.year, first_date.month, first_date.day, eh, em)
+                        _start_str = _start_dt.strftime("%Y%m%dT%H%M%SZ")
+                        _end_str   = _end_dt.strftime("%Y%m%dT%H%M%SZ")
+
+                        _until = _dt(end_date_obj.year, end_date_obj.month, end_date_obj.day, 23, 59, 59).strftime("%Y%m%dT%H%M%SZ")
+                        _rrule = f"RRULE:FREQ=WEEKLY;BYDAY={','.join(byday_codes)};UNTIL={_until}"
+
+                        _days_pretty = "/".join(_code_to_pretty[c] for c in byday_codes)
+                        _label = f"{_days_pretty} {_fmt_time(sh, sm)}–{_fmt_time(eh, em)}"
+
+                        _recur_url = (
+                            "https://calendar.google.com/calendar/render"
+                            f"?action=TEMPLATE"
+                            f"&text={_urllib.quote(_summary)}"
+                            f"&dates={_start_str}/{_end_str}"
+                            f"&details={_urllib.quote(_details)}"
+                            f"&location={_urllib.quote('Zoom')}"
+                            f"&ctz={_urllib.quote('Africa/Accra')}"
+                            f"&recur={_urllib.quote(_rrule)}"
+                            f"&sf=true"
+                        )
+                        _gcal_repeat_links.append((_label, _recur_url))
+            except Exception:
+                _gcal_repeat_links = []
+
+            if _gcal_repeat_links:
+                _items = "".join(
+                    f"<li style='margin:4px 0;'><a href='{url.replace('&','&amp;')}' target='_blank'>Tap here: {lbl}</a></li>"
+                    for (lbl, url) in _gcal_repeat_links
+                )
+                _phone_links_ul = f"<ul style='margin:6px 0 0 18px;padding:0;'>{_items}</ul>"
+            else:
+                _phone_links_ul = (
+                    "<div style='margin:6px 0 0 2px;color:#444;'>"
+                    "No repeating blocks are set yet. Ask the office to add your class times."
+                    "</div>"
+                )
+
+            st.markdown(
+                f"""
+                    **Computer or iPhone:** Download the **.ics** above and install.
+                    - **Computer (Google Calendar web):** calendar.google.com → **Settings** → **Import & export** → **Import**.
+                    - **iPhone (Apple Calendar via iCloud.com):**
+                        1. Tap Download full course (.ics)** above and save the file to your device (Files app → iCloud Drive/Downloads).
+                        2. Open Safari → iCloud.com → sign in with your Apple ID.
+                        3. In iCloud Drive, locate the downloaded calendar file and tap it. If it doesn’t open, re-download it from this page and try again.
+                        4. Choose **Calendar** when prompted, then tap **Add All** to import the events.
+
+                    **Android (Google Calendar app):** The app **can’t import `.ics`**. Use these links (**with repeat**):
+                    {_phone_links_ul}
+                    <div style="margin:8px 0 0 2px;"></div>
+                    """,
+                unsafe_allow_html=True,
+            )
+
+    # ===================== ATTENDANCE =====================
+    elif classroom_section == "Attendance":
+        with st.container():
+            st.markdown(
+                """
+                    <div style="
+                        padding:10px 12px;
+                        background:#f0f9ff;
+                        border:1px solid #bae6fd;
+                        border-radius:12px;
+                        margin: 6px 0 8px 0;
+                        display:flex;align-items:center;gap:8px;">
+                      <span style="font-size:1.05rem;">📊 <b>Attendance</b></span>
+                    </div>
+                    """,
+                unsafe_allow_html=True,
+            )
+            records, sessions_attended, hours_invested = load_attendance_records(
+                student_code, class_name
+            )
+            cols = st.columns(2)
+            cols[0].metric("Attended sessions", sessions_attended)
+            cols[1].metric("Invested hours", f"{hours_invested:.1f}")
+            if records:
+                df_att = pd.DataFrame(records)
+                df_att["Present"] = df_att.pop("present").map({True: "✓", False: ""})
+                df_att.rename(columns={"session": "Session"}, inplace=True)
+                st.dataframe(
+                    df_att,
+                    width="stretch",
+                    hide_index=True,
+                )
+            else:
+                st.info("No attendance records found yet.")
+
+    # ===================== MEMBERS & PROFILE =====================
+    elif classroom_section == "Members & Profile":
+        # Subtle hint banner
+        st.markdown(
+            """
+                <div style="
+                    padding:10px 12px;
+                    background:#f0f9ff;
+                    border:1px solid #bae6fd;
+                    border-radius:12px;
+                    margin: 6px 0 8px 0;
+                    display:flex;align-items:center;gap:8px;">
+                  <span style="font-size:1.05rem;">👥 <b>Class Members</b></span>
+                </div>
+                """,
+            unsafe_allow_html=True,
+        )
+        with st.container():
+            try:
+                df_students = load_student_data()
+            except Exception:
+                df_students = pd.DataFrame()
+            if df_students is None:
+                df_students = pd.DataFrame()
+
+            same_class = pd.DataFrame(
+                get_roster_index(df_students).class_members(class_name)
+            )
+            for col in (
+                "ClassName",
+                "Name",
+                "Email",
+                "Location",
+                "StudentCode",
+            ):
+                if col not in same_class.columns:
+                    same_class[col] = ""
+                same_class[col] = (
+                    same_class[col].fillna("").astype(str).str.strip()
+                )
+
+            if not same_class.empty:
+                _bios = load_student_profiles(
+                    same_class["StudentCode"].tolist(), class_name=class_name
+                )
+                same_class["About"] = same_class["StudentCode"].map(
+                    lambda code: _bios.get(code, "")
+                )
+            _n = len(same_class)
+            st.markdown(
+                f"""
+                    <div style="display:flex;justify-content:space-between;align-items:center;margin:4px 0 6px 0;">
+                      <div style="font-weight:600;color:#0f172a;">{class_name}</div>
+                      <span style="background:#0ea5e922;border:1px solid #0ea5e9;color:#0369a1;
+                                   padding:3px 8px;border-radius:999px;font-size:.9rem;">
+                        {_n} member{'' if _n==1 else 's'}
+                      </span>
+                    </div>
+                    """,
+                unsafe_allow_html=True,
+            )
+
+            cols_show = [
+                c for c in ["Name", "Email", "Location", "About"] if c in same_class.columns
+            ]
+            if not same_class.empty and cols_show:
+                for _, row in same_class[cols_show].reset_index(drop=True).iterrows():
+                    name = row.get("Name", "")
+                    email = row.get("Email", "")
+                    location = row.get("Location", "")
+                    about = row.get("About", "")
+
+                    contact = " | ".join(
+                        [part for part in [email, location] if part]
+                    )
+
+                    st.markdown(
+                        f"""
+                            <div style="width:100%;padding:8px 0;border-bottom:1px solid #e5e7eb;">
+                                <div style="font-weight:600;color:#0f172a;">{name}</div>
+                                <div style="font-size:.9rem;color:#475569;">{contact}</div>
+                                <div style="margin-top:4px;">{about}</div>
+                            </div>
+                            """,
+                        unsafe_allow_html=True,
+                    )
+            else:
+                st.info("No members found for this class yet.")
+        st.info("Scroll down to update your profile description.")
+
+        # --- Profile section ---
+        st.markdown("---")
+        with st.container():
+            st.markdown(
+                """
+                    <div style="
+                        padding:10px 12px;
+                        background:#f0f9ff;
+                        border:1px solid #bae6fd;
+                        border-radius:12px;
+                        margin: 6px 0 8px 0;
+                        display:flex;align-items:center;gap:8px;">
+                      <span style="font-size:1.05rem;">👤 <b>Profile</b></span>
+                    </div>
+                    """,
+                unsafe_allow_html=True,
+            )
+            student_code = (st.session_state.get("student_code", "") or "").strip()
+            loaded_key = "profile_loaded_code"
+            about_key = "profile_about"
+            edit_key = "profile_editing"
+            cancel_profile_key = "profile_cancel"
+            if (
+                student_code
+                and (
+                    st.session_state.get(loaded_key) != student_code
+                    or about_key not in st.session_state
+                )
+            ):
+                st.session_state[about_key] = load_student_profile(student_code)
+                st.session_state[loaded_key] = student_code
+            if not student_code:
+                st.session_state.setdefault(about_key, "")
+            st.session_state.setdefault(edit_key, False)
+            st.session_state.setdefault(cancel_profile_key, False)
+
+            ai_flag = f"profile_ai_busy_{student_code}"
+            if st.session_state.get(cancel_profile_key):
+                st.session_state[about_key] = (
+                    load_student_profile(student_code) if student_code else ""
+                )
+                st.session_state.pop(ai_flag, None)
+                st.session_state[edit_key] = False
+                st.session_state[cancel_profile_key] = False
+
+            editing = st.session_state.get(edit_key, False)
+            if editing:
+                if st.session_state.get(ai_flag):
+                    with st.spinner("Correcting with AI..."):
+                        apply_profile_ai_correction(about_key)
+                    st.session_state[ai_flag] = False
+                    st.session_state.pop("need_rerun", None)
+                st.text_area("About me", key=about_key, height=300)
+            else:
+                st.markdown(st.session_state[about_key])
+
+            if not editing:
+                if st.button("Edit", disabled=not bool(student_code), key=_ukey("edit_profile")):
+                    st.session_state[edit_key] = True
+            else:
+                col1, col_ai, col2 = st.columns(3)
+                with col1:
+                    if st.button("Save", key=_ukey("save_profile")):
+                        try:
+                            save_student_profile(student_code, st.session_state.get(about_key, ""))
+                            st.success("Profile saved.")
+                        except Exception:
+                            st.error("Failed to save profile.")
+                        finally:
+                            st.session_state.pop(ai_flag, None)
+                            st.session_state[edit_key] = False
+                with col_ai:
+                    if st.button(
+                        "✨ Correct with AI",
+                        key=_ukey("ai_profile"),
+                        disabled=st.session_state.get(ai_flag, False),
+                    ):
+                        st.session_state[ai_flag] = True
+                        st.session_state["need_rerun"] = True
+                with col2:
+                    if st.button("Cancel", key=_ukey("cancel_profile")):
+                        st.session_state[cancel_profile_key] = True
+                        st.rerun()
+
+            if not bool(student_code):
+                st.info("Enter your student code to edit your profile.")
+
+    # ===================== JOIN =====================
+    elif classroom_section == "Join on Zoom":
+        with st.container():
+            st.markdown(
+                """
+                    <div style="padding: 12px; background: #facc15; color: #000; border-radius: 8px;
+                         font-size: 1rem; margin-bottom: 16px; text-align: left; font-weight: 600;">
+                      📣 <b>Zoom Classroom (Official)</b><br>
+                      This is the <u>official Zoom link</u> for your class. <span style="font-weight:500;">Add the calendar below to get notifications before each class.</span>
+                    </div>
+                    """,
+                unsafe_allow_html=True,
+            )
+
+            ZOOM = {
+                "link": "https://us06web.zoom.us/j/6886900916?pwd=bEdtR3RLQ2dGTytvYzNrMUV3eFJwUT09",
+                "meeting_id": "688 690 0916",
+                "passcode": "german",
+            }
+            # Allow secrets override
+            try:
+                zs = st.secrets.get("zoom", {})
+                if zs.get("link"):       ZOOM["link"]       = zs["link"]
+                if zs.get("meeting_id"): ZOOM["meeting_id"] = zs["meeting_id"]
+                if zs.get("passcode"):   ZOOM["passcode"]   = zs["passcode"]
+            except Exception:
+                pass
+
+            # Build iOS/Android deep-link (opens Zoom app directly)
+            _mid_digits = ZOOM["meeting_id"].replace(" ", "")
+            _pwd_enc = _urllib.quote(ZOOM["passcode"] or "")
+            zoom_deeplink = f"zoommtg://zoom.us/join?action=join&confno={_mid_digits}&pwd={_pwd_enc}"
+
+            z1, z2 = st.columns([3, 2])
+            with z1:
+                # Primary join button (browser)
+                try:
+                    st.link_button("➡️ Join Zoom Meeting (Browser)", ZOOM["link"], key=_ukey("zoom_join_btn"))
+                except Exception:
+                    st.markdown(f"[➡️ Join Zoom Meeting (Browser)]({ZOOM['link']})")
+
+                # Secondary: open in Zoom app (mobile deep link)
+                try:
+                    st.link_button("📱 Open in Zoom App", zoom_deeplink, key=_ukey("zoom_app_btn"))
+                except Exception:
+                    st.markdown(f"[📱 Open in Zoom App]({zoom_deeplink})")
+
+                st.write(f"**Meeting ID:** `{ZOOM['meeting_id']}`")
+                st.write(f"**Passcode:** `{ZOOM['passcode']}`")
+
+                # Copy helpers (mobile-friendly, safe escaping)
+                _link_safe = ZOOM["link"].replace("'", "\\'")
+                _id_safe   = ZOOM["meeting_id"].replace("'", "\\'")
+                _pwd_safe  = ZOOM["passcode"].replace("'", "\\'")
+                if components:
+                    components.html(
+                        f"""
+                            <div style="display:flex;gap:8px;margin-top:8px;">
+                              <button id="zCopyLink"
+                                      style="padding:6px 10px;border-radius:8px;border:1px solid #cbd5e1;background:#f1f5f9;cursor:pointer;">
+                                Copy Link
+                              </button>
+                              <button id="zCopyId"
+                                      style="padding:6px 10px;border-radius:8px;border:1px solid #cbd5e1;background:#f1f5f9;cursor:pointer;">
+                                Copy ID
+                              </button>
+                              <button id="zCopyPwd"
+                                      style="padding:6px 10px;border-radius:8px;border:1px solid #cbd5e1;background:#f1f5f9;cursor:pointer;">
+                                Copy Passcode
+                              </button>
+                            </div>
+                            <script>
+                              (function(){{
+                                try {{
+                                  var link = '{_link_safe}', mid = '{_id_safe}', pwd = '{_pwd_safe}';
+                                  function wire(btnId, txt, label) {{
+                                    var b = document.getElementById(btnId);
+                                    if (!b) return;
+                                    b.addEventListener('click', function(){{
+                                      navigator.clipboard.writeText(txt).then(function(){{
+                                        b.innerText = '✓ Copied ' + label;
+                                        setTimeout(function(){{ b.innerText = 'Copy ' + label; }}, 1500);
+                                      }}).catch(function(){{}});
+                                    }});
+                                  }}
+                                  wire('zCopyLink', link, 'Link');
+                                  wire('zCopyId',   mid,  'ID');
+                                  wire('zCopyPwd',  pwd,  'Passcode');
+                                }} catch(e) {{}}
+                              }})();
+                            </script>
+                            """,
+                        height=72,
+                    )
+
+            with z2:
+                st.info(
+                    f"You’re viewing: **{class_name}**  \n\n"
+                    "✅ Use the **calendar** tab to receive automatic class reminders.",
+                    icon="📅",
+                )
+
+
+    # ===================== Class Board =====================
+    elif classroom_section == "Class Notes & Q&A":
+        st.markdown("<div id='classnotes'></div>", unsafe_allow_html=True)
+        if st.session_state.pop("__scroll_to_classnotes", False):
+            st.markdown(
+                "<script>window.location.hash='classnotes';</script>",
+                unsafe_allow_html=True,
+            )
+        board_base = (
+            db.collection("class_board")
+            .document(student_level)
+            .collection("classes")
+            .document(class_name)
+            .collection("posts")
+        )
+        # Shared listener-backed mirror of this board; ``None`` means
+        # listeners are unavailable and we read Firestore directly.
+        board_cache = get_class_board_cache(student_level, class_name)
+
+        _new7, _unans, _total = 0, 0, 0
+        _board_stats = load_board_stats(db, student_level, class_name)
+        if _board_stats is None and board_cache is not None:
+            _board_stats = compute_board_stats(
+                [dict(d.to_dict() or {}, id=d.id) for d in board_cache.post_snapshots()],
+                {pid: len(c) for pid, c in board_cache.comments_by_post().items()},
+            )
+        if _board_stats is not None:
+            _new7 = _board_stats.new_in_days()
+            _unans = _board_stats.unanswered
+            _total = _board_stats.total
+
+        _badges = []
+        if _new7 > 0:
+            _badges.append(
+                f"<span style='margin-left:8px;background:#16a34a;color:#fff;padding:2px 8px;"
+                f"border-radius:999px;font-size:0.8rem;'>NEW · {_new7}</span>"
+            )
+        if _unans > 0:
+            _badges.append(
+                f"<span style='margin-left:8px;background:#f97316;color:#fff;padding:2px 8px;"
+                f"border-radius:999px;font-size:0.8rem;'>UNANSWERED · {_unans}</span>"
+            )
+        _badge_html = "".join(_badges)
+
+        st.markdown(
+            f'''
+                <div style="
+                    padding:12px;
+                    background:#2e7d32;
+                    background-image:radial-gradient(circle, rgba(255,255,255,0.05) 1px, transparent 1px);
+                    background-size:6px 6px;
+                    color:#f5f5f5;
+                    border-radius:8px;
+                    margin-bottom:12px;
+                    border:2px solid #c8c8c8;
+                    box-shadow:inset 0 0 4px rgba(0,0,0,0.6), 0 2px 6px rgba(0,0,0,0.08);
+                    font-family:'Chalkboard','Chalkduster','Comic Sans MS',cursive;
+                    display:flex;align-items:center;justify-content:space-between;">
+                    <div style="font-weight:700;font-size:1.15rem;">💬 Class Board — {class_name} {_badge_html}</div>
+                    <div style="font-size:0.92rem;opacity:.9;">Share a post • Comment with {class_name} classmates</div>
+                </div>
+                ''',
+            unsafe_allow_html=True
+        )
+
+        def _fmt_ts(ts):
+            try:
+                return ts.strftime("%d %b %H:%M:%S")
+            except Exception:
+                return ""
+
+        def _normalize_legacy_post_content(text: str) -> str:
+            """Clean artifacts from legacy wrapped posts for display."""
+            if not text:
+                return ""
+
+            normalized = text.replace("\r\n", "\n").replace("\r", "\n")
+
+            # Remove leading double-spaces introduced by legacy rewrapping.
+            normalized = normalized.lstrip()
+            normalized = re.sub(r"(?m)(?<=\n)[ \t]{2,}(?=\S)", "", normalized)
+
+            if "·" in normalized:
+                # Convert legacy middot bullets to regular bullets for consistency.
+                normalized = re.sub(
+                    r"(?m)(^|\n)\s*·\s*",
+                    lambda m: (m.group(1) or "") + "• ",
+                    normalized,
+                )
+                normalized = normalized.replace(" · ", " • ")
+
+            return normalized
+
+        def format_post(text: str) -> str:
+            """Normalize post text for consistent rendering."""
+            cleaned = (text or "")
+            cleaned = cleaned.replace("\r\n", "\n").replace("\r", "\n")
+            cleaned = cleaned.strip()
+            cleaned = re.sub(r"\n\s*\n+", "\n\n", cleaned)
+            return cleaned
+
+        def escape_with_linebreaks(text: str) -> str:
+            """Escape text and convert newlines into HTML-friendly breaks."""
+            if not text:
+                return ""
+
+            normalized = _normalize_legacy_post_content(text)
+            normalized = normalized.strip()
+            normalized = re.sub(r"\n\s*\n+", "\n\n", normalized)
+
+            paragraphs = [p for p in normalized.split("\n\n") if p != ""]
+            if not paragraphs:
+                return ""
+
+            escaped_paragraphs: List[str] = []
+            for para in paragraphs:
+                escaped = html.escape(para)
+                escaped_paragraphs.append(escaped.replace("\n", "<br>"))
+
+            return "".join(f"<p>{p}</p>" for p in escaped_paragraphs)
+
+        # ---- Prepare lesson choices ----
+        lesson_choices = []
+        try:
+            schedules = load_level_schedules()
+            level_sched = schedules.get(student_level, schedules.get("A1", []))
+            for item in level_sched:
+                day = item.get("day")
+                topic = item.get("topic")
+                if day is not None and topic:
+                    lesson_choices.append(_schedule.full_lesson_title(item))
+        except Exception:
+            pass
+
+        st.subheader("➕ Add a new post")
+        st.info(
+            "Decide whether you're responding to a classmate or posting your own question. "
+            "If you're responding, scroll down to find the existing question and reply there. "
+            "When you want to post a new question, use the text box below."
+        )
+        draft_key = "q_text"
+        initialize_draft_state(student_code, draft_key)
+        if st.session_state.get("__clear_q_form"):
+            st.session_state.pop("__clear_q_form", None)
+            st.session_state["q_topic"] = ""
+            st.session_state["q_link"] = ""
+            st.session_state["q_lesson"] = lesson_choices[0] if lesson_choices else ""
+            st.session_state.pop("q_ai_suggestion", None)
+            st.session_state.pop("q_ai_explanation", None)
+            st.session_state.pop("q_ai_diff", None)
+            st.session_state["q_forum_timer_minutes"] = 0
+            reset_local_draft_state(draft_key)
+            _clear_typing_state(
+                level=student_level,
+                class_code=class_name,
+                qid=_NEW_POST_TYPING_ID,
+                draft_key="q_text",
+                student_code=student_code,
+                student_name=student_name,
+            )
+        lesson = (
+            st.selectbox("Lesson", lesson_choices, key="q_lesson")
+            if lesson_choices
+            else st.text_input("Lesson", key="q_lesson")
+        )
+        topic = st.text_input("Topic (optional)", key="q_topic")
+        link = st.text_input("Link (optional)", key="q_link")
+        timer_key = "q_forum_timer_minutes"
+        if timer_key not in st.session_state:
+            st.session_state[timer_key] = 0
+        if IS_ADMIN:
+            st.number_input(
+                "Forum timer (minutes)",
+                min_value=0,
+                step=5,
+                key=timer_key,
+                help="Automatically close replies after this many minutes.",
+            )
+
+        st.markdown(
+            """
+                <style>
+                textarea[aria-label="Your content"] {
+                    background-color: #f1f5f9;
+                    color: #0f172a;
+                    font-family: 'Chalkboard', 'Chalkduster', 'Comic Sans MS', cursive;
+                    font-size: 1.1rem;
+                    line-height: 1.4;
+                }
+                </style>
+                """,
+            unsafe_allow_html=True,
+        )
+        ai_flag = "__q_ai_busy"
+        if st.session_state.get(ai_flag):
+            with st.spinner("Correcting with AI..."):
+                original = st.session_state.get("q_text", "")
+                improved, explanation = apply_status_ai_correction(original)
+                st.session_state["q_ai_suggestion"] = improved
+                st.session_state["q_ai_explanation"] = explanation
+                st.session_state["q_ai_diff"] = diff_with_markers(original, improved)
+            st.session_state[ai_flag] = False
+
+        ta_col, ai_col = st.columns([3, 1])
+        with ta_col:
+            banner = _format_typing_banner(
+                fetch_active_typists(
+                    student_level,
+                    class_name,
+                    _NEW_POST_TYPING_ID,
+                ),
+                student_code,
+            )
+            if banner:
+                st.caption(banner)
+            new_q = st.text_area("Your content", key=draft_key, height=160)
+            render_umlaut_pad("q_text", context="classboard_post")
+            _update_typing_state(
+                level=student_level,
+                class_code=class_name,
+                qid=_NEW_POST_TYPING_ID,
+                draft_key="q_text",
+                student_code=student_code,
+                student_name=student_name,
+                text=new_q,
+            )
+            autosave_maybe(
+                student_code,
+                draft_key,
+                st.session_state.get(draft_key, ""),
+                min_secs=2.0,
+                min_delta=12,
+            )
+        with ai_col:
+            if st.button(
+                "✨ Correct with AI",
+                key="qna_ai_correct",
+                disabled=st.session_state.get(ai_flag, False),
+            ):
+                st.session_state[ai_flag] = True
+                st.rerun()
+
+        if st.session_state.get("q_ai_diff"):
+            st.markdown(st.session_state["q_ai_diff"], unsafe_allow_html=True)
+            st.markdown("**Why these changes?**")
+            st.markdown(st.session_state.get("q_ai_explanation", ""))
+            acc_col, rej_col = st.columns(2)
+            with acc_col:
+                if st.button("Accept", key="q_ai_accept"):
+                    st.session_state["q_text"] = st.session_state.get("q_ai_suggestion", "")
+                    st.session_state.pop("q_ai_suggestion", None)
+                    st.session_state.pop("q_ai_explanation", None)
+                    st.session_state.pop("q_ai_diff", None)
+                    st.session_state["need_rerun"] = True
+            with rej_col:
+                if st.button("Reject", key="q_ai_reject"):
+                    st.session_state.pop("q_ai_suggestion", None)
+                    st.session_state.pop("q_ai_explanation", None)
+                    st.session_state.pop("q_ai_diff", None)
+                    st.session_state["need_rerun"] = True
+
+        if st.button("Post", key="qna_post_question"):
+            formatted_q = format_post(new_q)
+            if formatted_q:
+                q_id = str(uuid4())[:8]
+                payload = {
+                    "content": formatted_q,
+                    "asked_by_name": student_name,
+                    "asked_by_code": student_code,
+                    "timestamp": _dt.now(UTC),
+                    "lesson": lesson,
+                    "topic": (topic or "").strip(),
+                    "link": (link or "").strip(),
+                    "pinned": False,
+                }
+                _chapter = post_chapter(payload)
+                if _chapter:
+                    payload["chapter"] = _chapter
+                timer_minutes_val = int(st.session_state.get("q_forum_timer_minutes", 0) or 0)
+                if timer_minutes_val > 0:
+                    payload["expires_at"] = _dt.now(UTC) + timedelta(minutes=timer_minutes_val)
+                _board_version = board_cache.version if board_cache is not None else 0
+                board_base.document(q_id).set(payload)
+                record_post_created(db, student_level, class_name, payload)
+                if board_cache is not None:
+                    board_cache.wait_for_change(_board_version)
+                preview = (formatted_q[:180] + "…") if len(formatted_q) > 180 else formatted_q
+                topic_tag = f" • Topic: {payload['topic']}" if payload["topic"] else ""
+                _notify_slack(
+                    f"📝 *New Class Board post* — {class_name}{topic_tag}\n",
+                    f"*From:* {student_name} ({student_code})\n",
+                    f"*When:* {_dt.now(UTC).strftime('%Y-%m-%d %H:%M')} UTC\n",
+                    f"*Content:* {preview}"
+                )
+                _clear_typing_state(
+                    level=student_level,
+                    class_code=class_name,
+                    qid=_NEW_POST_TYPING_ID,
+                    draft_key="q_text",
+                    student_code=student_code,
+                    student_name=student_name,
+                )
+                clear_draft_after_post(student_code, draft_key)
+                st.session_state["__clear_q_form"] = True
+                st.success("Post published!")
+                refresh_with_toast()
+
+
+        colsa, colsb, colsc = st.columns([2, 1, 1])
+        with colsa:
+            q_search = st.text_input("Search posts (text or topic)…", key="q_search")
+        with colsb:
+            show_latest = st.toggle("Newest first", value=True, key="q_show_latest")
+        with colsc:
+            if st.button("↻ Refresh", key="qna_refresh"):
+                refresh_with_toast()
+
+        board_pages_key = f"q_board_pages_{student_level}_{class_name}"
+        board_pages = max(1, int(st.session_state.get(board_pages_key, 1) or 1))
+        if board_cache is not None:
+            board_data = BoardData.from_cache(board_cache, newest_first=show_latest)
+        else:
+            board_data = load_board_page(
+                db,
+                student_level,
+                class_name,
+                pages=board_pages,
+                newest_first=show_latest,
+            )
+        questions = [dict(d.to_dict() or {}, id=d.id) for d in board_data.posts]
+
+        if q_search.strip():
+            ql = q_search.lower()
+            questions = [
+                q for q in questions
+                if ql in str(q.get("content", "")).lower() or ql in str(q.get("topic", "")).lower()
+            ]
+            if board_data.has_more:
+                # Without the listener cache only the loaded pages are read.
+                st.caption("Searching the loaded posts only. Load older posts to search further.")
+
+        pinned_qs, other_qs, has_older_posts = window_posts(
+            questions, pages=board_pages, page_size=BOARD_PAGE_SIZE
+        )
+        has_older_posts = has_older_posts or board_data.has_more
+        questions = pinned_qs + other_qs
+
+        def send_comment(
+            q_id,
+            student_code,
+            student_name,
+            class_name,
+            board_base,
+            draft_key,
+            last_val_key,
+            last_ts_key,
+            saved_flag_key,
+            saved_at_key,
+            first_reply=False,
+        ):
+            current_text = st.session_state.get(draft_key, "").strip()
+            if not current_text:
+                return
+            comment_payload = {
+                "content": current_text,
+                "replied_by_name": student_name,
+                "replied_by_code": student_code,
+                "timestamp": _dt.now(_timezone.utc),
+                COMMENT_POST_ID_FIELD: q_id,
+            }
+            c_ref = board_base.document(q_id).collection("comments")
+            c_ref.document(str(uuid4())[:8]).set(comment_payload)
+            record_comment_added(db, student_level, class_name, first_reply=first_reply)
+            prev = (
+                comment_payload["content"][:180] + "…"
+            ) if len(comment_payload["content"]) > 180 else comment_payload["content"]
+            _notify_slack(
+                f"💬 *New Class Board comment* — {class_name}\n",
+                f"*By:* {student_name} ({student_code})  •  *QID:* {q_id}\n",
+                f"*When:* {_dt.now(_timezone.utc).strftime('%Y-%m-%d %H:%M')} UTC\n",
+                f"*Comment:* {prev}",
+            )
+            discard_pending_draft(student_code, draft_key)
+            save_draft_to_db(student_code, draft_key, "")
+            _clear_typing_state(
+                level=student_level,
+                class_code=class_name,
+                qid=q_id,
+                draft_key=draft_key,
+                student_code=student_code,
+                student_name=student_name,
+            )
+            st.session_state[f"__clear_comment_draft_{q_id}"] = True
+            st.session_state[last_val_key] = ""
+            st.session_state[last_ts_key] = time.time()
+            st.session_state[saved_flag_key] = False
+            st.session_state[saved_at_key] = None
+            st.success("Comment sent!")
+            refresh_with_toast()
+
+        comment_panel_active = (
+            st.session_state.get("coursebook_subtab") == "🧑‍🏫 Classroom"
+            and st.session_state.get("classroom_page") == "Class Notes & Q&A"
+        )
+        if comment_panel_active:
+            try:
+                from streamlit_autorefresh import st_autorefresh
+            except ImportError:
+                pass
+            else:
+                st_autorefresh(interval=5000, key="classboard_comment_refresh")
+
+        if not questions:
+            st.info("No posts yet.")
+        else:
+            now_for_timer = _dt.now(UTC)
+            for idx, q in enumerate(questions):
+                q_id = q.get("id", "")
+                ts = q.get("timestamp")
+                ts_label = _fmt_ts(ts)
+                pin_html = " 📌" if q.get("pinned") else ""
+                timer_info = build_forum_timer_indicator(q.get("expires_at"), now=now_for_timer)
+                timer_minutes_remaining = int(timer_info.get("minutes") or 0)
+                topic_html = (
+                    f"<div style='font-weight:bold;color:#8d4de8;'>{html.escape(str(q.get('topic', '')))}</div>"
+                    if q.get("topic")
+                    else ""
+                )
+                content_html = escape_with_linebreaks(q.get("content", ""))
+                raw_link_value = q.get("link")
+                raw_link = str(raw_link_value).strip() if raw_link_value else ""
+                safe_link_html = ""
+                if raw_link:
+                    parsed_link = urlparse(raw_link)
+                    if parsed_link.scheme.lower() in {"http", "https"}:
+                        safe_href = html.escape(raw_link, quote=True)
+                        safe_label = html.escape(raw_link)
+                        safe_link_html = (
+                            "<div style='margin-top:4px;'>"
+                            f"<a href='{safe_href}' target='_blank' rel='noopener noreferrer'>{safe_label}</a>"
+                            "</div>"
+                        )
+                link_html = safe_link_html
+                lesson_value = q.get("lesson")
+                lesson = str(lesson_value) if lesson_value else ""
+                if lesson:
+                    day_part = lesson.split(":")[0]
+                    day = day_part.split()[1] if len(day_part.split()) > 1 else ""
+                    course_link = build_course_day_link(day)
+                    safe_lesson = html.escape(lesson)
+                    link_markup = ""
+                    if course_link:
+                        safe_course_link = html.escape(course_link, quote=True)
+                        link_markup = (
+                            f" – <a href='{safe_course_link}' target='_blank' rel='noopener noreferrer'>View page</a>"
+                        )
+                    lesson_html = (
+                        "<div style='font-size:1.1rem;font-weight:600;color:#0f172a;'>"
+                        f"📘 {safe_lesson}{link_markup}"
+                        "</div>"
+                    )
+                else:
+                    lesson_html = ""
+                safe_author = html.escape(str(q.get("asked_by_name", "")))
+                safe_timestamp = html.escape(ts_label) if ts_label else ""
+                timestamp_html = (
+                    f"<span style='color:#aaa;'> • {safe_timestamp}</span>" if safe_timestamp else ""
+                )
+                timer_html = ""
+                timer_label = timer_info.get("label") or ""
+                if timer_info.get("status") == "open" and timer_label:
+                    timer_html = (
+                        "<div style='margin-top:4px;font-size:0.95rem;font-weight:600;color:#dc2626;'>"
+                        f"{html.escape(str(timer_label))}"
+                        "</div>"
+                    )
+                elif timer_info.get("status") == "closed" and timer_label:
+                    timer_html = (
+                        "<div style='margin-top:4px;font-size:0.95rem;font-weight:600;color:#64748b;'>"
+                        f"{html.escape(str(timer_label))}"
+                        "</div>"
+                    )
+                post_html = (
+                    "<div style='padding:10px;background:#f8fafc;border:1px solid #ddd;border-radius:6px;margin:6px 0;font-size:1rem;line-height:1.5;'>"
+                    f"<b>{safe_author}</b>{pin_html}"
+                    f"{timestamp_html}"
+                    f"{timer_html}"
+                    f"{lesson_html}"
+                    f"{topic_html}"
+                    f"{content_html}"
+                    f"{link_html}"
+                    "</div>"
+                )
+                st.markdown(post_html, unsafe_allow_html=True)
+
+                show_timer_warning = (
+                    timer_info.get("status") == "open" and timer_minutes_remaining == 1
+                )
+
+                clear_q_edit_flag = f"__clear_q_edit_{q_id}"
+                if st.session_state.pop(clear_q_edit_flag, False):
+                    for _k in [
+                        f"q_edit_text_{q_id}",
+                        f"q_edit_topic_{q_id}",
+                        f"q_edit_link_{q_id}",
+                        f"q_edit_lesson_{q_id}",
+                        f"q_edit_text_input_{q_id}",
+                        f"q_edit_topic_input_{q_id}",
+                        f"q_edit_link_input_{q_id}",
+                        f"q_edit_lesson_input_{q_id}",
+                        f"q_edit_timer_input_{q_id}",
+                    ]:
+                        st.session_state.pop(_k, None)
+                    _clear_typing_state(
+                        level=student_level,
+                        class_code=class_name,
+                        qid=q_id,
+                        draft_key=f"q_edit_text_{q_id}",
+                        student_code=student_code,
+                        student_name=student_name,
+                    )
+
+                can_modify_q = (q.get("asked_by_code") == student_code) or IS_ADMIN
+                start_q_edit_flag = f"__start_q_edit_{q_id}"
+                if can_modify_q:
+                    qc1, qc2, qc3, _ = st.columns([1, 1, 1, 6])
+                    with qc1:
+                        if st.button("✏️ Edit", key=f"q_edit_btn_{q_id}"):
+                            st.session_state[start_q_edit_flag] = True
+                    if st.session_state.pop(start_q_edit_flag, False):
+                        st.session_state[f"q_editing_{q_id}"] = True
+                        st.session_state[f"q_edit_text_{q_id}"] = q.get("content", "")
+                        st.session_state[f"q_edit_topic_{q_id}"] = q.get("topic", "")
+                        st.session_state[f"q_edit_link_{q_id}"] = q.get("link", "")
+                        st.session_state[f"q_edit_lesson_{q_id}"] = q.get("lesson", "")
+                        st.session_state[f"q_edit_timer_input_{q_id}"] = timer_minutes_remaining
+                    with qc2:
+                        if st.button("🗑️ Delete", key=f"q_del_btn_{q_id}"):
+                            try:
+                                c_ref = board_base.document(q_id).collection("comments")
+                                for rdoc in c_ref.stream():
+                                    rdoc.reference.delete()
+                            except Exception:
+                                pass
+                            board_base.document(q_id).delete()
+                            record_post_deleted(
+                                db,
+                                student_level,
+                                class_name,
+                                q,
+                                had_comments=bool(board_data.comments_for(q_id)) or bool(legacy_reply_count(q)),
+                            )
+                            _notify_slack(
+                                f"🗑️ *Class Board post deleted* — {class_name}\n"
+                                f"*By:* {student_name} ({student_code}) • QID: {q_id}\n"
+                                f"*When:* {_dt.now(UTC).strftime('%Y-%m-%d %H:%M')} UTC"
+                            )
+                            st.success("Post deleted.")
+                            refresh_with_toast()
+                    with qc3:
+                        pin_label = "📌 Unpin" if q.get("pinned") else "📌 Pin"
+                        if st.button(pin_label, key=f"q_pin_btn_{q_id}"):
+                            board_base.document(q_id).update({"pinned": not q.get("pinned", False)})
+                            refresh_with_toast()
+
+                    if st.session_state.get(f"q_editing_{q_id}", False):
+                        with st.form(f"q_edit_form_{q_id}"):
+                            if lesson_choices:
+                                current_lesson = st.session_state.get(f"q_edit_lesson_{q_id}", "")
+                                try:
+                                    _idx = lesson_choices.index(current_lesson)
+                                except ValueError:
+                                    _idx = 0
+                                new_lesson = st.selectbox(
+                                    "Edit lesson",
+                                    lesson_choices,
+                                    index=_idx,
+                                    key=f"q_edit_lesson_input_{q_id}"
+                                )
+                            else:
+                                new_lesson = st.text_input(
+                                    "Edit lesson",
+                                    value=st.session_state.get(f"q_edit_lesson_{q_id}", ""),
+                                    key=f"q_edit_lesson_input_{q_id}"
+                                )
+                            new_topic = st.text_input(
+                                "Edit topic (optional)",
+                                value=st.session_state.get(f"q_edit_topic_{q_id}", ""),
+                                key=f"q_edit_topic_input_{q_id}"
+                            )
+                            new_link = st.text_input(
+                                "Edit link (optional)",
+                                value=st.session_state.get(f"q_edit_link_{q_id}", ""),
+                                key=f"q_edit_link_input_{q_id}"
+                            )
+                            if f"q_edit_timer_input_{q_id}" not in st.session_state:
+                                st.session_state[f"q_edit_timer_input_{q_id}"] = timer_minutes_remaining
+                            if IS_ADMIN:
+                                st.number_input(
+                                    "Forum timer (minutes)",
+                                    min_value=0,
+                                    step=5,
+                                    key=f"q_edit_timer_input_{q_id}",
+                                )
+                            banner = _format_typing_banner(
+                                fetch_active_typists(student_level, class_name, q_id),
+                                student_code,
+                            )
+                            if banner:
+                                st.caption(banner)
+                            new_text = st.text_area(
+                                "Edit post",
+                                value=st.session_state.get(f"q_edit_text_{q_id}", ""),
+                                key=f"q_edit_text_input_{q_id}",
+                                height=150
+                            )
+                            _update_typing_state(
+                                level=student_level,
+                                class_code=class_name,
+                                qid=q_id,
+                                draft_key=f"q_edit_text_{q_id}",
+                                student_code=student_code,
+                                student_name=student_name,
+                                text=new_text,
+                            )
+                            save_edit = st.form_submit_button("💾 Save")
+                            cancel_edit = st.form_submit_button("❌ Cancel")
+                        if save_edit:
+                            formatted_edit = format_post(new_text)
+                            if formatted_edit:
+                                update_payload = {
+                                    "content": formatted_edit,
+                                    "topic": (new_topic or "").strip(),
+                                    "link": (new_link or "").strip(),
+                                    "lesson": new_lesson,
+                                }
+                                if IS_ADMIN:
+                                    timer_minutes_updated = int(
+                                        st.session_state.get(f"q_edit_timer_input_{q_id}", 0) or 0
+                                    )
+                                    if timer_minutes_updated > 0:
+                                        update_payload["expires_at"] = _dt.now(UTC) + timedelta(
+                                            minutes=timer_minutes_updated
+                                        )
+                                    else:
+                                        update_payload["expires_at"] = firestore.DELETE_FIELD
+                                board_base.document(q_id).update(update_payload)
+                                _notify_slack(
+                                    f"✏️ *Class Board post edited* — {class_name}\n",
+                                    f"*By:* {student_name} ({student_code}) • QID: {q_id}\n",
+                                    f"*When:* {_dt.now(UTC).strftime('%Y-%m-%d %H:%M')} UTC\n",
+                                    f"*New:* {(formatted_edit[:180] + '…') if len(formatted_edit) > 180 else formatted_edit}",
+                                )
+                                _clear_typing_state(
+                                    level=student_level,
+                                    class_code=class_name,
+                                    qid=q_id,
+                                    draft_key=f"q_edit_text_{q_id}",
+                                    student_code=student_code,
+                                    student_name=student_name,
+                                )
+                                st.session_state[f"q_editing_{q_id}"] = False
+                                st.session_state[f"__clear_q_edit_{q_id}"] = True
+                                st.success("Post updated.")
+                                refresh_with_toast()
+                        if cancel_edit:
+                            _clear_typing_state(
+                                level=student_level,
+                                class_code=class_name,
+                                qid=q_id,
+                                draft_key=f"q_edit_text_{q_id}",
+                                student_code=student_code,
+                                student_name=student_name,
+                            )
+                            st.session_state[f"q_editing_{q_id}"] = False
+                            st.session_state[f"__clear_q_edit_{q_id}"] = True
+                            refresh_with_toast()
+
+                comments_docs = board_data.comments_for(q_id)
+
+                if comments_docs:
+                    for c in comments_docs:
+                        cid = c.id
+                        c_data = c.to_dict() or {}
+                        c_label = _fmt_ts(c_data.get("timestamp"))
+                        commenter = c_data.get("replied_by_name", "")
+                        role = "user" if c_data.get("replied_by_code") == student_code else "assistant"
+                        message = st.chat_message(role)
+                        header_html = f"**{commenter}**"
+                        if c_label:
+                            header_html = (
+                                f"{header_html} <span style='color:#94a3b8;font-size:0.85rem;'>{c_label}</span>"
+                            )
+                        message.markdown(header_html, unsafe_allow_html=True)
+                        message.markdown(c_data.get("content", ""))
+
+                        clear_c_edit_flag = f"__clear_c_edit_{q_id}_{cid}"
+                        if st.session_state.pop(clear_c_edit_flag, False):
+                            for _k in [
+                                f"c_edit_text_{q_id}_{cid}",
+                                f"c_edit_text_input_{q_id}_{cid}",
+                            ]:
+                                st.session_state.pop(_k, None)
+                            _clear_typing_state(
+                                level=student_level,
+                                class_code=class_name,
+                                qid=q_id,
+                                draft_key=f"c_edit_text_{q_id}_{cid}",
+                                student_code=student_code,
+                                student_name=student_name,
+                            )
+
+                        can_modify_c = (c_data.get("replied_by_code") == student_code) or IS_ADMIN
+                        start_c_edit_flag = f"__start_c_edit_{q_id}_{cid}"
+                        if can_modify_c:
+                            controls = message.container()
+                            rc1, rc2, _ = controls.columns([1, 1, 6])
+                            with rc1:
+                                if st.button("✏️ Edit", key=f"c_edit_btn_{q_id}_{cid}"):
+                                    st.session_state[start_c_edit_flag] = True
+                            if st.session_state.pop(start_c_edit_flag, False):
+                                st.session_state[f"c_editing_{q_id}_{cid}"] = True
+                                st.session_state[f"c_edit_text_{q_id}_{cid}"] = c_data.get("content", "")
+                            with rc2:
+                                if st.button("🗑️ Delete", key=f"c_del_btn_{q_id}_{cid}"):
+                                    c.reference.delete()
+                                    record_comment_deleted(
+                                        db,
+                                        student_level,
+                                        class_name,
+                                        last_reply=len(comments_docs) == 1 and not legacy_reply_count(q),
+                                    )
+                                    _notify_slack(
+                                        f"🗑️ *Class Board comment deleted* — {class_name}\n"
+                                        f"*By:* {student_name} ({student_code}) • QID: {q_id}\n"
+                                        f"*When:* {_dt.now(_timezone.utc).strftime('%Y-%m-%d %H:%M')} UTC"
+                                    )
+                                    st.success("Comment deleted.")
+                                    refresh_with_toast()
+
+                            if st.session_state.get(f"c_editing_{q_id}_{cid}", False):
+                                edit_container = controls.container()
+                                with edit_container.form(f"c_edit_form_{q_id}_{cid}"):
+                                    banner = _format_typing_banner(
+                                        fetch_active_typists(
+                                            student_level,
+                                            class_name,
+                                            q_id,
+                                        ),
+                                        student_code,
+                                    )
+                                    if banner:
+                                        st.caption(banner)
+                                    new_rtext = st.text_area(
+                                        "Edit comment",
+                                        value=st.session_state.get(f"c_edit_text_{q_id}_{cid}", ""),
+                                        key=f"c_edit_text_input_{q_id}_{cid}",
+                                        height=80
+                                    )
+                                    _update_typing_state(
+                                        level=student_level,
+                                        class_code=class_name,
+                                        qid=q_id,
+                                        draft_key=f"c_edit_text_{q_id}_{cid}",
+                                        student_code=student_code,
+                                        student_name=student_name,
+                                        text=new_rtext,
+                                    )
+                                    csave = st.form_submit_button("💾 Save")
+                                    ccancel = st.form_submit_button("❌ Cancel")
+                                if csave and new_rtext.strip():
+                                    c.reference.update({
+                                        "content": new_rtext.strip(),
+                                        "edited_at": _dt.now(_timezone.utc),
+                                    })
+                                    _notify_slack(
+                                        f"✏️ *Class Board comment edited* — {class_name}\n"
+                                        f"*By:* {student_name} ({student_code}) • QID: {q_id}\n"
+                                        f"*When:* {_dt.now(_timezone.utc).strftime('%Y-%m-%d %H:%M')} UTC\n"
+                                        f"*New:* {(new_rtext[:180] + '…') if len(new_rtext) > 180 else new_rtext}"
+                                    )
+                                    _clear_typing_state(
+                                        level=student_level,
+                                        class_code=class_name,
+                                        qid=q_id,
+                                        draft_key=f"c_edit_text_{q_id}_{cid}",
+                                        student_code=student_code,
+                                        student_name=student_name,
+                                    )
+                                    st.session_state[f"c_editing_{q_id}_{cid}"] = False
+                                    st.session_state[f"__clear_c_edit_{q_id}_{cid}"] = True
+                                    st.success("Comment updated.")
+                                    refresh_with_toast()
+                                if ccancel:
+                                    _clear_typing_state(
+                                        level=student_level,
+                                        class_code=class_name,
+                                        qid=q_id,
+                                        draft_key=f"c_edit_text_{q_id}_{cid}",
+                                        student_code=student_code,
+                                        student_name=student_name,
+                                    )
+                                    st.session_state[f"c_editing_{q_id}_{cid}"] = False
+                                    st.session_state[f"__clear_c_edit_{q_id}_{cid}"] = True
+                                    refresh_with_toast()
+
+                draft_key = f"classroom_comment_draft_{q_id}"
+                last_val_key, last_ts_key, saved_flag_key, saved_at_key = _draft_state_keys(draft_key)
+                if draft_key not in st.session_state:
+                    txt, ts = load_draft_meta_from_db(student_code, draft_key)
+                    st.session_state[draft_key] = txt or ""
+                    st.session_state[last_val_key] = st.session_state[draft_key]
+                    st.session_state[last_ts_key] = time.time()
+                    st.session_state[saved_flag_key] = bool(txt)
+                    st.session_state[saved_at_key] = ts
+                clear_flag = f"__clear_comment_draft_{q_id}"
+                if st.session_state.pop(clear_flag, False):
+                    st.session_state[draft_key] = ""
+                    _clear_typing_state(
+                        level=student_level,
+                        class_code=class_name,
+                        qid=q_id,
+                        draft_key=draft_key,
+                        student_code=student_code,
+                        student_name=student_name,
+                    )
+                def apply_ai_correction(q_id: str, draft_key: str, current_text: str) -> None:
+                    if not current_text.strip():
+                        return
+                    try:
+                        resp = client.chat.completions.create(
+                            model="gpt-4o-mini",
+                            messages=[
+                                {
+                                    "role": "system",
+                                    "content": (
+                                        "You are a helpful assistant that corrects German replies. "
+                                        "Return only the corrected reply."
+                                    ),
+                                },
+                                {
+                                    "role": "user",
+                                    "content": f"Question: {q.get('content','')}\nReply: {current_text}",
+                                },
+                            ],
+                            temperature=0,
+                            max_tokens=300,
+                        )
+                        ai_text = (resp.choices[0].message.content or "").strip()
+                        flagged = resp.choices[0].finish_reason == "content_filter"
+                    except Exception:
+                        ai_text = ""
+                        flagged = False
+                    if ai_text:
+                        st.session_state[draft_key] = ai_text
+                        save_ai_response(q_id, ai_text, flagged)
+
+                ai_flag = f"q_ai_busy_{q_id}"
+
+                current_text = st.session_state.get(draft_key, "")
+                if not isinstance(current_text, str):
+                    current_text = ""
+                if st.session_state.get(ai_flag):
+                    with st.spinner("Correcting with AI..."):
+                        apply_ai_correction(q_id, draft_key, current_text)
+                    st.session_state[ai_flag] = False
+                    current_text = st.session_state.get(draft_key, "")
+                    if not isinstance(current_text, str):
+                        current_text = ""
+
+                banner = _format_typing_banner(
+                    fetch_active_typists(student_level, class_name, q_id),
+                    student_code,
+                )
+                if banner:
+                    st.caption(banner)
+                reply_timer_label = build_forum_reply_indicator_text(timer_info)
+                if reply_timer_label:
+                    reply_color = "#dc2626" if timer_info.get("status") == "open" else "#64748b"
+                    st.markdown(
+                        "<div style='font-size:0.95rem;font-weight:600;color:%s;margin:6px 0 -4px;'>%s</div>"
+                        % (
+                            reply_color,
+                            html.escape(str(reply_timer_label)),
+                        ),
+                        unsafe_allow_html=True,
+                    )
+                if show_timer_warning:
+                    st.info(
+                        "⏳ Time up soon—replies close in under a minute.",
+                        icon="⏳",
+                    )
+                st.text_area(
+                    "Reply to this thread…",
+                    key=draft_key,
+                    placeholder="Reply to this thread…",
+                    label_visibility="collapsed",
+                )
+                render_umlaut_pad(
+                    draft_key,
+                    context=f"classboard_reply_{q_id}",
+                )
+
+                current_text = st.session_state.get(draft_key, "")
+                if not isinstance(current_text, str):
+                    current_text = ""
+                _update_typing_state(
+                    level=student_level,
+                    class_code=class_name,
+                    qid=q_id,
+                    draft_key=draft_key,
+                    student_code=student_code,
+                    student_name=student_name,
+                    text=current_text,
+                )
+                autosave_maybe(
+                    student_code,
+                    draft_key,
+                    current_text,
+                    min_secs=1.0,
+                    min_delta=4,
+                )
+
+                saved_at_val = st.session_state.get(saved_at_key)
+                saved_at_dt = _to_datetime_any(saved_at_val) if saved_at_val else None
+                saved_stamp = _fmt_ts(saved_at_dt) if saved_at_dt else ""
+                autosave_msg = "💾 Autosave on"
+                if saved_stamp:
+                    autosave_msg += f" • Last saved {saved_stamp}"
+                st.caption(autosave_msg)
+
+                send_col, ai_col = st.columns([1, 1])
+
+                send_request_key = f"__send_reply_request_{q_id}"
+                send_error_key = f"__send_reply_error_{q_id}"
+
+                with send_col:
+                    if st.button(
+                        "Send Reply",
+                        key=f"q_send_comment_{q_id}",
+                        type="primary",
+                        width="stretch",
+                        disabled=st.session_state.get(send_request_key, False),
+                    ):
+                        st.session_state[send_request_key] = True
+
+                    if st.session_state.pop(send_request_key, False):
+                        if not current_text.strip():
+                            st.session_state[send_error_key] = "Type a reply first."
+                        else:
+                            st.session_state.pop(send_error_key, None)
+                            save_now(draft_key, student_code, show_toast=False)
+                            send_comment(
+                                q_id,
+                                student_code,
+                                student_name,
+                                class_name,
+                                board_base,
+                                draft_key,
+                                last_val_key,
+                                last_ts_key,
+                                saved_flag_key,
+                                saved_at_key,
+                                first_reply=not comments_docs and not legacy_reply_count(q),
+                            )
+                            st.rerun()
+                    if st.session_state.get(send_error_key):
+                        st.warning(st.session_state[send_error_key])
+
+                with ai_col:
+                    if st.button(
+                        "✨ Correct with AI",
+                        key=f"q_ai_btn_{q_id}",
+                        disabled=st.session_state.get(ai_flag, False),
+                        width="stretch",
+                    ):
+                        st.session_state[ai_flag] = True
+                        st.rerun()
+
+                if idx < len(questions) - 1:
+                    st.divider()
+
+        if has_older_posts:
+            if st.button(
+                "⬇️ Load older posts" if show_latest else "⬇️ Load newer posts",
+                key="qna_load_older",
+            ):
+                st.session_state[board_pages_key] = board_pages + 1
+                st.rerun()
+
+        st.markdown("<div style='height:16px'></div>", unsafe_allow_html=True)
+        st.divider()
+        st.button(
+            "Log out",
+            key=_ukey("classnotes_logout"),
+            type="secondary",
+            on_click=do_logout,
+            help="End your session when you finish reading the Class Notes & Q&A feed.",
+        )
+#
+
+# === LEARNING NOTES SUBTAB ===
+elif cb_subtab == "📒 Learning Notes":
+    st.markdown("""
+            <div style="padding: 14px; background: #8d4de8; color: #fff; border-radius: 8px; 
+            text-align:center; font-size:1.5rem; font-weight:700; margin-bottom:16px; letter-spacing:.5px;">
+            📒 My Learning Notes
+            </div>
+        """, unsafe_allow_html=True)
+
+    student_code = st.session_state.get("student_code", "") or ""
+    if not student_code:
+        st.error("Student code is required to view notes.")
+        st.stop()
+    key_notes = f"notes_{student_code}"
+
+    if key_notes not in st.session_state:
+        st.session_state[key_notes] = load_notes_from_db(student_code)
+    notes = st.session_state[key_notes]
+
+    if st.session_state.get("switch_to_edit_note"):
+        st.session_state["course_notes_radio"] = "➕ Add/Edit Note"
+        del st.session_state["switch_to_edit_note"]
+    elif st.session_state.get("switch_to_library"):
+        st.session_state["course_notes_radio"] = "📚 My Notes Library"
+        del st.session_state["switch_to_library"]
+
+    notes_subtab = st.radio(
+        "Notebook",
+        ["➕ Add/Edit Note", "📚 My Notes Library"],
+        horizontal=True,
+        key="course_notes_radio"
+    )
+
+    if notes_subtab == "➕ Add/Edit Note":
+        # >>>> New helper message for pre-filled note context <<<<
+        editing = st.session_state.get("edit_note_idx", None) is not None
+        if editing:
+            idx = st.session_state["edit_note_idx"]
+            title = st.session_state.get("edit_note_title", "")
+            tag = st.session_state.get("edit_note_tag", "")
+            text = st.session_state.get("edit_note_text", "")
+        else:
+            title, tag, text = "", "", ""
+
+        student_level = st.session_state.get("student_level", "A1")
+        lesson_choices = []
+        try:
+            schedules = load_level_schedules()
+            level_sched = schedules.get(student_level, schedules.get("A1", []))
+            for item in level_sched:
+                day = item.get("day")
+                topic = item.get("topic")
+                if day is not None and topic:
+                    lesson_choices.append(
+                        f"Day {day} - {topic} (Chapter {item.get('chapter', '?')})"
+                    )
+        except Exception:
+            pass
+
+        if title and tag:
+            st.info(f"You're adding a note for **{title}** ({tag}).")
+
+        st.markdown("#### ✍️ Create a new note or update an old one")
+        if st.session_state.pop("reset_note_form", False):
+            for k in [
+                "learning_note_title",
+                "learning_note_tag",
+                "learning_note_draft",
+                "learning_note_last_saved",
+                "learning_note_lesson",
+            ]:
+                st.session_state.pop(k, None)
+
+        with st.form("note_form", clear_on_submit=True):
+            st.session_state.setdefault("learning_note_title", title)
+            st.session_state.setdefault("learning_note_tag", tag)
+            st.session_state.setdefault("learning_note_draft", text)
+            st.session_state.setdefault("learning_note_last_saved", None)
+            st.session_state.setdefault(
+                "learning_note_lesson",
+                st.session_state.get(
+                    "edit_note_lesson",
+                    lesson_choices[0] if lesson_choices else "",
+                ),
+            )
+
+            st.selectbox("Lesson", lesson_choices, key="learning_note_lesson")
+
+            st.text_input(
+                "Note Title",
+                max_chars=50,
+                key="learning_note_title",
+            )
+            st.text_input(
+                "Category/Tag (optional)",
+                max_chars=20,
+                key="learning_note_tag",
+            )
+            ta_col, ai_col = st.columns([3, 1])
+            with ta_col:
+                st.text_area(
+                    "Your Note",
+                    height=200,
+                    max_chars=3000,
+                    key="learning_note_draft",
+                )
+            with ai_col:
+                ai_btn = st.form_submit_button("✨ Correct with AI")
+
+            col1, col2 = st.columns(2)
+            save_btn = col1.form_submit_button("Save")
+            cancel_btn = editing and col2.form_submit_button("❌ Cancel Edit")
+            if save_btn:
+                autosave_learning_note(student_code, key_notes)
+                if not editing:
+                    st.session_state["reset_note_form"] = True
+                    st.session_state["need_rerun"] = True
+            if st.session_state.get("learning_note_last_saved"):
+                st.caption(
+                    f"Last saved {st.session_state['learning_note_last_saved']} UTC"
+                )
+
+        if ai_btn:
+            with st.spinner("Correcting with AI..."):
+                original = st.session_state.get("learning_note_draft", "")
+                improved, explanation = apply_note_ai_correction(original)
+                st.session_state["note_ai_suggestion"] = improved
+                st.session_state["note_ai_explanation"] = explanation
+                st.session_state["note_ai_diff"] = diff_with_markers(original, improved)
+            st.session_state["need_rerun"] = True
+
+        if st.session_state.get("note_ai_diff"):
+            st.markdown(st.session_state["note_ai_diff"], unsafe_allow_html=True)
+            st.markdown("**Why these changes?**")
+            st.markdown(st.session_state.get("note_ai_explanation", ""))
+            acc_col, rej_col = st.columns(2)
+            with acc_col:
+                if st.button("Accept", key="note_ai_accept"):
+                    st.session_state["learning_note_draft"] = st.session_state.get(
+                        "note_ai_suggestion", ""
+                    )
+                    st.session_state.pop("note_ai_suggestion", None)
+                    st.session_state.pop("note_ai_explanation", None)
+                    st.session_state.pop("note_ai_diff", None)
+                    st.session_state["need_rerun"] = True
+            with rej_col:
+                if st.button("Reject", key="note_ai_reject"):
+                    st.session_state.pop("note_ai_suggestion", None)
+                    st.session_state.pop("note_ai_explanation", None)
+                    st.session_state.pop("note_ai_diff", None)
+                    st.session_state["need_rerun"] = True
+
+        if cancel_btn:
+
+            for k in [
+                "edit_note_idx",
+                "edit_note_title",
+                "edit_note_text",
+                "edit_note_tag",
+                "edit_note_lesson",
+                "learning_note_title",
+                "learning_note_tag",
+                "learning_note_draft",
+                "learning_note_lesson",
+                "learning_note_last_saved",
+            ]:
+                if k in st.session_state:
+                    del st.session_state[k]
+
+            st.session_state["switch_to_library"] = True
+            refresh_with_toast()
+
+    elif notes_subtab == "📚 My Notes Library":
+        st.markdown("#### 📚 All My Notes")
+
+        if not notes:
+            st.info("No notes yet. Add your first note in the ➕ tab!")
+        else:
+            search_term = st.text_input("🔎 Search your notes…", "")
+            if search_term.strip():
+                filtered = []
+                st.markdown('<div style="height:10px"></div>', unsafe_allow_html=True)
+                for n in notes:
+                    if (
+                        search_term.lower() in n.get("title", "").lower()
+                        or search_term.lower() in n.get("tag", "").lower()
+                        or search_term.lower() in n.get("text", "").lower()
+                        or search_term.lower() in n.get("lesson", "").lower()
+                    ):
+                        filtered.append(n)
+                notes_to_show = filtered
+                if not filtered:
+                    st.warning("No matching notes found!")
+            else:
+                notes_to_show = notes
+
+            # --- Download Buttons (TXT, PDF, DOCX) FOR ALL NOTES ---
+            all_notes = []
+            for n in notes_to_show:
+                note_text = f"Title: {n.get('title','')}\n"
+                if n.get('tag'):
+                    note_text += f"Tag: {n['tag']}\n"
+                if n.get("lesson"):
+                    note_text += f"Lesson: {n['lesson']}\n"
+                note_text += n.get('text','') + "\n"
+                note_text += f"Date: {n.get('updated', n.get('created',''))}\n"
+                note_text += "-"*32 + "\n"
+                all_notes.append(note_text)
+            txt_data = "\n".join(all_notes)
+
+            st.download_button(
+                label="⬇️ Download All Notes (TXT)",
+                data=txt_data.encode("utf-8"),
+                file_name=f"{student_code}_notes.txt",
+                mime="text/plain"
+            )
+
+            # --- PDF Download (all notes, Unicode/emoji ready!) ---
+
+            pdf_bytes = generate_notes_pdf(notes_to_show)
+
+            st.download_button(
+                label="⬇️ Download All Notes (PDF)",
+                data=pdf_bytes,
+                file_name=f"{student_code}_notes.pdf",
+                mime="application/pdf",
+            )
+
+            # --- DOCX Download (all notes) ---
+            def export_notes_to_docx(notes, student_code="student"):
+                doc = Document()
+                doc.add_heading("My Learning Notes", 0)
+                doc.add_heading("Table of Contents", level=1)
+                for idx, note in enumerate(notes):
+                    doc.add_paragraph(f"{idx+1}. {note.get('title', '(No Title)')} - {note.get('created', note.get('updated',''))}")
+                doc.add_page_break()
+                for note in notes:
+                    doc.add_heading(note.get('title','(No Title)'), level=1)
+                    if note.get("tag"):
+                        doc.add_paragraph(f"Tag: {note.get('tag','')}")
+                    if note.get("lesson"):
+                        doc.add_paragraph(f"Lesson: {note.get('lesson','')}")
+                    doc.add_paragraph(note.get('text', ''))
+                    doc.add_paragraph(f"Date: {note.get('created', note.get('updated',''))}")
+                    doc.add_paragraph('-' * 40)
+                    doc.add_paragraph("")
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as f:
+                    doc.save(f.name)
+                    return f.name
+            docx_path = export_notes_to_docx(notes_to_show, student_code)
+            with open(docx_path, "rb") as f:
+                st.download_button(
+                    label="⬇️ Download All Notes (DOCX)",
+                    data=f.read(),
+                    file_name=f"{student_code}_notes.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                )
+            os.remove(docx_path)
+
+            st.markdown("---")
+            pinned_notes = [n for n in notes_to_show if n.get("pinned")]
+            other_notes = [n for n in notes_to_show if not n.get("pinned")]
+            show_list = pinned_notes + other_notes
+            for i, note in enumerate(show_list):
+                st.markdown(
+                    f"<div style='padding:12px 0 6px 0; font-weight:600; color:#7c3aed; font-size:1.18rem;'>"
+                    f"{'📌 ' if note.get('pinned') else ''}{note.get('title','(No Title)')}"
+                    f"</div>", unsafe_allow_html=True)
+                if note.get("tag"):
+                    st.caption(f"🏷️ Tag: {note['tag']}")
+                if note.get("lesson"):
+                    st.caption(f"📘 Lesson: {note['lesson']}")
+                note_html = note['text'].replace('\n', '<br>')
+                st.markdown(
+                    f"<div style='margin-top:-5px; margin-bottom:6px; font-size:1.08rem; line-height:1.7;'>{note_html}</div>",
+                    unsafe_allow_html=True)
+                st.caption(f"🕒 {note.get('updated',note.get('created',''))}")
+
+                # --- Per-Note Download Buttons (TXT, PDF, DOCX) ---
+                download_cols = st.columns([1,1,1])
+                with download_cols[0]:
+                    # TXT per note
+                    txt_note = f"Title: {note.get('title','')}\n"
+                    if note.get('tag'):
+                        txt_note += f"Tag: {note['tag']}\n"
+                    if note.get("lesson"):
+                        txt_note += f"Lesson: {note['lesson']}\n"
+                    txt_note += note.get('text', '') + "\n"
+                    txt_note += f"Date: {note.get('updated', note.get('created',''))}\n"
+                    st.download_button(
+                        label="⬇️ TXT",
+                        data=txt_note.encode("utf-8"),
+                        file_name=f"{student_code}_{note.get('title','note').replace(' ','_')}.txt",
+                        mime="text/plain",
+                        key=f"download_txt_{i}"
+                    )
+                with download_cols[1]:
+                    # PDF per note (Unicode/emoji ready!)
+                    pdf_bytes_single = generate_single_note_pdf(note)
+                    st.download_button(
+                        label="⬇️ PDF",
+                        data=pdf_bytes_single,
+                        file_name=f"{student_code}_{note.get('title','note').replace(' ','_')}.pdf",
+                        mime="application/pdf",
+                        key=f"download_pdf_{i}",
+                    )
+                with download_cols[2]:
+                    # DOCX per note
+                    doc_single = Document()
+                    doc_single.add_heading(note.get('title','(No Title)'), level=1)
+                    if note.get("tag"):
+                        doc_single.add_paragraph(f"Tag: {note.get('tag','')}")
+                    if note.get("lesson"):
+                        doc_single.add_paragraph(f"Lesson: {note.get('lesson','')}")
+                    doc_single.add_paragraph(note.get('text', ''))
+                    doc_single.add_paragraph(f"Date: {note.get('updated', note.get('created',''))}")
+                    single_docx_io = io.BytesIO()
+                    doc_single.save(single_docx_io)
+                    st.download_button(
+                        label="⬇️ DOCX",
+                        data=single_docx_io.getvalue(),
+                        file_name=f"{student_code}_{note.get('title','note').replace(' ','_')}.docx",
+                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+                        key=f"download_docx_{i}"
+                    )
+
+                cols = st.columns([1,1,1,1])
+                with cols[0]:
+                    if st.button("✏️ Edit", key=f"edit_{i}"):
+                        st.session_state["edit_note_idx"] = i
+                        st.session_state["edit_note_title"] = note["title"]
+                        st.session_state["edit_note_text"] = note["text"]
+                        st.session_state["edit_note_tag"] = note.get("tag", "")
+                        st.session_state["edit_note_lesson"] = note.get("lesson", "")
+                        st.session_state["switch_to_edit_note"] = True
+                        refresh_with_toast()
+                with cols[1]:
+                    if st.button("🗑️ Delete", key=f"del_{i}"):
+                        notes.remove(note)
+                        st.session_state[key_notes] = notes
+                        save_notes_to_db(student_code, notes)
+                        st.success("Note deleted.")
+                        refresh_with_toast()
+                with cols[2]:
+                    if note.get("pinned"):
+                        if st.button("📌 Unpin", key=f"unpin_{i}"):
+                            note["pinned"] = False
+                            st.session_state[key_notes] = notes
+                            save_notes_to_db(student_code, notes)
+                            refresh_with_toast()
+                    else:
+                        if st.button("📍 Pin", key=f"pin_{i}"):
+                            note["pinned"] = True
+                            st.session_state[key_notes] = notes
+                            save_notes_to_db(student_code, notes)
+                            refresh_with_toast()
+                with cols[3]:
+                    st.caption("")
@@ -0,0 +1,1634 @@
+# Schreiben Trainer tab of the Falowen app.
+#
+# Executed by src.tab_router in the namespace of a1sprechen.py when this tab is
+# active.  It imports what it uses; the helpers below the imports are defined
+# in a1sprechen.py itself and are named here so flake8 checks every other name.
+# It is not meant to be imported on its own.
+
+import random
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from src.draft_management import (
+    _draft_state_keys,
+    autosave_maybe,
+    initialize_draft_state,
+    reset_local_draft_state,
+    save_now,
+)
+from src.draft_queue import discard_pending_draft
+from src.firestore_utils import load_draft_from_db, save_draft_to_db
+from src.schreiben import (
+    clear_letter_coach_draft,
+    delete_schreiben_feedback,
+    get_level_from_code,
+    get_schreiben_stats,
+    get_schreiben_usage,
+    highlight_feedback,
+    inc_schreiben_usage,
+    load_letter_coach_draft,
+    load_letter_coach_progress,
+    load_schreiben_feedback,
+    load_vocab_practice_progress,
+    save_letter_coach_draft,
+    save_letter_coach_progress,
+    save_schreiben_feedback,
+    save_submission,
+    set_vocab_practice_status,
+    update_schreiben_stats,
+    vocab_practice_word_key,
+)
+from src.services.vocab import VOCAB_LISTS, get_audio_url
+from src.stats_ui import render_schreiben_stats
+from src.utils.toasts import toast_once
+
+# Defined in a1sprechen.py.
+SCHREIBEN_DAILY_LIMIT = SCHREIBEN_DAILY_LIMIT  # noqa: F821
+_safe_str = _safe_str  # noqa: F821
+client = client  # noqa: F821
+render_umlaut_pad = render_umlaut_pad  # noqa: F821
+
+st.markdown(
+    '''
+        <div style="
+            padding: 8px 12px;
+            background: #d63384;
+            color: #fff;
+            border-radius: 6px;
+            text-align: center;
+            margin-bottom: 8px;
+            font-size: 1.3rem;">
+            ✍️ Schreiben Trainer (Writing Practice)
+        </div>
+        ''',
+    unsafe_allow_html=True
+)
+
+st.info(
+    """
+        ✍️ **This section is for Writing (Schreiben) only.**
+        Practice German letters, emails, and essays for A1–C1 exams—now with automatic level detection.
+
+        Want to practice presentations or focus on Speaking, Reading, or Listening?
+        👉 Switch to **Exam Mode & Chat • Grammar • Exams** (tab above)!
+
+        Your writing will be assessed and scored out of 25 marks, just like in the real exam.
+        """,
+    icon="✉️"
+)
+
+st.divider()
+
+# --- Writing stats summary with Firestore ---
+student_code = st.session_state.get("student_code", "demo")
+stats = render_schreiben_stats(student_code)
+student_name = _safe_str(st.session_state.get("student_name"), "Student") or "Student"
+
+# --- Update session states for new student (preserves drafts, etc) ---
+prev_student_code = st.session_state.get("prev_student_code", None)
+if student_code != prev_student_code:
+    stats = stats or get_schreiben_stats(student_code)
+    st.session_state[f"{student_code}_last_feedback"] = None
+    st.session_state[f"{student_code}_last_user_letter"] = None
+    st.session_state[f"{student_code}_delta_compare_feedback"] = None
+    st.session_state[f"{student_code}_final_improved_letter"] = ""
+    st.session_state[f"{student_code}_awaiting_correction"] = False
+    st.session_state[f"{student_code}_improved_letter"] = ""
+    st.session_state["prev_student_code"] = student_code
+
+# --- Sub-tabs for the Trainer ---
+st.markdown(
+    """
+        <style>
+        div[role="radiogroup"][aria-label="Choose Mode"],
+        div[data-testid="stHorizontalBlock"] [aria-label="Choose Mode"] {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 0.5rem;
+        }
+        div[role="radiogroup"][aria-label="Choose Mode"] > label,
+        div[data-testid="stHorizontalBlock"] [aria-label="Choose Mode"] > label {
+            flex: 1 1 180px;
+            min-width: 160px;
+        }
+        @media (max-width: 640px) {
+            div[role="radiogroup"][aria-label="Choose Mode"] > label,
+            div[data-testid="stHorizontalBlock"] [aria-label="Choose Mode"] > label {
+                flex-basis: 100%;
+            }
+        }
+        </style>
+        """,
+    unsafe_allow_html=True,
+)
+sub_tab = st.radio(
+    "Choose Mode",
+    [
+        "Vocab Practice",
+        "Practice Letters",
+        "Mark My Letter",
+        "Ideas Generator (Letter Coach)",
+
+    ],
+    horizontal=True,
+    key=f"schreiben_sub_tab_{student_code}"
+)
+
+    # --- Level picker: Auto-detect from student code (manual override removed) ---
+if student_code:
+    detected_level = get_level_from_code(student_code)
+    # Only apply detected level when first seeing this student code
+    if st.session_state.get("prev_student_code_for_level") != student_code:
+        st.session_state["schreiben_level"] = detected_level
+        st.session_state["prev_student_code_for_level"] = student_code
+else:
+    detected_level = "A1"
+    if "schreiben_level" not in st.session_state:
+        st.session_state["schreiben_level"] = detected_level
+
+# Ensure current writing level variable reflects auto-detected one
+schreiben_level = st.session_state.get("schreiben_level", "A1")
+
+st.markdown(
+    f"<span style='color:gray;font-size:0.97em;'>Auto-detected level from your code: <b>{detected_level}</b></span>",
+    unsafe_allow_html=True
+)
+
+
+st.divider()
+
+# ----------- VOCAB PRACTICE -----------
+if sub_tab == "Vocab Practice":
+    st.markdown("### 📚 Schreiben Trainer – Vocab Practice")
+    st.caption(
+        "Use this mini trainer to revise essential words for your writing tasks."
+    )
+
+    level_map: Dict[str, List[Tuple[str, ...]]] = {}
+    for lvl, entries in VOCAB_LISTS.items():
+        label = str(lvl).strip()
+        if not label or label.lower() == "nan":
+            label = "Unknown level"
+        level_map.setdefault(label, []).extend(entries)
+
+    if not level_map:
+        st.warning("No vocabulary data found. Please refresh the vocab sheet and try again.")
+    else:
+        available_levels = sorted(level_map.keys())
+        default_level = (
+            schreiben_level if schreiben_level in level_map else available_levels[0]
+        )
+        selected_level = st.selectbox(
+            "Choose a level",
+            available_levels,
+            index=available_levels.index(default_level),
+            key=f"sch_vocab_level_{student_code}",
+        )
+
+        vocab_entries = level_map.get(selected_level, [])
+
+        def _unpack_entry(entry: Tuple[str, ...]) -> Tuple[str, str, str]:
+            german = str(entry[0]) if len(entry) > 0 else ""
+            english = str(entry[1]) if len(entry) > 1 else ""
+            pronunciation = str(entry[2]) if len(entry) > 2 else ""
+            if german.lower() == "nan":
+                german = ""
+            if english.lower() == "nan":
+                english = ""
+            if pronunciation.lower() == "nan":
+                pronunciation = ""
+            return german, english, pronunciation
+
+        progress_data = (
+            load_vocab_practice_progress(student_code)
+            if student_code
+            else {}
+        )
+        practiced_keys = {
+            key for key, meta in progress_data.items() if meta.get("practiced")
+        }
+
+        def _entry_key(entry: Tuple[str, ...]) -> str:
+            german, english, _ = _unpack_entry(entry)
+            return vocab_practice_word_key(selected_level, german, english)
+
+        total_words = len(vocab_entries)
+        practiced_count = sum(
+            1 for entry in vocab_entries if _entry_key(entry) in practiced_keys
+        )
+        remaining_words = total_words - practiced_count
+        completion_ratio = practiced_count / total_words if total_words else 0.0
+
+        st.progress(
+            completion_ratio,
+            text=f"{practiced_count}/{total_words} words practiced",
+        )
+        if remaining_words <= 0 and total_words:
+            st.success(
+                "Amazing! You've practiced every word at this level. Use the buttons"
+                " below to keep the words fresh or switch to another level."
+            )
+
+        if not student_code:
+            st.info(
+                "Enter your student code to sync vocab progress with Falowen and keep"
+                " track of practiced words."
+            )
+        else:
+            st.caption("Progress is saved automatically to Firestore for this student code.")
+
+        records = []
+        for entry in vocab_entries:
+            german, english, pronunciation = _unpack_entry(entry)
+            if not german:
+                continue
+            status = (
+                "✅ Practiced" if _entry_key(entry) in practiced_keys else "⏳ Not yet"
+            )
+            records.append(
+                {
+                    "German": german,
+                    "English": english,
+                    "Pronunciation": pronunciation,
+                    "Status": status,
+                }
+            )
+
+        if records:
+            with st.expander("Word list & status", expanded=False):
+                df_vocab = pd.DataFrame(records)
+                st.dataframe(
+                    df_vocab,
+                    hide_index=True,
+                    use_container_width=True,
+                )
+
+        st.markdown("#### Practice a word")
+
+        state_prefix = f"svocab_{student_code or 'anon'}_{selected_level}"
+        current_word_key = f"{state_prefix}_current"
+
+        def _reset_attempt_state() -> None:
+            for suffix in ("guess", "show", "result"):
+                st.session_state.pop(f"{state_prefix}_{suffix}", None)
+
+        def _pick_next_word() -> Optional[Dict[str, str]]:
+            if not vocab_entries:
+                return None
+            unpracticed = [
+                entry for entry in vocab_entries if _entry_key(entry) not in practiced_keys
+            ]
+            pool = unpracticed or vocab_entries
+            entry = random.choice(pool)
+            german, english, pronunciation = _unpack_entry(entry)
+            return {
+                "level": selected_level,
+                "german": german,
+                "english": english,
+                "pronunciation": pronunciation,
+                "key": vocab_practice_word_key(selected_level, german, english),
+            }
+
+        if st.button(
+            "🔁 New word",
+            key=f"{state_prefix}_next",
+            use_container_width=True,
+        ):
+            st.session_state[current_word_key] = _pick_next_word()
+            _reset_attempt_state()
+
+        if current_word_key not in st.session_state or not st.session_state[current_word_key]:
+            st.session_state[current_word_key] = _pick_next_word()
+
+        def _normalize_answer_text(text: str) -> str:
+            cleaned = re.sub(r"[^a-zA-ZäöüÄÖÜß\s]", "", (text or "").lower())
+            return re.sub(r"\s+", " ", cleaned).strip()
+
+        def _is_correct_answer(user_text: str, answer_text: str) -> bool:
+            guess_norm = _normalize_answer_text(user_text)
+            if not guess_norm:
+                return False
+            parts = re.split(r"[,/;]", answer_text or "") or [answer_text]
+            return any(guess_norm == _normalize_answer_text(part) for part in parts)
+
+        current_word = st.session_state.get(current_word_key)
+        if not current_word:
+            st.info("No words available for this level yet. Please check another level.")
+        else:
+            german = current_word.get("german", "")
+            english = current_word.get("english", "")
+            pronunciation = current_word.get("pronunciation", "")
+            st.markdown(f"##### 🇩🇪 {german}")
+            if pronunciation and pronunciation.lower() not in ("nan", "none"):
+                st.caption(f"Pronunciation: {pronunciation}")
+
+            guess_key = f"{state_prefix}_guess"
+            guess_value = st.text_input(
+                "Type the English meaning",
+                key=guess_key,
+                placeholder="e.g., invitation, complaint, groceries",
+            )
+
+            show_key = f"{state_prefix}_show"
+            result_key = f"{state_prefix}_result"
+
+            action_cols = st.columns([2, 1])
+            with action_cols[0]:
+                if st.button(
+                    "Check answer",
+                    key=f"{state_prefix}_check",
+                    use_container_width=True,
+                ):
+                    st.session_state[show_key] = True
+                    st.session_state[result_key] = _is_correct_answer(guess_value, english)
+            with action_cols[1]:
+                if st.button(
+                    "Reveal",
+                    key=f"{state_prefix}_reveal",
+                    use_container_width=True,
+                ):
+                    st.session_state[show_key] = True
+                    st.session_state[result_key] = None
+
+            if st.session_state.get(show_key):
+                answer_text = english or "(No translation in sheet)"
+                result = st.session_state.get(result_key)
+                if result is True:
+                    st.success(f"Correct! {german} = {answer_text}")
+                elif result is False:
+                    st.info(f"Keep practicing! {german} = **{answer_text}**")
+                else:
+                    st.info(f"Answer: **{answer_text}**")
+
+                audio_url = get_audio_url(selected_level, german)
+                if audio_url:
+                    st.audio(audio_url)
+
+            practiced = current_word.get("key") in practiced_keys
+            col_prac, col_unprac = st.columns(2)
+            with col_prac:
+                if st.button(
+                    "✅ Mark practiced",
+                    key=f"{state_prefix}_mark_done",
+                    disabled=(not student_code) or practiced,
+                    use_container_width=True,
+                ):
+                    set_vocab_practice_status(
+                        student_code,
+                        level=selected_level,
+                        german=german,
+                        english=english,
+                        practiced=True,
+                    )
+                    st.session_state["need_rerun"] = True
+            with col_unprac:
+                if st.button(
+                    "↩️ Mark not practiced",
+                    key=f"{state_prefix}_mark_todo",
+                    disabled=(not student_code) or not practiced,
+                    use_container_width=True,
+                ):
+                    set_vocab_practice_status(
+                        student_code,
+                        level=selected_level,
+                        german=german,
+                        english=english,
+                        practiced=False,
+                    )
+                    st.session_state["need_rerun"] = True
+
+            if not student_code:
+                st.caption("Sign in with your student code to enable progress tracking.")
+
+# ----------- PRACTICE LETTERS -----------
+if sub_tab == "Practice Letters":
+    try:
+        from src.schreiben_prompts_module import get_prompts_for_level
+    except Exception:  # pragma: no cover - fallback if module missing
+        def get_prompts_for_level(_level):
+            return []
+
+    prompts = get_prompts_for_level(schreiben_level)
+    if prompts:
+        options = [p["Thema"] for p in prompts]
+        selected_theme = st.selectbox(
+            "Choose a prompt",
+            options,
+            key=f"practice_prompt_{student_code}",
+        )
+        st.markdown(
+            "**[German Writing Rules](https://drive.google.com/file/d/1o7_ez3WSNgpgxU_nEtp6EO1PXDyi3K3b/view?usp=sharing)**",
+        )
+        prompt = next((p for p in prompts if p["Thema"] == selected_theme), None)
+        if prompt:
+            st.markdown(f"### ✉️ {prompt['Thema']}")
+            st.markdown("\n".join(f"- {p}" for p in prompt['Punkte']))
+    else:
+        st.selectbox(
+            "Choose a prompt",
+            ["(no prompts available)"],
+            key=f"practice_prompt_{student_code}",
+        )
+    st.info(
+        "Use \u201cMark My Letter\u201d to submit your response for evaluation and \u201cIdeas Generator (Letter Coach)\u201d when you need inspiration.",
+    )
+
+# ----------- 1. MARK MY LETTER -----------
+if sub_tab == "Mark My Letter":
+    daily_so_far = get_schreiben_usage(student_code)
+    st.markdown(f"**Daily usage:** {daily_so_far} / {SCHREIBEN_DAILY_LIMIT}")
+
+    st.markdown(
+        "**[German Writing Rules](https://drive.google.com/file/d/1o7_ez3WSNgpgxU_nEtp6EO1PXDyi3K3b/view?usp=sharing)**",
+    )
+
+    try:
+        _ = _wkey
+    except NameError:
+        import hashlib
+
+        def _wkey(base: str) -> str:
+            sc = str(st.session_state.get("student_code", "anon"))
+            return f"{base}_{hashlib.md5(f'{base}|{sc}'.encode()).hexdigest()[:8]}"
+
+    draft_key = _wkey("schreiben_letter")
+    existing_draft = load_draft_from_db(student_code, draft_key)
+    existing_feedback, existing_letter = load_schreiben_feedback(student_code)
+    if existing_feedback or existing_letter:
+        st.session_state[f"{student_code}_last_feedback"] = existing_feedback
+        st.session_state[f"{student_code}_last_user_letter"] = existing_letter
+
+    letter_disabled = daily_so_far >= SCHREIBEN_DAILY_LIMIT
+    if letter_disabled:
+        st.warning(
+            "You've reached today's limit for letter corrections. Please come back"
+            " tomorrow after the daily quota resets to submit a new letter. While"
+            " you wait, feel free to explore the other tabs for prompts, ideas, or"
+            " practice activities."
+        )
+
+    user_letter = st.text_area(
+        "Paste or type your German letter/essay here.",
+        key=draft_key,
+        value=existing_draft,
+        on_change=lambda: save_now(draft_key, student_code),
+        height=400,
+        placeholder="Write your German letter here...",
+        disabled=letter_disabled,
+    )
+
+    render_umlaut_pad(
+        draft_key,
+        context=f"schreiben_mark_{student_code}",
+        disabled=letter_disabled,
+    )
+
+    autosave_maybe(student_code, draft_key, user_letter, min_secs=2.0, min_delta=20)
+
+    if st.button("\U0001f4be Save Draft", key=f"save_draft_btn_{student_code}"):
+        save_now(draft_key, student_code)
+        toast_once("Draft saved!", "✅")
+    st.caption("Auto-saves every few seconds or click 'Save Draft' to save now.")
+
+    def clear_feedback_and_start_new():
+        for k in [
+            "last_feedback",
+            "last_user_letter",
+            "delta_compare_feedback",
+            "improved_letter",
+            "final_improved_letter",
+        ]:
+            st.session_state.pop(f"{student_code}_{k}", None)
+        st.session_state[f"{student_code}_awaiting_correction"] = False
+        st.session_state.pop(draft_key, None)
+        save_now(draft_key, student_code)
+        lv, lt, sf, sa = _draft_state_keys(draft_key)
+        for key in (lv, lt, sf, sa):
+            st.session_state.pop(key, None)
+        delete_schreiben_feedback(student_code)
+        st.session_state["need_rerun"] = True
+
+    if st.session_state.get(f"{student_code}_last_feedback"):
+        st.info(
+            "Draft auto-save is paused while feedback is visible. "
+            "Clear feedback to resume saving."
+        )
+
+    # --- Word count and Goethe exam rules ---
+    import re
+    def get_level_requirements(level):
+        reqs = {
+            "A1": {"min": 25, "max": 40, "desc": "A1 formal/informal letters should be 25–40 words. Cover all bullet points."},
+            "A2": {"min": 30, "max": 40, "desc": "A2 formal/informal letters should be 30–40 words. Cover all bullet points."},
+            "B1": {"min": 80, "max": 150, "desc": "B1 letters/essays should be about 80–150 words, with all points covered and clear structure."},
+            "B2": {"min": 150, "max": 250, "desc": "B2 essays are 180–220 words, opinion essays or reports, with good structure and connectors."},
+            "C1": {"min": 230, "max": 350, "desc": "C1 essays are 230–250+ words. Use advanced structures and express opinions clearly."}
+        }
+        return reqs.get(level.upper(), reqs["A1"])
+
+    def count_words(text):
+        return len(re.findall(r'\b\w+\b', text))
+
+    if user_letter.strip():
+        words = re.findall(r'\b\w+\b', user_letter)
+        chars = len(user_letter)
+        st.info(f"**Word count:** {len(words)} &nbsp;|&nbsp; **Character count:** {chars}")
+
+        # -- Apply Goethe writing rules here --
+        requirements = get_level_requirements(detected_level)  # << USE AUTO-DETECTED LEVEL
+        word_count = count_words(user_letter)
+        min_wc = requirements["min"]
+        max_wc = requirements["max"]
+
+        if detected_level in ("A1", "A2"):
+            if word_count < min_wc:
+                st.error(f"⚠️ Your letter is too short for {detected_level} ({word_count} words). {requirements['desc']}")
+                st.stop()
+            elif word_count > max_wc:
+                st.warning(f"ℹ️ Your letter is a bit long for {detected_level} ({word_count} words). The exam expects {min_wc}-{max_wc} words.")
+        else:
+            if word_count < min_wc:
+                st.error(f"⚠️ Your essay is too short for {detected_level} ({word_count} words). {requirements['desc']}")
+                st.stop()
+            elif word_count > max_wc + 40 and detected_level in ("B1", "B2"):
+                st.warning(f"ℹ️ Your essay is longer than the usual limit for {detected_level} ({word_count} words). Try to stay within the guidelines.")
+
+    # --------- Reset correction states (do not indent inside above ifs)
+    for k, v in [
+        ("last_feedback", None),
+        ("last_user_letter", None),
+        ("delta_compare_feedback", None),
+        ("improved_letter", ""),
+        ("awaiting_correction", False),
+        ("final_improved_letter", "")
+    ]:
+        session_key = f"{student_code}_{k}"
+        if session_key not in st.session_state:
+            st.session_state[session_key] = v
+
+    # Namespaced correction state per student (reset on session)
+    for k, v in [
+        ("last_feedback", None),
+        ("last_user_letter", None),
+        ("delta_compare_feedback", None),
+        ("improved_letter", ""),
+        ("awaiting_correction", False),
+        ("final_improved_letter", "")
+    ]:
+        session_key = f"{student_code}_{k}"
+        if session_key not in st.session_state:
+            st.session_state[session_key] = v
+
+    submit_disabled = (not user_letter.strip()) or (daily_so_far >= SCHREIBEN_DAILY_LIMIT)
+    feedback_btn = st.button(
+        "Get Feedback",
+        type="primary",
+        disabled=submit_disabled,
+        key=f"feedback_btn_{student_code}"
+    )
+
+    if feedback_btn:
+        st.session_state[f"{student_code}_awaiting_correction"] = True
+        ai_prompt = (
+            f"You are Herr Felix, a supportive and innovative German letter writing trainer.\n"
+            f"You help students prepare for A1, A2, B1, B2, and C1 German exam letters or essays.\n"
+            f"The student has submitted a {schreiben_level} German letter or essay.\n"
+            f"Your job is to mark, score, and explain feedback in a kind, step-by-step way.\n"
+            f"Always answer in English.\n"
+            f"Begin with a warm greeting that uses the student's name ({student_name}) and refer to them by name throughout your feedback.\n"
+            f"1. Give a quick summary (one line) of how well the student did overall.\n"
+            f"2. Then show a detailed breakdown of strengths and weaknesses in 4 areas:\n"
+            f"   Grammar, Vocabulary, Spelling, Structure.\n"
+            f"3. For each area, say what was good and what should improve.\n"
+            f"4. Highlight every mistake with [wrong]...[/wrong] and every good example with [correct]...[/correct].\n"
+            f"5. Give 2-3 improvement tips in bullet points.\n"
+            f"6. At the end, give a realistic score out of 25 in the format: Score: X/25.\n"
+            f"7. For A1 and A2, be strict about connectors, basic word order, modal verbs, and correct formal/informal greeting.\n"
+            f"8. For B1+, mention exam criteria and what examiner wants.\n"
+            f"9. Never write a new letter for the student, only mark what they submit.\n"
+            f"10. When possible, point out specific lines or examples from their letter in your feedback.\n"
+            f"11. When student score is 18 or above then they have passed. When score is less than 18, is a fail and they must try again before submitting to prevent low marks.\n"
+            f"12. After completion, remind them to only copy their improved letter without your feedback, go to 'my course' on the app and submit together with their lesen and horen answers. They only share the letter and feedback with their teacher for evaluation only when they preparing for the exams\n"
+            
+        )
+
+        with st.spinner("🧑‍🏫 Herr Felix is typing..."):
+            try:
+                completion = client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": ai_prompt},
+                        {"role": "user", "content": user_letter},
+                    ],
+                    temperature=0.6,
+                )
+                feedback = completion.choices[0].message.content
+                st.session_state[f"{student_code}_last_feedback"] = feedback
+                st.session_state[f"{student_code}_last_user_letter"] = user_letter
+                st.session_state[f"{student_code}_delta_compare_feedback"] = None
+            except Exception:
+                st.error("AI feedback failed. Please check your OpenAI setup.")
+                feedback = None
+
+        if feedback:
+            st.markdown("[⬇️ Jump to feedback](#feedback-reference)")
+            st.session_state[f"{student_code}_awaiting_correction"] = True
+
+            save_schreiben_feedback(student_code, feedback, user_letter)
+
+            # --- Save to Firestore ---
+            score_match = re.search(r"Score[: ]+(\d+)", feedback)
+            score = int(score_match.group(1)) if score_match else 0
+            passed = score >= 18
+            save_submission(
+                student_code=student_code,
+                score=score,
+                passed=passed,
+                timestamp=None,  # Not needed
+                level=schreiben_level,
+                letter=user_letter
+            )
+            update_schreiben_stats(student_code)
+            inc_schreiben_usage(student_code)
+            discard_pending_draft(student_code, draft_key)
+            save_draft_to_db(student_code, draft_key, "")
+            st.session_state.pop(draft_key, None)
+
+    elif (
+        st.session_state.get(f"{student_code}_last_feedback")
+        and st.session_state.get(f"{student_code}_last_user_letter")
+    ):
+        st.markdown("[⬇️ Jump to feedback](#feedback-reference)")
+        
+    # --- Improvement section: Compare, download, WhatsApp ---
+    if st.session_state.get(f"{student_code}_last_feedback") and st.session_state.get(f"{student_code}_last_user_letter"):
+        st.markdown("---")
+        st.markdown('<div id="feedback-reference"></div>', unsafe_allow_html=True)
+        st.markdown("#### 📝 Feedback from Herr Felix (Reference)")
+        st.markdown(
+            highlight_feedback(st.session_state[f"{student_code}_last_feedback"]),
+            unsafe_allow_html=True
+        )
+        clear_feedback_reference = st.button(
+            "🗑️ Clear feedback and start a new letter",
+            key=f"clear_feedback_{student_code}_reference",
+        )
+        if clear_feedback_reference:
+            clear_feedback_and_start_new()
+        st.markdown(
+            """
+                <div style="background:#e3f7da; border-left:7px solid #44c767;
+                color:#295327; padding:1.15em; margin-top:1em; border-radius:10px; font-size:1.09em;">
+                    🔁 <b>Try to improve your letter!</b><br>
+                    Paste your improved version below and click <b>Compare My Improvement</b>.<br>
+                    The AI will highlight what’s better, what’s still not fixed, and give extra tips.<br>
+                    <b>You can download or share the improved version & new feedback below.</b>
+                </div>
+                """, unsafe_allow_html=True
+        )
+        improved_letter = st.text_area(
+            "Your improved version (try to fix the mistakes Herr Felix mentioned):",
+            key=f"{student_code}_improved_letter",
+            height=400,
+            placeholder="Paste your improved letter here..."
+        )
+        render_umlaut_pad(
+            f"{student_code}_improved_letter",
+            context=f"schreiben_improve_{student_code}",
+        )
+        compare_clicked = st.button("Compare My Improvement", key=f"compare_btn_{student_code}")
+
+        if compare_clicked and improved_letter.strip():
+            ai_compare_prompt = (
+                "You are Herr Felix, a supportive German writing coach. "
+                "A student first submitted this letter:\n\n"
+                f"{st.session_state[f'{student_code}_last_user_letter']}\n\n"
+                "Your feedback was:\n"
+                f"{st.session_state[f'{student_code}_last_feedback']}\n\n"
+                "Now the student has submitted an improved version below.\n"
+                f"The student's name is {student_name}. Begin by greeting {student_name} and continue to use their name warmly throughout your response.\n"
+                "Compare both versions and:\n"
+                "- Tell the student exactly what they improved, and which mistakes were fixed.\n"
+                "- Point out if there are still errors left, with new tips for further improvement.\n"
+                "- Encourage the student. If the improvement is significant, say so.\n"
+                "1. If student dont improve after the third try, end the chat politely and tell the student to try again tomorrow. Dont continue to give the feedback after third try.\n"
+                "2. Always explain your feeback in English for them to understand. You can still highlight their german phrases. But your correction should be english\n"
+                "3. For A1 and A2 students, make sure a sentence is not more than 7 words."
+                "4. For A1 and A2 students, break their phrases down for them when they use relative clauses."
+                "5. For A1 and A2 students, only recommend connectors such as deshalb, weil, ich mochte wissen,und,oder."
+                "- Give a revised score out of 25 (Score: X/25)."
+            )
+            with st.spinner("👨‍🏫 Herr Felix is comparing your improvement..."):
+                try:
+                    result = client.chat.completions.create(
+                        model="gpt-4o",
+                        messages=[
+                            {"role": "system", "content": ai_compare_prompt},
+                            {"role": "user", "content": improved_letter}
+                        ],
+                        temperature=0.5,
+                    )
+                    compare_feedback = result.choices[0].message.content
+                    st.session_state[f"{student_code}_delta_compare_feedback"] = compare_feedback
+                    st.session_state[f"{student_code}_final_improved_letter"] = improved_letter
+                except Exception as e:
+                    st.session_state[f"{student_code}_delta_compare_feedback"] = f"Sorry, there was an error comparing your letters: {e}"
+
+        if st.session_state.get(f"{student_code}_delta_compare_feedback"):
+            st.markdown("---")
+            st.markdown("### 📝 Improvement Feedback from Herr Felix")
+            st.markdown(highlight_feedback(st.session_state[f"{student_code}_delta_compare_feedback"]), unsafe_allow_html=True)
+
+            # PDF & WhatsApp buttons
+            from fpdf import FPDF
+            import urllib.parse
+            import os
+
+            def sanitize_text(text):
+                return text
+
+            # PDF
+            pdf = FPDF()
+            pdf.add_font("DejaVu", "", "font/DejaVuSans.ttf", uni=True)
+            pdf.add_page()
+            pdf.set_font("DejaVu", size=12)
+            improved_letter = st.session_state.get(f"{student_code}_final_improved_letter", "")
+            improved_feedback = st.session_state[f"{student_code}_delta_compare_feedback"]
+            pdf.multi_cell(0, 10, f"Your Improved Letter:\n\n{sanitize_text(improved_letter)}\n\nFeedback from Herr Felix:\n\n{sanitize_text(improved_feedback)}")
+            pdf_output = f"Feedback_{student_code}_{schreiben_level}_improved.pdf"
+            pdf.output(pdf_output)
+            with open(pdf_output, "rb") as f:
+                pdf_bytes = f.read()
+            st.download_button(
+                "⬇️ Download Improved Version + Feedback (PDF)",
+                pdf_bytes,
+                file_name=pdf_output,
+                mime="application/pdf"
+            )
+            os.remove(pdf_output)
+
+            # WhatsApp share
+            wa_message = (
+                f"Hi, here is my IMPROVED German letter and AI feedback:\n\n"
+                f"{improved_letter}\n\n"
+                f"Feedback:\n{st.session_state[f'{student_code}_delta_compare_feedback']}"
+            )
+            wa_url = (
+                "https://api.whatsapp.com/send"
+                "?phone=233205706589"
+                f"&text={urllib.parse.quote(wa_message)}"
+            )
+            st.markdown(
+                f"[📲 Send Improved Letter & Feedback to Tutor on WhatsApp]({wa_url})",
+                unsafe_allow_html=True,
+            )
+            clear_feedback = st.button(
+                "🗑️ Clear feedback and start a new letter",
+                key=f"clear_feedback_{student_code}",
+            )
+            if clear_feedback:
+                for k in [
+                    "last_feedback",
+                    "last_user_letter",
+                    "delta_compare_feedback",
+                    "improved_letter",
+                    "final_improved_letter",
+                ]:
+                    st.session_state.pop(f"{student_code}_{k}", None)
+                st.session_state[f"{student_code}_awaiting_correction"] = False
+                st.session_state.pop(draft_key, None)
+                save_now(draft_key, student_code)
+                lv, lt, sf, sa = _draft_state_keys(draft_key)
+                for key in (lv, lt, sf, sa):
+                    st.session_state.pop(key, None)
+                st.session_state["need_rerun"] = True
+if sub_tab == "Ideas Generator (Letter Coach)":
+    import io
+
+    # === NAMESPACED SESSION KEYS (per student) ===
+    student_code = st.session_state.get("student_code", "demo")
+    student_name = _safe_str(st.session_state.get("student_name"), "Student") or "Student"
+    ns_prefix = f"{student_code}_letter_coach_"
+    def ns(key): return ns_prefix + key
+
+    prompt_draft_key = ns("prompt_draft")
+    chat_draft_key = ns("chat_draft")
+    drafts_hydrated_key = ns("drafts_hydrated")
+    draft_sync_key = ns("draft_sync_cache")
+
+    # --- Reset per-student Letter Coach state on student change ---
+    prev_letter_coach_code = st.session_state.get("prev_letter_coach_code", None)
+    if student_code != prev_letter_coach_code:
+        last_prompt, last_chat = load_letter_coach_progress(student_code)
+        st.session_state[ns("prompt")] = last_prompt or ""
+        st.session_state[ns("chat")] = last_chat or []
+        st.session_state[ns("stage")] = 1 if last_chat else 0
+        st.session_state["prev_letter_coach_code"] = student_code
+        st.session_state[drafts_hydrated_key] = False
+        st.session_state[draft_sync_key] = ("", "")
+
+    # --- Set per-student defaults if missing ---
+    for k, default in [
+        ("prompt", ""),
+        ("chat", []),
+        ("stage", 0),
+        ("clear_prompt", False),
+        ("clear_chat", False),
+        ("clear_chat_draft", False),
+        ("drafts_hydrated", False),
+        ("draft_sync_cache", ("", "")),
+    ]:
+        if ns(k) not in st.session_state:
+            st.session_state[ns(k)] = default
+
+    if not st.session_state.get(drafts_hydrated_key):
+        prompt_draft, chat_draft, _, updated_at = load_letter_coach_draft(student_code)
+        reset_local_draft_state(
+            prompt_draft_key,
+            prompt_draft or "",
+            saved=bool(prompt_draft),
+            saved_at=updated_at,
+        )
+        reset_local_draft_state(
+            chat_draft_key,
+            chat_draft or "",
+            saved=bool(chat_draft),
+            saved_at=updated_at,
+        )
+        st.session_state[draft_sync_key] = (
+            prompt_draft or "",
+            chat_draft or "",
+        )
+        st.session_state[drafts_hydrated_key] = True
+
+    def sync_letter_coach_draft_state() -> None:
+        if not student_code:
+            return
+        prompt_text = st.session_state.get(prompt_draft_key, "") or ""
+        chat_text = st.session_state.get(chat_draft_key, "") or ""
+        payload = (prompt_text, chat_text)
+        if st.session_state.get(draft_sync_key) == payload:
+            return
+        save_letter_coach_draft(student_code, prompt_text, chat_text)
+        st.session_state[draft_sync_key] = payload
+
+    def clear_letter_coach_draft_state() -> None:
+        if not student_code:
+            return
+        clear_letter_coach_draft(student_code)
+        st.session_state[draft_sync_key] = ("", "")
+
+    def save_prompt_draft_now(*, show_toast: bool = True) -> None:
+        save_now(prompt_draft_key, student_code, show_toast=show_toast)
+        sync_letter_coach_draft_state()
+
+    def save_chat_draft_now(*, show_toast: bool = True) -> None:
+        save_now(chat_draft_key, student_code, show_toast=show_toast)
+        sync_letter_coach_draft_state()
+
+    if st.session_state.get(ns("reset_coach")):
+        st.session_state[ns("prompt")] = ""
+        st.session_state[ns("chat")] = []
+        st.session_state[ns("stage")] = 0
+        reset_local_draft_state(prompt_draft_key, "")
+        reset_local_draft_state(chat_draft_key, "")
+        save_prompt_draft_now()
+        save_chat_draft_now()
+        clear_letter_coach_draft_state()
+        st.session_state.pop(ns("reset_coach"))
+
+    phrase_sections = [
+        (
+            "Termin absagen (Cancelling an appointment)",
+            [
+                "Ich schreibe Ihnen, weil ich den Termin absagen möchte.",
+                "Es tut mir leid, ich kann nicht kommen.",
+                "Entschuldigung, ich muss den Termin absagen.",
+                "Können wir einen anderen Termin vereinbaren?",
+            ],
+        ),
+        (
+            "Anfragen und Informationen (Making enquiries)",
+            [
+                "Ich schreibe Ihnen, weil ich eine Anfrage stellen möchte.",
+                "Ich möchte eine Anfrage stellen.",
+                "Könnten Sie mir bitte Informationen über [Thema] geben?",
+                "Wie viel kostet das und wie soll ich bezahlen?",
+                "Kann ich mit Kreditkarte oder bar bezahlen?",
+            ],
+        ),
+        (
+            "Hotel reservieren (Hotel reservation)",
+            [
+                "Ich schreibe Ihnen, weil ich ein Hotelzimmer reservieren möchte.",
+                "Ich möchte ein Hotelzimmer reservieren.",
+                "Haben Sie vom [Datum] bis zum [Datum] ein freies Zimmer?",
+                "Könnten Sie mir bitte die Preise für ein Einzelzimmer nennen?",
+                "Ich brauche das Zimmer für [Number] Personen.",
+            ],
+        ),
+        (
+            "Neuen Termin vereinbaren (Setting a new appointment)",
+            [
+                "Ich schreibe Ihnen, weil ich einen neuen Termin vereinbaren möchte.",
+                "Können wir einen anderen Termin vereinbaren?",
+                "Es regnet, deshalb kann ich nicht kommen.",
+                "Ich bin krank. Ich habe Kopfschmerzen.",
+            ],
+        ),
+        (
+            "Geburtstag feiern (Celebrating a birthday)",
+            [
+                "Ich schreibe Ihnen, weil ich Ihnen zum Geburtstag gratulieren möchte.",
+                "Herzlichen Glückwunsch zum Geburtstag!",
+                "Ich wünsche Ihnen einen wunderschönen Tag mit Ihrer Familie.",
+                "Feiern Sie am Wochenende?",
+                "Alles Gute und viel Gesundheit für das neue Lebensjahr!",
+            ],
+        ),
+        (
+            "Neuer Job (Congratulating on a new job)",
+            [
+                "Ich schreibe Ihnen, weil ich Ihnen zum neuen Job gratulieren möchte.",
+                "Herzlichen Glückwunsch zu Ihrem neuen Job!",
+                "Ich freue mich sehr über diese tolle Nachricht.",
+                "Ich wünsche Ihnen viel Erfolg in der neuen Position.",
+                "Wo ist die Party?",
+            ],
+        ),
+        (
+            "Hochzeits-Einladung (Wedding invitation)",
+            [
+                "Ich schreibe Ihnen, weil ich Sie zu unserer Hochzeit einladen möchte.",
+                "Wir heiraten am [Datum].",
+                "Die Feier ist in [Ort] und beginnt um [Uhrzeit].",
+                "Bitte sagen Sie uns bis [Datum], ob Sie kommen können.",
+                "Wir freuen uns sehr auf Sie.",
+            ],
+        ),
+        (
+            "Zur Hochzeit gratulieren (Congratulating on a wedding)",
+            [
+                "Ich schreibe Ihnen, weil ich Ihnen zur Hochzeit gratulieren möchte.",
+                "Herzlichen Glückwunsch zu Ihrer Hochzeit!",
+                "Ich wünsche Ihnen viel Glück und Liebe.",
+                "Ich freue mich sehr für Sie beide.",
+            ],
+        ),
+        (
+            "Dank aussprechen (Expressing thanks)",
+            [
+                "Ich schreibe Ihnen, weil ich mich bedanken möchte.",
+                "Vielen Dank für Ihre schnelle Antwort.",
+                "Ich danke Ihnen herzlich für die Unterstützung.",
+                "Ihre Hilfe hat mir sehr weitergeholfen.",
+                "Bitte lassen Sie mich wissen, wenn ich mich revanchieren kann.",
+            ],
+        ),
+        (
+            "Sich entschuldigen (Apologising)",
+            [
+                "Ich schreibe Ihnen, weil ich mich entschuldigen möchte.",
+                "Es tut mir sehr leid für die Unannehmlichkeiten.",
+                "Bitte entschuldigen Sie meinen Fehler.",
+                "Ich werde darauf achten, dass es nicht wieder passiert.",
+                "Vielen Dank für Ihr Verständnis.",
+            ],
+        ),
+    ]
+
+    download_lines = ["Schreiben Trainer – Phrase Bank", ""]
+    for title, phrases in phrase_sections:
+        download_lines.append(title)
+        download_lines.extend(f"- {phrase}" for phrase in phrases)
+        download_lines.append("")
+
+    with st.expander("📚 Quick phrase bank for common Schreiben tasks"):
+        st.markdown(
+            "These ready-to-use fragments help you start or finish typical Schreiben tasks. "
+            "Add your own details (Zeit, Ort, Grund) to customise each sentence."
+        )
+        for title, phrases in phrase_sections:
+            st.markdown(f"**{title}**")
+            st.markdown("\n".join(f"- {phrase}" for phrase in phrases))
+        st.download_button(
+            "📥 Download phrase bank (TXT)",
+            data="\n".join(download_lines),
+            file_name="schreiben_phrase_bank.txt",
+            mime="text/plain",
+        )
+
+    st.markdown(
+        "**[German Writing Rules](https://drive.google.com/file/d/1o7_ez3WSNgpgxU_nEtp6EO1PXDyi3K3b/view?usp=sharing)**",
+    )
+    
+
+# Patch: enforce '…möchte' in the reason line + add conclusion 'Ich freue mich im Voraus auf Ihre/deine Antwort'
+    LETTER_COACH_PROMPTS = {
+        "A1": (
+            "You are Herr Felix, a creative, supportive German letter-writing coach for A1 students. "
+            "Your mission: idea generator + step-by-step coach. "
+            "Always reply in English. You may show short German fragments (2–3 words), but never full sentences. "
+            "Classify each student message as: NEW PROMPT, CONTINUATION, or QUESTION. "
+            "• If QUESTION: answer simply, encourage progress, then prompt the next step only. "
+            "• If CONTINUATION: give brief corrections and guide the next step only. "
+            "    1) Give short ideas, structure, tips, and 2–3 word German fragments. Don’t overfeed; let them think. "
+            "    2) Allowed connectors only: 'und', 'aber', 'weil', 'deshalb', 'ich möchte wissen, ob', 'ich möchte wissen, wann'. "
+            "       Do NOT suggest 'da', 'dass', relative clauses, or advanced tenses (keep present + basic modals). "
+            "    3) Requests: teach 'Könnten Sie … [Infinitiv am Ende]?' and show the main verb at the end. "
+            "    4) Greeting + Introduction (fragments; enforce comma/space + register consistency): "
+            "       • Formal: 'Ich hoffe, es geht Ihnen gut. Ich schreibe Ihnen, weil ich … möchte.' "
+            "       • Informal: 'Wie geht es dir? Ich hoffe, es geht dir gut. Ich schreibe dir, weil ich … möchte.' "
+            "       The reason line must END with 'möchte' to keep it simple and consistent at A1. "
+            "    5) Closing/conclusion templates (teach explicitly): "
+            "       • Formal: 'Ich freue mich im Voraus auf Ihre Antwort.'  +  'Mit freundlichen Grüßen,' + [Name] "
+            "       • Informal: 'Ich freue mich im Voraus auf deine Antwort.'  +  'Viele Grüße,' + [Name] "
+            "    6) Word-order guard rails: "
+            "       • 'weil'-clause → verb at the end (warn if not). "
+            "       • Requests with 'Könnten Sie' → infinitive at the end (warn if not). "
+            "    7) If a line uses ≥2 conjunctions or is long/complex, warn and split. "
+            "    8) If a line exceeds ~7–8 words, break into short statements with full stops. "
+            "    9) Final letter length target: 25–35 words. "
+            "    10) Scenario mini-banks (fragments only): "
+            "        • Cancellation: Wetter/Gesundheit + 'Termin absagen' "
+            "        • Enquiry/registration: 'Anfrage stellen'; add 'Wie viel kostet …?' "
+            "        • Registration/course: 'anfangen'/'beginnen' "
+            "        • Appointment: 'neuen Termin vereinbaren' "
+            "        • Apology: 'Es tut mir leid.' "
+            "    11) Never write full sentences. Provide only fragments/keywords; the student writes the sentences. "
+            "    12) Remind students to type their own words (no translator); you will correct them. "
+            "If NEW PROMPT: give a 5-part overview (greeting, introduction, reason, request, closing) with micro-examples (fragments only). "
+            "Always end with: 'Your next recommended step:' and request exactly one part at a time—first greeting (wait), then introduction (wait), then reason, then request, then closing. "
+            "After each reply: correct briefly, give one tip, then again: 'Your next recommended step:' for the next single part. "
+            "Session pacing: aim to finish in ~10 student replies. If not done, say: 'Most letters can be completed in about 10 steps. Please try to finish soon.' "
+            "At 14 replies without completion: 'We have reached the end of this coaching session. Please copy your letter below so far and paste it into the “Mark My Letter” tool for full AI feedback and a score.' "
+        ),
+        "A2": (
+            "You are Herr Felix, a creative, supportive German letter-writing coach for A2 students. "
+            "Role: idea generator + step-by-step coach. "
+            "Always reply in English. You may show short German fragments (2–3 words), never full sentences. "
+            "Classify each message: NEW PROMPT, CONTINUATION, or QUESTION. "
+            "• If QUESTION: answer simply, encourage progress, then prompt the next step only. "
+            "• If CONTINUATION: correct briefly and guide the next step only. "
+            "    1) Require sequencing: 'Zuerst' (first idea), 'Dann' or 'Außerdem' (next idea), 'Zum Schluss' (final/closing bridge). Prefer 'Zuerst' over 'Erstens'. "
+            "    2) Connectors: 'und', 'aber', 'weil', 'denn', 'deshalb', 'ich möchte wissen, ob/wann/wo'. Recommend one at a time; if ≥2 used in a short line, simplify to one. "
+            "    3) Greeting + Introduction templates (teach explicitly; split into fragments if needed): "
+            "       • Formal: 'Ich hoffe, es geht Ihnen gut. Ich schreibe Ihnen, weil …' "
+            "       • Informal: 'Wie geht es dir? Ich hoffe, es geht dir gut. Ich schreibe dir, weil …' "
+            "       Enforce comma after 'Ihnen/dir,' in 'Ich schreibe Ihnen/dir, weil …'. "
+            "    4) After every reply, give one tip or one phrase fragment—never full sentences. "
+            "    5) Keep lines short: ~7–8 words; split long lines. "
+            "    6) Letter length target: 30–40 words. "
+            "    7) Scenarios: cancellations (health/weather; 'absagen'), enquiries/registrations ('Anfrage stellen'; include 'Wie viel kostet …?'), appointments ('neuen Termin vereinbaren'). "
+            "    8) Apologies: 'Es tut mir leid.' "
+            "    9) Always correct grammar and suggest improved fragments when needed. "
+            "Steps: greeting → introduction → 'Zuerst' idea → 'Außerdem' (or 'Dann') → 'Zum Schluss' → polite closing cue ('Ich freue mich …'). "
+            "Always end with: 'Your next recommended step:' and ask for exactly one section at a time. "
+            "Do not write the full letter; guide only. Remind students to type their own words; you will correct them. "
+            "Session pacing: finish in ~10 replies; if not, remind to finish soon. End at 14 with: copy/paste into 'Mark My Letter' for feedback. "
+        ),
+        "B1": (
+            "You are Herr Felix, a supportive German letter/essay coach for B1 students—idea generator + step-by-step coach. "
+            "Always reply in English; show only short German fragments (2–3 words), never full sentences. "
+            "Detect type: formal letter, informal letter, or opinion essay. If unclear, ask which type. "
+            "    1) Give short ideas, structure, tips, and 2–3 word German fragments. Don’t overfeed. "
+            "    2) Enforce paragraph logic with clear starters/sequence. "
+            "    3) After each student line, add 1–2 ideas if helpful (fragments only). "
+            "    4) Length targets: formal letter 40–50 words; informal letter & opinion essay 80–90 words (intro, body, conclusion). "
+            "    5) Provide fragments only; the student completes each sentence. "
+            "    6) Remind them to type their own words; you will correct mistakes. "
+            "    7) Never write full sentences for them. "
+            "Greeting options for forum/opinion posts (teach explicitly; choose one): "
+            "    • 'Hallo zusammen,'  • 'Liebe Forenmitglieder,'  • 'Liebes Forum,'  • 'Liebe Community,' "
+            "    Avoid: 'Lieber Forummitglieder' (wrong: gender/number and compound). "
+            "Opinion essay template (fragments only): "
+            "    • 'Heutzutage ist das Thema' + [Thema] + 'ein wichtiges Thema in unserem Leben.' "
+            "    • 'Ich bin der Meinung, dass' + [Info] + ', weil' + [Info] + '.' "
+            "    • 'Einerseits gibt es viele Vorteile.'  'Zum Beispiel' + [Verb/Modal] + [Info] + '.' "
+            "    • 'Andererseits gibt es auch Nachteile.'  'Ein Beispiel dafür ist' + [Nomen] + '. ' + 'Kleine Info.' "
+            "    • 'Ich glaube, dass' + [eigene Meinung] + '.' "
+            "    • 'Zusammenfassend lässt sich sagen, dass' + [Thema] + '… positiv/negativ … beeinflussen kann.' "
+            "Process: ask one section at a time with 'Your next recommended step:' (intro → pros → cons → opinion → conclusion). "
+            "Session pacing: ~10 replies; end at 14 with 'Mark My Letter'. "
+        ),
+        "B2": (
+            "You are Herr Felix, a supportive German writing coach for B2—idea generator + step-by-step coach. "
+            "Always reply in English; you may show short German fragments (2–3 words), never full sentences. "
+            "Detect type: formal letter, informal letter, or opinion/argumentative essay. If unclear, ask which type. "
+            "    1) Give short ideas, structure, tips, and 2–3 word German fragments. Don’t overfeed. "
+            "    2) Enforce paragraph logic with clear sequence and topic focus. "
+            "    3) Add 1–2 ideas after each submission (fragments only) if helpful. "
+            "    4) Length targets: formal letter 100–150 words; opinion/argumentative essay 150–170 words. "
+            "Forum/opinion post greetings (pick one): "
+            "    • 'Hallo zusammen,'  • 'Liebe Forenmitglieder,'  • 'Liebes Forum,'  • 'Liebe Community,' "
+            "    Avoid: 'Lieber Forummitglieder' (wrong form). "
+            "Opinion/argumentative scaffold (fragments only): thesis → arguments (pro) → counter (contra) → conclusion. "
+            "Always end with 'Your next recommended step:' and request exactly one section at a time. "
+            "Session pacing: finish in ~10 replies; end at 14 with 'Mark My Letter' paste instruction. "
+        ),
+
+
+        "B2": (
+            "You are Herr Felix, a supportive German writing coach for B2—idea generator + step-by-step coach. "
+            "Always reply in English; you may show short German fragments (2–3 words), never full sentences. "
+            "Detect type: formal letter, informal letter, or opinion/argumentative essay. If unclear, ask which type. "
+            "    1) Give short ideas, structure, tips, and 2–3 word German fragments. Don’t overfeed. "
+            "    2) Enforce paragraph logic with clear sequence and topic focus. "
+            "    3) Add 1–2 ideas after each student submission (fragments only) if helpful. "
+            "    4) Length targets: formal letter 100–150 words; opinion/argumentative essay 150–170 words. "
+            "    5) Always correct grammar and suggest stronger phrasing (fragments). "
+            "Greeting + Introduction templates (teach explicitly; split into fragments if needed): "
+            "    • Formal: 'Ich hoffe, es geht Ihnen gut. Ich schreibe Ihnen, weil …' "
+            "    • Informal: 'Wie geht es dir? Ich hoffe, es geht dir gut. Ich schreibe dir, weil …' "
+            "    Enforce comma after 'Ihnen/dir,' in 'Ich schreibe Ihnen/dir, weil …'. "
+            "Formal: greeting → intro → clear argument/reason → supporting details → closing. "
+            "Informal: greeting → personal intro → main point/reason → brief examples → closing. "
+            "Opinion/argumentative: intro with thesis → arguments with examples → counterargument(s) → conclusion. "
+            "Always end with: 'Your next recommended step:' and ask for exactly one section at a time. "
+            "After each reply, give feedback, then 'Your next recommended step:' again. "
+            "Model connectors: 'denn', 'dennoch', 'außerdem', 'jedoch', 'zum Beispiel', 'einerseits … andererseits'. "
+            "Session pacing: finish in ~10 replies; end at 14 with 'Mark My Letter' paste instruction. "
+        ),
+        "C1": (
+            "You are Herr Felix, an advanced, supportive German writing coach for C1—idea generator + step-by-step coach. "
+            "Primarily reply in English; you may include German where useful and then explain it clearly. "
+            "Detect type: formal letter, informal letter, or academic/opinion essay. If unclear, ask which type. "
+            "    1) Give short ideas, structure, tips, and 2–3 word German fragments. Don’t overfeed. "
+            "    2) Enforce paragraph logic with sequence, cohesion, and topic sentences. "
+            "    3) Add 1–2 ideas after each submission (fragments) if helpful. "
+            "    4) Length targets: formal letter 120–150 words; opinion/academic essay 230–250 words. "
+            "    5) Correct grammar and suggest precise, higher-register phrasing (explain briefly if advanced). "
+            "Formal: greeting → sophisticated introduction → detailed argument → evidence/examples → closing. "
+            "Informal: greeting → nuanced intro → main point/reason → personal stance → polished closing. "
+            "Academic/opinion: intro with thesis & context → structured arguments → counterpoints → conclusion. "
+            "Always end with: 'Your next recommended step:' and ask for exactly one section at a time. "
+            "After each answer, provide feedback, then 'Your next recommended step:' again. "
+            "Model advanced connectors: 'nicht nur … sondern auch', 'obwohl', 'dennoch', 'folglich', 'somit'. "
+            "Session pacing: finish in ~10 replies; at 14, end and ask the student to paste into 'Mark My Letter' for scoring. "
+        ),
+    }
+
+
+
+    def reset_letter_coach():
+        for k in [
+            "letter_coach_stage", "letter_coach_chat", "letter_coach_prompt",
+            "letter_coach_type", "selected_letter_lines", "letter_coach_uploaded"
+        ]:
+            st.session_state[k] = 0 if k == "letter_coach_stage" else []
+        st.session_state["letter_coach_uploaded"] = False
+
+    def bubble(role, text):
+        if role == "assistant":
+            return f"""<div style='background: #f4eafd; color: #7b2ff2; border-radius: 16px 16px 16px 3px; margin-bottom: 8px; margin-right: 80px; box-shadow: 0 2px 8px rgba(123,47,242,0.08); padding: 13px 18px; text-align: left; max-width: 88vw; font-size: 1.12rem;'><b>👨‍🏫 Herr Felix:</b><br>{text}</div>"""
+        return f"""<div style='background: #eaf4ff; color: #1a237e; border-radius: 16px 16px 3px 16px; margin-bottom: 8px; margin-left: 80px; box-shadow: 0 2px 8px rgba(26,35,126,0.07); padding: 13px 18px; text-align: right; max-width: 88vw; font-size: 1.12rem;'><b>🙋 You:</b><br>{text}</div>"""
+
+    # --- General Instructions for Students (Minimal Welcome + Subline) ---
+    st.markdown(
+        """
+            <div style="
+                background: linear-gradient(97deg, #f4eafd 75%, #ffe0f5 100%);
+                border-radius: 12px;
+                border: 1px solid #e6d3fa;
+                box-shadow: 0 2px 8px #e5e1fa22;
+                padding: 0.75em 1em 0.72em 1em;
+                margin-bottom: 1.1em;
+                margin-top: 0.1em;
+                color: #4b2976;
+                font-size: 1.03rem;
+                font-family: 'Segoe UI', 'Roboto', 'Arial', sans-serif;
+                text-align: center;
+                ">
+                <span style="font-size:1.19em; vertical-align:middle;">✉️</span>
+                <span style="font-size:1.05em; font-weight: 500; margin-left:0.24em;">
+                    Welcome to <span style="color:#7b2ff2;">Letter Coach</span>
+                </span>
+                <div style="color:#b48be6; font-size:0.97em; margin-top:0.35em;">
+                    Get started below 👇
+                </div>
+            </div>
+            """,
+        unsafe_allow_html=True
+    )
+
+    # --- Stage 0: Prompt input ---
+    if st.session_state[ns("stage")] == 0:
+        if st.button("Start new write-up"):
+            st.session_state[ns("reset_coach")] = True
+            st.session_state["need_rerun"] = True
+        st.markdown("### ✏️ Enter your exam prompt or draft to start coaching")
+        draft_key = prompt_draft_key
+        initialize_draft_state(student_code, draft_key)
+
+
+        if st.session_state.pop(ns("clear_prompt"), False):
+            reset_local_draft_state(draft_key, "")
+            save_prompt_draft_now()
+
+        prompt = st.text_area(
+            "Exam prompt",
+            key=draft_key,
+            height=120,
+            placeholder="e.g., Schreiben Sie eine formelle E-Mail an Ihre Nachbarin ...",
+            label_visibility="collapsed",
+            on_change=save_prompt_draft_now,
+        )
+
+        render_umlaut_pad(
+            draft_key,
+            context=f"letter_coach_prompt_{student_code}",
+            disabled=False,
+        )
+
+        autosave_maybe(
+            student_code,
+            draft_key,
+            st.session_state.get(draft_key, ""),
+            min_secs=2.0,
+            min_delta=12,
+        )
+        sync_letter_coach_draft_state()
+
+        st.caption("Draft auto-saves every few seconds.")
+
+        saved_at = st.session_state.get(f"{draft_key}_saved_at")
+        if saved_at:
+            st.caption(f"Last saved at {saved_at.strftime('%H:%M:%S')}")
+
+        prompt = st.session_state.get(draft_key, "")
+
+        if prompt:
+            word_count = len(prompt.split())
+            char_count = len(prompt)
+            st.markdown(
+                (
+                    "<div style='color:#7b2ff2; font-size:0.97em; margin-bottom:0.18em;'>"
+                    f"Words: <b>{word_count}</b> &nbsp;|&nbsp; Characters: <b>{char_count}</b>"
+                    "</div>"
+                ),
+                unsafe_allow_html=True,
+            )
+
+        if st.button("✉️ Start Letter Coach"):
+            save_prompt_draft_now()
+
+            prompt = st.session_state.get(draft_key, "")
+            if prompt:
+                st.session_state[ns("prompt")] = prompt
+                student_level = st.session_state.get("schreiben_level", "A1")
+                system_prompt = LETTER_COACH_PROMPTS[student_level].format(prompt=prompt)
+                system_prompt += (
+                    f" The student's name is {student_name}. Always greet {student_name} and weave their name into your encouragement and guidance."
+                )
+                chat_history = [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ]
+                try:
+                    resp = client.chat.completions.create(
+                        model="gpt-4o",
+                        messages=chat_history,
+                        temperature=0.22,
+                        max_tokens=380
+                    )
+                    ai_reply = resp.choices[0].message.content
+                except Exception:
+                    ai_reply = "Sorry, there was an error generating a response. Please try again."
+                chat_history.append({"role": "assistant", "content": ai_reply})
+
+                st.session_state[ns("chat")] = chat_history
+                st.session_state[ns("stage")] = 1
+                save_letter_coach_progress(
+                    student_code,
+                    student_level,
+                    st.session_state[ns("prompt")],
+                    st.session_state[ns("chat")],
+                )
+                st.session_state[ns("clear_prompt")] = True
+                st.session_state["need_rerun"] = True
+                
+        if prompt:
+            st.markdown("---")
+            st.markdown(f"📝 **Letter/Essay Prompt or Draft:**\n\n{prompt}")
+
+    # --- Stage 1: Coaching Chat ---
+    elif st.session_state[ns("stage")] == 1:
+        st.markdown("---")
+        st.markdown(f"📝 **Letter/Essay Prompt:**\n\n{st.session_state[ns('prompt')]}")
+        chat_history = st.session_state[ns("chat")]
+        for msg in chat_history[1:]:
+            st.markdown(bubble(msg["role"], msg["content"]), unsafe_allow_html=True)
+        num_student_turns = sum(1 for msg in chat_history[1:] if msg["role"] == "user")
+        if num_student_turns == 10:
+            st.info("🔔 You have written 10 steps. Most students finish in 7–10 turns. Try to complete your letter soon!")
+        elif num_student_turns == 12:
+            st.warning(
+                "⏰ You have reached 12 writing turns. "
+                "Usually, your letter should be complete by now. "
+                "If you want feedback, click **END SUMMARY** or download your letter as TXT. "
+                "You can always start a new session for more practice."
+            )
+        elif num_student_turns > 12:
+            st.warning(
+                f"🚦 You are now at {num_student_turns} turns. "
+                "Long letters are okay, but usually a good letter is finished in 7–12 turns. "
+                "Try to wrap up, click **END SUMMARY** or download your letter as TXT."
+            )
+
+
+        draft_key = chat_draft_key
+        initialize_draft_state(student_code, draft_key)
+
+
+        if st.session_state.pop(ns("clear_chat_draft"), False):
+            reset_local_draft_state(draft_key, "")
+            save_chat_draft_now(show_toast=False)
+
+        if st.session_state.pop(ns("clear_chat"), False):
+            reset_local_draft_state(draft_key, "")
+            save_chat_draft_now(show_toast=False)
+
+        st.text_area(
+            "Chat input",
+            key=draft_key,
+            height=400,
+            placeholder="Type your reply, ask about a section, or paste your draft here...",
+            label_visibility="collapsed",
+
+        )
+
+        render_umlaut_pad(
+            draft_key,
+            context=f"letter_coach_chat_{student_code}",
+            disabled=False,
+        )
+        
+        autosave_maybe(
+            student_code,
+            draft_key,
+            st.session_state.get(draft_key, ""),
+            min_secs=0.2,
+            min_delta=1,
+        )
+        sync_letter_coach_draft_state()
+       
+        saved_at = st.session_state.get(f"{draft_key}_saved_at")
+        if saved_at:
+            st.caption(f"Last saved at {saved_at.strftime('%H:%M:%S')}")
+
+        letter_draft_key = ns("letter_draft_saved")
+        initialize_draft_state(student_code, letter_draft_key)
+        letter_draft = st.session_state.get(letter_draft_key, "")
+
+        def _reset_letter_coach_session() -> None:
+            """Clear the current coaching session and return to the prompt stage."""
+
+            st.session_state[ns("clear_chat_draft")] = True
+            st.session_state[ns("chat")] = []
+            st.session_state[ns("prompt")] = ""
+            st.session_state[ns("selected_letter_lines")] = []
+            st.session_state[ns("reset_coach")] = True
+            reset_local_draft_state(prompt_draft_key, "")
+            save_prompt_draft_now(show_toast=False)
+            clear_letter_coach_draft_state()
+            st.session_state["need_rerun"] = True
+
+        send_col, reset_col = st.columns([2, 3])
+        with send_col:
+            send = st.button(
+                "Send",
+                key=ns("send_button"),
+                type="primary",
+                use_container_width=True,
+            )
+        with reset_col:
+            start_new_top = st.button(
+                "Start New Letter Coach",
+                key=ns("start_new_letter_top"),
+                help="Clear this chat and begin a fresh coaching session.",
+                use_container_width=True,
+            )
+
+        if start_new_top:
+            _reset_letter_coach_session()
+
+        if send:
+            user_input = st.session_state[draft_key].strip()
+            save_chat_draft_now()
+
+        else:
+            user_input = ""
+
+        if user_input:
+            chat_history.append({"role": "user", "content": user_input})
+            student_level = st.session_state.get("schreiben_level", "A1")
+            system_prompt = LETTER_COACH_PROMPTS[student_level].format(prompt=st.session_state[ns("prompt")])
+            system_prompt += (
+                f" The student's name is {student_name}. Always greet {student_name} warmly and include their name in your feedback."
+            )
+            with st.spinner("👨‍🏫 Herr Felix is typing..."):
+                resp = client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[{"role": "system", "content": system_prompt}] + chat_history[1:],
+                    temperature=0.22,
+                    max_tokens=380
+                )
+                ai_reply = resp.choices[0].message.content
+            chat_history.append({"role": "assistant", "content": ai_reply})
+            st.session_state[ns("chat")] = chat_history
+            save_letter_coach_progress(
+                student_code,
+                student_level,
+                st.session_state[ns("prompt")],
+                st.session_state[ns("chat")],
+            )
+            st.session_state[ns("clear_chat")] = True
+            st.session_state["need_rerun"] = True
+
+        # ----- LIVE AUTO-UPDATING LETTER DRAFT, Download + Copy -----
+        import streamlit.components.v1 as components
+
+        user_msgs = [
+            msg["content"]
+            for msg in st.session_state[ns("chat")][1:]
+            if msg.get("role") == "user"
+        ]
+
+        st.markdown("""
+                **📝 Your Letter Draft**
+                - Tick the lines you want to include in your letter draft.
+                - You can untick any part you want to leave out.
+                - Only ticked lines will appear in your downloadable draft below.
+            """)
+
+        saved_letter_draft = st.session_state.get(letter_draft_key, "")
+        saved_at_key = f"{letter_draft_key}_saved_at"
+        saved_at = st.session_state.get(saved_at_key)
+        selection_key = ns("selected_letter_lines")
+
+        def _restore_selected_lines() -> List[bool]:
+            if not user_msgs:
+                return []
+            if not saved_at:
+                return [True] * len(user_msgs)
+            saved_lines = saved_letter_draft.splitlines()
+            if not saved_lines:
+                return [False] * len(user_msgs)
+            remaining = Counter(saved_lines)
+            restored: List[bool] = []
+            for msg in user_msgs:
+                if remaining.get(msg, 0):
+                    restored.append(True)
+                    remaining[msg] -= 1
+                else:
+                    restored.append(False)
+            return restored
+
+        if selection_key not in st.session_state:
+            st.session_state[selection_key] = _restore_selected_lines()
+        else:
+            current_selection = st.session_state[selection_key]
+            if len(current_selection) < len(user_msgs):
+                current_selection.extend([True] * (len(user_msgs) - len(current_selection)))
+            elif len(current_selection) > len(user_msgs):
+                st.session_state[selection_key] = current_selection[:len(user_msgs)]
+
+        selected_lines: List[str] = []
+        previous_letter_draft = saved_letter_draft
+        for i, line in enumerate(user_msgs):
+            selected = st.checkbox(
+                line,
+                value=st.session_state[selection_key][i],
+                key=ns(f"letter_line_{i}")
+            )
+            st.session_state[selection_key][i] = selected
+            if selected:
+                selected_lines.append(line)
+
+        letter_draft = "\n".join(selected_lines) if selected_lines else ""
+        if letter_draft != previous_letter_draft:
+            st.session_state[letter_draft_key] = letter_draft
+            autosave_maybe(
+                student_code,
+                letter_draft_key,
+                letter_draft,
+                min_secs=0.0,
+                min_delta=0,
+            )
+            saved_at = st.session_state.get(saved_at_key)
+
+        letter_draft = st.session_state.get(letter_draft_key, "")
+
+        saved_at = st.session_state.get(saved_at_key)
+        if saved_at:
+            st.caption(f"Last saved at {saved_at.strftime('%H:%M:%S')}")
+
+        # --- Live word/character count for the letter draft ---
+        draft_word_count = len(letter_draft.split())
+        draft_char_count = len(letter_draft)
+        st.markdown(
+            f"<div style='color:#7b2ff2; font-size:0.97em; margin-bottom:0.18em;'>"
+            f"Words: <b>{draft_word_count}</b> &nbsp;|&nbsp; Characters: <b>{draft_char_count}</b>"
+            "</div>",
+            unsafe_allow_html=True
+        )
+
+        # --- Modern, soft header (copy/download) ---
+        st.markdown(
+            """
+                <div style="
+                    background:#23272b;
+                    color:#eee;
+                    border-radius:10px;
+                    padding:0.72em 1.04em;
+                    margin-bottom:0.4em;
+                    font-size:1.07em;
+                    font-weight:400;
+                    border:1px solid #343a40;
+                    box-shadow:0 2px 10px #0002;
+                    text-align:left;
+                ">
+                    <span style="font-size:1.12em; color:#ffe082;">📝 Your Letter So Far</span><br>
+                    <span style="font-size:1.00em; color:#b0b0b0;">copy often or download below to prevent data loss</span>
+                </div>
+                """,
+            unsafe_allow_html=True
+        )
+
+        # --- Mobile-friendly copy/download box ---
+        components.html(f"""
+                <textarea id="letterBox_{student_code}" readonly rows="6" style="
+                    width: 100%;
+                    border-radius: 12px;
+                    background: #f9fbe7;
+                    border: 1.7px solid #ffe082;
+                    color: #222;
+                    font-size: 1.12em;
+                    font-family: 'Fira Mono', 'Consolas', monospace;
+                    padding: 1em 0.7em;
+                    box-shadow: 0 2px 8px #ffe08266;
+                    margin-bottom: 0.5em;
+                    resize: none;
+                    overflow:auto;
+                " onclick="this.select()">{letter_draft}</textarea>
+                <button onclick="navigator.clipboard.writeText(document.getElementById('letterBox_{student_code}').value)" 
+                    style="
+                        background:#ffc107;
+                        color:#3e2723;
+                        font-size:1.08em;
+                        font-weight:bold;
+                        padding:0.48em 1.12em;
+                        margin-top:0.4em;
+                        border:none;
+                        border-radius:7px;
+                        cursor:pointer;
+                        box-shadow:0 2px 8px #ffe08255;
+                        width:100%;
+                        max-width:320px;
+                        display:block;
+                        margin-left:auto;
+                        margin-right:auto;
+                    ">
+                    📋 Copy Text
+                </button>
+                <style>
+                    @media (max-width: 480px) {{
+                        #letterBox_{student_code} {{
+                            font-size: 1.16em !important;
+                            min-width: 93vw !important;
+                        }}
+                    }}
+                </style>
+            """, height=175)
+
+        st.markdown("""
+                <div style="
+                    background:#ffe082;
+                    padding:0.9em 1.2em;
+                    border-radius:10px;
+                    margin:0.4em 0 1.2em 0;
+                    color:#543c0b;
+                    font-weight:600;
+                    border-left:6px solid #ffc107;
+                    font-size:1.08em;">
+                    📋 <span>On phone, tap in the box above to select all for copy.<br>
+                    Or just tap <b>Copy Text</b>.<br>
+                    To download, use the button below.</span>
+                </div>
+            """, unsafe_allow_html=True)
+
+        st.download_button(
+            "⬇️ Download Letter as TXT",
+            letter_draft.encode("utf-8"),
+            file_name="my_letter.txt"
+        )
+
+        if st.button(
+            "Start New Letter Coach",
+            key=ns("start_new_letter_bottom"),
+            help="Clear this chat and return to the prompt input screen.",
+        ):
+            _reset_letter_coach_session()
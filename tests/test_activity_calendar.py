@@ -0,0 +1,60 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.activity_calendar import ActivityCalendar
+
+SCORES = pd.DataFrame(
+    {
+        "studentcode": ["ABC", "abc ", "abc", "abc", "abc", "xyz", "xyz", "abc"],
+        "date_norm": [
+            date(2025, 9, 1),
+            date(2025, 9, 2),
+            date(2025, 9, 3),
+            date(2025, 9, 22),
+            date(2025, 9, 23),
+            date(2025, 9, 22),
+            date(2025, 9, 23),
+            pd.NaT,
+        ],
+    }
+)
+
+
+def test_streaks_use_distinct_days():
+    scores = pd.concat([SCORES, SCORES.iloc[[4]]], ignore_index=True)
+    calendar = ActivityCalendar.from_scores(scores)
+
+    assert calendar.current_streak("ABC") == 2
+    assert calendar.longest_streak("abc") == 3
+    assert calendar.current_streak("missing") == 0
+    assert calendar.longest_streak("missing") == 0
+
+
+def test_current_streak_is_broken_after_a_missed_day():
+    calendar = ActivityCalendar.from_scores(SCORES)
+
+    assert calendar.current_streak("abc", today=date(2025, 9, 24)) == 2
+    assert calendar.current_streak("abc", today=date(2025, 9, 25)) == 0
+
+
+def test_weekly_count_and_heatmap_count_every_submission():
+    scores = pd.concat([SCORES, SCORES.iloc[[4]]], ignore_index=True)
+    calendar = ActivityCalendar.from_scores(scores)
+
+    assert calendar.submissions_this_week("abc", today=date(2025, 9, 24)) == 3
+    assert calendar.submissions_between("abc", date(2025, 9, 1), date(2025, 9, 2)) == 2
+
+    days, counts = calendar.heatmap("abc", date(2025, 9, 21), date(2025, 9, 24))
+    assert list(days) == list(np.arange("2025-09-21", "2025-09-25", dtype="datetime64[D]"))
+    assert list(counts) == [0, 1, 2, 0]
+
+
+def test_streak_leaderboard_and_fallback_without_date_norm():
+    calendar = ActivityCalendar.from_scores(SCORES)
+    assert calendar.streak_leaderboard() == [("abc", 2), ("xyz", 2)]
+
+    raw = pd.DataFrame({"studentcode": ["q"], "date": ["23.09.2025"]})
+    assert ActivityCalendar.from_scores(raw).days("Q").tolist() == [date(2025, 9, 23)]
+    assert len(ActivityCalendar.from_scores(pd.DataFrame())) == 0
@@ -1,49 +1,11 @@
-import ast
-import re
-from datetime import UTC, date, datetime
-from pathlib import Path
-from typing import Any, Iterable, Optional
+from datetime import date
 
 import pandas as pd
 
-
-def _load_assignment_date_helper():
-    src_path = Path(__file__).resolve().parents[1] / "a1sprechen.py"
-    source = src_path.read_text(encoding="utf-8")
-    tree = ast.parse(source, filename="a1sprechen.py")
-
-    assign_names = {
-        "CONTRACT_DATE_FORMATS",
-        "_ASSIGNMENT_DATE_COLUMNS",
-        "_ASSIGNMENT_DATE_REGEX_PATTERNS",
-    }
-    func_names = {"_parse_contract_date_value", "_normalize_assignment_submission_dates"}
-
-    nodes: list[Any] = []
-    for node in tree.body:
-        if isinstance(node, ast.Assign):
-            if any(isinstance(target, ast.Name) and target.id in assign_names for target in node.targets):
-                nodes.append(node)
-        elif isinstance(node, ast.FunctionDef) and node.name in func_names:
-            nodes.append(node)
-
-    module = ast.Module(body=nodes, type_ignores=[])
-    glb = {
-        "Any": Any,
-        "Iterable": Iterable,
-        "Optional": Optional,
-        "UTC": UTC,
-        "datetime": datetime,
-        "date": date,
-        "pd": pd,
-        "re": re,
-    }
-    exec(compile(module, "a1sprechen.py", "exec"), glb)
-    return glb["_normalize_assignment_submission_dates"]
+from src.assignment_dates import DATE_NORM_COLUMN, normalize_submission_dates
 
 
 def test_assignment_streak_handles_mixed_date_formats():
-    normalize_dates = _load_assignment_date_helper()
     df = pd.DataFrame(
         {
             "studentcode": ["abc123"] * 5,
@@ -57,7 +19,7 @@ def test_assignment_streak_handles_mixed_date_formats():
         }
     )
 
-    df["date"] = normalize_dates(df)
+    df["date"] = normalize_submission_dates(df)
 
     assert list(df["date"].notna()) == [True] * len(df)
     assert df.loc[1, "date"] == date(2025, 9, 23)
@@ -77,3 +39,78 @@ def test_assignment_streak_handles_mixed_date_formats():
             break
 
     assert streak == 3
+
+
+def test_each_known_format_and_fallback_is_parsed():
+    values = {
+        "2025-09-23": date(2025, 9, 23),
+        "2025-09-23 14:05:00": date(2025, 9, 23),
+        "2025-09-23T23:30:00-02:00": date(2025, 9, 24),
+        "2025-09-23T10:00:00Z": date(2025, 9, 23),
+        "09/24/2025": date(2025, 9, 24),
+        "23.09.25": date(2025, 9, 23),
+        "23.09.2025": date(2025, 9, 23),
+        "23.09.2025 14:05": date(2025, 9, 23),
+        "23-09-2025": date(2025, 9, 23),
+        "Sep 23, 2025": date(2025, 9, 23),
+        "due 2025/9/3 (late)": date(2025, 9, 3),
+        "handed in 3.9.2025!": date(2025, 9, 3),
+    }
+    df = pd.DataFrame({"Date": list(values) + ["", None, "nan", "soon"]})
+
+    result = normalize_submission_dates(df)
+
+    assert list(result.iloc[: len(values)]) == list(values.values())
+    assert result.iloc[len(values):].isna().all()
+    assert result.index.equals(df.index)
+
+
+def test_datetime_columns_and_missing_columns():
+    df = pd.DataFrame(
+        {"timestamp": pd.to_datetime(["2025-01-02 10:00", None]).tz_localize("UTC")},
+        index=[5, 7],
+    )
+    result = normalize_submission_dates(df)
+    assert result.loc[5] == date(2025, 1, 2)
+    assert pd.isna(result.loc[7])
+
+    missing = normalize_submission_dates(pd.DataFrame({"score": [1, 2]}))
+    assert missing.isna().all() and len(missing) == 2
+
+
+def test_scores_parser_adds_date_norm():
+    from src import assignment_ui
+
+    text = "Student Code,Assignment,Level,Score,Date\na1,1.1,A1,90,23.09.2025\n"
+
+    df = assignment_ui._parse_assignment_scores(text)
+
+    assert df.loc[0, DATE_NORM_COLUMN] == date(2025, 9, 23)
+    assert df.loc[0, "date"] == "23.09.2025"
+    assert df.loc[0, "studentcode"] == "a1"
+
+
+def test_offsets_do_not_shift_naive_values_in_the_same_column():
+    df = pd.DataFrame(
+        {
+            "Date": [
+                "2023-03-02T10:00:00+05:00",
+                "2023-03-02 01:51",
+                "2023-03-02T23:30:00-02:00",
+                "2023-03-02 23:30",
+                "Mar 2 2023 23:00 -05:00",
+                "Mar 2 2023 01:00",
+            ]
+        }
+    )
+
+    result = normalize_submission_dates(df)
+
+    assert list(result) == [
+        date(2023, 3, 2),
+        date(2023, 3, 2),
+        date(2023, 3, 3),
+        date(2023, 3, 2),
+        date(2023, 3, 3),
+        date(2023, 3, 2),
+    ]
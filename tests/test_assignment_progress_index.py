@@ -0,0 +1,75 @@
+import pandas as pd
+
+from src import assignment_ui
+from src.assignment_ui import (
+    AssignmentProgressIndex,
+    compile_schedule,
+    get_assignment_summary,
+    get_class_assignment_summaries,
+)
+
+SCHEDULE = [
+    {"day": 1, "chapter": "1.1", "assignment": True, "topic": "Ch1"},
+    {"day": 2, "chapter": "1.2", "assignment": True, "topic": "Goethe mock"},
+    {"day": 3, "chapter": "2.1", "assignment": True, "topic": "Ch2"},
+    {"day": 4, "chapter": "3.1", "assignment": False, "topic": "Review"},
+    {
+        "day": 5,
+        "chapter": "4.1",
+        "topic": "Ch4",
+        "lesen_hören": [{"chapter": "4.1", "assignment": True}, {"chapter": "4.2", "assignment": True}],
+    },
+]
+
+SCORES = pd.DataFrame(
+    {
+        "studentcode": ["S1", "s1 ", "S1", "S2", "S2", "S3"],
+        "assignment": ["1.1", "1.1", "2.1", "1.1", "4.1, 2", "1.1"],
+        "level": ["A1", "a1", "A1", "A1", "A1", "A2"],
+        "score": ["40", "85", "50%", "3/5", "90", "100"],
+    }
+)
+
+
+def test_index_keeps_best_score_per_chapter():
+    index = AssignmentProgressIndex.from_scores(SCORES)
+
+    assert index.best_scores("S1", "A1") == {1.1: 85.0, 2.1: 50.0}
+    assert index.best_scores("s2", "a1") == {1.1: 60.0, 4.1: 90.0, 4.2: 90.0}
+    assert index.best_scores("S3", "A1") == {}
+    assert index.students("A1") == ["s1", "s2"]
+
+
+def test_index_without_score_column_is_empty():
+    index = AssignmentProgressIndex.from_scores(SCORES.drop(columns=["score"]))
+    assert index.best_scores("S1", "A1") == {}
+
+
+def test_compile_schedule_skips_goethe_and_ungraded_lessons():
+    compiled = compile_schedule(SCHEDULE)
+
+    assert [lesson.day for lesson in compiled.lessons] == [1, 3, 5]
+    assert compiled.lessons[-1].relevant_nums == (4.1, 4.2)
+    assert compiled.identifiers == {1.1, 2.1, 4.1, 4.2}
+
+
+def test_compiled_schedule_is_reused_per_schedule_object(monkeypatch):
+    monkeypatch.setattr(assignment_ui, "_get_level_schedules", lambda: {"A1": SCHEDULE})
+    assert assignment_ui.get_compiled_schedule("a1") is assignment_ui.get_compiled_schedule("A1")
+
+
+def test_indexed_and_class_summaries_match_direct_summary(monkeypatch):
+    monkeypatch.setattr(assignment_ui, "_get_level_schedules", lambda: {"A1": SCHEDULE})
+    index = AssignmentProgressIndex.from_scores(SCORES)
+
+    direct = {code: get_assignment_summary(code, "A1", SCORES) for code in ("s1", "s2")}
+    indexed = {
+        code: get_assignment_summary(code, "A1", SCORES, progress=index) for code in ("s1", "s2")
+    }
+    class_wide = get_class_assignment_summaries("A1", progress=index)
+
+    assert direct == indexed == class_wide
+    assert direct["s1"]["failed_identifiers"] == [2.1]
+    assert direct["s1"]["next"] is None
+    assert direct["s2"]["missed"] == ["Day 3: Chapter 2.1 – Ch2"]
+    assert direct["s2"]["target"] == 4
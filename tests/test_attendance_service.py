@@ -0,0 +1,119 @@
+import pytest
+
+from src.attendance_service import AttendanceMatrix, AttendanceService
+
+
+class _Snap:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class _DB:
+    def __init__(self, docs):
+        self.docs = docs
+        self.streams = 0
+
+    def collection(self, name):
+        assert name in {"attendance", "sessions"}
+        return self
+
+    def document(self, name):
+        return self
+
+    def stream(self):
+        self.streams += 1
+        return [_Snap(doc_id, data) for doc_id, data in self.docs]
+
+
+DOCS = [
+    ("s1", {"label": "Woche 1: Hallo", "attendees": {"abc": 1.5, "XYZ": 1}}),
+    ("s2", {"label": "Woche 2: Zahlen", "students": {"abc": {"present": True, "hours": 2}}}),
+    ("s3", {"attendees": [{"code": "xyz"}, {"code": "new", "present": False}]}),
+]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_matrix_answers_student_and_class_queries():
+    matrix = AttendanceMatrix.from_documents(DOCS)
+
+    records, count, hours = matrix.student_records("abc")
+    assert [r["present"] for r in records] == [True, True, False]
+    assert (count, hours) == (2, 3.5)
+    assert matrix.student_summary(" ABC ") == (2, 3.5)
+    assert matrix.student_summary("xyz") == (2, 1.0)
+    assert matrix.student_records("nobody")[1:] == (0, 0.0)
+
+    assert matrix.class_report() == [
+        {"student_code": "abc", "sessions": 2, "hours": 3.5},
+        {"student_code": "xyz", "sessions": 2, "hours": 1.0},
+    ]
+    assert [row["present"] for row in matrix.session_report()] == [2, 1, 1]
+
+
+def test_service_loads_each_class_once_per_ttl():
+    clock = _Clock()
+    service = AttendanceService(ttl=60, clock=clock)
+    db = _DB(DOCS)
+
+    first = service.matrix("C1", db)
+    assert service.matrix("C1", db) is first
+    assert db.streams == 1
+
+    clock.now = 61
+    assert service.matrix("C1", db) is not first
+    assert db.streams == 2
+
+
+def test_stale_matrix_is_reloaded_after_the_ttl():
+    # Attendance is written outside the app; only the TTL brings changes in.
+    clock = _Clock()
+    service = AttendanceService(ttl=300, clock=clock)
+    db = _DB(DOCS[:1])
+    assert service.matrix("C1", db).student_summary("abc") == (1, 1.5)
+
+    db.docs = DOCS
+    clock.now = 299
+    assert service.matrix("C1", db).student_summary("abc") == (1, 1.5)
+
+    clock.now = 300
+    assert service.matrix("C1", db).student_summary("abc") == (2, 3.5)
+    assert db.streams == 2
+
+
+def test_invalidate_and_new_client_reload():
+    service = AttendanceService(ttl=600, clock=_Clock())
+    db = _DB(DOCS)
+    service.matrix("C1", db)
+
+    db.docs = DOCS[:1]
+    service.invalidate("C1")
+    assert len(service.matrix("C1", db)) == 1
+
+    other = _DB(DOCS)
+    assert len(service.matrix("C1", other)) == 3
+    assert other.streams == 1
+
+
+def test_failed_load_is_not_cached():
+    class _Broken(_DB):
+        def stream(self):
+            self.streams += 1
+            raise RuntimeError("boom")
+
+    service = AttendanceService(ttl=600, clock=_Clock())
+    broken = _Broken(DOCS)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            service.matrix("C1", broken)
+    assert broken.streams == 2
@@ -0,0 +1,39 @@
+import importlib.util
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "bench_startup", Path(__file__).resolve().parents[1] / "scripts" / "bench_startup.py"
+)
+bench = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(bench)
+
+
+def test_parse_importtime_reads_rows_and_skips_header():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   _io",
+            "import time:      2500 |      40000 | pandas",
+            "unrelated warning",
+        ]
+    )
+    rows = bench.parse_importtime(stderr)
+    assert [r["module"] for r in rows] == ["_io", "pandas"]
+    assert rows[1]["cumulative_ms"] == 40.0
+    assert rows[1]["self_ms"] == 2.5
+
+
+def test_check_budget_reports_regressions():
+    report = {
+        "imports": {"pandas": {"cumulative_ms": 700.0}, "flask": {"cumulative_ms": 90.0}},
+        "first_render": {"ms": 6000.0, "exceptions": ["boom"]},
+    }
+    budget = {
+        "imports_ms": {"pandas": 600, "flask": 250, "missing": 10},
+        "first_render_ms": 5000,
+        "fail_on_render_exception": True,
+    }
+    violations = bench.check_budget(report, budget)
+    assert len(violations) == 3
+    assert violations[0].startswith("import pandas")
+    assert bench.check_budget(report, {"imports_ms": {"flask": 250}}) == []
@@ -0,0 +1,262 @@
+from types import SimpleNamespace
+
+from firebase_admin import firestore
+
+from src.falowen import chat_core
+from src.falowen.chat_migration import migrate_legacy_chats
+from src.falowen.chat_storage import ConversationStore
+
+MSGS = "falowen_chats/S1/conversations/{}/messages"
+
+
+def _merge(target, data):
+    for key, value in data.items():
+        if value is firestore.DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif isinstance(value, dict):
+            target[key] = {}
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+
+class Ref:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return Coll(self.db, f"{self.path}/{name}")
+
+    def get(self):
+        self.db.reads.append(self.path)
+        return self.db.snap(self)
+
+    def set(self, data, merge=False):
+        self.db.write(self.path, data, merge)
+
+
+class Coll:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def document(self, name):
+        return Ref(self.db, f"{self.path}/{name}")
+
+    def stream(self):
+        self.db.reads.append(self.path)
+        depth = self.path.count("/") + 1
+        return [
+            self.db.snap(Ref(self.db, p))
+            for p in sorted(self.db.docs)
+            if p.startswith(self.path + "/") and p.count("/") == depth
+        ]
+
+
+class Batch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append((ref.path, data, merge))
+
+    def commit(self):
+        for op in self.ops:
+            self.db.write(*op)
+        self.db.commits += 1
+
+
+class FakeDB:
+    def __init__(self, docs=None):
+        self.docs = dict(docs or {})
+        self.reads = []
+        self.written = []
+        self.commits = 0
+
+    def write(self, path, data, merge):
+        self.written.append(path)
+        if merge:
+            _merge(self.docs.setdefault(path, {}), data)
+        else:
+            self.docs[path] = dict(data)
+
+    def snap(self, ref):
+        data = self.docs.get(ref.path)
+        return SimpleNamespace(
+            id=ref.id,
+            reference=ref,
+            exists=data is not None,
+            to_dict=lambda: dict(data or {}),
+        )
+
+    def collection(self, name):
+        return Coll(self, name)
+
+    def batch(self):
+        return Batch(self)
+
+
+def _messages(n):
+    return [{"role": "user" if i % 2 else "assistant", "content": f"m{i}"} for i in range(n)]
+
+
+def test_append_writes_only_new_messages():
+    db = FakeDB()
+    store = ConversationStore(db, "S1").load()
+
+    assert store.append("Chat_A1_custom_aa", _messages(2)) == 2
+    db.written.clear()
+    assert store.append("Chat_A1_custom_aa", _messages(4)) == 2
+    assert store.append("Chat_A1_custom_aa", _messages(4)) == 0
+
+    new_messages = [p for p in db.written if "/messages/" in p]
+    base = MSGS.format("Chat_A1_custom_aa")
+    assert new_messages == [f"{base}/000002", f"{base}/000003"]
+    index = db.docs["falowen_chat_index/S1"]
+    assert index["conversations"]["Chat_A1_custom_aa"]["message_count"] == 4
+    assert index["legacy_chats_migrated"] is True
+    assert db.docs["falowen_chats/S1/conversations/Chat_A1_custom_aa"]["message_count"] == 4
+
+    reloaded = ConversationStore(db, "S1").load()
+    assert reloaded.load_messages("Chat_A1_custom_aa") == _messages(4)
+    assert reloaded.message_counts() == {"Chat_A1_custom_aa": 4}
+
+
+def test_migrated_student_reads_index_and_one_conversation_only():
+    db = FakeDB()
+    store = ConversationStore(db, "S1").load()
+    store.append("Chat_A1_custom_aa", _messages(3))
+    store.append("Chat_A1_custom_bb", _messages(5))
+    db.reads.clear()
+
+    store = ConversationStore(db, "S1").load()
+    assert store.message_counts() == {"Chat_A1_custom_aa": 3, "Chat_A1_custom_bb": 5}
+    assert store.load_messages("Chat_A1_custom_bb") == _messages(5)
+    assert db.reads == [
+        "falowen_chat_index/S1",
+        "falowen_chats/S1",
+        MSGS.format("Chat_A1_custom_bb"),
+    ]
+
+
+def test_legacy_conversations_are_read_and_copied_on_first_append():
+    db = FakeDB(
+        {
+            "falowen_chats/S1": {
+                "chats": {"Chat_A1_custom_old": _messages(3), "topic_coach": _messages(1)},
+                "current_conv": {"Chat_A1_custom": "Chat_A1_custom_old"},
+            }
+        }
+    )
+    store = ConversationStore(db, "S1").load()
+    assert store.message_counts() == {"Chat_A1_custom_old": 3}
+    assert store.current_conv() == {"Chat_A1_custom": "Chat_A1_custom_old"}
+    assert store.load_messages("Chat_A1_custom_old") == _messages(3)
+
+    assert store.append("Chat_A1_custom_old", _messages(4)) == 4
+    assert ConversationStore(db, "S1").load().load_messages("Chat_A1_custom_old") == _messages(4)
+    assert db.docs["falowen_chat_index/S1"]["legacy_chats_migrated"] is True
+
+
+def test_migration_copies_marks_and_is_idempotent():
+    db = FakeDB(
+        {
+            "falowen_chats/S1": {
+                "chats": {
+                    "Chat_A1_custom_aa": _messages(3),
+                    "Chat_B1_Teil1_bb": _messages(2),
+                    "topic_coach": _messages(2),
+                },
+                "drafts": {"Chat_A1_custom_aa": "draft"},
+            },
+            "falowen_chats/S2": {"chats": {"Chat_A2_custom_cc": _messages(1)}},
+        }
+    )
+
+    dry = migrate_legacy_chats(db, dry_run=True)
+    assert dry["messages"] == 6 and db.commits == 0
+
+    stats = migrate_legacy_chats(db, delete_legacy=True)
+    assert stats == {"students": 2, "conversations": 3, "messages": 6, "kept": 0, "deleted": 3}
+    assert db.docs["falowen_chats/S1"]["chats"] == {"topic_coach": _messages(2)}
+    assert db.docs["falowen_chats/S1"]["drafts"] == {"Chat_A1_custom_aa": "draft"}
+
+    store = ConversationStore(db, "S1").load()
+    assert store.legacy == {}
+    assert store.load_messages("Chat_A1_custom_aa") == _messages(3)
+    assert ConversationStore(db, "S2").load().message_counts() == {"Chat_A2_custom_cc": 1}
+
+    db.docs["falowen_chats/S1"]["chats"]["Chat_A1_custom_aa"] = _messages(3)
+    again = migrate_legacy_chats(db, codes=["S1"])
+    assert again["kept"] == 1 and again["messages"] == 0
+
+
+def test_prepare_chat_session_opens_the_current_conversation(monkeypatch):
+    db = FakeDB()
+    ConversationStore(db, "S1").load().append("Chat_A1_custom_aa", _messages(2))
+    monkeypatch.setattr(chat_core, "st", SimpleNamespace(session_state={}))
+
+    session = chat_core.prepare_chat_session(
+        db=db, student_code="S1", mode="Chat", level="A1", teil=None
+    )
+    assert session.conv_key == "Chat_A1_custom_aa"
+    assert session.messages == _messages(2)
+    assert session.conversations == {"Chat_A1_custom_aa": 2}
+    assert not session.fresh_chat
+    index = db.docs["falowen_chat_index/S1"]
+    assert index["current_conv"] == {"Chat_A1_custom": "Chat_A1_custom_aa"}
+
+    chat_core.st.session_state.clear()
+    fresh = chat_core.prepare_chat_session(
+        db=db, student_code="S1", mode="Chat", level="B1", teil="Teil 1"
+    )
+    assert fresh.fresh_chat and fresh.messages == []
+    chat_core.persist_messages(fresh.doc_ref, fresh.conv_key, _messages(1))
+    assert ConversationStore(db, "S1").load().message_counts()[fresh.conv_key] == 1
+
+
+def test_reruns_reuse_the_session_store_and_messages(monkeypatch):
+    db = FakeDB({"falowen_chats/S1": {"drafts": {"Chat_A1_custom_aa": "half typed"}}})
+    ConversationStore(db, "S1").load().append("Chat_A1_custom_aa", _messages(200))
+    monkeypatch.setattr(chat_core, "st", SimpleNamespace(session_state={}))
+
+    db.reads.clear()
+    session = chat_core.prepare_chat_session(
+        db=db, student_code="S1", mode="Chat", level="A1", teil=None
+    )
+    assert len(session.messages) == 200
+    assert chat_core.st.session_state[session.draft_key] == "half typed"
+    assert len(db.reads) == 3  # index, chat document, one conversation
+
+    db.reads.clear()
+    for _ in range(3):
+        again = chat_core.prepare_chat_session(
+            db=db, student_code="S1", mode="Chat", level="A1", teil=None
+        )
+        assert again.messages is session.messages
+    assert db.reads == []
+
+
+def test_drafts_still_pick_the_conversation_after_migration(monkeypatch):
+    db = FakeDB(
+        {
+            "falowen_chats/S1": {
+                "chats": {"Chat_A1_custom_aa": _messages(5), "Chat_A1_custom_bb": _messages(1)},
+                "drafts": {"Chat_A1_custom_bb": "unsent"},
+            }
+        }
+    )
+    migrate_legacy_chats(db, delete_legacy=True)
+    monkeypatch.setattr(chat_core, "st", SimpleNamespace(session_state={}))
+
+    session = chat_core.prepare_chat_session(
+        db=db, student_code="S1", mode="Chat", level="A1", teil=None
+    )
+
+    assert session.conv_key == "Chat_A1_custom_bb"
+    assert chat_core.st.session_state[session.draft_key] == "unsent"
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src import class_board_cache
+from src.class_board_cache import ClassBoardCache
+
+
+BASE = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+
+class FakeSnap:
+    def __init__(self, doc_id, data, parent_post=None):
+        self.id = doc_id
+        self._data = data
+        post_ref = SimpleNamespace(id=parent_post)
+        self.reference = SimpleNamespace(parent=SimpleNamespace(parent=post_ref))
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+def change(kind, snap):
+    return SimpleNamespace(type=SimpleNamespace(name=kind), document=snap)
+
+
+class FakeWatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_active = True
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+        self.is_active = False
+
+
+class FakeRef:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def collection(self, name):
+        return FakeRef(self.db, self.path + (name,))
+
+    def document(self, name):
+        return FakeRef(self.db, self.path + (name,))
+
+    def order_by(self, *args, **kwargs):
+        return self
+
+    def start_at(self, *args, **kwargs):
+        return self
+
+    def end_at(self, *args, **kwargs):
+        return self
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(callback)
+        self.db.watches.append((self.path, watch))
+        return watch
+
+
+class FakeDB:
+    def __init__(self):
+        self.watches = []
+
+    def collection(self, name):
+        return FakeRef(self, (name,))
+
+    def collection_group(self, name):
+        return FakeRef(self, ("group", name))
+
+    def document(self, path):
+        return FakeRef(self, tuple(path.split("/")))
+
+
+def test_cache_applies_incremental_changes():
+    db = FakeDB()
+    cache = ClassBoardCache(db, "A1", "Class 1")
+    assert cache.start()
+    assert not cache.ready
+
+    p1 = FakeSnap("p1", {"content": "old", "timestamp": BASE})
+    p2 = FakeSnap("p2", {"content": "new", "timestamp": BASE + timedelta(hours=1)})
+    cache._on_posts([], [change("ADDED", p1), change("ADDED", p2)], None)
+    c1 = FakeSnap("c1", {"timestamp": BASE + timedelta(minutes=5)}, parent_post="p1")
+    c2 = FakeSnap("c2", {"timestamp": BASE + timedelta(minutes=1)}, parent_post="p1")
+    cache._on_comments([], [change("ADDED", c1), change("ADDED", c2)], None)
+
+    assert cache.ready and cache.healthy
+    assert [s.id for s in cache.post_snapshots()] == ["p2", "p1"]
+    assert [s.id for s in cache.post_snapshots(newest_first=False)] == ["p1", "p2"]
+    assert [s.id for s in cache.comment_snapshots("p1")] == ["c2", "c1"]
+    assert cache.comment_snapshots("p2") == []
+
+    version = cache.version
+    edited = FakeSnap("p1", {"content": "edited", "timestamp": BASE})
+    cache._on_posts([], [change("MODIFIED", edited)], None)
+    assert cache.wait_for_change(version, timeout=0)
+    assert cache.post_snapshots()[1].to_dict()["content"] == "edited"
+
+    cache._on_comments([], [change("REMOVED", c2)], None)
+    assert [s.id for s in cache.comment_snapshots("p1")] == ["c1"]
+
+    cache._on_posts([], [change("REMOVED", edited)], None)
+    assert [s.id for s in cache.post_snapshots()] == ["p2"]
+    assert cache.comments_by_post() == {}
+
+
+def test_close_unsubscribes_and_marks_unhealthy():
+    db = FakeDB()
+    cache = ClassBoardCache(db, "A1", "Class 1")
+    cache.start()
+    cache._on_posts([], [], None)
+    cache._on_comments([], [], None)
+    assert cache.healthy
+
+    cache.close()
+
+    assert all(w.unsubscribed for _, w in db.watches)
+    assert not cache.healthy
+
+
+def test_listener_paths_are_scoped_to_class():
+    db = FakeDB()
+    ClassBoardCache(db, "B1", "Evening").start()
+    paths = [p for p, _ in db.watches]
+    assert paths[0] == ("class_board", "B1", "classes", "Evening", "posts")
+    assert paths[1] == ("group", "comments")
+
+
+def test_build_returns_none_without_db():
+    assert class_board_cache._build_board_cache("A1", "C", db_getter=lambda: None) is None
+
+
+def test_build_gives_up_when_listeners_never_report():
+    db = FakeDB()
+    cache = class_board_cache._build_board_cache(
+        "A1", "C", db_getter=lambda: db, ready_timeout=0
+    )
+    assert cache is None
+    assert all(w.unsubscribed for _, w in db.watches)
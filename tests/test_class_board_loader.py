@@ -0,0 +1,271 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.class_board_cache import ClassBoardCache
+from src.class_board_loader import (
+    BoardData,
+    backfill_comment_post_ids,
+    load_board,
+    load_board_page,
+    window_posts,
+)
+
+
+BASE = datetime(2024, 5, 1, tzinfo=timezone.utc)
+POSTS = ("class_board", "A1", "classes", "Class 1", "posts")
+
+
+class Snap:
+    def __init__(self, path, data):
+        self.id = path[-1]
+        self._data = data
+        parent_post = SimpleNamespace(id=path[-3] if len(path) >= 3 else None)
+        self.reference = SimpleNamespace(
+            path="/".join(path), parent=SimpleNamespace(parent=parent_post)
+        )
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class Query:
+    def __init__(self, db, path, group=None):
+        self.db = db
+        self.path = path
+        self.group = group
+        self._limit = None
+        self._desc = False
+        self._after = None
+        self._pinned_only = False
+        self._post_ids = None
+
+    def collection(self, name):
+        return Query(self.db, self.path + (name,))
+
+    def document(self, name):
+        return Query(self.db, self.path + (name,))
+
+    def order_by(self, field, direction="ASCENDING"):
+        self._desc = direction == "DESCENDING"
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def where(self, *args, filter=None, **kwargs):
+        if getattr(filter, "field_path", None) == "post_id":
+            assert len(filter.value) <= 30
+            self._post_ids = set(filter.value)
+        else:
+            self._pinned_only = True
+        return self
+
+    def start_after(self, snap):
+        self._after = snap.to_dict()["timestamp"]
+        return self
+
+    def start_at(self, *args, **kwargs):
+        return self
+
+    def end_at(self, *args, **kwargs):
+        return self
+
+    def stream(self):
+        self.db.queries += 1
+        if self.group:
+            if self.db.fail_group:
+                raise RuntimeError("missing index")
+            docs = [
+                Snap(p, d)
+                for p, d in self.db.docs.items()
+                if len(p) == len(POSTS) + 3 and p[-2] == self.group
+            ]
+            if self._post_ids is not None:
+                docs = [d for d in docs if d.to_dict().get("post_id") in self._post_ids]
+            return iter(docs)
+        docs = [
+            Snap(p, d)
+            for p, d in self.db.docs.items()
+            if p[:-1] == self.path
+        ]
+        if self._pinned_only:
+            docs = [d for d in docs if d.to_dict().get("pinned")]
+        docs.sort(key=lambda s: s.to_dict()["timestamp"], reverse=self._desc)
+        if self._after is not None:
+            if self._desc:
+                docs = [d for d in docs if d.to_dict()["timestamp"] < self._after]
+            else:
+                docs = [d for d in docs if d.to_dict()["timestamp"] > self._after]
+        if self._limit:
+            docs = docs[: self._limit]
+        return iter(docs)
+
+
+class FakeDB:
+    def __init__(self, n_posts, comments_per_post=2):
+        self.queries = 0
+        self.fail_group = False
+        self.docs = {}
+        for i in range(n_posts):
+            post = POSTS + (f"p{i}",)
+            self.docs[post] = {"timestamp": BASE + timedelta(minutes=i)}
+            for j in range(comments_per_post):
+                self.docs[post + ("comments", f"c{i}_{j}")] = {
+                    "timestamp": BASE + timedelta(minutes=i, seconds=comments_per_post - j),
+                    "post_id": f"p{i}",
+                }
+
+    def collection(self, name):
+        return Query(self, (name,))
+
+    def collection_group(self, name):
+        return Query(self, (), group=name)
+
+    def document(self, path):
+        return Query(self, tuple(path.split("/")))
+
+    def batch(self):
+        return Batch(self)
+
+
+class Batch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append((tuple(ref.path.split("/")), data))
+
+    def commit(self):
+        for path, data in self.ops:
+            self.db.docs[path].update(data)
+
+
+def test_load_board_uses_constant_queries():
+    for n_posts in (1, 5, 50):
+        db = FakeDB(n_posts)
+        data = load_board(db, "A1", "Class 1")
+        assert data.queries == 2
+        assert db.queries == 2
+        assert len(data.posts) == n_posts
+        assert sum(len(c) for c in data.comments.values()) == n_posts * 2
+
+
+def test_load_board_orders_posts_and_comments():
+    db = FakeDB(3)
+    data = load_board(db, "A1", "Class 1")
+    assert [s.id for s in data.posts] == ["p2", "p1", "p0"]
+    assert [c.id for c in data.comments_for("p1")] == ["c1_1", "c1_0"]
+    assert data.comments_for("missing") == []
+
+
+def test_load_board_limit_reads_comments_of_loaded_posts_only():
+    db = FakeDB(5)
+    data = load_board(db, "A1", "Class 1", post_limit=2)
+    assert [s.id for s in data.posts] == ["p4", "p3"]
+    assert set(data.comments) == {"p4", "p3"}
+    assert data.queries == 1 + 1
+
+
+def test_load_board_without_posts_skips_comment_query():
+    db = FakeDB(0)
+    data = load_board(db, "A1", "Class 1")
+    assert data.posts == [] and data.queries == 1
+
+
+def test_load_board_falls_back_to_per_post_reads():
+    db = FakeDB(3)
+    db.fail_group = True
+    data = load_board(db, "A1", "Class 1")
+    assert data.queries == 1 + 1 + 3
+    assert [c.id for c in data.comments_for("p0")] == ["c0_1", "c0_0"]
+
+
+def test_board_data_from_cache_costs_no_queries():
+    cache = ClassBoardCache(None, "A1", "Class 1")
+    post = Snap(POSTS + ("p1",), {"timestamp": BASE})
+    comment = Snap(POSTS + ("p1", "comments", "c1"), {"timestamp": BASE})
+    cache._on_posts([], [SimpleNamespace(type="ADDED", document=post)], None)
+    cache._on_comments([], [SimpleNamespace(type="ADDED", document=comment)], None)
+
+    data = BoardData.from_cache(cache)
+
+    assert data.queries == 0
+    assert [s.id for s in data.posts] == ["p1"]
+    assert [c.id for c in data.comments_for("p1")] == ["c1"]
+
+
+def test_load_board_page_cost_is_independent_of_history():
+    small = FakeDB(20, comments_per_post=0)
+    large = FakeDB(2000, comments_per_post=0)
+    for db in (small, large):
+        data = load_board_page(db, "A1", "Class 1", page_size=20)
+        assert len(data.posts) == 20
+        assert data.queries == 1 + 1 + 1
+    assert [s.id for s in load_board_page(large, "A1", "Class 1").posts][:2] == ["p1999", "p1998"]
+
+
+def test_load_board_page_cost_depends_on_pages_not_page_size():
+    db = FakeDB(200, comments_per_post=1)
+    for page_size in (5, 20, 30):
+        for pages in (1, 3):
+            data = load_board_page(db, "A1", "Class 1", pages=pages, page_size=page_size)
+            assert len(data.posts) == pages * page_size
+            # pinned posts + one cursor query and one comments query per page
+            assert data.queries == 1 + 2 * pages
+            assert set(data.comments) == {s.id for s in data.posts}
+
+
+def test_load_board_page_reads_per_post_when_filtered_query_fails():
+    db = FakeDB(5, comments_per_post=1)
+    db.fail_group = True
+    data = load_board_page(db, "A1", "Class 1", page_size=10)
+    assert data.queries == 1 + 1 + 1 + 5
+    assert set(data.comments) == {s.id for s in data.posts}
+
+
+def test_load_board_page_walks_cursors_and_keeps_pinned_first():
+    db = FakeDB(50, comments_per_post=1)
+    db.docs[POSTS + ("p3",)]["pinned"] = True
+
+    data = load_board_page(db, "A1", "Class 1", pages=2, page_size=10)
+
+    ids = [s.id for s in data.posts]
+    assert ids[0] == "p3"
+    assert ids[1:] == [f"p{i}" for i in range(49, 29, -1)]
+    assert data.has_more
+    assert data.queries == 1 + 2 + 1 + 2
+    assert set(data.comments) == set(ids)
+    assert [c.id for c in data.comments_for("p40")] == ["c40_0"]
+
+
+def test_load_board_page_reports_end_of_board():
+    db = FakeDB(15, comments_per_post=0)
+    data = load_board_page(db, "A1", "Class 1", pages=3, page_size=10)
+    assert len(data.posts) == 15
+    assert not data.has_more
+
+
+def test_window_posts_keeps_pinned_and_cuts_the_rest():
+    posts = [{"id": f"p{i}", "pinned": i == 7} for i in range(30)]
+    pinned, visible, has_more = window_posts(posts, pages=1, page_size=10)
+    assert [p["id"] for p in pinned] == ["p7"]
+    assert len(visible) == 10 and "p7" not in {p["id"] for p in visible}
+    assert has_more
+
+    _, visible, has_more = window_posts(posts, pages=3, page_size=10)
+    assert len(visible) == 29 and not has_more
+
+
+def test_backfill_stores_the_parent_post_id():
+    db = FakeDB(3, comments_per_post=2)
+    for path, doc in db.docs.items():
+        if "comments" in path and path[-3] != "p0":
+            doc.pop("post_id")
+
+    assert backfill_comment_post_ids(db, dry_run=True) == 4
+    assert backfill_comment_post_ids(db) == 4
+    assert backfill_comment_post_ids(db) == 0
+    data = load_board_page(db, "A1", "Class 1")
+    assert [c.id for c in data.comments_for("p2")] == ["c2_1", "c2_0"]
@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src import class_board_stats as stats_mod
+from src.class_board_stats import (
+    BoardStats,
+    compute_board_stats,
+    count_board_posts,
+    load_board_stats,
+    post_chapter,
+    record_comment_added,
+    record_post_created,
+)
+
+
+NOW = datetime(2024, 5, 10, 12, tzinfo=timezone.utc)
+
+
+class FakeDoc:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def collection(self, name):
+        return FakeColl(self.db, self.path + (name,))
+
+    def get(self):
+        self.db.reads += 1
+        data = self.db.docs.get(self.path)
+        return SimpleNamespace(exists=data is not None, to_dict=lambda: dict(data or {}))
+
+    def update(self, updates):
+        if self.path not in self.db.docs:
+            raise KeyError("not found")
+        self.db.updates.append(updates)
+
+    def set(self, data, merge=False):
+        self.db.docs[self.path] = data
+
+
+class FakeColl:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.filters = []
+
+    def document(self, name):
+        return FakeDoc(self.db, self.path + (name,))
+
+    def where(self, *args, filter=None, **kwargs):
+        self.filters.append(filter)
+        return self
+
+    def count(self, alias=None):
+        def _get():
+            self.db.count_queries += 1
+            return [[SimpleNamespace(alias=alias, value=self.db.count_value)]]
+
+        return SimpleNamespace(get=_get)
+
+
+class FakeDB:
+    def __init__(self):
+        self.docs = {}
+        self.updates = []
+        self.reads = 0
+        self.count_queries = 0
+        self.count_value = 4
+
+    def collection(self, name):
+        return FakeColl(self, (name,))
+
+
+STATS_PATH = ("class_board", "A1", "classes", "C1", "meta", "class_board_stats")
+
+
+def test_post_chapter_prefers_field_and_parses_lesson_title():
+    assert post_chapter({"chapter": "2.1", "lesson": "Day 3: X (Chapter 1.2)"}) == "2.1"
+    assert post_chapter({"lesson": "Day 3: Familie (Chapter 1.2)"}) == "1.2"
+    assert post_chapter({"lesson": "free text"}) == ""
+
+
+def test_count_board_posts_is_cached(monkeypatch):
+    monkeypatch.setattr(stats_mod, "_count_cache", {})
+    db = FakeDB()
+    assert count_board_posts(db, "A1", "C1", chapter="1.2") == 4
+    db.count_value = 9
+    assert count_board_posts(db, "A1", "C1", chapter="1.2") == 4
+    assert db.count_queries == 1
+
+    stats_mod.invalidate_counts("A1", "C1")
+    assert count_board_posts(db, "A1", "C1", chapter="1.2") == 9
+    assert db.count_queries == 2
+
+
+def test_record_helpers_invalidate_count_cache(monkeypatch):
+    monkeypatch.setattr(stats_mod, "_count_cache", {})
+    db = FakeDB()
+    db.docs[STATS_PATH] = {"total": 0}
+    count_board_posts(db, "A1", "C1")
+    record_post_created(db, "A1", "C1", {"lesson": "Day 1: X (Chapter 1.1)", "timestamp": NOW}, now=NOW)
+    db.count_value = 5
+    assert count_board_posts(db, "A1", "C1") == 5
+
+    updates = db.updates[-1]
+    assert "total" in updates and "unanswered" in updates
+    assert "chapters.`1.1`" in updates
+    assert "new_by_day.`2024-05-10`" in updates
+
+
+def test_record_without_stats_doc_is_noop():
+    db = FakeDB()
+    record_comment_added(db, "A1", "C1", first_reply=True)
+    record_comment_added(db, "A1", "C1", first_reply=False)
+    assert db.updates == []
+
+
+def test_load_board_stats_single_read_and_prunes_old_buckets():
+    db = FakeDB()
+    db.docs[STATS_PATH] = {
+        "total": 12,
+        "unanswered": 3,
+        "chapters": {"1.1": 5},
+        "new_by_day": {"2024-05-09": 2, "2024-05-01": 1, "2024-03-01": 7},
+    }
+
+    stats = load_board_stats(db, "A1", "C1", now=NOW)
+
+    assert db.reads == 1
+    assert (stats.total, stats.unanswered) == (12, 3)
+    assert stats.chapter_count("1.1") == 5
+    assert stats.new_in_days(now=NOW) == 2
+    assert stats.new_in_days(14, now=NOW) == 3
+    assert db.updates == [{"new_by_day.`2024-03-01`": stats_mod.firestore.DELETE_FIELD}]
+
+
+def test_compute_board_stats_counts_unanswered_and_recent():
+    posts = [
+        {"id": "a", "timestamp": NOW - timedelta(days=1), "lesson": "Day 1: X (Chapter 1.1)"},
+        {"id": "b", "timestamp": NOW - timedelta(days=10)},
+        {"id": "c", "timestamp": NOW - timedelta(days=90)},
+    ]
+    stats = compute_board_stats(posts, {"a": 2}, now=NOW)
+    assert stats.total == 3
+    assert stats.unanswered == 2
+    assert stats.chapters == {"1.1": 1}
+    assert stats.new_in_days(now=NOW) == 1
+    assert BoardStats.from_dict(stats.to_dict()) == stats
+
+
+def test_compute_board_stats_honours_legacy_reply_fields():
+    posts = [
+        {"id": "a", "answers": [{"text": "x"}]},
+        {"id": "b", "replies": []},
+        {"id": "c", "reply_count": 2},
+        {"id": "d"},
+    ]
+    stats = compute_board_stats(posts, {"d": 1}, now=NOW)
+    assert stats.unanswered == 1
+
+
+def test_failed_rebuild_backs_off(monkeypatch):
+    from src import class_board_loader
+
+    monkeypatch.setattr(stats_mod, "_rebuild_failed", {})
+    clock = [1000.0]
+    monkeypatch.setattr(stats_mod.time, "monotonic", lambda: clock[0])
+    loads = []
+
+    def failing_load(db, level, class_name):
+        loads.append(class_name)
+        raise RuntimeError("permission denied")
+
+    monkeypatch.setattr(class_board_loader, "load_board", failing_load)
+    db = FakeDB()
+
+    assert load_board_stats(db, "A1", "C1") is None
+    assert load_board_stats(db, "A1", "C1") is None
+    assert loads == ["C1"]
+
+    clock[0] += stats_mod.STATS_REBUILD_RETRY_SECONDS
+    post = SimpleNamespace(id="p1", to_dict=lambda: {"timestamp": NOW})
+    monkeypatch.setattr(
+        class_board_loader,
+        "load_board",
+        lambda db, level, class_name: SimpleNamespace(posts=[post], comments={}),
+    )
+
+    def failing_set(self, data, merge=False):
+        raise RuntimeError("permission denied")
+
+    monkeypatch.setattr(FakeDoc, "set", failing_set)
+    stats = load_board_stats(db, "A1", "C1")
+    assert (stats.total, stats.unanswered) == (1, 1)
+
+    monkeypatch.setattr(class_board_loader, "load_board", failing_load)
+    assert load_board_stats(db, "A1", "C1") == stats
+    assert loads == ["C1"]
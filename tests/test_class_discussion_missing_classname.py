@@ -3,7 +3,7 @@ from pathlib import Path
 
 
 def test_class_discussion_skips_without_classname():
-    src = Path("a1sprechen.py").read_text(encoding="utf-8")
+    src = Path("tabs/my_course.py").read_text(encoding="utf-8")
     lines = src.splitlines()
     target = next(
         i + 1 for i, line in enumerate(lines) if "Class discussion count & link" in line
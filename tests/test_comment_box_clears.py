@@ -2,11 +2,12 @@ import ast
 import time
 from datetime import datetime, timezone
 
+from src.class_board_loader import COMMENT_POST_ID_FIELD
 from src.draft_management import _draft_state_keys
 
 
 def load_send_comment(stub_st):
-    with open('a1sprechen.py', 'r', encoding='utf-8') as f:
+    with open('tabs/my_course.py', 'r', encoding='utf-8') as f:
         tree = ast.parse(f.read())
     func_node = None
     for node in ast.walk(tree):
@@ -17,6 +18,7 @@ def load_send_comment(stub_st):
     glb = {
         'st': stub_st,
         'save_draft_to_db': lambda *a, **k: None,
+        'discard_pending_draft': lambda *a, **k: None,
         '_notify_slack': lambda *a, **k: None,
         '_dt': datetime,
         '_timezone': timezone,
@@ -24,7 +26,10 @@ def load_send_comment(stub_st):
         'time': time,
         'refresh_with_toast': lambda *a, **k: None,
         '_clear_typing_state': lambda **kwargs: None,
+        'record_comment_added': lambda *a, **k: None,
+        'db': None,
         'student_level': 'A1',
+        'COMMENT_POST_ID_FIELD': COMMENT_POST_ID_FIELD,
     }
     exec(compile(mod, 'a1sprechen.py', 'exec'), glb)
     return glb['send_comment']
@@ -118,6 +123,8 @@ def test_comment_submission_clears_box():
     except DummyStreamlit.StreamlitAPIException as exc:
         raise AssertionError('StreamlitAPIException should not be raised') from exc
 
+    assert board.doc.data[COMMENT_POST_ID_FIELD] == q_id
+
     st.locked.clear()
     render_comment_box(st, q_id, 's1')
     assert st.session_state[draft_key] == ''
@@ -22,3 +22,34 @@ def test_next_session_details_skips_to_second_day_when_first_passed():
     assert details["day_number"] == 2
     assert details["summary"] and details["summary"].startswith("Day 2 — ")
     assert any("Chapter 0.2" in label for label in details["sessions"])
+
+
+def test_all_bundled_schedules_are_indexed():
+    from src.course_schedule import all_schedules, schedule_index
+
+    names = [schedule["class_name"] for schedule in all_schedules()]
+    assert "A1 Munich Klasse" in names and "B1 Koln Klasse" in names
+    assert schedule_index() is schedule_index()
+    assert schedule_index().get(" a1 munich klasse ").class_name == "A1 Munich Klasse"
+
+
+def test_bulk_queries_match_single_class_lookups():
+    from src.course_schedule import schedule_index, session_summary_for_date
+
+    index = schedule_index()
+    classes = ["A1 Frankfurt Klasse", "A1 Bonn Klasse", "Unknown"]
+    ranges = index.sessions_between(classes, date(2025, 10, 20), date(2025, 11, 12))
+
+    assert ranges["Unknown"] == []
+    frankfurt = ranges["A1 Frankfurt Klasse"]
+    assert frankfurt[0].date == date(2025, 10, 23)
+    assert [d.date for d in frankfurt] == sorted(d.date for d in frankfurt)
+    for day in frankfurt:
+        assert day.summary == session_summary_for_date("A1 Frankfurt Klasse", day.date)
+
+    upcoming = index.next_sessions(classes, from_date=date(2025, 10, 22))
+    assert upcoming["A1 Frankfurt Klasse"] == next_session_details(
+        "A1 Frankfurt Klasse", from_date=date(2025, 10, 22)
+    )
+    assert upcoming["A1 Bonn Klasse"]["date"] == date(2025, 11, 10)
+    assert upcoming["Unknown"] is None
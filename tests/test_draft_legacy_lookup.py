@@ -0,0 +1,184 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import firestore_utils
+from src.draft_migration import migrate_legacy_drafts
+
+
+class Ref:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return Coll(self.db, f"{self.path}/{name}")
+
+    def get(self):
+        self.db.single_gets += 1
+        return self.db.snap(self)
+
+
+class Coll:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+
+    def document(self, name):
+        return Ref(self.db, f"{self.path}/{name}")
+
+    def stream(self):
+        depth = self.path.count("/") + 1
+        return [
+            self.db.snap(Ref(self.db, p))
+            for p in sorted(self.db.docs)
+            if p.startswith(self.path + "/") and p.count("/") == depth
+        ]
+
+    def list_documents(self):
+        depth = self.path.count("/") + 1
+        ids = {p.split("/")[depth] for p in self.db.docs if p.startswith(self.path + "/")}
+        return [Ref(self.db, f"{self.path}/{i}") for i in sorted(ids)]
+
+
+class Batch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append(("set", ref.path, data, merge))
+
+    def delete(self, ref):
+        self.ops.append(("delete", ref.path))
+
+    def commit(self):
+        for op in self.ops:
+            if op[0] == "delete":
+                self.db.docs.pop(op[1], None)
+            elif op[3]:
+                self.db.docs.setdefault(op[1], {}).update(op[2])
+            else:
+                self.db.docs[op[1]] = dict(op[2])
+        self.db.commits += 1
+
+
+class FakeDB:
+    def __init__(self, docs=None):
+        self.docs = dict(docs or {})
+        self.get_all_calls = []
+        self.single_gets = 0
+        self.commits = 0
+
+    def snap(self, ref):
+        data = self.docs.get(ref.path)
+        return SimpleNamespace(
+            id=ref.id,
+            reference=ref,
+            exists=data is not None,
+            to_dict=lambda: dict(data or {}),
+        )
+
+    def collection(self, name):
+        return Coll(self, name)
+
+    def collection_group(self, name):
+        docs = [p for p in sorted(self.docs) if p.split("/")[-2] == name]
+        return SimpleNamespace(stream=lambda: [self.snap(Ref(self, p)) for p in docs])
+
+    def get_all(self, refs):
+        refs = list(refs)
+        self.get_all_calls.append([r.path for r in refs])
+        return [self.snap(r) for r in reversed(refs)]
+
+    def batch(self):
+        return Batch(self)
+
+
+@pytest.fixture
+def use_db(monkeypatch):
+    def _use(db):
+        monkeypatch.setattr(firestore_utils, "db", db)
+        monkeypatch.setattr(firestore_utils, "_legacy_state", {})
+        return db
+
+    return _use
+
+
+def test_missing_draft_costs_one_round_trip_and_is_remembered(use_db):
+    db = use_db(FakeDB())
+
+    assert firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day1_ch1") == ("", None)
+    assert len(db.get_all_calls) == 1
+    assert len(db.get_all_calls[0]) == 4
+    assert db.single_gets == 0
+
+    firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day2_ch1")
+    assert db.get_all_calls[-1] == [
+        "drafts_v2/S1/lessons/A1_day2_ch1",
+        "drafts_v2/A1/lessons/A1_day2_ch1/users/S1",
+    ]
+
+
+def test_lookup_prefers_v2_then_compat_then_flat(use_db):
+    db = use_db(
+        FakeDB(
+            {
+                "drafts_v2/A1/lessons/A1_day1_ch1/users/S1": {"text": "compat", "updated_at": 2},
+                "draft_answers/S1": {
+                    "draft_A1_day1_ch1": "flat",
+                    "draft_A1_day3_ch1": "flat only",
+                    "draft_A1_day3_ch1__updated_at": 3,
+                },
+            }
+        )
+    )
+    assert firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day1_ch1") == ("compat", 2)
+    assert firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day3_ch1") == ("flat only", 3)
+
+    db.docs["drafts_v2/S1/lessons/A1_day1_ch1"] = {"text": "v2", "updated_at": 1}
+    assert firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day1_ch1") == ("v2", 1)
+
+
+def test_migrated_students_skip_fallbacks(use_db):
+    db = use_db(
+        FakeDB({"drafts_v2/S1": {firestore_utils.LEGACY_MARKER_FIELD: True}})
+    )
+    firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day1_ch1")
+    firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day2_ch1")
+    assert db.get_all_calls[-1] == ["drafts_v2/S1/lessons/A1_day2_ch1"]
+
+
+def test_migration_copies_marks_and_keeps_newer_v2(use_db):
+    db = use_db(
+        FakeDB(
+            {
+                "draft_answers/S1": {"draft_A1_day1_ch1": "flat", "draft_A2_day4_ch2": "flat2"},
+                "drafts_v2/A1/lessons/A1_day1_ch1/users/S1": {"text": "compat", "updated_at": 5},
+                "drafts_v2/S1/lessons/A2_day4_ch2": {"text": "newer"},
+                "drafts_v2/S2/lessons/A1_day1_ch1": {"text": "v2 only"},
+            }
+        )
+    )
+
+    stats = migrate_legacy_drafts(db, delete_legacy=True)
+
+    assert stats["copied"] == 1 and stats["kept_v2"] == 1
+    assert db.docs["drafts_v2/S1/lessons/A1_day1_ch1"]["text"] == "compat"
+    assert db.docs["drafts_v2/S1/lessons/A2_day4_ch2"]["text"] == "newer"
+    assert db.docs["drafts_v2/S1"][firestore_utils.LEGACY_MARKER_FIELD] is True
+    assert db.docs["drafts_v2/S2"][firestore_utils.LEGACY_MARKER_FIELD] is True
+    assert "drafts_v2/A1" not in db.docs
+    assert "draft_answers/S1" not in db.docs
+
+    assert firestore_utils.load_draft_meta_from_db("S1", "draft_A1_day1_ch1") == ("compat", 5)
+    assert firestore_utils._legacy_state["S1"] == firestore_utils._LEGACY_MIGRATED
+
+
+def test_migration_dry_run_writes_nothing():
+    db = FakeDB({"draft_answers/S1": {"draft_A1_day1_ch1": "flat"}})
+    stats = migrate_legacy_drafts(db, dry_run=True)
+    assert stats["copied"] == 1
+    assert db.commits == 0
+    assert list(db.docs) == ["draft_answers/S1"]
@@ -47,6 +47,8 @@ def test_autosave_maybe_handles_none_state(monkeypatch):
     save_mock = MagicMock()
     monkeypatch.setattr(dm, "save_draft_to_db", save_mock)
     monkeypatch.setattr(dm, "save_chat_draft_to_db", MagicMock())
+    # Write-behind unavailable: autosave falls back to a synchronous write.
+    monkeypatch.setattr(dm, "enqueue_draft_write", lambda *a: False)
 
     dm.autosave_maybe("code", draft_key, None, min_secs=0)
     dm.autosave_maybe("code", draft_key, "New text", min_secs=0)
@@ -0,0 +1,138 @@
+import threading
+import types
+from unittest.mock import MagicMock
+
+from src import draft_management as dm
+from src import draft_queue
+from src.draft_queue import DraftWriteQueue
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.ops = []
+
+    def set(self, ref, payload, merge=False):
+        self.ops.append((ref, payload, merge))
+
+    def commit(self):
+        if self.db.fail:
+            raise RuntimeError("unavailable")
+        self.db.batches.append(self.ops)
+
+
+class FakeDB:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def make_queue(db, **kwargs):
+    kwargs.setdefault("flush_interval", 3600)
+    return DraftWriteQueue(lambda: db, **kwargs)
+
+
+def test_repeated_saves_are_coalesced():
+    db = FakeDB()
+    queue = make_queue(db)
+    for text in ("a", "ab", "abc"):
+        queue.enqueue(("S1", "draft_A1_day1"), "ref1", {"text": text})
+    queue.enqueue(("S2", "draft_A1_day1"), "ref2", {"text": "x"})
+
+    assert queue.depth == 2
+    assert queue.flush() == 2
+    assert db.batches == [[("ref1", {"text": "abc"}, True), ("ref2", {"text": "x"}, True)]]
+    metrics = queue.metrics()
+    assert metrics["depth"] == 0
+    assert metrics["coalesced"] == 2
+    assert metrics["batches"] == 1 and metrics["written"] == 2
+    assert metrics["last_flush_ms"] >= 0.0
+    queue.close(flush=False)
+
+
+def test_flush_splits_into_batches_of_max_size():
+    db = FakeDB()
+    queue = make_queue(db, flush_threshold=10_000)
+    for i in range(1203):
+        queue.enqueue(("S", f"k{i}"), f"ref{i}", {"text": str(i)})
+
+    assert queue.flush() == 1203
+    assert [len(b) for b in db.batches] == [500, 500, 203]
+    queue.close(flush=False)
+
+
+def test_failed_batch_is_requeued_without_clobbering_newer_value():
+    db = FakeDB()
+    db.fail = True
+    queue = make_queue(db)
+    queue.enqueue(("S", "k"), "ref", {"text": "old"})
+
+    assert queue.flush() == 0
+    assert queue.depth == 1
+    assert queue.metrics()["failed_batches"] == 1
+
+    queue.enqueue(("S", "k"), "ref", {"text": "new"})
+    db.fail = False
+    queue.flush()
+    assert db.batches == [[("ref", {"text": "new"}, True)]]
+    queue.close(flush=False)
+
+
+def test_size_trigger_wakes_background_worker():
+    db = FakeDB()
+    queue = make_queue(db, flush_threshold=3)
+    done = threading.Event()
+    original = queue._commit
+
+    def _commit(chunk):
+        written = original(chunk)
+        done.set()
+        return written
+
+    queue._commit = _commit
+    for i in range(3):
+        queue.enqueue(("S", f"k{i}"), f"ref{i}", {"text": "t"})
+
+    assert done.wait(5)
+    assert sum(len(b) for b in db.batches) == 3
+    queue.close(flush=False)
+
+
+def test_discard_drops_pending_write():
+    db = FakeDB()
+    queue = make_queue(db)
+    queue.enqueue(("S", "k"), "ref", {"text": "stale"})
+
+    assert queue.discard(("S", "k"))
+    assert not queue.discard(("S", "k"))
+    assert queue.flush() == 0
+    assert db.batches == []
+    queue.close(flush=False)
+
+
+def test_autosave_enqueues_and_explicit_save_discards(monkeypatch):
+    db = FakeDB()
+    queue = make_queue(db)
+    monkeypatch.setattr(draft_queue, "_queue", queue)
+    monkeypatch.setattr(draft_queue, "get_draft_queue", lambda: queue)
+    monkeypatch.setattr(
+        draft_queue, "draft_write_op", lambda code, key, text: (f"{code}/{key}", {"text": text})
+    )
+    draft_key = "draft_A1_day1_ch1"
+    session_state = {draft_key: "final"}
+    monkeypatch.setattr(dm, "st", types.SimpleNamespace(session_state=session_state))
+    sync_save = MagicMock()
+    monkeypatch.setattr(dm, "save_draft_to_db", sync_save)
+
+    dm.autosave_maybe("S1", draft_key, "draft text", min_secs=0)
+    sync_save.assert_not_called()
+    assert queue.depth == 1
+
+    dm.save_before_download(draft_key, "S1")
+    sync_save.assert_called_once_with("S1", draft_key, "final")
+    assert queue.depth == 0
+    assert queue.flush() == 0
+    queue.close(flush=False)
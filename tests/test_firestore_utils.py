@@ -364,3 +364,35 @@ def test_fetch_attendance_summary_mixed_case_student_code(monkeypatch):
     count, hours = fetch_attendance_summary("ABC", "C1")
     assert count == 2
     assert abs(hours - 2.0) < 1e-6
+
+
+def test_canonical_labels_cover_all_levels():
+    from src import schedule
+
+    labels = firestore_utils.canonical_labels()
+    b1_topic = next(item["topic"] for item in schedule.get_b1_schedule() if item.get("topic"))
+    a1_topic = next(item["topic"] for item in schedule.get_a1_schedule() if item.get("topic"))
+    assert b1_topic in labels and a1_topic in labels
+    assert list(labels) == sorted(labels)
+    assert firestore_utils.CANONICAL_LABELS is labels
+
+
+def test_label_matcher_uses_exact_lookup_and_memoises_fuzzy(monkeypatch):
+    calls = []
+    real_extract = firestore_utils.process.extractOne
+
+    def _extract(*args, **kwargs):
+        calls.append(args[0])
+        return real_extract(*args, **kwargs)
+
+    monkeypatch.setattr(firestore_utils.process, "extractOne", _extract)
+    monkeypatch.setattr(
+        firestore_utils, "CANONICAL_LABELS", ["Greetings", "Numbers"], raising=False
+    )
+
+    assert normalize_label("Woche 1: Greetings") == "Greetings"
+    assert calls == []
+    for _ in range(3):
+        assert normalize_label("Woche 2: Numbrs") == "Numbers"
+        assert normalize_label("something else") == "something else"
+    assert calls == ["Numbrs", "something else"]
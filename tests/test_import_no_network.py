@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Imports every ``src`` module in a fresh interpreter with sockets disabled and
+# reports the modules that tried to open a connection while being imported.
+_PROBE = r"""
+import importlib
+import pkgutil
+import socket
+
+offenders = []
+current = [None]
+
+
+def _blocked(*args, **kwargs):
+    offenders.append(current[0])
+    raise OSError("network access during import")
+
+
+socket.socket.connect = _blocked
+socket.create_connection = _blocked
+socket.getaddrinfo = _blocked
+
+import src
+
+for info in pkgutil.walk_packages(src.__path__, "src."):
+    current[0] = info.name
+    try:
+        importlib.import_module(info.name)
+    except Exception:
+        pass  # modules with unavailable optional dependencies
+print("OFFENDERS:" + ",".join(sorted(set(offenders))))
+"""
+
+
+def test_importing_src_modules_opens_no_sockets(tmp_path):
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=300,
+        env={
+            "PATH": "",
+            "PYTHONPATH": str(ROOT),
+            "HOME": str(tmp_path),
+            "FALOWEN_SHEET_SNAPSHOT_DIR": str(tmp_path / "sheets"),
+        },
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    line = next(l for l in result.stdout.splitlines() if l.startswith("OFFENDERS:"))
+    assert line == "OFFENDERS:", line
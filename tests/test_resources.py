@@ -0,0 +1,104 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from flask import Flask
+
+from src import resources
+from src.resources import ConnectionStats, ResourceRegistry, build_http_client
+from src.routes.health import HEALTH_TOKEN_ENV, register_health_route
+
+
+def test_registry_builds_once_and_counts_reuse(monkeypatch):
+    monkeypatch.setattr(resources, "_creation_counts", resources.Counter())
+    registry = ResourceRegistry()
+    built = []
+
+    def factory():
+        built.append(1)
+        return object()
+
+    first = registry.get("thing", factory)
+    assert registry.get("thing", factory) is first
+    assert registry.get("thing", factory) is first
+    assert built == [1]
+    assert registry.diagnostics()["thing"]["created"] == 1
+    assert registry.diagnostics()["thing"]["reused"] == 2
+
+
+def test_failed_factory_is_retried(monkeypatch):
+    monkeypatch.setattr(resources, "_creation_counts", resources.Counter())
+    registry = ResourceRegistry()
+
+    def broken():
+        raise RuntimeError("no credentials")
+
+    with pytest.raises(RuntimeError):
+        registry.get("db", broken)
+    assert registry.get("db", lambda: "client") == "client"
+    assert registry.diagnostics()["db"]["created"] == 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_http_client_reuses_kept_alive_connection():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stats = ConnectionStats()
+    try:
+        with build_http_client(stats) as client:
+            url = f"http://127.0.0.1:{server.server_address[1]}/"
+            for _ in range(3):
+                assert client.get(url).text == "ok"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    snapshot = stats.snapshot()
+    assert snapshot["requests"] == 3
+    assert snapshot["connections"] == 1
+    assert snapshot["reused_connections"] == 2
+    assert snapshot["tls_handshakes"] == 0
+
+
+def test_diagnostics_route_is_off_without_a_token(monkeypatch):
+    monkeypatch.delenv(HEALTH_TOKEN_ENV, raising=False)
+    app = Flask(__name__)
+    register_health_route(app)
+    assert app.test_client().get("/health/resources").status_code == 404
+
+
+def test_diagnostics_route_requires_the_token(monkeypatch):
+    monkeypatch.setenv(HEALTH_TOKEN_ENV, "s3cret")
+    monkeypatch.setattr(resources, "get_registry", lambda: ResourceRegistry())
+    app = Flask(__name__)
+    register_health_route(app)
+    client = app.test_client()
+
+    assert client.get("/health/resources").status_code == 401
+    wrong = {"Authorization": "Bearer nope"}
+    assert client.get("/health/resources", headers=wrong).status_code == 401
+    response = client.get("/health/resources", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert "openai_pool" in response.get_json()
+
+
+def test_flask_app_is_built_once(monkeypatch):
+    registry = ResourceRegistry()
+    monkeypatch.setattr(resources, "get_registry", lambda: registry)
+    app = resources.get_flask_app()
+    assert resources.get_flask_app() is app
+    assert "/health" in {rule.rule for rule in app.url_map.iter_rules()}
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from src import roster_index
+from src.roster_index import ROSTER_FETCH_ID_ATTR, RosterIndex, get_roster_index
+
+
+def make_roster():
+    return pd.DataFrame(
+        [
+            {"StudentCode": " Felix1 ", "Email": "felix@x.com", "ClassName": "A1 Berlin", "Balance": np.nan},
+            {"StudentCode": "anna", "Email": "shared@x.com", "ClassName": "A1 Berlin", "Balance": "0"},
+            {"StudentCode": "ben", "Email": "SHARED@x.com", "ClassName": "B1 Munich", "Balance": "10"},
+        ]
+    )
+
+
+def test_code_email_and_class_lookups():
+    index = RosterIndex.from_frame(make_roster())
+
+    assert index.by_student_code("FELIX1")["Email"] == "felix@x.com"
+    assert index.by_student_code("felix1")["Balance"] is None
+    assert index.by_student_code("nobody") is None
+    assert [r["StudentCode"] for r in index.by_student_email(" shared@X.com")] == ["anna", "ben"]
+    assert [r["StudentCode"] for r in index.lookup("felix@x.com")] == [" Felix1 "]
+    assert index.lookup("ben")[0]["ClassName"] == "B1 Munich"
+    assert index.match("anna", "shared@x.com")["StudentCode"] == "anna"
+    assert index.match("anna", "felix@x.com") is None
+    assert [r["StudentCode"] for r in index.class_members("A1 Berlin")] == [" Felix1 ", "anna"]
+
+
+def test_returned_rows_are_copies():
+    index = RosterIndex.from_frame(make_roster())
+    index.by_student_code("anna")["Email"] = "changed"
+    assert index.by_student_code("anna")["Email"] == "shared@x.com"
+
+
+def test_index_is_shared_per_roster_fetch(monkeypatch):
+    monkeypatch.setattr(roster_index, "_index_cache", {})
+    df = make_roster()
+    df.attrs[ROSTER_FETCH_ID_ATTR] = "fetch-1"
+    copy = df.copy()
+
+    assert get_roster_index(df) is get_roster_index(copy)
+    assert get_roster_index(df.iloc[:1]) is not get_roster_index(df)
+    assert len(get_roster_index(make_roster())) == 3
+    assert len(get_roster_index(None)) == 0
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from src.roster_refresh import RosterRefreshCoordinator
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_refreshes_share_one_download():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader(force):
+        calls.append(force)
+        if force:
+            started.set()
+            release.wait(5)
+            return "fresh"
+        return "cached"
+
+    coordinator = RosterRefreshCoordinator(loader, min_interval=60)
+    results = []
+    leader = threading.Thread(target=lambda: results.append(coordinator.refresh()))
+    leader.start()
+    assert started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(coordinator.refresh())) for _ in range(5)
+    ]
+    for t in followers:
+        t.start()
+    deadline = time.monotonic() + 5
+    while coordinator.stats["joined"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert calls == [True]
+    assert results == ["fresh"] * 6
+
+
+def test_refreshes_within_min_interval_use_cached_roster():
+    clock = Clock()
+    calls = []
+    coordinator = RosterRefreshCoordinator(
+        lambda force: calls.append(force) or force, min_interval=60, clock=clock
+    )
+
+    assert coordinator.refresh() is True
+    clock.now += 30
+    assert coordinator.refresh() is False
+    clock.now += 31
+    assert coordinator.refresh() is True
+    assert calls == [True, False, True]
+    assert coordinator.stats["throttled"] == 1
+
+
+def test_failed_refresh_is_raised_and_still_rate_limited():
+    clock = Clock()
+
+    def loader(force):
+        if force:
+            raise RuntimeError("sheet down")
+        return "cached"
+
+    coordinator = RosterRefreshCoordinator(loader, min_interval=60, clock=clock)
+    with pytest.raises(RuntimeError):
+        coordinator.refresh()
+    assert coordinator.refresh() == "cached"
+
+
+def test_negative_cache_expires():
+    clock = Clock()
+    coordinator = RosterRefreshCoordinator(lambda force: None, miss_ttl=120, clock=clock)
+
+    assert not coordinator.is_known_missing("Typo@X.com")
+    coordinator.remember_missing(" typo@x.com ")
+    assert coordinator.is_known_missing("TYPO@x.com")
+    assert not coordinator.is_known_missing("")
+
+    clock.now += 121
+    assert not coordinator.is_known_missing("typo@x.com")
+
+    coordinator.remember_missing("bot")
+    coordinator.forget_missing("bot")
+    assert not coordinator.is_known_missing("bot")
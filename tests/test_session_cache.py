@@ -0,0 +1,103 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import falowen.sessions as sessions
+
+
+class FakeRef:
+    def __init__(self, db, token):
+        self.db = db
+        self.token = token
+
+    def get(self):
+        self.db.ops.append(("get", self.token))
+        data = self.db.docs.get(self.token)
+        return SimpleNamespace(exists=data is not None, to_dict=lambda: dict(data or {}))
+
+    def set(self, data):
+        self.db.ops.append(("set", self.token))
+        self.db.docs[self.token] = dict(data)
+
+    def update(self, data):
+        self.db.ops.append(("update", self.token))
+        self.db.docs[self.token].update(data)
+
+    def delete(self):
+        self.db.ops.append(("delete", self.token))
+        self.db.docs.pop(self.token, None)
+
+
+class FakeDB:
+    def __init__(self):
+        self.docs = {}
+        self.ops = []
+
+    def collection(self, name):
+        return SimpleNamespace(document=lambda token: FakeRef(self, token))
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(sessions, "get_db", lambda: db)
+    sessions.clear_session_cache()
+    yield db
+    sessions.clear_session_cache()
+
+
+def _seed(db, token, *, issued_ago=0.0, extended_ago=0.0):
+    now = time.time()
+    db.docs[token] = {
+        "student_code": "abc",
+        "issued_at": now - issued_ago,
+        "expires_at": now - extended_ago + sessions.SESSION_TTL_MIN * 60,
+        "ua_hash": "",
+    }
+
+
+def test_steady_state_reruns_issue_no_rpcs(fake_db):
+    _seed(fake_db, "tok")
+    for _ in range(5):
+        assert sessions.validate_session_token("tok")["student_code"] == "abc"
+        assert sessions.refresh_or_rotate_session_token("tok") == "tok"
+    assert fake_db.ops == [("get", "tok")]
+
+
+def test_extension_written_once_per_window(fake_db):
+    _seed(fake_db, "tok", extended_ago=sessions.SESSION_EXTEND_EVERY_SEC + 5)
+    sessions.refresh_or_rotate_session_token("tok")
+    sessions.refresh_or_rotate_session_token("tok")
+    assert fake_db.ops.count(("update", "tok")) == 1
+
+
+def test_rotation_uses_cached_issued_at(fake_db):
+    _seed(fake_db, "tok", issued_ago=sessions.SESSION_ROTATE_AFTER_MIN * 60 + 5)
+    sessions.validate_session_token("tok")
+    new_token = sessions.refresh_or_rotate_session_token("tok")
+    assert new_token != "tok"
+    assert "tok" not in fake_db.docs
+    fake_db.ops.clear()
+    assert sessions.validate_session_token(new_token)["student_code"] == "abc"
+    assert sessions.validate_session_token("tok") is None
+    assert fake_db.ops == [("get", "tok")]
+
+
+def test_cache_expires_and_destroy_invalidates(fake_db, monkeypatch):
+    _seed(fake_db, "tok")
+    sessions.validate_session_token("tok")
+    monkeypatch.setattr(sessions, "SESSION_CACHE_TTL_SEC", 0)
+    sessions.validate_session_token("tok")
+    assert fake_db.ops.count(("get", "tok")) == 2
+
+    monkeypatch.setattr(sessions, "SESSION_CACHE_TTL_SEC", 300)
+    sessions.destroy_session_token("tok")
+    assert sessions.validate_session_token("tok") is None
+
+
+def test_ua_mismatch_rejected_from_cache(fake_db):
+    _seed(fake_db, "tok")
+    fake_db.docs["tok"]["ua_hash"] = "ua1"
+    assert sessions.validate_session_token("tok", ua_hash="ua1")
+    assert sessions.validate_session_token("tok", ua_hash="ua2") is None
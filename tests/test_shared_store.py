@@ -0,0 +1,78 @@
+import copy
+import importlib.util
+import json
+import pickle
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src import schedule
+from src.shared_store import FrozenDict, FrozenList, deep_sizeof, freeze, session_memory_report
+
+
+def test_freeze_blocks_mutation_but_keeps_types():
+    frozen = freeze({"days": [{"day": 1, "sections": [{"chapter": "1.1"}]}], "pair": (1, [2])})
+
+    assert isinstance(frozen, dict) and isinstance(frozen["days"], list)
+    assert isinstance(frozen["pair"], tuple) and isinstance(frozen["pair"][1], FrozenList)
+    for mutate in (
+        lambda: frozen.__setitem__("x", 1),
+        lambda: frozen.update(x=1),
+        lambda: frozen.pop("days"),
+        lambda: frozen["days"].append({}),
+        lambda: frozen["days"][0].setdefault("topic", ""),
+        lambda: frozen["days"][0]["sections"].sort(),
+    ):
+        with pytest.raises(TypeError):
+            mutate()
+    assert json.loads(json.dumps(frozen)) == {
+        "days": [{"day": 1, "sections": [{"chapter": "1.1"}]}],
+        "pair": [1, [2]],
+    }
+
+
+def test_copies_are_mutable_and_pickles_stay_frozen():
+    frozen = freeze({"a": [{"b": 1}]})
+
+    shallow = copy.copy(frozen)
+    shallow["c"] = 2
+    deep = copy.deepcopy(frozen)
+    deep["a"][0]["b"] = 3
+    assert type(deep["a"]) is list and frozen["a"][0]["b"] == 1
+
+    restored = pickle.loads(pickle.dumps(frozen))
+    assert isinstance(restored, FrozenDict) and restored == frozen
+
+
+def test_level_schedules_are_shared_read_only():
+    first = schedule.load_level_schedules()
+
+    assert first is schedule.load_level_schedules()
+    assert first["A1"] and isinstance(first["A1"][0], dict)
+    with pytest.raises(TypeError):
+        first["A1"][0]["topic"] = "changed"
+
+
+def test_session_memory_report_ignores_shared_values():
+    shared = freeze({"lessons": [{"topic": "x" * 1000}]})
+    frame = pd.DataFrame({"a": range(1000)})
+    report = session_memory_report({"schedules": shared, "frame": frame, "n": [1]}, [shared])
+
+    assert report["keys"]["schedules"] == 0
+    assert report["keys"]["frame"] >= 8000
+    assert report["total_bytes"] == sum(report["keys"].values())
+    assert deep_sizeof(shared) > 1000
+
+
+def test_memory_report_script_shows_per_session_savings():
+    spec = importlib.util.spec_from_file_location(
+        "memory_report", Path(__file__).resolve().parents[1] / "scripts" / "memory_report.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    report = module.run(3)["level_schedules"]
+    assert report["before"]["bytes_per_session"] > 0
+    assert report["after"]["bytes_per_session"] == 0
+    assert report["after"]["total_bytes"] < report["before"]["total_bytes"]
@@ -0,0 +1,222 @@
+import logging
+
+import pytest
+
+from src import sheets
+from src.sheets import CsvSheet, SheetRefresher
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("sheet unavailable")
+        return f"v{self.calls}"
+
+
+def make(loader, clock, ttl=100):
+    refresher = SheetRefresher(clock=clock, poll_interval=10, background=False)
+    refresher.register("roster", loader, ttl=ttl)
+    return refresher
+
+
+def test_first_get_loads_then_serves_snapshot():
+    clock, loader = Clock(), Loader()
+    refresher = make(loader, clock)
+
+    assert refresher.get("roster") == "v1"
+    clock.now = 500  # long past the TTL: readers still get the snapshot at once
+    assert refresher.get("roster") == "v1"
+    assert loader.calls == 1
+
+
+def test_first_load_errors_propagate():
+    clock, loader = Clock(), Loader()
+    loader.fail = True
+    refresher = make(loader, clock)
+    with pytest.raises(RuntimeError):
+        refresher.get("roster")
+    with pytest.raises(KeyError):
+        refresher.get("unknown")
+
+
+def test_refresh_due_swaps_before_expiry():
+    clock, loader = Clock(), Loader()
+    refresher = make(loader, clock)
+    refresher.get("roster")
+
+    clock.now = 50
+    assert refresher.refresh_due() == 0
+    clock.now = 81
+    assert refresher.refresh_due() == 1
+    assert refresher.get("roster") == "v2"
+    assert refresher.status()["roster"]["age_sec"] == 0
+
+
+def test_failed_refresh_keeps_snapshot_and_backs_off(caplog):
+    clock, loader = Clock(), Loader()
+    refresher = make(loader, clock)
+    refresher.get("roster")
+    loader.fail = True
+
+    clock.now = 90
+    with caplog.at_level(logging.WARNING):
+        assert refresher.refresh_due() == 0
+    assert refresher.get("roster") == "v1"
+    assert refresher.status()["roster"]["failures"] == 1
+    assert "keeping last snapshot" in caplog.text
+
+    clock.now = 95  # still inside the back-off window
+    refresher.refresh_due()
+    assert loader.calls == 2
+
+    loader.fail = False
+    clock.now = 101
+    assert refresher.refresh_due() == 1
+    assert refresher.get("roster") == "v3"
+    assert refresher.status()["roster"]["failures"] == 0
+
+
+def test_forced_refresh_fetches_now():
+    clock, loader = Clock(), Loader()
+    refresher = make(loader, clock)
+    refresher.get("roster")
+    clock.now = 1
+    assert refresher.refresh("roster") == "v2"
+
+
+def test_views_are_derived_once_per_snapshot():
+    clock, loader = Clock(), Loader()
+    refresher = make(loader, clock)
+    builds = []
+
+    def build(value):
+        builds.append(value)
+        return value.upper()
+
+    assert refresher.view("roster", "upper", build) == "V1"
+    assert refresher.view("roster", "upper", build) == "V1"
+    clock.now = 1
+    refresher.refresh("roster")
+    assert refresher.view("roster", "upper", build) == "V2"
+    assert builds == ["v1", "v2"]
+
+
+class FakeResponse:
+    def __init__(self, text, status_code=200, headers=None):
+        self.text = text
+        self.content = text.encode()
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+def test_csv_sheet_skips_unchanged_bodies(monkeypatch, tmp_path):
+    responses = [
+        FakeResponse("German,English\nHaus,house\n", headers={"ETag": '"a"'}),
+        FakeResponse("", status_code=304),
+        FakeResponse("German,English\nHaus,house\n"),
+        FakeResponse("German,English\nHund,dog\n"),
+    ]
+    sent = []
+
+    def fake_get(url, timeout, headers):
+        sent.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(sheets.requests, "get", fake_get)
+    clock = Clock()
+    refresher = SheetRefresher(clock=clock, background=False, snapshot_dir=str(tmp_path))
+    refresher.register("vocab", CsvSheet("https://example.com/sheet.csv"), ttl=100, persist=True)
+
+    first = refresher.get("vocab")
+    assert first.loc[0, "German"] == "Haus"
+    for step in (1, 2):
+        clock.now = step
+        assert refresher.refresh("vocab") is first
+    assert sent[1]["If-None-Match"] == '"a"'
+    clock.now = 3
+    assert refresher.refresh("vocab").loc[0, "German"] == "Hund"
+    assert refresher.status()["vocab"]["generation"] == 2
+
+
+class CountingSheet:
+    """Serves a different CSV body on every download."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, url, timeout, headers):
+        self.calls += 1
+        return FakeResponse(f"name,n\nroster,{self.calls}\n")
+
+
+def _persisted(tmp_path, **kwargs):
+    refresher = SheetRefresher(clock=Clock(), background=False, snapshot_dir=str(tmp_path), **kwargs)
+    refresher.register("roster", CsvSheet("https://example.com/r.csv"), ttl=100, persist=True)
+    return refresher
+
+
+def test_persisted_snapshot_warms_a_new_process(monkeypatch, tmp_path):
+    fetch = CountingSheet()
+    monkeypatch.setattr(sheets.requests, "get", fetch)
+    tmp_path.chmod(0o700)
+    assert _persisted(tmp_path).get("roster").loc[0, "n"] == "1"
+    assert (tmp_path / "roster.csv").read_text() == "name,n\nroster,1\n"
+
+    assert _persisted(tmp_path).get("roster").loc[0, "n"] == "1"
+    assert fetch.calls == 1
+
+    assert _persisted(tmp_path, snapshot_max_age=-1).get("roster").loc[0, "n"] == "2"
+
+
+def test_snapshots_outside_a_private_directory_are_ignored(monkeypatch, tmp_path, caplog):
+    fetch = CountingSheet()
+    monkeypatch.setattr(sheets.requests, "get", fetch)
+    tmp_path.chmod(0o700)
+    _persisted(tmp_path).get("roster")
+
+    tmp_path.chmod(0o755)
+    with caplog.at_level(logging.WARNING):
+        assert _persisted(tmp_path).get("roster").loc[0, "n"] == "2"
+    assert "not a 0700 directory" in caplog.text
+    assert (tmp_path / "roster.csv").read_text() == "name,n\nroster,1\n"
+
+
+def test_persist_needs_a_csv_sheet():
+    refresher = SheetRefresher(background=False)
+    with pytest.raises(TypeError):
+        refresher.register("roster", Loader(), ttl=100, persist=True)
+
+
+def test_csv_sheet_rejects_html(monkeypatch):
+    monkeypatch.setattr(
+        sheets.requests, "get", lambda url, timeout, headers: FakeResponse("<html>login</html>")
+    )
+    with pytest.raises(ValueError):
+        CsvSheet("https://example.com/sheet.csv")()
+
+
+def test_sources_are_not_registered_by_the_rerun_script():
+    # a1sprechen.py and the tab scripts run on every rerun; re-registering
+    # there would replace the source and drop its snapshot each time.
+    from pathlib import Path
+
+    root = Path(__file__).resolve().parents[1]
+    for script in [root / "a1sprechen.py", *sorted((root / "tabs").glob("*.py"))]:
+        assert "sheet_refresher.register(" not in script.read_text(encoding="utf-8"), script
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from src import sheets, stats
+from src.sheets import CsvSheet, SheetRefresher
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode()
+
+    def raise_for_status(self):
+        pass
+
+
+def test_levels_keep_the_sheet_override_and_every_row(monkeypatch):
+    urls = []
+
+    def fake_get(url, timeout, headers):
+        urls.append(url)
+        # No row has a ContractEnd, and "ABC" repeats a code.
+        return FakeResponse("StudentCode,Level\nabc,a1\nABC,b1\nxyz,a2\n")
+
+    monkeypatch.setattr(sheets.requests, "get", fake_get)
+    monkeypatch.setattr(stats, "st", SimpleNamespace(secrets={}))
+    monkeypatch.setenv("ROSTER_SHEET_ID", "custom-sheet")
+    refresher = SheetRefresher(background=False)
+    refresher.register(
+        stats.STUDENT_LEVELS_SHEET,
+        CsvSheet(stats._student_levels_csv_url, stats._parse_student_levels),
+        ttl=stats.STUDENT_LEVELS_TTL_SEC,
+    )
+    monkeypatch.setattr(stats, "sheet_refresher", refresher)
+
+    levels = stats.load_student_levels()
+
+    assert urls == ["https://docs.google.com/spreadsheets/d/custom-sheet/export?format=csv"]
+    assert len(levels) == 3
+    assert stats.get_student_level("xyz") == "A2"
+    assert stats.get_student_level("abc") == "A1"
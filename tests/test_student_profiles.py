@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import firestore_utils
+
+
+class Ref:
+    def __init__(self, db, code):
+        self.db = db
+        self.id = code
+        self.path = f"students/{code}"
+
+    def get(self):
+        self.db.single_gets += 1
+        return self.db.snap(self)
+
+    def set(self, data, merge=False):
+        doc = self.db.docs.setdefault(self.id, {})
+        for key, value in data.items():
+            if value is firestore_utils.firestore.DELETE_FIELD:
+                doc.pop(key, None)
+            else:
+                doc[key] = value
+
+
+class FakeDB:
+    def __init__(self, docs):
+        self.docs = docs
+        self.get_all_calls = []
+        self.single_gets = 0
+
+    def collection(self, name):
+        assert name == "students"
+        return SimpleNamespace(document=lambda code: Ref(self, code))
+
+    def snap(self, ref):
+        data = self.docs.get(ref.id)
+        return SimpleNamespace(
+            id=ref.id, reference=ref, exists=data is not None, to_dict=lambda: dict(data or {})
+        )
+
+    def get_all(self, refs):
+        refs = list(refs)
+        self.get_all_calls.append([r.id for r in refs])
+        return [self.snap(r) for r in reversed(refs)]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = FakeDB({"a1": {"about": "Hallo"}, "b2": {"about": None}, "c3": {"name": "x"}})
+    monkeypatch.setattr(firestore_utils, "db", fake)
+    monkeypatch.setattr(firestore_utils, "_class_profiles", {})
+    return fake
+
+
+def test_class_bios_are_fetched_with_one_get_all(db):
+    bios = firestore_utils.load_student_profiles(["a1", "b2", "c3", "zz", "", "a1"], "Klasse")
+
+    assert bios == {"a1": "Hallo", "b2": "", "c3": "", "zz": ""}
+    assert db.get_all_calls == [["a1", "b2", "c3", "zz"]]
+    assert db.single_gets == 0
+
+
+def test_class_bios_are_cached_until_ttl_or_new_member(db, monkeypatch):
+    firestore_utils.load_student_profiles(["a1", "b2"], "Klasse")
+    firestore_utils.load_student_profiles(["b2", "a1"], "Klasse")
+    assert len(db.get_all_calls) == 1
+
+    firestore_utils.load_student_profiles(["a1", "b2", "c3"], "Klasse")
+    assert len(db.get_all_calls) == 2
+
+    monkeypatch.setattr(firestore_utils, "PROFILE_CACHE_TTL_SEC", 0)
+    firestore_utils.load_student_profiles(["a1"], "Klasse")
+    assert len(db.get_all_calls) == 3
+
+
+def test_saving_or_deleting_a_profile_drops_the_cached_class(db):
+    assert firestore_utils.load_student_profiles(["a1", "b2"], "Klasse")["b2"] == ""
+
+    firestore_utils.save_student_profile("b2", "Neu hier")
+    assert firestore_utils.load_student_profiles(["a1", "b2"], "Klasse")["b2"] == "Neu hier"
+
+    firestore_utils.delete_student_profile("a1")
+    assert firestore_utils.load_student_profiles(["a1", "b2"], "Klasse")["a1"] == ""
+    assert len(db.get_all_calls) == 3
+
+
+def test_without_db_returns_empty_bios(monkeypatch):
+    monkeypatch.setattr(firestore_utils, "db", None)
+    monkeypatch.setattr(firestore_utils, "get_db", lambda: None)
+    assert firestore_utils.load_student_profiles(["a1"], "Klasse") == {"a1": ""}
@@ -0,0 +1,35 @@
+import ast
+from pathlib import Path
+
+from src import tab_router
+
+
+def test_every_tab_script_exists_and_compiles():
+    for tab in tab_router.TAB_SCRIPTS:
+        assert tab_router.load_tab(tab) is not None
+    assert tab_router.load_tab("Unknown") is None
+
+
+def test_entry_script_routes_every_tab():
+    tree = ast.parse(Path("a1sprechen.py").read_text(encoding="utf-8"))
+    routed = {
+        node.args[0].value
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "run_tab"
+    }
+    assert routed == set(tab_router.TAB_SCRIPTS)
+
+
+def test_run_tab_executes_in_namespace_and_caches_code(tmp_path, monkeypatch):
+    script = tmp_path / "demo.py"
+    script.write_text("seen.append(tab_value * 2)\n", encoding="utf-8")
+    monkeypatch.setattr(tab_router, "TABS_DIR", str(tmp_path))
+    monkeypatch.setitem(tab_router.TAB_SCRIPTS, "Demo", "demo.py")
+
+    namespace = {"seen": [], "tab_value": 21}
+    assert tab_router.run_tab("Demo", namespace) is True
+    assert namespace["seen"] == [42]
+    assert tab_router.load_tab("Demo") is tab_router.load_tab("Demo")
+    assert tab_router.run_tab("Missing", namespace) is False